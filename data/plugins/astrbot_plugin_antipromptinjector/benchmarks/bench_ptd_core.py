@@ -0,0 +1,179 @@
+"""
+编码载荷检测与提示词净化的耗时对比：
+原实现每种编码各扫描一遍全文，净化时逐条以字符串模式调用 re.sub；
+现实现单次扫描定位全部编码片段并按需解码，净化规则预编译（SANITIZE_RULES）。
+两者的输出逐条比对，不一致时直接报错。
+
+在 AstrBot 根目录运行（main.py 需要 Python 3.12+）:
+    python data/plugins/astrbot_plugin_antipromptinjector/benchmarks/bench_ptd_core.py
+"""
+
+import base64
+import gzip
+import random
+import re
+import sys
+import time
+from pathlib import Path
+from urllib.parse import quote, unquote
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from data.plugins.astrbot_plugin_antipromptinjector.main import SANITIZE_RULES  # noqa: E402
+from data.plugins.astrbot_plugin_antipromptinjector.ptd_core import PromptThreatDetector  # noqa: E402
+
+PROMPT_PIECES = 4000
+CORPUS_SIZE = 2000
+ROUNDS = 5
+
+WORDS = [
+    "hello",
+    "system prompt",
+    "override",
+    "越狱",
+    "猫娘",
+    "jailbreak",
+    "你好",
+    "ignore previous instructions please",
+    "role: system",
+    "normal text",
+    "weather",
+]
+KEYWORDS = ("system prompt", "override", "jailbreak", "猫娘", "越狱")
+BASE64_KEYWORDS = KEYWORDS + ("ignore previous instructions", "developer mode override", "role: system", "begin prompt")
+
+LEGACY_BASE64 = re.compile(r"(?<![A-Za-z0-9+/=])([A-Za-z0-9+/]{24,}={0,2})(?![A-Za-z0-9+/=])")
+LEGACY_DATA_URI = re.compile(r"data:[^;]+;base64,([A-Za-z0-9+/]{24,}={0,2})", re.IGNORECASE)
+LEGACY_PERCENT = re.compile(r"(?:%[0-9a-fA-F]{2}){8,}")
+LEGACY_UNICODE = re.compile(r"(\\u[0-9a-fA-F]{4}){4,}")
+LEGACY_HEX = re.compile(r"(\\x[0-9a-fA-F]{2}){8,}")
+
+
+def legacy_b64(chunk):
+    return base64.b64decode(chunk + "=" * ((4 - len(chunk) % 4) % 4), validate=True)
+
+
+def legacy_encoded_signals(text):
+    """
+    原实现的编码载荷检测：每种编码各扫描一遍，Data URI 只看第一个命中。
+    Unicode / Hex 转义的拼接解码与现实现口径不同，语料中不含这两类片段，这里只保留扫描开销。
+    """
+    found = []
+    for chunk in LEGACY_BASE64.findall(text):
+        if len(chunk) > 4096:
+            continue
+        try:
+            raw = legacy_b64(chunk)
+        except Exception:
+            continue
+        try:
+            raw = gzip.decompress(raw)
+        except Exception:
+            pass
+        decoded = raw.decode("utf-8", "ignore")
+        if any(k in decoded.lower() for k in BASE64_KEYWORDS):
+            found.append(("base64_payload", "解码后包含指令片段: " + decoded.replace("\n", " ")[:120]))
+            break
+    for encoded in LEGACY_PERCENT.findall(text):
+        decoded = unquote(encoded)
+        if any(k in decoded.lower() for k in KEYWORDS):
+            found.append(("percent_encoded_payload", decoded.replace("\n", " ")[:120]))
+            break
+    LEGACY_UNICODE.findall(text)
+    LEGACY_HEX.findall(text)
+    m = LEGACY_DATA_URI.search(text)
+    if m:
+        try:
+            decoded = legacy_b64(m.group(1)).decode("utf-8", "ignore")
+        except Exception:
+            decoded = ""
+        if any(k in decoded.lower() for k in KEYWORDS):
+            found.append(("data_uri_payload", decoded.replace("\n", " ")[:120]))
+    names = [name for name, _ in found]
+    if len(found) >= 2:
+        found.append(("encoded_multi", None))
+    if "base64_payload" in names and re.search(r"powershell(?:\\.exe)?\s+-enc|certutil\s+-decode", text.lower()):
+        found.append(("base64_exec_chain", "base64 + exec"))
+    return found
+
+
+def new_encoded_signals(detector, text):
+    _, signals = detector._handle_encoded_payloads(text, text.lower(), [], 0)
+    return [(s["name"], None if s["name"] == "encoded_multi" else s["detail"]) for s in signals]
+
+
+def legacy_sanitize(s):
+    s = re.sub(r"^/system\s+.*", "", s, flags=re.IGNORECASE | re.MULTILINE)
+    s = re.sub(r"^```(system|prompt|json|tools|function).*?```", "", s, flags=re.IGNORECASE | re.DOTALL)
+    s = re.sub(r"\brole\s*:\s*system\b.*", "", s, flags=re.IGNORECASE)
+    s = re.sub(r"\b(function_call|tool_use)\s*:\s*\{[\s\S]*?\}", "", s, flags=re.IGNORECASE)
+    s = re.sub(r"data:[^;]+;base64,[A-Za-z0-9+/]{24,}={0,2}", "[redacted-base64]", s, flags=re.IGNORECASE)
+    s = re.sub(r"(curl|wget|invoke-?webrequest|iwr)\b[\s\S]*?https?://\S+", "[redacted-link-fetch]", s, flags=re.IGNORECASE)
+    s = re.sub(r"<<\s*SYS\s*>>[\s\S]*?(?=<<|$)", "", s, flags=re.IGNORECASE)
+    s = re.sub(r"(BEGIN|END)\s+(SYSTEM|PROMPT|INSTRUCTIONS)[\s\S]*", "", s, flags=re.IGNORECASE)
+    s = re.sub(r"<!--[\s\S]*?-->", "", s, flags=re.IGNORECASE)
+    return s
+
+
+def sanitize(s):
+    for pattern, replacement in SANITIZE_RULES:
+        s = pattern.sub(replacement, s)
+    return s
+
+
+def make_text(rnd, pieces):
+    """随机拼接编码片段与普通文本；每条文本只放一个 Data URI，与原实现的比较口径一致"""
+    parts = []
+    has_uri = False
+    for _ in range(pieces):
+        w = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 6)))
+        k = rnd.randint(0, 6)
+        if k == 0:
+            w = base64.b64encode(w.encode()).decode()
+        elif k == 1:
+            w = base64.b64encode(gzip.compress(w.encode())).decode()
+        elif k == 2:
+            w = quote(w, safe="")
+        elif k == 3 and not has_uri:
+            w = "data:text/plain;base64," + base64.b64encode(w.encode()).decode()
+            has_uri = True
+        elif k == 4:
+            w = "powershell -enc " + base64.b64encode(w.encode("utf-16le")).decode()
+        elif k == 5:
+            w = "https://pastebin.com/raw/abc curl fetch"
+        parts.append(w)
+    return " ".join(parts)
+
+
+def timed(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    rnd = random.Random(7)
+    detector = PromptThreatDetector()
+    corpus = [make_text(rnd, rnd.randint(1, 8)) for _ in range(CORPUS_SIZE)]
+    big = make_text(rnd, PROMPT_PIECES)
+
+    for text in corpus + [big]:
+        assert new_encoded_signals(detector, text) == legacy_encoded_signals(text), text[:200]
+        assert sanitize(text) == legacy_sanitize(text), text[:200]
+
+    print(f"编码载荷检测，{len(corpus)} 条短文本:")
+    print(f"  原实现 {timed(lambda: [legacy_encoded_signals(t) for t in corpus], ROUNDS):8.1f} ms")
+    print(f"  现实现 {timed(lambda: [new_encoded_signals(detector, t) for t in corpus], ROUNDS):8.1f} ms")
+    print(f"编码载荷检测，长提示词 {len(big)} 字符:")
+    print(f"  原实现 {timed(lambda: legacy_encoded_signals(big), ROUNDS):8.1f} ms")
+    print(f"  现实现 {timed(lambda: new_encoded_signals(detector, big), ROUNDS):8.1f} ms")
+    print(f"提示词净化，{len(corpus)} 条短文本 + 长提示词:")
+    texts = corpus + [big]
+    print(f"  原实现 {timed(lambda: [legacy_sanitize(t) for t in texts], ROUNDS):8.1f} ms")
+    print(f"  现实现 {timed(lambda: [sanitize(t) for t in texts], ROUNDS):8.1f} ms")
+    print("输出一致")
+
+
+if __name__ == "__main__":
+    main()
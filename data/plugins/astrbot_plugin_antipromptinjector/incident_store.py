@@ -0,0 +1,304 @@
+import asyncio
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+
+class IncidentStore:
+    """
+    Persistent, indexed store for intercept incidents and analysis logs.
+
+    - SQLite in WAL mode; indexes on time / sender / group / severity
+    - FTS5 (trigram when available) over reason + prompt text for keyword search
+    - Writes never block the request path: ``append`` only enqueues into a bounded
+      queue, a background task flushes batches off the event loop; when the queue
+      is full the record is dropped and counted
+    - Keyset (cursor) pagination by row id, plus hourly / per-group aggregates
+    """
+
+    KINDS = ("incidents", "analysis_logs")
+
+    _COLUMNS: Dict[str, Tuple[str, ...]] = {
+        "incidents": (
+            "time", "sender_id", "group_id", "severity", "score", "reason", "defense_mode",
+            "trigger", "prompt_preview", "action_taken", "prompt",
+        ),
+        "analysis_logs": (
+            "time", "sender_id", "group_id", "severity", "score", "trigger", "result", "reason",
+            "prompt_preview", "core_version", "action_taken", "persona_score", "persona_action",
+            "persona_reason", "prompt",
+        ),
+    }
+    # 仅用于等值过滤的列（走索引）
+    _EQ_FILTERS: Dict[str, Tuple[str, ...]] = {
+        "incidents": ("sender_id", "group_id", "severity", "trigger", "action_taken"),
+        "analysis_logs": (
+            "sender_id", "group_id", "severity", "trigger", "action_taken", "result", "persona_action",
+        ),
+    }
+
+    PROMPT_MAX_CHARS = 4000
+
+    def __init__(
+        self,
+        db_path: Union[str, Path],
+        queue_size: int = 10000,
+        batch_size: int = 200,
+        flush_interval: float = 1.0,
+        retention_days: int = 30,
+    ) -> None:
+        self.db_path = Path(db_path)
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = max(0.05, float(flush_interval))
+        self.retention_days = max(0, int(retention_days))
+        # None 为停止哨兵，由 close() 投递
+        self._queue: "asyncio.Queue[Optional[Tuple[str, Dict[str, Any]]]]" = asyncio.Queue(maxsize=max(1, int(queue_size)))
+        self._writer_task: Optional[asyncio.Task] = None
+        self._write_lock = threading.Lock()
+        self._read_lock = threading.Lock()
+        self.fts_enabled = False
+        self.fts_trigram = False
+        self.stats: Dict[str, int] = {"queued": 0, "written": 0, "dropped": 0, "write_errors": 0}
+        self._writer = self._connect()
+        self._init_schema()
+        self._reader = self._connect()
+
+    # ----------------------------------------------------------------- schema
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._writer
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS incidents ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, time REAL NOT NULL, sender_id TEXT, group_id TEXT, "
+            "severity TEXT, score REAL, reason TEXT, defense_mode TEXT, trigger TEXT, "
+            "prompt_preview TEXT, action_taken TEXT, prompt TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS analysis_logs ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, time REAL NOT NULL, sender_id TEXT, group_id TEXT, "
+            "severity TEXT, score REAL, trigger TEXT, result TEXT, reason TEXT, prompt_preview TEXT, "
+            "core_version TEXT, action_taken TEXT, persona_score REAL, persona_action TEXT, "
+            "persona_reason TEXT, prompt TEXT)"
+        )
+        for table in self.KINDS:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_time ON {table}(time)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_sender ON {table}(sender_id, time)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_group ON {table}(group_id, time)")
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{table}_severity ON {table}(severity, time)")
+        conn.commit()
+
+        for tokenizer in ("trigram", "unicode61"):
+            try:
+                for table in self.KINDS:
+                    conn.execute(
+                        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table}_fts USING fts5("
+                        f"reason, prompt, content='{table}', content_rowid='id', tokenize='{tokenizer}')"
+                    )
+                    conn.execute(
+                        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ai AFTER INSERT ON {table} BEGIN "
+                        f"INSERT INTO {table}_fts(rowid, reason, prompt) VALUES (new.id, new.reason, new.prompt); END"
+                    )
+                    conn.execute(
+                        f"CREATE TRIGGER IF NOT EXISTS {table}_fts_ad AFTER DELETE ON {table} BEGIN "
+                        f"INSERT INTO {table}_fts({table}_fts, rowid, reason, prompt) "
+                        f"VALUES ('delete', old.id, old.reason, old.prompt); END"
+                    )
+                conn.commit()
+                self.fts_enabled = True
+                self.fts_trigram = tokenizer == "trigram"
+                break
+            except sqlite3.OperationalError:
+                conn.rollback()
+                continue
+
+    # ----------------------------------------------------------------- writer
+    def start(self) -> None:
+        if self._writer_task is None or self._writer_task.done():
+            self._writer_task = asyncio.create_task(self._writer_loop())
+
+    def append(self, kind: str, entry: Dict[str, Any]) -> bool:
+        """非阻塞入队；队列已满时丢弃并计数。"""
+        try:
+            self._queue.put_nowait((kind, entry))
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    async def _writer_loop(self) -> None:
+        last_retention = 0.0
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch = [item]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    # 收到停止哨兵：先写完手上的批次再退出
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if not stopping and self.retention_days and time.time() - last_retention > 3600:
+                last_retention = time.time()
+                try:
+                    await asyncio.to_thread(self._apply_retention)
+                except Exception:
+                    self.stats["write_errors"] += 1
+
+    async def _flush(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        try:
+            await asyncio.to_thread(self._write_batch, batch)
+            self.stats["written"] += len(batch)
+        except Exception:
+            self.stats["write_errors"] += 1
+
+    def _write_batch(self, batch: List[Tuple[str, Dict[str, Any]]]) -> None:
+        grouped: Dict[str, List[Tuple[Any, ...]]] = {}
+        for kind, entry in batch:
+            if kind not in self._COLUMNS:
+                continue
+            row = []
+            for col in self._COLUMNS[kind]:
+                value = entry.get(col)
+                if col == "prompt" and isinstance(value, str):
+                    value = value[: self.PROMPT_MAX_CHARS]
+                row.append(value)
+            grouped.setdefault(kind, []).append(tuple(row))
+        with self._write_lock:
+            for kind, rows in grouped.items():
+                cols = self._COLUMNS[kind]
+                self._writer.executemany(
+                    f"INSERT INTO {kind} ({', '.join(cols)}) VALUES ({', '.join('?' for _ in cols)})",
+                    rows,
+                )
+            self._writer.commit()
+
+    def _apply_retention(self) -> None:
+        cutoff = time.time() - self.retention_days * 86400
+        with self._write_lock:
+            for table in self.KINDS:
+                self._writer.execute(f"DELETE FROM {table} WHERE time < ?", (cutoff,))
+            self._writer.commit()
+
+    async def flush_pending(self) -> None:
+        batch: List[Tuple[str, Dict[str, Any]]] = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        if batch:
+            await self._flush(batch)
+
+    async def close(self) -> None:
+        if self._writer_task:
+            if not self._writer_task.done():
+                # 不能直接 cancel：写入任务可能正持有已出队的批次，取消会丢掉这批记录
+                await self._queue.put(None)
+            try:
+                await self._writer_task
+            except Exception:
+                pass
+            self._writer_task = None
+        await self.flush_pending()
+        with self._write_lock:
+            self._writer.close()
+        with self._read_lock:
+            self._reader.close()
+
+    def clear(self, kind: str) -> None:
+        if kind not in self.KINDS:
+            return
+        with self._write_lock:
+            self._writer.execute(f"DELETE FROM {kind}")
+            if self.fts_enabled:
+                self._writer.execute(f"INSERT INTO {kind}_fts({kind}_fts) VALUES ('rebuild')")
+            self._writer.commit()
+
+    # ----------------------------------------------------------------- reader
+    def _build_where(self, kind: str, filters: Dict[str, Any]) -> Tuple[str, List[Any]]:
+        clauses: List[str] = []
+        args: List[Any] = []
+        since = filters.get("since")
+        if since:
+            clauses.append("t.time >= ?")
+            args.append(float(since))
+        for col in self._EQ_FILTERS[kind]:
+            value = filters.get(col)
+            if value:
+                clauses.append(f"t.{col} = ?")
+                args.append(str(value))
+        keyword = str(filters.get("keyword") or "").strip()
+        if keyword:
+            if self.fts_enabled and (not self.fts_trigram or len(keyword) >= 3):
+                clauses.append(f"t.id IN (SELECT rowid FROM {kind}_fts WHERE {kind}_fts MATCH ?)")
+                args.append('"' + keyword.replace('"', '""') + '"')
+            else:
+                clauses.append("(t.reason LIKE ? OR t.prompt LIKE ?)")
+                like = f"%{keyword}%"
+                args.extend([like, like])
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def query(
+        self,
+        kind: str,
+        filters: Dict[str, Any],
+        limit: int = 50,
+        cursor: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[int]]:
+        """按时间倒序返回一页记录与下一页游标（无更多记录时为 None）。"""
+        where, args = self._build_where(kind, filters)
+        if cursor:
+            where += (" AND " if where else " WHERE ") + "t.id < ?"
+            args.append(int(cursor))
+        sql = f"SELECT * FROM {kind} t{where} ORDER BY t.id DESC LIMIT ?"
+        args.append(int(limit) + 1)
+        with self._read_lock:
+            rows = [dict(r) for r in self._reader.execute(sql, args).fetchall()]
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = rows[-1]["id"]
+        return rows, next_cursor
+
+    def count(self, kind: str, filters: Dict[str, Any]) -> int:
+        where, args = self._build_where(kind, filters)
+        with self._read_lock:
+            row = self._reader.execute(f"SELECT COUNT(*) FROM {kind} t{where}", args).fetchone()
+        return int(row[0]) if row else 0
+
+    def per_hour(self, kind: str, since: float) -> List[Tuple[int, int]]:
+        """返回 [(小时起点时间戳, 数量)]，按时间升序。"""
+        sql = (
+            f"SELECT CAST(time / 3600 AS INTEGER) * 3600 AS bucket, COUNT(*) AS n "
+            f"FROM {kind} WHERE time >= ? GROUP BY bucket ORDER BY bucket"
+        )
+        with self._read_lock:
+            return [(int(r[0]), int(r[1])) for r in self._reader.execute(sql, (since,)).fetchall()]
+
+    def per_group(self, kind: str, since: float, limit: int = 10) -> List[Tuple[str, int]]:
+        sql = (
+            f"SELECT COALESCE(group_id, '') AS g, COUNT(*) AS n FROM {kind} "
+            f"WHERE time >= ? GROUP BY g ORDER BY n DESC LIMIT ?"
+        )
+        with self._read_lock:
+            return [(str(r[0]), int(r[1])) for r in self._reader.execute(sql, (since, int(limit))).fetchall()]
@@ -15,7 +15,7 @@ from astrbot.api import AstrBotConfig, logger
 from astrbot.api.all import MessageType
 from astrbot.api.event import AstrMessageEvent, filter
 from astrbot.api.provider import ProviderRequest
-from astrbot.api.star import Context, Star, register
+from astrbot.api.star import Context, Star, StarTools, register
 
 try:
     from .persona_core import PersonaMatcher  # type: ignore
@@ -27,6 +27,16 @@ try:
 except ImportError:
     from ptd_core import PromptThreatDetector
 
+try:
+    from .verdict_cache import VerdictCache  # type: ignore
+except ImportError:
+    from verdict_cache import VerdictCache
+
+try:
+    from .incident_store import IncidentStore  # type: ignore
+except ImportError:
+    from incident_store import IncidentStore
+
 STATUS_PANEL_TEMPLATE = """
 <!DOCTYPE html>
 <html lang="zh-CN">
@@ -546,6 +556,66 @@ class PromptGuardianWebUI:
             out.append(it)
         return out
 
+    # 持久化存储的筛选列：等值匹配以命中索引，关键词走全文索引
+    _STORE_FILTERS: Dict[str, Tuple[str, Dict[str, str]]] = {
+        "incidents": ("fi_", {
+            "sender": "sender_id", "group": "group_id", "severity": "severity",
+            "trigger": "trigger", "action": "action_taken",
+        }),
+        "analysis_logs": ("fl_", {
+            "result": "result", "sender": "sender_id", "group": "group_id", "severity": "severity",
+            "trigger": "trigger", "action": "action_taken", "persona_action": "persona_action",
+        }),
+    }
+    PAGE_SIZE = 50
+    EXPORT_LIMIT = 50000
+
+    def _store_filters(self, kind: str, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        prefix, mapping = self._STORE_FILTERS[kind]
+        def get(name: str) -> str:
+            return (params.get(prefix + name, [""])[0] or "").strip()
+        filters: Dict[str, Any] = {col: get(name) for name, col in mapping.items() if get(name)}
+        filters["keyword"] = get("keyword")
+        try:
+            minutes = int(get("since") or 0)
+        except ValueError:
+            minutes = 0
+        if minutes > 0:
+            filters["since"] = time.time() - minutes * 60
+        return filters
+
+    async def _load_records(
+        self,
+        kind: str,
+        params: Dict[str, List[str]],
+        limit: int,
+        cursor: Optional[int] = None,
+    ) -> Tuple[List[Dict[str, Any]], int, Optional[int]]:
+        """返回 (当前页记录, 匹配总数, 下一页游标)。未启用持久化存储时回退到内存中的最近记录。"""
+        store = self.plugin.incident_store
+        if not store:
+            rows = self._filter_incidents(params) if kind == "incidents" else self._filter_logs(params)
+            return rows[:limit], len(rows), None
+        filters = self._store_filters(kind, params)
+        rows, next_cursor = await asyncio.to_thread(store.query, kind, filters, limit, cursor)
+        total = await asyncio.to_thread(store.count, kind, filters)
+        return rows, total, next_cursor
+
+    async def _load_dashboard_records(self, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        records: Dict[str, Any] = {}
+        for kind, prefix in (("incidents", "fi_"), ("analysis_logs", "fl_")):
+            try:
+                cursor = int((params.get(prefix + "cursor", [""])[0] or "0")) or None
+            except ValueError:
+                cursor = None
+            records[kind] = await self._load_records(kind, params, self.PAGE_SIZE, cursor)
+        store = self.plugin.incident_store
+        if store:
+            since = time.time() - 86400
+            records["per_hour"] = await asyncio.to_thread(store.per_hour, "incidents", since)
+            records["per_group"] = await asyncio.to_thread(store.per_group, "incidents", since, 5)
+        return records
+
     def _csv_escape(self, v: Any) -> str:
         s = str(v if v is not None else "")
         if any(ch in s for ch in [',', '\n', '"']):
@@ -641,7 +711,7 @@ class PromptGuardianWebUI:
                 return self._redirect_response("/login")
 
             if parsed.path == "/export/incidents.csv":
-                rows = self._filter_incidents(params)
+                rows, _, _ = await self._load_records("incidents", params, self.EXPORT_LIMIT)
                 fields = [
                     "time","sender_id","group_id","severity","score","trigger","defense_mode","action_taken","reason","prompt_preview"
                 ]
@@ -658,7 +728,7 @@ class PromptGuardianWebUI:
                     extra_headers={"Content-Disposition": "attachment; filename=incidents.csv"},
                 )
             if parsed.path == "/export/analysis.csv":
-                rows = self._filter_logs(params)
+                rows, _, _ = await self._load_records("analysis_logs", params, self.EXPORT_LIMIT)
                 fields = [
                     "time","sender_id","group_id","result","severity","score","trigger","core_version",
                     "action_taken","persona_action","persona_score","persona_reason","reason","prompt_preview"
@@ -706,7 +776,8 @@ class PromptGuardianWebUI:
         notice = params.get("notice", [""])[0]
         success_flag = params.get("success", ["1"])[0] == "1"
         session_id = cookies.get("API_SESSION", "")
-        html = self._render_dashboard(notice, success_flag, params, session_id)
+        records = await self._load_dashboard_records(params)
+        html = self._render_dashboard(notice, success_flag, params, session_id, records)
         return self._response(200, "OK", html, content_type="text/html; charset=utf-8")
 
     async def _apply_action(self, action: str, params: Dict[str, List[str]]) -> Tuple[str, bool]:
@@ -813,10 +884,19 @@ class PromptGuardianWebUI:
                 message = f"{target} 已移出黑名单"
             elif action == "clear_history":
                 self.plugin.recent_incidents.clear()
+                if self.plugin.incident_store:
+                    await asyncio.to_thread(self.plugin.incident_store.clear, "incidents")
                 message = "已清空拦截记录"
             elif action == "clear_logs":
                 self.plugin.analysis_logs.clear()
+                if self.plugin.incident_store:
+                    await asyncio.to_thread(self.plugin.incident_store.clear, "analysis_logs")
                 message = "已清空分析日志"
+            elif action == "clear_verdict_cache":
+                if not self.plugin.verdict_cache:
+                    return "LLM 判定缓存未启用", False
+                self.plugin.verdict_cache.clear()
+                message = "已清空 LLM 判定缓存"
             else:
                 message = "未知操作"
                 success = False
@@ -825,11 +905,25 @@ class PromptGuardianWebUI:
             return "内部错误，请检查日志。", False
         return message, success
 
-    def _render_dashboard(self, notice: str, success: bool, params: Optional[Dict[str, List[str]]] = None, session_id: str = "") -> str:
+    def _render_dashboard(
+        self,
+        notice: str,
+        success: bool,
+        params: Optional[Dict[str, List[str]]] = None,
+        session_id: str = "",
+        records: Optional[Dict[str, Any]] = None,
+    ) -> str:
         config = self.plugin.config
         stats = self.plugin.stats
-        incidents = self._filter_incidents(params or {})
-        analysis_logs = self._filter_logs(params or {})
+        if records is None:
+            all_incidents = self._filter_incidents(params or {})
+            all_logs = self._filter_logs(params or {})
+            records = {
+                "incidents": (all_incidents[: self.PAGE_SIZE], len(all_incidents), None),
+                "analysis_logs": (all_logs[: self.PAGE_SIZE], len(all_logs), None),
+            }
+        incidents, incident_total, incident_next = records["incidents"]
+        analysis_logs, log_total, log_next = records["analysis_logs"]
         whitelist = config.get("whitelist", [])
         blacklist = config.get("blacklist", {})
         defense_mode = config.get("defense_mode", "sentry")
@@ -908,6 +1002,34 @@ class PromptGuardianWebUI:
         html_parts.append(f"<p>启发式判定：{stats.get('heuristic_hits', 0)}</p>")
         html_parts.append(f"<p>LLM 判定：{stats.get('llm_hits', 0)}</p>")
         html_parts.append(f"<p>自动拉黑次数：{stats.get('auto_blocked', 0)}</p>")
+        verdict_cache = getattr(self.plugin, "verdict_cache", None)
+        if verdict_cache:
+            cache_stats = verdict_cache.summary()
+            html_parts.append(f"<p>LLM 判定缓存命中率：{cache_stats['hit_rate']:.1%}</p>")
+            html_parts.append(f"<p>节省 LLM 调用：{cache_stats['saved_llm_calls']}（实际调用 {cache_stats['llm_calls']}）</p>")
+            html_parts.append(f"<p>缓存条目：{cache_stats['size']}</p>")
+        else:
+            html_parts.append("<p>LLM 判定缓存：未启用</p>")
+        html_parts.append("</div>")
+
+        incident_store = getattr(self.plugin, "incident_store", None)
+        html_parts.append("<div class='card'><h3>记录存储</h3>")
+        if incident_store:
+            store_stats = incident_store.stats
+            html_parts.append(f"<p>持久化：已启用（保留 {incident_store.retention_days} 天）</p>")
+            html_parts.append(f"<p>已写入：{store_stats['written']} · 丢弃：{store_stats['dropped']} · 写入失败：{store_stats['write_errors']}</p>")
+            per_group = records.get("per_group") or []
+            if per_group:
+                groups_text = "，".join(f"{escape(g or '私聊')}（{n}）" for g, n in per_group)
+                html_parts.append(f"<p>近24小时拦截最多的群：{groups_text}</p>")
+            per_hour = records.get("per_hour") or []
+            if per_hour:
+                hours_text = " ".join(
+                    f"{datetime.fromtimestamp(bucket).strftime('%H时')}:{n}" for bucket, n in per_hour
+                )
+                html_parts.append(f"<p class='small'>近24小时每小时拦截：{escape(hours_text)}</p>")
+        else:
+            html_parts.append("<p>持久化：未启用（仅保留内存中的最近记录）</p>")
         html_parts.append("</div>")
 
         toggle_label = "关闭防护" if enabled else "开启防护"
@@ -986,6 +1108,13 @@ class PromptGuardianWebUI:
             f"{('<input type=\'hidden\' name=\'token\' value=\'' + escape(tkn) + '\'>') if tkn else ''}"
             "<button class='btn danger' type='submit'>清空分析日志</button></form>"
         )
+        html_parts.append(
+            "<form class='inline-form' method='post' action='/'>"
+            "<input type='hidden' name='action' value='clear_verdict_cache'/>"
+            f"<input type='hidden' name='csrf' value='{escape(csrf_token)}'/>"
+            f"{('<input type=\'hidden\' name=\'token\' value=\'' + escape(tkn) + '\'>') if tkn else ''}"
+            "<button class='btn danger' type='submit'>清空判定缓存</button></form>"
+        )
         html_parts.append("</div></div>")
         html_parts.append("</div>")  # end card-grid
 
@@ -998,6 +1127,19 @@ class PromptGuardianWebUI:
         fl_fields = ["fl_result","fl_sender","fl_group","fl_severity","fl_trigger","fl_action","fl_persona_action","fl_keyword","fl_since"]
         fi_query = self._build_query({k: (params.get(k, [""])[0] if params else "") for k in fi_fields})
         fl_query = self._build_query({k: (params.get(k, [""])[0] if params else "") for k in fl_fields})
+        page_query = self._build_query({k: (params.get(k, [""])[0] if params else "") for k in fi_fields + fl_fields})
+        if tkn:
+            page_query = (page_query + ("&" if page_query else "")) + f"token={quote_plus(tkn)}"
+
+        def page_links(cursor_param: str, next_cursor: Optional[int]) -> str:
+            links = []
+            if params and (params.get(cursor_param, [""])[0] or ""):
+                links.append(f"<a class='btn secondary' href='/?{page_query}'>第一页</a>")
+            if next_cursor:
+                sep = "&" if page_query else ""
+                links.append(f"<a class='btn secondary' href='/?{page_query}{sep}{cursor_param}={next_cursor}'>下一页</a>")
+            return f"<div class='actions'>{''.join(links)}</div>" if links else ""
+
         html_parts.append("<section class='section-with-table'>")
         html_parts.append("<h3>筛选与导出</h3>")
         html_parts.append("<form method='get' action='/' class='inline-form'>")
@@ -1027,7 +1169,7 @@ class PromptGuardianWebUI:
         html_parts.append(f"<a class='btn secondary' href='/export/incidents.csv?{fi_query}'>导出拦截CSV</a>")
         html_parts.append(f"<a class='btn secondary' href='/export/analysis.csv?{fl_query}'>导出分析CSV</a>")
         html_parts.append("</div>")
-        html_parts.append(f"<p class='small'>拦截事件：{len(incidents)} 条 · 分析日志：{len(analysis_logs)} 条</p>")
+        html_parts.append(f"<p class='small'>拦截事件：{incident_total} 条 · 分析日志：{log_total} 条</p>")
         html_parts.append("</form>")
         html_parts.append("</section>")
 
@@ -1097,7 +1239,7 @@ class PromptGuardianWebUI:
         html_parts.append("<div class='section-with-table'><h3>拦截事件</h3>")
         if incidents:
             html_parts.append("<table><thead><tr><th>时间</th><th>来源</th><th>严重级别</th><th>得分</th><th>触发</th><th>原因</th><th>预览</th></tr></thead><tbody>")
-            for item in incidents[:50]:
+            for item in incidents:
                 timestamp = datetime.fromtimestamp(item["time"]).strftime("%Y-%m-%d %H:%M:%S")
                 source = item["sender_id"]
                 if item.get("group_id"):
@@ -1116,12 +1258,13 @@ class PromptGuardianWebUI:
             html_parts.append("</tbody></table>")
         else:
             html_parts.append("<p class='muted'>尚未记录拦截事件。</p>")
+        html_parts.append(page_links("fi_cursor", incident_next))
         html_parts.append("</div>")
 
         html_parts.append("<div class='section-with-table'><h3>分析日志</h3>")
         if analysis_logs:
             html_parts.append("<table class='analysis-table'><thead><tr><th>时间</th><th>来源</th><th>结果</th><th>严重级别</th><th>得分</th><th>触发</th><th>核心版本</th><th>原因</th><th>内容预览</th></tr></thead><tbody>")
-            for item in analysis_logs[:50]:
+            for item in analysis_logs:
                 timestamp = datetime.fromtimestamp(item["time"]).strftime("%Y-%m-%d %H:%M:%S")
                 source = item["sender_id"]
                 if item.get("group_id"):
@@ -1142,6 +1285,7 @@ class PromptGuardianWebUI:
             html_parts.append("</tbody></table>")
         else:
             html_parts.append("<p class='muted'>暂无分析日志，可等待消息经过后查看。</p>")
+        html_parts.append(page_links("fl_cursor", log_next))
         html_parts.append("</div>")
 
         html_parts.append("</div>")  # end dual-column
@@ -1222,6 +1366,20 @@ class PromptGuardianWebUI:
         max_age = expires if expires is not None else self.session_timeout
         return f"API_SESSION={session_id}; Path=/; HttpOnly; SameSite=Strict; Max-Age={max_age}"
 PLUGIN_VERSION = "3.5.0"
+
+# 提示词净化规则：加载时编译一次，按顺序依次替换
+SANITIZE_RULES: List[Tuple[re.Pattern, str]] = [
+    (re.compile(r"^/system\s+.*", re.IGNORECASE | re.MULTILINE), ""),
+    (re.compile(r"^```(system|prompt|json|tools|function).*?```", re.IGNORECASE | re.DOTALL), ""),
+    (re.compile(r"\brole\s*:\s*system\b.*", re.IGNORECASE), ""),
+    (re.compile(r"\b(function_call|tool_use)\s*:\s*\{[\s\S]*?\}", re.IGNORECASE), ""),
+    (re.compile(r"data:[^;]+;base64,[A-Za-z0-9+/]{24,}={0,2}", re.IGNORECASE), "[redacted-base64]"),
+    (re.compile(r"(curl|wget|invoke-?webrequest|iwr)\b[\s\S]*?https?://\S+", re.IGNORECASE), "[redacted-link-fetch]"),
+    (re.compile(r"<<\s*SYS\s*>>[\s\S]*?(?=<<|$)", re.IGNORECASE), ""),
+    (re.compile(r"(BEGIN|END)\s+(SYSTEM|PROMPT|INSTRUCTIONS)[\s\S]*", re.IGNORECASE), ""),
+    (re.compile(r"<!--[\s\S]*?-->", re.IGNORECASE), ""),
+]
+
 @register("antipromptinjector", "LumineStory", "一个用于阻止提示词注入攻击的插件", PLUGIN_VERSION)
 class AntiPromptInjector(Star):
     def __init__(self, context: Context, config: AstrBotConfig = None):
@@ -1251,6 +1409,16 @@ class AntiPromptInjector(Star):
             "webui_password_alg": self.config.get("webui_password_alg", ""),
             "webui_session_timeout": 3600,
             "enable_signature_lock": True,
+            # LLM verdict cache
+            "llm_verdict_cache_enabled": True,
+            "llm_verdict_cache_size": 2048,
+            "llm_verdict_cache_ttl": 86400,
+            "llm_verdict_cache_negative": True,
+            "llm_verdict_cache_persist": False,
+            # Persistent incident store
+            "incident_store_enabled": True,
+            "incident_store_retention_days": 30,
+            "incident_store_queue_size": 10000,
             # Persona detection
             "persona_enabled": True,
             "persona_sensitivity": 0.7,
@@ -1292,6 +1460,11 @@ class AntiPromptInjector(Star):
 
         self.observe_until: Optional[float] = None
 
+        self.verdict_cache: Optional[VerdictCache] = self._build_verdict_cache()
+        self.incident_store: Optional[IncidentStore] = self._build_incident_store()
+        if self.incident_store:
+            self.incident_store.start()
+
         self.web_ui: Optional[PromptGuardianWebUI] = None
         self.webui_task: Optional[asyncio.Task] = None
         if self.config.get("webui_enabled", True):
@@ -1303,6 +1476,40 @@ class AntiPromptInjector(Star):
             if not self.is_password_configured():
                 logger.warning("WebUI 密码尚未设置，请尽快通过指令 /设置WebUI密码 <新密码> 配置登录密码。")
 
+    def _build_verdict_cache(self) -> Optional[VerdictCache]:
+        if not self.config.get("llm_verdict_cache_enabled", True):
+            return None
+        db_path = None
+        if self.config.get("llm_verdict_cache_persist", False):
+            try:
+                db_path = StarTools.get_data_dir("astrbot_plugin_antipromptinjector") / "verdict_cache.db"
+            except Exception as exc:
+                logger.warning(f"无法获取插件数据目录，LLM 判定缓存将仅保存在内存中：{exc}")
+        try:
+            return VerdictCache(
+                max_size=int(self.config.get("llm_verdict_cache_size", 2048)),
+                ttl=float(self.config.get("llm_verdict_cache_ttl", 86400)),
+                cache_negative=bool(self.config.get("llm_verdict_cache_negative", True)),
+                db_path=db_path,
+            )
+        except Exception as exc:
+            logger.warning(f"LLM 判定缓存初始化失败，将直接调用 LLM：{exc}")
+            return None
+
+    def _build_incident_store(self) -> Optional[IncidentStore]:
+        if not self.config.get("incident_store_enabled", True):
+            return None
+        try:
+            db_path = StarTools.get_data_dir("astrbot_plugin_antipromptinjector") / "incidents.db"
+            return IncidentStore(
+                db_path,
+                queue_size=int(self.config.get("incident_store_queue_size", 10000)),
+                retention_days=int(self.config.get("incident_store_retention_days", 30)),
+            )
+        except Exception as exc:
+            logger.warning(f"拦截记录持久化存储初始化失败，将仅保留内存中的最近记录：{exc}")
+            return None
+
     def _update_incident_capacity(self):
         capacity = max(10, int(self.config.get("incident_history_size", 100)))
         if self.recent_incidents.maxlen != capacity:
@@ -1330,6 +1537,8 @@ class AntiPromptInjector(Star):
             "action_taken": analysis.get("action_taken", action),
         }
         self.recent_incidents.appendleft(entry)
+        if self.incident_store:
+            self.incident_store.append("incidents", {**entry, "prompt": analysis.get("prompt", "")})
         self.stats["total_intercepts"] += 1
         trigger = analysis.get("trigger")
         if trigger == "llm":
@@ -1358,6 +1567,8 @@ class AntiPromptInjector(Star):
             "persona_reason": (persona or {}).get("reason"),
         }
         self.analysis_logs.appendleft(entry)
+        if self.incident_store:
+            self.incident_store.append("analysis_logs", {**entry, "prompt": analysis.get("prompt", "")})
 
     def _build_stats_summary(self) -> str:
         return (
@@ -1367,6 +1578,16 @@ class AntiPromptInjector(Star):
             f"- 启发式判定：{self.stats.get('heuristic_hits', 0)}\n"
             f"- LLM 判定：{self.stats.get('llm_hits', 0)}\n"
             f"- 自动拉黑次数：{self.stats.get('auto_blocked', 0)}"
+            + self._build_verdict_cache_summary()
+        )
+
+    def _build_verdict_cache_summary(self) -> str:
+        if not self.verdict_cache:
+            return ""
+        cache_stats = self.verdict_cache.summary()
+        return (
+            f"\n- LLM 判定缓存命中率：{cache_stats['hit_rate']:.1%}"
+            f"（节省 LLM 调用 {cache_stats['saved_llm_calls']} 次，实际调用 {cache_stats['llm_calls']} 次）"
         )
 
     def _hash_password(self, password: str, salt: str) -> str:
@@ -1495,8 +1716,20 @@ class AntiPromptInjector(Star):
         result_text = (response.completion_text or "").strip()
         return self._parse_llm_response(result_text)
 
+    async def _cached_llm_audit(self, event: AstrMessageEvent, prompt: str) -> Dict[str, Any]:
+        if not self.verdict_cache:
+            return await self._llm_injection_audit(event, prompt)
+        reviewer = f"{self.config.get('review_provider', '')}|{self.config.get('review_model', '')}"
+        signature = VerdictCache.make_signature(prompt, reviewer)
+        verdict, cached = await self.verdict_cache.get_or_compute(
+            signature, lambda: self._llm_injection_audit(event, prompt)
+        )
+        if cached:
+            verdict["cached"] = True
+        return verdict
+
     def _parse_llm_response(self, text: str) -> Dict[str, Any]:
-        fallback = {"is_injection": False, "confidence": 0.0, "reason": "LLM 返回无法解析"}
+        fallback = {"is_injection": False, "confidence": 0.0, "reason": "LLM 返回无法解析", "unparsed": True}
         if not text:
             return fallback
         match = re.search(r"\{.*\}", text, re.S)
@@ -1593,7 +1826,7 @@ class AntiPromptInjector(Star):
             return False, analysis
 
         try:
-            llm_result = await self._llm_injection_audit(event, req.prompt or "")
+            llm_result = await self._cached_llm_audit(event, req.prompt or "")
         except Exception as exc:
             logger.warning(f"LLM 注入分析失败：{exc}")
             return False, analysis
@@ -2041,6 +2274,10 @@ class AntiPromptInjector(Star):
                 await asyncio.gather(*tasks, return_exceptions=True)
             except Exception:
                 pass
+        if self.verdict_cache:
+            self.verdict_cache.close()
+        if self.incident_store:
+            await self.incident_store.close()
         if self.web_ui:
             await self.web_ui.stop()
         if self.webui_task:
@@ -2051,15 +2288,8 @@ class AntiPromptInjector(Star):
         logger.info("AntiPromptInjector 插件已终止。")
     def _sanitize_prompt(self, text: str) -> str:
         s = text or ""
-        s = re.sub(r"^/system\s+.*", "", s, flags=re.IGNORECASE | re.MULTILINE)
-        s = re.sub(r"^```(system|prompt|json|tools|function).*?```", "", s, flags=re.IGNORECASE | re.DOTALL)
-        s = re.sub(r"\brole\s*:\s*system\b.*", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"\b(function_call|tool_use)\s*:\s*\{[\s\S]*?\}", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"data:[^;]+;base64,[A-Za-z0-9+/]{24,}={0,2}", "[redacted-base64]", s, flags=re.IGNORECASE)
-        s = re.sub(r"(curl|wget|invoke-?webrequest|iwr)\b[\s\S]*?https?://\S+", "[redacted-link-fetch]", s, flags=re.IGNORECASE)
-        s = re.sub(r"<<\s*SYS\s*>>[\s\S]*?(?=<<|$)", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"(BEGIN|END)\s+(SYSTEM|PROMPT|INSTRUCTIONS)[\s\S]*", "", s, flags=re.IGNORECASE)
-        s = re.sub(r"<!--[\s\S]*?-->", "", s, flags=re.IGNORECASE)
+        for pattern, replacement in SANITIZE_RULES:
+            s = pattern.sub(replacement, s)
         return s
 
     def _compute_signature(self, req: ProviderRequest) -> str:
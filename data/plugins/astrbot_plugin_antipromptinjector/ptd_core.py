@@ -1,7 +1,7 @@
 import base64
 import re
-import gzip
-from typing import Any, Dict, List, Optional, Tuple
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 from urllib.parse import unquote
 
 
@@ -472,14 +472,59 @@ class PromptThreatDetector(PTDCoreBase):
             "bit.ly",
         ]
 
-        # 7. 百分号编码/Unicode 编码检测
-        self.percent_pattern = re.compile(r"(?:%[0-9a-fA-F]{2}){8,}")
-        self.unicode_escape_pattern = re.compile(r"(\\u[0-9a-fA-F]{4}){4,}")
-        self.hex_escape_pattern = re.compile(r"(\\x[0-9a-fA-F]{2}){8,}")
-
-        # 8. Base64 载荷检测
-        self.base64_pattern = re.compile(r"(?<![A-Za-z0-9+/=])([A-Za-z0-9+/]{24,}={0,2})(?![A-Za-z0-9+/=])")
-        self.data_uri_pattern = re.compile(r"data:[^;]+;base64,([A-Za-z0-9+/]{24,}={0,2})", re.IGNORECASE)
+        # 7. 编码载荷检测：单次扫描定位全部候选编码片段（Data URI / 百分号 / Unicode / Hex / Base64）。
+        # Data URI 排在最前，其载荷同时作为 Base64 候选；其余分支互不重叠（%、\ 都会截断 Base64 字符串）。
+        # 开头的前瞻只列出各分支可能的首字符，让正则引擎快速跳过其余位置。
+        self.encoded_span_pattern = re.compile(
+            r"(?=[A-Za-z0-9+/%\\])"
+            r"(?:(?P<data_uri>(?i:data:)(?P<data_mime>[^;]+)(?i:;base64,)(?P<data_payload>[A-Za-z0-9+/]{24,}={0,2}))"
+            r"|(?P<percent>(?:%[0-9a-fA-F]{2}){8,})"
+            r"|(?P<unicode>(?:\\u[0-9a-fA-F]{4}){4,})"
+            r"|(?P<hex>(?:\\x[0-9a-fA-F]{2}){8,})"
+            r"|(?<![A-Za-z0-9+/=])(?P<base64>[A-Za-z0-9+/]{24,}={0,2})(?![A-Za-z0-9+/=]))"
+        )
+        self.exec_chain_pattern = re.compile(r"powershell(?:\\.exe)?\s+-enc|certutil\s+-decode")
+        self.url_pattern = re.compile(r"https?://[^\s]+")
+        self.fetch_command_pattern = re.compile(r"(curl|wget|invoke-?webrequest|iwr|powershell|bitsadmin|certutil|aria2c)\b")
+
+        # 8. 解码限制：递归层数、单个 Base64 片段长度、gzip 解压输出、单条提示词解码输出总量
+        self.max_decode_depth = 3
+        self.max_base64_span = 4096
+        self.max_gzip_output = 64 * 1024
+        self.max_decoded_chars = 256 * 1024
+        self.payload_keywords: Dict[str, Tuple[str, ...]] = {
+            "base64": (
+                "ignore previous instructions",
+                "system prompt",
+                "猫娘",
+                "越狱",
+                "jailbreak",
+                "developer mode override",
+                "role: system",
+                "begin prompt",
+                "override",
+            ),
+            "percent": ("system prompt", "override", "jailbreak", "猫娘", "越狱"),
+            "unicode": ("system prompt", "越狱", "猫娘", "jailbreak", "override"),
+            "hex": ("system prompt", "jailbreak", "override", "猫娘", "越狱"),
+            "data_uri": ("system prompt", "override", "jailbreak", "猫娘", "越狱"),
+        }
+        # kind -> (信号名, 权重, 描述)，顺序即信号输出顺序
+        self.payload_signals: Dict[str, Tuple[str, int, str]] = {
+            "base64": ("base64_payload", 4, "Base64 内容包含注入指令"),
+            "percent": ("percent_encoded_payload", 3, "URL 编码内容中包含可疑指令"),
+            "unicode": ("unicode_escape_payload", 3, "Unicode 转义内容中包含可疑指令"),
+            "hex": ("hex_escape_payload", 3, "Hex 转义内容中包含可疑指令"),
+            "data_uri": ("data_uri_payload", 3, "Data URI Base64 中包含可疑指令"),
+        }
+        # 片段类型 -> 解码后可能产出的信号类型（Data URI 载荷同时按 Base64 检查）
+        self.payload_span_kinds: Dict[str, Set[str]] = {
+            "base64": {"base64"},
+            "data_uri": {"data_uri", "base64"},
+            "percent": {"percent"},
+            "unicode": {"unicode"},
+            "hex": {"hex"},
+        }
 
         # 分数阈值
         self.medium_threshold = 7
@@ -803,6 +848,10 @@ class PromptThreatDetector(PTDCoreBase):
 
         return None
 
+    # ------------------------------------------------------------------ #
+    # 编码载荷解码流水线
+    # ------------------------------------------------------------------ #
+
     def _handle_encoded_payloads(
         self,
         text: str,
@@ -810,49 +859,35 @@ class PromptThreatDetector(PTDCoreBase):
         signals: List[Dict[str, Any]],
         score: int,
     ) -> Tuple[int, List[Dict[str, Any]]]:
+        # 每种编码只取第一个命中的片段；解码层按深度、文本顺序排列，表层命中优先
+        previews: Dict[str, str] = {}
+        pending = set(self.payload_signals)
+        for kind, decoded in self._decode_encoded_layers(text, pending):
+            if kind not in pending:
+                continue
+            lower_decoded = decoded.lower()
+            if any(keyword in lower_decoded for keyword in self.payload_keywords[kind]):
+                previews[kind] = decoded.replace("\n", " ")[:120]
+                pending.discard(kind)
+                if not pending:
+                    break
+
         found_types: List[str] = []
-        # Base64 检测
-        decoded_message = self._detect_base64_payload(text)
-        if decoded_message:
+        for kind, (name, weight, description) in self.payload_signals.items():
+            preview = previews.get(kind)
+            if preview is None:
+                continue
             signals.append(
                 {
                     "type": "payload",
-                    "name": "base64_payload",
-                    "detail": decoded_message,
-                    "weight": 4,
-                    "description": "Base64 内容包含注入指令",
+                    "name": name,
+                    "detail": f"解码后包含指令片段: {preview}" if kind == "base64" else preview,
+                    "weight": weight,
+                    "description": description,
                 }
             )
-            score += 4
-            found_types.append("base64")
-
-        # 百分号编码
-        percent_result = self._detect_percent_encoded_payload(text)
-        if percent_result:
-            signals.append(percent_result)
-            score += percent_result["weight"]
-            found_types.append("percent")
-
-        # Unicode Escape 编码
-        unicode_result = self._detect_unicode_escape_payload(text)
-        if unicode_result:
-            signals.append(unicode_result)
-            score += unicode_result["weight"]
-            found_types.append("unicode")
-
-        # Hex Escape 编码
-        hex_result = self._detect_hex_escape_payload(text)
-        if hex_result:
-            signals.append(hex_result)
-            score += hex_result["weight"]
-            found_types.append("hex")
-
-        # Data URI Base64
-        data_uri_result = self._detect_data_uri_payload(text)
-        if data_uri_result:
-            signals.append(data_uri_result)
-            score += data_uri_result["weight"]
-            found_types.append("data_uri")
+            score += weight
+            found_types.append(kind)
 
         # 编码载荷的协同加权：出现两种及以上编码形式
         if len(found_types) >= 2:
@@ -868,9 +903,7 @@ class PromptThreatDetector(PTDCoreBase):
             score += 2
 
         # Base64 执行链协同：检测到 base64 + (powershell -enc / certutil -decode)
-        if ("base64" in found_types) and (
-            re.search(r"powershell(?:\\.exe)?\s+-enc", normalized) or re.search(r"certutil\s+-decode", normalized)
-        ):
+        if "base64" in found_types and self.exec_chain_pattern.search(normalized):
             signals.append(
                 {
                     "type": "heuristic",
@@ -884,132 +917,95 @@ class PromptThreatDetector(PTDCoreBase):
 
         return score, signals
 
-    def _detect_base64_payload(self, text: str) -> str:
-        for chunk in self.base64_pattern.findall(text):
-            if len(chunk) > 4096:
-                continue
-            padded = chunk + "=" * ((4 - len(chunk) % 4) % 4)
+    def _iter_encoded_spans(self, text: str) -> Iterator[Tuple[str, str]]:
+        """按文本顺序产出 (编码类型, 片段)"""
+        for match in self.encoded_span_pattern.finditer(text):
+            kind = match.lastgroup
+            if kind == "data_uri":
+                # MIME 部分本身也可能夹带其他编码片段
+                for nested in self._iter_encoded_spans(match.group("data_mime")):
+                    if nested[0] != "data_uri":
+                        yield nested
+                yield "data_uri", match.group("data_payload")
+            else:
+                yield kind, match.group(kind)
+
+    def _decode_encoded_layers(self, text: str, pending: Set[str]) -> Iterator[Tuple[str, str]]:
+        """
+        分层解码，逐个产出 (编码类型, 解码文本)。
+
+        - 相同片段只解码一次；所属编码已在 pending 中移除（已命中）的片段不再解码
+        - 解码结果送回扫描器寻找嵌套编码，受 max_decode_depth 与 max_decoded_chars 约束
+        """
+        seen: Set[Tuple[str, str]] = set()
+        budget = self.max_decoded_chars
+        frontier = [text]
+        for _ in range(self.max_decode_depth):
+            next_frontier: List[str] = []
+            for source in frontier:
+                for kind, span in self._iter_encoded_spans(source):
+                    if not pending:
+                        return
+                    if (kind, span) in seen or not (pending & self.payload_span_kinds[kind]):
+                        continue
+                    seen.add((kind, span))
+                    for layer_kind, decoded in self._decode_span(kind, span):
+                        if budget <= 0:
+                            return
+                        decoded = decoded[:budget]
+                        budget -= len(decoded)
+                        next_frontier.append(decoded)
+                        yield layer_kind, decoded
+            if not next_frontier:
+                break
+            frontier = next_frontier
+
+    def _decode_span(self, kind: str, span: str) -> List[Tuple[str, str]]:
+        if kind == "percent":
+            return [("percent", unquote(span))]
+        if kind == "unicode":
             try:
-                decoded_bytes = base64.b64decode(padded, validate=True)
+                return [("unicode", span.encode("ascii").decode("unicode_escape"))]
             except Exception:
-                continue
-            # 尝试识别 gzip 压缩后的载荷
-            try:
-                decoded_bytes = gzip.decompress(decoded_bytes)
-            except Exception:
-                pass
-            try:
-                decoded_text = decoded_bytes.decode("utf-8")
-            except UnicodeDecodeError:
-                decoded_text = decoded_bytes.decode("utf-8", "ignore")
-            normalized = decoded_text.lower()
-            keywords = (
-                "ignore previous instructions",
-                "system prompt",
-                "猫娘",
-                "越狱",
-                "jailbreak",
-                "developer mode override",
-                "role: system",
-                "begin prompt",
-                "override",
-            )
-            if any(keyword in normalized for keyword in keywords):
-                preview = decoded_text.replace("\n", " ")[:120]
-                return f"解码后包含指令片段: {preview}"
-        return ""
-
-    def _detect_percent_encoded_payload(self, text: str) -> Optional[Dict[str, Any]]:
-        matches = self.percent_pattern.findall(text)
-        for encoded in matches:
-            try:
-                decoded = unquote(encoded)
-            except Exception:
-                continue
-            lower_decoded = decoded.lower()
-            if any(keyword in lower_decoded for keyword in ("system prompt", "override", "jailbreak", "猫娘", "越狱")):
-                preview = decoded.replace("\n", " ")[:120]
-                return {
-                    "type": "payload",
-                    "name": "percent_encoded_payload",
-                    "detail": preview,
-                    "weight": 3,
-                    "description": "URL 编码内容中包含可疑指令",
-                }
-        return None
-
-    def _detect_unicode_escape_payload(self, text: str) -> Optional[Dict[str, Any]]:
-        matches = self.unicode_escape_pattern.findall(text)
-        if not matches:
-            return None
-        # 仅当整体出现大量 unicode escape 时才处理
-        escaped_str = "".join(matches)
-        try:
-            decoded = escaped_str.encode("utf-8").decode("unicode_escape")
-        except Exception:
-            return None
-        lower_decoded = decoded.lower()
-        if any(keyword in lower_decoded for keyword in ("system prompt", "越狱", "猫娘", "jailbreak", "override")):
-            preview = decoded.replace("\n", " ")[:120]
-            return {
-                "type": "payload",
-                "name": "unicode_escape_payload",
-                "detail": preview,
-                "weight": 3,
-                "description": "Unicode 转义内容中包含可疑指令",
-            }
-        return None
-
-    def _detect_hex_escape_payload(self, text: str) -> Optional[Dict[str, Any]]:
-        matches = self.hex_escape_pattern.findall(text)
-        if not matches:
-            return None
+                return []
+        if kind == "hex":
+            return [("hex", self._decode_bytes(bytes.fromhex(span.replace("\\x", ""))))]
+
+        # 超长的 Base64 / Data URI 片段直接跳过，不做解码
+        if len(span) > self.max_base64_span:
+            return []
+        # base64 / data_uri：同一片段只做一次 Base64 解码
+        padded = span + "=" * ((4 - len(span) % 4) % 4)
         try:
-            hex_pairs = re.findall(r"\\x([0-9A-Fa-f]{2})", "".join(matches))
-            hex_bytes = bytes(int(h, 16) for h in hex_pairs)
+            raw = base64.b64decode(padded, validate=True)
         except Exception:
-            return None
+            return []
+        layers: List[Tuple[str, str]] = []
+        if kind == "data_uri":
+            layers.append(("data_uri", self._decode_bytes(raw)))
+        # 尝试识别 gzip 压缩后的载荷
+        layers.append(("base64", self._decode_bytes(self._gunzip_limited(raw))))
+        return layers
+
+    def _gunzip_limited(self, data: bytes) -> bytes:
+        """有输出上限的 gzip 解压，防止压缩炸弹；不是完整 gzip 数据时原样返回"""
+        if not data.startswith(b"\x1f\x8b"):
+            return data
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
         try:
-            decoded = hex_bytes.decode("utf-8")
-        except Exception:
-            decoded = hex_bytes.decode("utf-8", "ignore")
-        lower_decoded = decoded.lower()
-        if any(keyword in lower_decoded for keyword in ("system prompt", "jailbreak", "override", "猫娘", "越狱")):
-            preview = decoded.replace("\n", " ")[:120]
-            return {
-                "type": "payload",
-                "name": "hex_escape_payload",
-                "detail": preview,
-                "weight": 3,
-                "description": "Hex 转义内容中包含可疑指令",
-            }
-        return None
-
-    def _detect_data_uri_payload(self, text: str) -> Optional[Dict[str, Any]]:
-        m = self.data_uri_pattern.search(text)
-        if not m:
-            return None
-        chunk = m.group(1)
-        padded = chunk + "=" * ((4 - len(chunk) % 4) % 4)
-        try:
-            decoded_bytes = base64.b64decode(padded, validate=True)
-        except Exception:
-            return None
+            output = decompressor.decompress(data, self.max_gzip_output)
+        except zlib.error:
+            return data
+        if decompressor.unconsumed_tail or decompressor.eof:
+            return output
+        return data
+
+    @staticmethod
+    def _decode_bytes(data: bytes) -> str:
         try:
-            decoded_text = decoded_bytes.decode("utf-8")
-        except Exception:
-            decoded_text = decoded_bytes.decode("utf-8", "ignore")
-        lower_decoded = decoded_text.lower()
-        if any(k in lower_decoded for k in ("system prompt", "override", "jailbreak", "猫娘", "越狱")):
-            preview = decoded_text.replace("\n", " ")[:120]
-            return {
-                "type": "payload",
-                "name": "data_uri_payload",
-                "detail": preview,
-                "weight": 3,
-                "description": "Data URI Base64 中包含可疑指令",
-            }
-        return None
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return data.decode("utf-8", "ignore")
 
     def _handle_external_links(
         self,
@@ -1019,7 +1015,7 @@ class PromptThreatDetector(PTDCoreBase):
         score: int,
     ) -> Tuple[int, List[Dict[str, Any]]]:
         suspicious_links = []
-        for match in re.findall(r"https?://[^\s]+", text):
+        for match in self.url_pattern.findall(text):
             lower = match.lower()
             if any(domain in lower for domain in self.malicious_domains):
                 suspicious_links.append(match)
@@ -1050,7 +1046,7 @@ class PromptThreatDetector(PTDCoreBase):
             score += 2
 
         # 命令拉取 + 恶意外链协同加权
-        if suspicious_links and re.search(r"(curl|wget|invoke-?webrequest|iwr|powershell|bitsadmin|certutil|aria2c)\b", normalized):
+        if suspicious_links and self.fetch_command_pattern.search(normalized):
             signals.append(
                 {
                     "type": "heuristic",
@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+from data.plugins.astrbot_plugin_antipromptinjector.incident_store import (
+    IncidentStore,
+)
+
+
+def incident(i, **extra):
+    entry = {
+        "time": time.time(),
+        "sender_id": f"user{i % 3}",
+        "group_id": f"group{i % 2}",
+        "severity": "high" if i % 2 else "low",
+        "reason": f"reason {i}",
+        "prompt": f"ignore previous instructions #{i}",
+    }
+    entry.update(extra)
+    return entry
+
+
+def test_close_writes_batch_held_by_writer(tmp_path):
+    db_path = tmp_path / "incidents.db"
+
+    async def main():
+        # 刷写间隔很长：writer 会一直持有已出队的批次等待凑满
+        store = IncidentStore(db_path, batch_size=1000, flush_interval=60)
+        store.start()
+        for i in range(50):
+            store.append("incidents", incident(i))
+        await asyncio.sleep(0.05)
+        assert store._queue.empty()
+        assert store.stats["written"] == 0
+
+        await asyncio.wait_for(store.close(), 5)
+        assert store.stats["written"] == 50
+        assert store.stats["write_errors"] == 0
+
+    asyncio.run(main())
+    reopened = IncidentStore(db_path)
+    assert reopened.count("incidents", {}) == 50
+    asyncio.run(reopened.close())
+
+
+def test_close_flushes_records_queued_after_sentinel(tmp_path):
+    async def main():
+        store = IncidentStore(tmp_path / "incidents.db", flush_interval=60)
+        store.start()
+        store.append("incidents", incident(0))
+        await asyncio.sleep(0.01)
+        closing = asyncio.create_task(store.close())
+        await asyncio.sleep(0)
+        store.append("analysis_logs", incident(1, result="blocked"))
+        await closing
+        return store.stats
+
+    stats = asyncio.run(main())
+    assert stats["written"] == 2
+
+
+def test_full_queue_drops_and_counts(tmp_path):
+    async def main():
+        store = IncidentStore(tmp_path / "incidents.db", queue_size=3)
+        results = [store.append("incidents", incident(i)) for i in range(5)]
+        assert results == [True, True, True, False, False]
+        assert store.stats["dropped"] == 2 and store.stats["queued"] == 3
+        await store.close()
+
+    asyncio.run(main())
+
+
+def test_query_filters_and_keyset_pagination(tmp_path):
+    async def main():
+        store = IncidentStore(tmp_path / "incidents.db", flush_interval=0.05)
+        store.start()
+        for i in range(25):
+            store.append("incidents", incident(i))
+        store.append("incidents", incident(99, reason="base64 payload smuggling"))
+        await store.close()
+
+    asyncio.run(main())
+    store = IncidentStore(tmp_path / "incidents.db")
+    try:
+        seen, cursor = [], None
+        while True:
+            rows, cursor = store.query("incidents", {}, limit=10, cursor=cursor)
+            seen.extend(row["id"] for row in rows)
+            if cursor is None:
+                break
+        assert seen == sorted(seen, reverse=True) and len(seen) == 26
+
+        assert store.count("incidents", {"severity": "high"}) == 13
+        assert (
+            store.count("incidents", {"sender_id": "user0", "group_id": "group0"}) == 5
+        )
+        rows, _ = store.query("incidents", {"keyword": "smuggling"})
+        assert [row["reason"] for row in rows] == ["base64 payload smuggling"]
+        assert sum(n for _, n in store.per_group("incidents", 0)) == 26
+    finally:
+        asyncio.run(store.close())
+
+
+def test_retention_removes_old_records(tmp_path):
+    store = IncidentStore(tmp_path / "incidents.db", retention_days=1)
+    store._write_batch(
+        [
+            ("incidents", incident(0, time=time.time() - 3 * 86400)),
+            ("incidents", incident(1)),
+        ]
+    )
+    store._apply_retention()
+    assert store.count("incidents", {}) == 1
+    asyncio.run(store.close())
@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
+
+
+class VerdictCache:
+    """
+    LLM injection-audit verdict cache.
+
+    - Keyed on a signature of the normalized prompt (+ reviewer), so copy-pasted
+      jailbreaks / spam that differ only in case, width or whitespace share a verdict
+    - In-memory LRU with per-entry TTL, optionally backed by SQLite for restarts
+    - Single-flight: concurrent audits of the same signature share one LLM call
+    - Negative verdicts (is_injection == False) are cached only when enabled
+    """
+
+    _WHITESPACE = re.compile(r"\s+")
+    _INVISIBLE = re.compile(r"[\u200b-\u200f\u2060-\u2064\ufeff]")
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: float = 86400.0,
+        cache_negative: bool = True,
+        db_path: Optional[Union[str, Path]] = None,
+    ) -> None:
+        self.max_size = max(1, int(max_size))
+        self.ttl = max(1.0, float(ttl))
+        self.cache_negative = cache_negative
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats: Dict[str, int] = {
+            "lookups": 0,
+            "hits": 0,
+            "persistent_hits": 0,
+            "coalesced": 0,
+            "llm_calls": 0,
+        }
+        self._db: Optional[sqlite3.Connection] = None
+        self._db_lock = threading.Lock()
+        if db_path:
+            self._open_db(Path(db_path))
+
+    # ------------------------------------------------------------------ keys
+    @classmethod
+    def normalize_prompt(cls, prompt: str) -> str:
+        text = unicodedata.normalize("NFKC", prompt or "")
+        text = cls._INVISIBLE.sub("", text)
+        text = cls._WHITESPACE.sub(" ", text).strip()
+        return text.casefold()
+
+    @classmethod
+    def make_signature(cls, prompt: str, reviewer: str = "") -> str:
+        normalized = cls.normalize_prompt(prompt)
+        return hashlib.sha256((reviewer + "||" + normalized).encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------ persistence
+    def _open_db(self, db_path: Path) -> None:
+        db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            "signature TEXT PRIMARY KEY, verdict TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_verdicts_expires ON verdicts(expires_at)")
+        self._db.execute("DELETE FROM verdicts WHERE expires_at <= ?", (time.time(),))
+        self._db.commit()
+
+    def _db_get(self, signature: str) -> Optional[Tuple[float, Dict[str, Any]]]:
+        if not self._db:
+            return None
+        with self._db_lock:
+            row = self._db.execute(
+                "SELECT verdict, expires_at FROM verdicts WHERE signature = ?", (signature,)
+            ).fetchone()
+        if not row or row[1] <= time.time():
+            return None
+        try:
+            return row[1], json.loads(row[0])
+        except Exception:
+            return None
+
+    def _db_put(self, signature: str, verdict: Dict[str, Any], expires_at: float) -> None:
+        if not self._db:
+            return
+        with self._db_lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO verdicts (signature, verdict, expires_at) VALUES (?, ?, ?)",
+                (signature, json.dumps(verdict, ensure_ascii=False), expires_at),
+            )
+            self._db.commit()
+
+    def _db_clear(self) -> None:
+        if self._db:
+            with self._db_lock:
+                self._db.execute("DELETE FROM verdicts")
+                self._db.commit()
+
+    # ----------------------------------------------------------------- memory
+    def _mem_get(self, signature: str) -> Optional[Dict[str, Any]]:
+        item = self._entries.get(signature)
+        if item is None:
+            return None
+        expires_at, verdict = item
+        if expires_at <= time.time():
+            del self._entries[signature]
+            return None
+        self._entries.move_to_end(signature)
+        return verdict
+
+    def _mem_put(self, signature: str, verdict: Dict[str, Any], expires_at: float) -> None:
+        self._entries[signature] = (expires_at, verdict)
+        self._entries.move_to_end(signature)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def _should_store(self, verdict: Dict[str, Any]) -> bool:
+        if verdict.get("unparsed"):
+            return False
+        return bool(verdict.get("is_injection")) or self.cache_negative
+
+    # -------------------------------------------------------------------- api
+    async def get_or_compute(
+        self,
+        signature: str,
+        compute: Callable[[], Awaitable[Dict[str, Any]]],
+    ) -> Tuple[Dict[str, Any], bool]:
+        """返回 (verdict, 是否命中缓存)。并发的相同签名只会触发一次 compute。"""
+        self.stats["lookups"] += 1
+        verdict = self._mem_get(signature)
+        if verdict is not None:
+            self.stats["hits"] += 1
+            return dict(verdict), True
+
+        pending = self._inflight.get(signature)
+        if pending is not None:
+            self.stats["coalesced"] += 1
+            return dict(await asyncio.shield(pending)), True
+
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        self._inflight[signature] = future
+        try:
+            if self._db:
+                stored = await asyncio.to_thread(self._db_get, signature)
+                if stored is not None:
+                    expires_at, verdict = stored
+                    self._mem_put(signature, verdict, expires_at)
+                    self.stats["hits"] += 1
+                    self.stats["persistent_hits"] += 1
+                    future.set_result(verdict)
+                    return dict(verdict), True
+
+            self.stats["llm_calls"] += 1
+            verdict = await compute()
+            if self._should_store(verdict):
+                expires_at = time.time() + self.ttl
+                self._mem_put(signature, verdict, expires_at)
+                if self._db:
+                    await asyncio.to_thread(self._db_put, signature, verdict, expires_at)
+            future.set_result(verdict)
+            return dict(verdict), False
+        except BaseException as exc:
+            if not future.done():
+                # 取消只针对发起者本身，等待同一结果的其他请求收到普通异常
+                if isinstance(exc, asyncio.CancelledError):
+                    exc = RuntimeError("LLM 审计已取消")
+                future.set_exception(exc)
+                # 避免无人等待时出现 "exception was never retrieved"
+                future.exception()
+            raise
+        finally:
+            self._inflight.pop(signature, None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._db_clear()
+
+    def close(self) -> None:
+        if self._db:
+            with self._db_lock:
+                self._db.close()
+                self._db = None
+
+    def summary(self) -> Dict[str, Any]:
+        lookups = self.stats["lookups"]
+        saved = self.stats["hits"] + self.stats["coalesced"]
+        return {
+            **self.stats,
+            "size": len(self._entries),
+            "saved_llm_calls": saved,
+            "hit_rate": (saved / lookups) if lookups else 0.0,
+        }
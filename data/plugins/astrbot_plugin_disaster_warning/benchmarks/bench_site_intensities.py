@@ -0,0 +1,58 @@
+"""
+多地点烈度估算基准：逐点调用 calculate_distance + calculate_estimated_intensity
+与 calculate_site_intensities 批量计算的耗时对比
+
+在 AstrBot 根目录运行:
+    python data/plugins/astrbot_plugin_disaster_warning/benchmarks/bench_site_intensities.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from data.plugins.astrbot_plugin_disaster_warning.core.intensity_calculator import (  # noqa: E402
+    IntensityCalculator,
+)
+
+SITE_COUNTS = (10, 100, 1000)
+ROUNDS = 200
+
+
+def _scalar(magnitude, depth, event_lat, event_lon, lats, lons):
+    return [
+        IntensityCalculator.calculate_estimated_intensity(
+            magnitude,
+            IntensityCalculator.calculate_distance(event_lat, event_lon, lat, lon),
+            depth,
+            event_longitude=event_lon,
+        )
+        for lat, lon in zip(lats, lons)
+    ]
+
+
+def _timeit(func, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        func(*args)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+def main():
+    rnd = random.Random(1)
+    print(f"{'地点数':>6} {'逐点(us)':>10} {'批量(us)':>10} {'加速比':>8}")
+    for n in SITE_COUNTS:
+        lats = [rnd.uniform(20, 45) for _ in range(n)]
+        lons = [rnd.uniform(100, 130) for _ in range(n)]
+        args = (6.0, 10.0, 30.0, 110.0, lats, lons)
+        scalar = _timeit(_scalar, *args)
+        batch = _timeit(IntensityCalculator.calculate_site_intensities, *args)
+        print(
+            f"{n:>6} {scalar * 1e6:>10.0f} {batch * 1e6:>10.0f} {scalar / batch:>7.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
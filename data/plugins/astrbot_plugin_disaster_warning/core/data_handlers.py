@@ -134,6 +134,10 @@ class BaseDataHandler:
         """解析数据 - 子类实现"""
         raise NotImplementedError
 
+    def _safe_float_convert(self, value) -> float | None:
+        """安全地将值转换为浮点数"""
+        return _safe_float_convert(value)
+
     def _parse_datetime(self, time_str: str) -> datetime | None:
         """解析时间字符串"""
         if not time_str or not isinstance(time_str, str):
@@ -896,10 +900,6 @@ class JMAEarthquakeP2PHandler(BaseDataHandler):
             logger.error(f"[灾害预警] {self.source_id} 消息处理失败: {e}")
             return None
 
-    def _safe_float_convert(self, value) -> float | None:
-        """安全地将值转换为浮点数 - 为JMAEarthquakeP2PHandler提供此方法"""
-        return _safe_float_convert(value)
-
     def _parse_earthquake_data(self, data: dict[str, Any]) -> DisasterEvent | None:
         """解析地震情報"""
         try:
@@ -7,6 +7,7 @@ import asyncio
 import json
 import traceback
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 
 from astrbot.api import logger
@@ -28,7 +29,12 @@ from .websocket_manager import GlobalQuakeClient, HTTPDataFetcher, WebSocketMana
 class DisasterWarningService:
     """灾害预警核心服务"""
 
-    def __init__(self, config: dict[str, Any], context):
+    def __init__(
+        self,
+        config: dict[str, Any],
+        context,
+        push_history_path: Path | str | None = None,
+    ):
         self.config = config
         self.context = context
         self.running = False
@@ -41,7 +47,7 @@ class DisasterWarningService:
             config.get("websocket_config", {}), self.message_logger
         )
         self.http_fetcher: HTTPDataFetcher | None = None
-        self.message_manager = MessagePushManager(config, context)
+        self.message_manager = MessagePushManager(config, context, push_history_path)
 
         # 数据处理器
         self.handlers = {}
@@ -611,7 +617,13 @@ class DisasterWarningService:
 
             # 关闭HTTP获取器
             if self.http_fetcher:
-                await self.http_fetcher.__aexit__(None, None, None)
+                await self.http_fetcher.close()
+
+            # 写完队列中剩余的原始消息日志并关闭文件
+            await asyncio.to_thread(self.message_logger.close)
+
+            # 写完剩余推送记录并关闭推送历史数据库
+            await asyncio.to_thread(self.message_manager.close)
 
             logger.info("[灾害预警] 灾害预警服务已停止")
 
@@ -713,11 +725,7 @@ class DisasterWarningService:
 
                     # 注册消息处理器
                     async def global_quake_handler(message):
-                        handler = self.handlers.get("global_quake")
-                        if handler:
-                            event = handler.parse_message(message)
-                            if event:
-                                await self._handle_disaster_event(event)
+                        await self._dispatch_to_handler("global_quake", message)
 
                     global_quake_client.register_handler(global_quake_handler)
 
@@ -746,66 +754,59 @@ class DisasterWarningService:
                 try:
                     await asyncio.sleep(300)  # 5分钟获取一次
 
-                    async with self.http_fetcher as fetcher:
-                        # 获取中国地震台网地震列表
-                        cenc_data = await fetcher.fetch_json(
-                            "https://api.wolfx.jp/cenc_eqlist.json"
+                    # 共用长连接；内容未变化（304 或哈希相同）时返回 None，不再重复解析分发
+                    fetcher = self.http_fetcher
+                    # 获取中国地震台网地震列表
+                    cenc_data = await fetcher.fetch_json_if_changed(
+                        "https://api.wolfx.jp/cenc_eqlist.json"
+                    )
+                    if cenc_data:
+                        # 记录原始HTTP响应数据
+                        if self.message_logger:
+                            try:
+                                self.message_logger.log_raw_message(
+                                    source="http_wolfx_cenc",
+                                    message_type="http_response",
+                                    raw_data=json.dumps(cenc_data),
+                                    connection_info={
+                                        "url": "https://api.wolfx.jp/cenc_eqlist.json",
+                                        "method": "GET",
+                                        "data_source": "wolfx_cenc_earthquake",
+                                    },
+                                )
+                            except Exception as log_e:
+                                logger.warning(f"[灾害预警] HTTP响应记录失败: {log_e}")
+
+                        # 使用新处理器
+                        await self._dispatch_to_handler(
+                            "cenc_wolfx", json.dumps(cenc_data)
                         )
-                        if cenc_data:
-                            # 记录原始HTTP响应数据
-                            if self.message_logger:
-                                try:
-                                    self.message_logger.log_raw_message(
-                                        source="http_wolfx_cenc",
-                                        message_type="http_response",
-                                        raw_data=json.dumps(cenc_data),
-                                        connection_info={
-                                            "url": "https://api.wolfx.jp/cenc_eqlist.json",
-                                            "method": "GET",
-                                            "data_source": "wolfx_cenc_earthquake",
-                                        },
-                                    )
-                                except Exception as log_e:
-                                    logger.warning(
-                                        f"[灾害预警] HTTP响应记录失败: {log_e}"
-                                    )
-
-                            # 使用新处理器
-                            handler = self.handlers.get("cenc_wolfx")
-                            if handler:
-                                event = handler.parse_message(json.dumps(cenc_data))
-                                if event:
-                                    await self._handle_disaster_event(event)
-
-                        # 获取日本气象厅地震列表
-                        jma_data = await fetcher.fetch_json(
-                            "https://api.wolfx.jp/jma_eqlist.json"
+
+                    # 获取日本气象厅地震列表
+                    jma_data = await fetcher.fetch_json_if_changed(
+                        "https://api.wolfx.jp/jma_eqlist.json"
+                    )
+                    if jma_data:
+                        # 记录原始HTTP响应数据
+                        if self.message_logger:
+                            try:
+                                self.message_logger.log_raw_message(
+                                    source="http_wolfx_jma",
+                                    message_type="http_response",
+                                    raw_data=json.dumps(jma_data),
+                                    connection_info={
+                                        "url": "https://api.wolfx.jp/jma_eqlist.json",
+                                        "method": "GET",
+                                        "data_source": "wolfx_jma_earthquake",
+                                    },
+                                )
+                            except Exception as log_e:
+                                logger.warning(f"[灾害预警] HTTP响应记录失败: {log_e}")
+
+                        # 使用新处理器
+                        await self._dispatch_to_handler(
+                            "jma_wolfx_info", json.dumps(jma_data)
                         )
-                        if jma_data:
-                            # 记录原始HTTP响应数据
-                            if self.message_logger:
-                                try:
-                                    self.message_logger.log_raw_message(
-                                        source="http_wolfx_jma",
-                                        message_type="http_response",
-                                        raw_data=json.dumps(jma_data),
-                                        connection_info={
-                                            "url": "https://api.wolfx.jp/jma_eqlist.json",
-                                            "method": "GET",
-                                            "data_source": "wolfx_jma_earthquake",
-                                        },
-                                    )
-                                except Exception as log_e:
-                                    logger.warning(
-                                        f"[灾害预警] HTTP响应记录失败: {log_e}"
-                                    )
-
-                            # 使用新处理器
-                            handler = self.handlers.get("jma_wolfx_info")
-                            if handler:
-                                event = handler.parse_message(json.dumps(jma_data))
-                                if event:
-                                    await self._handle_disaster_event(event)
 
                 except Exception as e:
                     logger.error(f"[灾害预警] 定时HTTP数据获取失败: {e}")
@@ -827,6 +828,14 @@ class DisasterWarningService:
         task = asyncio.create_task(cleanup())
         self.scheduled_tasks.append(task)
 
+    async def _dispatch_to_handler(self, source_id: str, message: str):
+        """交给指定数据源的处理器解析并处理（Global Quake、HTTP轮询与回放共用）"""
+        handler = self.handlers.get(source_id)
+        if handler:
+            event = handler.parse_message(message)
+            if event:
+                await self._handle_disaster_event(event)
+
     async def _handle_disaster_event(self, event: DisasterEvent):
         """处理灾害事件"""
         try:
@@ -895,6 +904,9 @@ class DisasterWarningService:
             "total_connections": len(connection_status),
             "connection_details": connection_status,
             "push_stats": self.message_manager.get_push_stats(),
+            "http_fetch_stats": self.http_fetcher.get_metrics()
+            if self.http_fetcher
+            else {},
             "data_sources": self._get_active_data_sources(),
             "message_logger_enabled": self.message_logger.enabled
             if self.message_logger
@@ -0,0 +1,254 @@
+"""
+地震事件关联索引
+将不同数据源对同一次地震的报告归并到同一个事件簇
+
+- 空间哈希：纬度按容差划分为行，每行按该行及相邻行最高纬度处的经线间距划分为列，
+  保证容差范围内的两个震中必然落在相邻（3×3）的格子内，并正确处理日界线
+- 匹配条件：真实大圆距离、发震时间窗口、震级容差同时满足
+- 每个事件簇有稳定的簇ID；(数据源, 事件ID) 直接索引到簇，同一数据源的后续报文 O(1) 定位
+- 过期：按入队时刻排列的双端队列，只检查队首；期间有新报告的簇按新的过期时刻重新入队，
+  无需全量扫描
+"""
+
+import math
+import time
+from collections import deque
+from datetime import datetime
+from itertools import count
+from typing import Any
+
+from .intensity_calculator import IntensityCalculator
+
+
+class EventCluster:
+    """同一次地震在各数据源的报告集合"""
+
+    __slots__ = (
+        "cluster_id",
+        "latitude",
+        "longitude",
+        "magnitude",
+        "origin_time",
+        "cell",
+        "last_seen",
+        "sources",
+        "keys",
+    )
+
+    def __init__(
+        self,
+        cluster_id: str,
+        latitude: float | None,
+        longitude: float | None,
+        magnitude: float | None,
+        origin_time: datetime,
+    ):
+        self.cluster_id = cluster_id
+        self.latitude = latitude
+        self.longitude = longitude
+        self.magnitude = magnitude
+        self.origin_time = origin_time
+        self.cell: tuple[int, int] | None = None
+        self.last_seen = time.monotonic()
+        # 数据源ID -> 该数据源最近一次报告的信息
+        self.sources: dict[str, dict[str, Any]] = {}
+        # 指向本簇的 (数据源, 事件ID) 索引键
+        self.keys: set[tuple[str, str]] = set()
+
+
+class EventCorrelationIndex:
+    """地震事件关联索引（空间哈希 + 时间有序过期队列）"""
+
+    def __init__(
+        self,
+        location_tolerance_km: float = 20.0,
+        time_window_seconds: float = 60.0,
+        magnitude_tolerance: float = 0.5,
+        retention_seconds: float = 120.0,
+    ):
+        self.location_tolerance = max(0.1, float(location_tolerance_km))
+        self.time_window = float(time_window_seconds)
+        self.magnitude_tolerance = float(magnitude_tolerance)
+        self.retention = float(retention_seconds)
+
+        # 每行的纬度跨度（度）
+        self._row_height = min(180.0, self.location_tolerance / 111.0)
+        self._row_count = math.ceil(180.0 / self._row_height)
+        self._row_columns: dict[int, int] = {}
+
+        self._cells: dict[tuple[int, int], list[EventCluster]] = {}
+        self._clusters: dict[str, EventCluster] = {}
+        self._source_index: dict[tuple[str, str], EventCluster] = {}
+        # (过期时刻, 簇)，按入队顺序排列
+        self._expiry: deque[tuple[float, EventCluster]] = deque()
+        self._ids = count(1)
+
+    # ------------------------------------------------------------------ 空间哈希
+    def _columns(self, row: int) -> int:
+        """
+        该行的列数：列宽不小于该行及相邻行最高纬度处容差对应的经度跨度
+        （相邻行的点也按本行的列划分查询，因此要按三行中的最高纬度计算）
+        """
+        columns = self._row_columns.get(row)
+        if columns is None:
+            lower = -90.0 + (row - 1) * self._row_height
+            upper = -90.0 + (row + 2) * self._row_height
+            edge = min(90.0, max(abs(lower), abs(upper)))
+            km_per_degree = 111.0 * math.cos(math.radians(edge))
+            if km_per_degree <= 0:
+                columns = 1
+            else:
+                min_width = self.location_tolerance / km_per_degree
+                columns = max(1, int(360.0 // min_width)) if min_width < 360 else 1
+            self._row_columns[row] = columns
+        return columns
+
+    def _row(self, latitude: float) -> int:
+        return min(int((latitude + 90.0) // self._row_height), self._row_count - 1)
+
+    def _column(self, row: int, longitude: float) -> int:
+        columns = self._columns(row)
+        return int(((longitude + 180.0) % 360.0) // (360.0 / columns)) % columns
+
+    def _cell(self, latitude: float, longitude: float) -> tuple[int, int]:
+        row = self._row(latitude)
+        return row, self._column(row, longitude)
+
+    def _neighbor_cells(self, latitude: float, longitude: float):
+        """查询点所在格子及相邻行/列的格子"""
+        center = self._row(latitude)
+        for row in (center - 1, center, center + 1):
+            if row < 0 or row >= self._row_count:
+                continue
+            columns = self._columns(row)
+            column = self._column(row, longitude)
+            for col in {(column + offset) % columns for offset in (-1, 0, 1)}:
+                yield row, col
+
+    # ------------------------------------------------------------------ 查询
+    def _matches(
+        self,
+        cluster: EventCluster,
+        latitude: float,
+        longitude: float,
+        magnitude: float | None,
+        origin_time: datetime,
+    ) -> float | None:
+        """满足全部条件时返回震中距离（公里），否则返回 None"""
+        if abs((origin_time - cluster.origin_time).total_seconds()) > self.time_window:
+            return None
+        if (
+            magnitude is not None
+            and cluster.magnitude is not None
+            and abs(magnitude - cluster.magnitude) > self.magnitude_tolerance
+        ):
+            return None
+        distance = IntensityCalculator.calculate_distance(
+            latitude, longitude, cluster.latitude, cluster.longitude
+        )
+        return distance if distance <= self.location_tolerance else None
+
+    def find(
+        self,
+        source_id: str,
+        event_id: str | None,
+        latitude: float | None,
+        longitude: float | None,
+        magnitude: float | None,
+        origin_time: datetime,
+    ) -> EventCluster | None:
+        """查找报告所属的事件簇（先按数据源事件ID，再按时空邻近）"""
+        self.expire()
+
+        if event_id:
+            cluster = self._source_index.get((source_id, event_id))
+            if cluster is not None:
+                return cluster
+
+        if latitude is None or longitude is None:
+            return None
+
+        best, best_distance = None, None
+        for cell in self._neighbor_cells(latitude, longitude):
+            for cluster in self._cells.get(cell, ()):
+                # 同一数据源以不同事件ID报告的是另一次地震（如短时间内的余震）
+                if event_id and any(
+                    key[0] == source_id and key[1] != event_id for key in cluster.keys
+                ):
+                    continue
+                distance = self._matches(
+                    cluster, latitude, longitude, magnitude, origin_time
+                )
+                if distance is not None and (
+                    best_distance is None or distance < best_distance
+                ):
+                    best, best_distance = cluster, distance
+        return best
+
+    # ------------------------------------------------------------------ 更新
+    def create(
+        self,
+        latitude: float | None,
+        longitude: float | None,
+        magnitude: float | None,
+        origin_time: datetime,
+    ) -> EventCluster:
+        """新建事件簇（以首报的震中、震级、发震时间为基准）"""
+        cluster_id = f"EQ{origin_time.strftime('%Y%m%d%H%M%S')}-{next(self._ids)}"
+        cluster = EventCluster(cluster_id, latitude, longitude, magnitude, origin_time)
+        if latitude is not None and longitude is not None:
+            cluster.cell = self._cell(latitude, longitude)
+            self._cells.setdefault(cluster.cell, []).append(cluster)
+        self._clusters[cluster_id] = cluster
+        self._expiry.append((cluster.last_seen + self.retention, cluster))
+        return cluster
+
+    def attach(self, cluster: EventCluster, source_id: str, event_id: str | None):
+        """记录 (数据源, 事件ID) 属于该簇，并刷新活动时间"""
+        cluster.last_seen = time.monotonic()
+        if event_id:
+            key = (source_id, event_id)
+            previous = self._source_index.get(key)
+            if previous is not None and previous is not cluster:
+                previous.keys.discard(key)
+            self._source_index[key] = cluster
+            cluster.keys.add(key)
+
+    def _remove(self, cluster: EventCluster):
+        if self._clusters.pop(cluster.cluster_id, None) is None:
+            return
+        if cluster.cell is not None:
+            bucket = self._cells.get(cluster.cell)
+            if bucket is not None:
+                bucket.remove(cluster)
+                if not bucket:
+                    del self._cells[cluster.cell]
+        for key in cluster.keys:
+            if self._source_index.get(key) is cluster:
+                del self._source_index[key]
+
+    def expire(self, now: float | None = None) -> int:
+        """移除超过保留时间未活动的事件簇，返回移除数量"""
+        now = time.monotonic() if now is None else now
+        removed = 0
+        while self._expiry and self._expiry[0][0] <= now:
+            _, cluster = self._expiry.popleft()
+            if cluster.cluster_id not in self._clusters:
+                continue
+            expires_at = cluster.last_seen + self.retention
+            if expires_at > now:
+                # 期间有新报告，按新的过期时刻重新入队
+                self._expiry.append((expires_at, cluster))
+                continue
+            self._remove(cluster)
+            removed += 1
+        return removed
+
+    def clear(self):
+        self._cells.clear()
+        self._clusters.clear()
+        self._source_index.clear()
+        self._expiry.clear()
+
+    def __len__(self) -> int:
+        return len(self._clusters)
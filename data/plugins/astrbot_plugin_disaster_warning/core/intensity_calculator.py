@@ -1,4 +1,10 @@
 import math
+from collections.abc import Sequence
+
+try:
+    import numpy as np
+except ImportError:  # numpy 不可用时退化为逐点计算
+    np = None
 
 
 class IntensityCalculator:
@@ -7,6 +13,9 @@ class IntensityCalculator:
     用于根据震级和距离估算本地烈度
     """
 
+    # 地点数少于此值时逐点计算更快（numpy 调用本身有固定开销）
+    VECTORIZE_MIN_SITES = 16
+
     @staticmethod
     def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
         """
@@ -75,6 +84,105 @@ class IntensityCalculator:
         # 烈度通常不小于0，最大通常不超过12
         return max(0.0, min(12.0, intensity))
 
+    @staticmethod
+    def calculate_site_intensities(
+        magnitude: float,
+        depth_km: float,
+        event_latitude: float,
+        event_longitude: float,
+        site_latitudes: Sequence[float],
+        site_longitudes: Sequence[float],
+        site_amplifications: Sequence[float] | None = None,
+    ):
+        """
+        批量估算多个地点的烈度（一次向量化计算）
+        距离与衰减公式与 calculate_distance / calculate_estimated_intensity 相同
+
+        场地放大系数为该地点地面峰值加速度相对基岩的放大倍数，
+        按烈度每增加1度加速度约翻倍，折算为烈度增量 log2(放大系数)；
+        缺省或非正数视为 1.0（不修正）
+
+        :param magnitude: 震级
+        :param depth_km: 震源深度（公里）
+        :param event_latitude: 震中纬度
+        :param event_longitude: 震中经度，同时用于判定东/西部衰减公式
+        :param site_latitudes: 各地点纬度
+        :param site_longitudes: 各地点经度
+        :param site_amplifications: 各地点场地放大系数，可选
+        :return: (预估烈度数组, 震中距数组)，顺序与输入地点一致；
+                 地点较少或 numpy 不可用时返回列表
+        """
+        if np is None or len(site_latitudes) < IntensityCalculator.VECTORIZE_MIN_SITES:
+            return IntensityCalculator._calculate_site_intensities_scalar(
+                magnitude,
+                depth_km,
+                event_latitude,
+                event_longitude,
+                site_latitudes,
+                site_longitudes,
+                site_amplifications,
+            )
+
+        lat2 = np.radians(np.asarray(site_latitudes, dtype=np.float64))
+        lon2 = np.radians(np.asarray(site_longitudes, dtype=np.float64))
+        lat1 = math.radians(event_latitude)
+        lon1 = math.radians(event_longitude)
+
+        # 海夫赛文公式
+        a = (
+            np.sin((lat2 - lat1) / 2) ** 2
+            + math.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+        )
+        distances = 2 * 6371.0 * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+        A, B, C, R0 = IntensityCalculator._attenuation_coefficients(event_longitude)
+        R = np.maximum(np.sqrt(distances**2 + depth_km**2), 5.0)
+        intensities = A + B * magnitude - C * np.log(R + R0)
+
+        if site_amplifications is not None:
+            amplifications = np.asarray(site_amplifications, dtype=np.float64)
+            corrections = np.zeros_like(amplifications)
+            positive = amplifications > 0
+            corrections[positive] = np.log2(amplifications[positive])
+            intensities = intensities + corrections
+
+        return np.clip(intensities, 0.0, 12.0), distances
+
+    @staticmethod
+    def _calculate_site_intensities_scalar(
+        magnitude: float,
+        depth_km: float,
+        event_latitude: float,
+        event_longitude: float,
+        site_latitudes: Sequence[float],
+        site_longitudes: Sequence[float],
+        site_amplifications: Sequence[float] | None = None,
+    ) -> tuple[list[float], list[float]]:
+        """calculate_site_intensities 的逐点实现（numpy 不可用时使用）"""
+        A, B, C, R0 = IntensityCalculator._attenuation_coefficients(event_longitude)
+        intensities, distances = [], []
+        for i, (lat, lon) in enumerate(zip(site_latitudes, site_longitudes)):
+            distance = IntensityCalculator.calculate_distance(
+                event_latitude, event_longitude, lat, lon
+            )
+            # 先不截断，加上场地修正后再统一截断
+            R = max(math.sqrt(distance**2 + depth_km**2), 5.0)
+            intensity = A + B * magnitude - C * math.log(R + R0)
+            if site_amplifications is not None and site_amplifications[i] > 0:
+                intensity += math.log2(site_amplifications[i])
+            intensities.append(max(0.0, min(12.0, intensity)))
+            distances.append(distance)
+        return intensities, distances
+
+    @staticmethod
+    def _attenuation_coefficients(
+        event_longitude: float | None,
+    ) -> tuple[float, float, float, float]:
+        """按震中经度返回衰减公式系数 (A, B, C, R0)，以105度为东/西部分界"""
+        if event_longitude is not None and event_longitude < 105.0:
+            return 5.643, 1.538, 2.109, 25.0
+        return 6.046, 1.480, 2.081, 25.0
+
     @staticmethod
     def get_intensity_description(intensity: float) -> str:
         """
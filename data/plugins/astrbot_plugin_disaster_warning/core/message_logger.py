@@ -1,11 +1,22 @@
 """
 原始消息记录器
 适配数据源架构，提供更好的日志格式和过滤功能
+
+记录调用只把消息放入有界队列，过滤、格式化和写盘都由后台写入线程完成
+（批量写入、定期 fsync、按大小/时间轮转并可压缩旧日志），
+队列满时直接丢弃并计数，预警推送不会等待磁盘 I/O
 """
 
+import gzip
 import hashlib
 import json
+import os
+import queue
+import shutil
+import threading
+import time
 import traceback
+from collections import deque
 from datetime import datetime
 from pathlib import Path
 from typing import Any
@@ -13,6 +24,9 @@ from typing import Any
 from astrbot.api import logger
 from astrbot.api.star import StarTools
 
+# 回放数据行前缀：每条日志附带一行紧凑 JSON（原始消息未经翻译/截断），供 core.replay 读取
+REPLAY_DATA_PREFIX = "📦 回放数据: "
+
 
 class MessageLogger:
     """原始消息格式记录器"""
@@ -33,6 +47,22 @@ class MessageLogger:
         )
         self.max_size_mb = config.get("debug_config", {}).get("log_max_size_mb", 50)
         self.max_files = config.get("debug_config", {}).get("log_max_files", 5)
+        self.rotate_interval_hours = config.get("debug_config", {}).get(
+            "log_rotate_interval_hours", 0
+        )
+        self.compress_rotated = config.get("debug_config", {}).get(
+            "log_compress_rotated", False
+        )
+        self.replay_data = config.get("debug_config", {}).get("log_replay_data", True)
+
+        # 后台写入配置
+        self.queue_size = max(
+            1, int(config.get("debug_config", {}).get("log_queue_size", 1000))
+        )
+        self.fsync_interval = max(
+            0.1, float(config.get("debug_config", {}).get("log_fsync_interval", 1.0))
+        )
+        self.max_batch_size = 200
 
         # 过滤配置
         self.filter_heartbeat = config.get("debug_config", {}).get(
@@ -53,9 +83,9 @@ class MessageLogger:
 
         # 用于去重的缓存
         self.recent_event_hashes: set[str] = set()
-        self.recent_raw_logs: list[str] = []  # 新增：用于原始日志文本去重
         self.max_cache_size = 1000
         self.max_raw_log_cache = 30  # 只缓存最近30条原始日志用于去重
+        self.recent_raw_logs: deque[str] = deque(maxlen=self.max_raw_log_cache)
 
         # 日志过滤统计
         self.filter_stats = {
@@ -66,6 +96,28 @@ class MessageLogger:
             "total_filtered": 0,
         }
 
+        # 后台写入统计
+        self.queue_stats = {
+            "enqueued": 0,
+            "dropped": 0,  # 队列已满而丢弃的消息
+            "written": 0,
+            "batches": 0,
+            "fsyncs": 0,
+            "rotations": 0,
+            "write_errors": 0,
+        }
+
+        # 后台写入线程状态（首次记录时启动）
+        self._queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        self._writer_thread: threading.Thread | None = None
+        self._thread_lock = threading.Lock()
+        # 文件与去重状态只在持有此锁时访问（写入线程 / 清除日志 / 统计）
+        self._file_lock = threading.RLock()
+        self._log_file = None
+        self._segment_started = time.time()
+        self._last_fsync = time.monotonic()
+        self._stop_sentinel = object()
+
         # 设置日志文件路径 - 使用AstrBot的StarTools获取正确的数据目录
         self.data_dir = StarTools.get_data_dir("astrbot_plugin_disaster_warning")
         self.log_file_path = self.data_dir / self.log_file_name
@@ -583,6 +635,28 @@ class MessageLogger:
             logger.warning(f"[灾害预警] 日志格式化失败，使用回退格式: {e}")
             return json.dumps(log_entry, ensure_ascii=False, indent=2) + "\n\n"
 
+    def _append_replay_data(self, log_content: str, log_entry: dict[str, Any]) -> str:
+        """在日志条目末尾分隔线前插入回放数据行（含精确到微秒的接收时间）"""
+        try:
+            replay_line = REPLAY_DATA_PREFIX + json.dumps(
+                {
+                    "ts": datetime.fromisoformat(log_entry["timestamp"]).timestamp(),
+                    "source": log_entry["source"],
+                    "message_type": log_entry["message_type"],
+                    "raw": log_entry["raw_data"],
+                },
+                ensure_ascii=False,
+                default=str,
+            )
+        except Exception as e:
+            logger.debug(f"[灾害预警] 生成回放数据失败: {e}")
+            return log_content
+
+        closing = f"{'=' * 35}\n"
+        if log_content.endswith(closing):
+            return f"{log_content[: -len(closing)]}{replay_line}\n{closing}"
+        return f"{log_content}{replay_line}\n\n"
+
     def _format_json_data(self, data: dict[str, Any], indent: int = 0) -> str:
         """递归格式化JSON数据，增加可读性"""
         result = ""
@@ -989,10 +1063,8 @@ class MessageLogger:
                 logger.debug("[灾害预警] 发现内容完全重复的日志（内存缓存），跳过写入")
                 return True
 
-            # 更新缓存
+            # 更新缓存（deque 自动淘汰最旧的条目）
             self.recent_raw_logs.append(new_content_clean)
-            if len(self.recent_raw_logs) > self.max_raw_log_cache:
-                self.recent_raw_logs.pop(0)
 
             return False
 
@@ -1008,12 +1080,37 @@ class MessageLogger:
         raw_data: Any,
         connection_info: dict | None = None,
     ):
-        """记录原始消息"""
+        """记录原始消息（只入队，不做任何磁盘 I/O）"""
         if not self.enabled:
             # 仅在调试模式下输出，避免刷屏
             # logger.debug(f"[灾害预警] 消息记录器未启用，跳过记录: {source}")
             return
 
+        self._ensure_writer()
+        try:
+            self._queue.put_nowait(
+                (source, message_type, raw_data, connection_info, datetime.now())
+            )
+            self.queue_stats["enqueued"] += 1
+        except queue.Full:
+            self.queue_stats["dropped"] += 1
+            dropped = self.queue_stats["dropped"]
+            # 丢弃时按 1, 100, 200... 条输出警告，避免刷屏
+            if dropped == 1 or dropped % 100 == 0:
+                logger.warning(
+                    f"[灾害预警] 原始消息日志队列已满（{self.queue_size}），"
+                    f"已丢弃 {dropped} 条消息"
+                )
+
+    def _process_entry(
+        self,
+        source: str,
+        message_type: str,
+        raw_data: Any,
+        connection_info: dict | None,
+        current_time: datetime,
+    ) -> str | None:
+        """过滤并格式化一条消息，返回要写入的日志文本（在写入线程中执行）"""
         try:
             # 检查是否应该过滤该消息
             filter_reason = self._should_filter_message(raw_data, source)
@@ -1036,10 +1133,7 @@ class MessageLogger:
                     )
 
                 self.filter_stats["total_filtered"] += 1
-                return
-
-            # 获取当前时间
-            current_time = datetime.now()
+                return None
 
             # 准备日志条目数据
             log_entry = {
@@ -1068,18 +1162,12 @@ class MessageLogger:
                 logger.info(
                     f"[灾害预警] 跳过写入内容完全重复的日志 - 来源: {source}, 类型: {message_type}"
                 )
-                return
+                return None
 
-            # 确保目录存在
-            self.log_file_path.parent.mkdir(parents=True, exist_ok=True)
+            if self.replay_data:
+                log_content = self._append_replay_data(log_content, log_entry)
 
-            # 写入日志文件
-            with open(self.log_file_path, "a", encoding="utf-8") as f:
-                f.write(log_content)
-                f.flush()  # 确保立即写入磁盘
-
-            # 检查文件大小，必要时进行轮转
-            self._check_log_rotation()
+            return log_content
 
         except Exception as e:
             logger.error(f"[灾害预警] 记录原始消息失败: {e}")
@@ -1088,6 +1176,130 @@ class MessageLogger:
             )
             # 记录异常堆栈
             logger.error(f"[灾害预警] 异常堆栈: {traceback.format_exc()}")
+            return None
+
+    def _ensure_writer(self):
+        """按需启动后台写入线程"""
+        if self._writer_thread is not None and self._writer_thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._writer_thread is not None and self._writer_thread.is_alive():
+                return
+            self._writer_thread = threading.Thread(
+                target=self._writer_loop,
+                name="disaster-warning-log-writer",
+                daemon=True,
+            )
+            self._writer_thread.start()
+
+    def _writer_loop(self):
+        """后台写入线程：批量取出消息、写入文件、定期 fsync 与轮转"""
+        while True:
+            try:
+                item = self._queue.get(timeout=self.fsync_interval)
+            except queue.Empty:
+                with self._file_lock:
+                    self._sync_if_due(force=True)
+                    self._check_log_rotation()
+                continue
+
+            batch = [item]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            with self._file_lock:
+                contents = []
+                for entry in batch:
+                    if entry is self._stop_sentinel:
+                        stop = True
+                        continue
+                    content = self._process_entry(*entry)
+                    if content:
+                        contents.append(content)
+                if contents:
+                    self._write_batch(contents)
+                self._sync_if_due(force=stop)
+                self._check_log_rotation()
+                if stop:
+                    self._close_file()
+
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, contents: list[str]):
+        """将一批日志文本写入当前日志文件（调用方持有 _file_lock）"""
+        try:
+            if self._log_file is None:
+                # 确保目录存在
+                self.log_file_path.parent.mkdir(parents=True, exist_ok=True)
+                if not self.log_file_path.exists():
+                    self._segment_started = time.time()
+                self._log_file = open(self.log_file_path, "a", encoding="utf-8")
+            self._log_file.write("".join(contents))
+            self._log_file.flush()
+            self.queue_stats["written"] += len(contents)
+            self.queue_stats["batches"] += 1
+        except Exception as e:
+            self.queue_stats["write_errors"] += 1
+            logger.error(f"[灾害预警] 写入原始消息日志失败: {e}")
+            self._close_file()
+
+    def _sync_if_due(self, force: bool = False):
+        """距上次 fsync 超过间隔时同步到磁盘（调用方持有 _file_lock）"""
+        if self._log_file is None:
+            return
+        now = time.monotonic()
+        if not force and now - self._last_fsync < self.fsync_interval:
+            return
+        try:
+            self._log_file.flush()
+            os.fsync(self._log_file.fileno())
+            self.queue_stats["fsyncs"] += 1
+        except Exception as e:
+            logger.debug(f"[灾害预警] 日志 fsync 失败: {e}")
+        self._last_fsync = now
+
+    def _close_file(self):
+        """关闭当前日志文件句柄（调用方持有 _file_lock）"""
+        if self._log_file is None:
+            return
+        try:
+            self._log_file.close()
+        except Exception:
+            pass
+        self._log_file = None
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待队列中的消息全部写入并同步到磁盘（会阻塞，勿在事件循环中调用）"""
+        if self._writer_thread is None or not self._writer_thread.is_alive():
+            return True
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        with self._file_lock:
+            self._sync_if_due(force=True)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """停止写入线程并关闭日志文件（会阻塞，勿在事件循环中调用）"""
+        thread = self._writer_thread
+        if thread is not None and thread.is_alive():
+            try:
+                self._queue.put(self._stop_sentinel, timeout=timeout)
+            except queue.Full:
+                logger.warning("[灾害预警] 原始消息日志队列已满，未写入的消息将被丢弃")
+            thread.join(timeout)
+        with self._file_lock:
+            self._sync_if_due(force=True)
+            self._close_file()
 
     def log_websocket_message(
         self, connection_name: str, message: str, url: str | None = None
@@ -1108,12 +1320,8 @@ class MessageLogger:
             f"[灾害预警] 准备记录TCP消息 - 服务器: {server}:{port}, 消息: {message[:128]}..."
         )
 
-        # 先检查过滤情况
-        filter_reason = self._should_filter_message(message)
-        if filter_reason:
-            logger.info(f"[灾害预警] TCP消息被过滤 - 原因: {filter_reason}")
-        else:
-            logger.debug("[灾害预警] TCP消息未被过滤，将记录到日志")
+        # 过滤检查由写入线程统一进行（在此预先检查会提前登记事件哈希，
+        # 导致该消息随后被当作重复事件过滤）
 
         self.log_raw_message(
             source="tcp_global_quake",
@@ -1138,45 +1346,84 @@ class MessageLogger:
         )
 
     def _check_log_rotation(self):
-        """检查日志文件大小并进行轮转"""
+        """检查日志文件大小/时长并进行轮转（调用方持有 _file_lock）"""
         try:
-            if not self.log_file_path.exists():
+            if self._log_file is not None:
+                file_size = self._log_file.tell()
+            elif self.log_file_path.exists():
+                file_size = self.log_file_path.stat().st_size
+            else:
                 return
 
             # 获取文件大小（MB）
-            file_size_mb = self.log_file_path.stat().st_size / (1024 * 1024)
+            file_size_mb = file_size / (1024 * 1024)
 
             if file_size_mb > self.max_size_mb:
                 self._rotate_logs()
+            elif (
+                self.rotate_interval_hours
+                and file_size > 0
+                and time.time() - self._segment_started
+                >= self.rotate_interval_hours * 3600
+            ):
+                self._rotate_logs()
 
         except Exception as e:
             logger.error(f"[灾害预警] 日志轮转检查失败: {e}")
 
+    def _rotated_files(self, index: int) -> list[Path]:
+        """第 index 个轮转文件的可能路径（未压缩 / gzip 压缩）"""
+        plain = self.log_file_path.with_suffix(f".log.{index}")
+        return [plain, plain.with_name(plain.name + ".gz")]
+
     def _rotate_logs(self):
-        """轮转日志文件"""
+        """轮转日志文件（调用方持有 _file_lock）"""
         try:
             # 关闭当前日志文件
-            for i in range(self.max_files - 1, 0, -1):
-                old_file = self.log_file_path.with_suffix(f".log.{i}")
-                new_file = self.log_file_path.with_suffix(f".log.{i + 1}")
+            self._sync_if_due(force=True)
+            self._close_file()
 
-                if old_file.exists():
-                    if new_file.exists():
-                        new_file.unlink()  # 删除最旧的文件
-                    old_file.rename(new_file)
+            for i in range(self.max_files - 1, 0, -1):
+                for old_file, new_file in zip(
+                    self._rotated_files(i), self._rotated_files(i + 1)
+                ):
+                    if old_file.exists():
+                        if new_file.exists():
+                            new_file.unlink()  # 删除最旧的文件
+                        old_file.rename(new_file)
 
             # 重命名当前日志文件
+            backup_file = self.log_file_path.with_suffix(".log.1")
             if self.log_file_path.exists():
-                backup_file = self.log_file_path.with_suffix(".log.1")
-                if backup_file.exists():
-                    backup_file.unlink()
+                for stale in self._rotated_files(1):
+                    if stale.exists():
+                        stale.unlink()
                 self.log_file_path.rename(backup_file)
 
+                if self.compress_rotated:
+                    backup_file = self._compress_file(backup_file)
+
+            self._segment_started = time.time()
+            self.queue_stats["rotations"] += 1
             logger.info(f"[灾害预警] 日志文件已轮转，备份文件: {backup_file}")
 
         except Exception as e:
             logger.error(f"[灾害预警] 日志轮转失败: {e}")
 
+    def _compress_file(self, path: Path) -> Path:
+        """gzip 压缩轮转出的日志文件，返回压缩后的路径（失败时返回原路径）"""
+        gz_path = path.with_name(path.name + ".gz")
+        try:
+            with open(path, "rb") as src, gzip.open(gz_path, "wb") as dst:
+                shutil.copyfileobj(src, dst)
+            path.unlink()
+            return gz_path
+        except Exception as e:
+            logger.warning(f"[灾害预警] 压缩轮转日志失败，保留未压缩文件: {e}")
+            if gz_path.exists():
+                gz_path.unlink()
+            return path
+
     def get_log_summary(self) -> dict[str, Any]:
         """获取日志统计信息（支持新可读性格式）"""
         try:
@@ -1189,9 +1436,12 @@ class MessageLogger:
             date_range = {"start": None, "end": None}
             file_size_mb = self.log_file_path.stat().st_size / (1024 * 1024)
 
-            # 读取文件内容
-            with open(self.log_file_path, encoding="utf-8") as f:
-                content = f.read()
+            # 读取文件内容（持锁读取，避免读到写入中的批次）
+            with self._file_lock:
+                if self._log_file is not None:
+                    self._log_file.flush()
+                with open(self.log_file_path, encoding="utf-8") as f:
+                    content = f.read()
 
             # 按分隔符分割条目
             entries = content.split(f"\n{'=' * 35}\n")
@@ -1242,6 +1492,8 @@ class MessageLogger:
                 "date_range": date_range,
                 "file_size_mb": file_size_mb,
                 "filter_stats": self.filter_stats.copy(),
+                "queue_stats": self.queue_stats.copy(),
+                "queue_pending": self._queue.qsize(),
                 "format_version": "3.0",  # 新格式版本
             }
 
@@ -1252,18 +1504,22 @@ class MessageLogger:
     def clear_logs(self):
         """清除所有日志文件"""
         try:
-            # 删除主日志文件
-            if self.log_file_path.exists():
-                self.log_file_path.unlink()
-
-            # 删除轮转的旧日志文件
-            for i in range(1, self.max_files + 1):
-                old_file = self.log_file_path.with_suffix(f".log.{i}")
-                if old_file.exists():
-                    old_file.unlink()
-
-            # 清空去重缓存
-            self.recent_event_hashes.clear()
+            with self._file_lock:
+                self._close_file()
+
+                # 删除主日志文件
+                if self.log_file_path.exists():
+                    self.log_file_path.unlink()
+
+                # 删除轮转的旧日志文件
+                for i in range(1, self.max_files + 1):
+                    for old_file in self._rotated_files(i):
+                        if old_file.exists():
+                            old_file.unlink()
+
+                # 清空去重缓存
+                self.recent_event_hashes.clear()
+                self.recent_raw_logs.clear()
 
             # 重置统计
             for key in self.filter_stats:
@@ -3,14 +3,17 @@
 实现优化的报数控制、拆分过滤器和改进的去重逻辑
 """
 
+import time
 import urllib.parse
 from collections import defaultdict
 from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from typing import Any
 
 import astrbot.api.message_components as Comp
 from astrbot.api import logger
 from astrbot.api.event import MessageChain
+from astrbot.api.star import StarTools
 
 from ..models.data_source_config import (
     get_intensity_based_sources,
@@ -30,7 +33,14 @@ from ..utils.message_formatters import (
     format_tsunami_message,
     format_weather_message,
 )
+from .event_correlator import EventCorrelationIndex
 from .intensity_calculator import IntensityCalculator
+from .push_history import (
+    STATUS_FAILED,
+    STATUS_SENT,
+    STATUS_SKIPPED,
+    PushHistoryStore,
+)
 
 
 class IntensityFilter:
@@ -118,7 +128,7 @@ class USGSFilter:
 
 
 class LocalIntensityFilter:
-    """本地烈度过滤器"""
+    """本地烈度过滤器（支持为各群配置独立的监控地点）"""
 
     def __init__(self, config: dict):
         self.enabled = config.get("enabled", False)
@@ -128,38 +138,111 @@ class LocalIntensityFilter:
         self.strict_mode = config.get("strict_mode", False)
         self.place_name = config.get("place_name", "本地")
 
-    def check_event(self, earthquake: EarthquakeData) -> tuple[bool, float, float]:
+        # 监控地点：下标0为默认本地地点，其余来自 group_locations
+        self.site_names: list[str] = [self.place_name]
+        self.site_latitudes: list[float] = [self.latitude]
+        self.site_longitudes: list[float] = [self.longitude]
+        self.site_amplifications: list[float] = [config.get("site_amplification", 1.0)]
+        # 群号 -> 该群的监控地点下标
+        self.group_sites: dict[str, list[int]] = defaultdict(list)
+        for entry in config.get("group_locations", []) or []:
+            self._add_group_location(entry)
+
+        # 同一事件的多次检查（各群、各报）复用同一次批量计算
+        self._last_estimation_key = None
+        self._last_estimation = None
+
+    def _add_group_location(self, entry: str):
+        """解析群监控地点："群号,纬度,经度[,地名[,场地放大系数]]" """
+        parts = [part.strip() for part in str(entry).replace("，", ",").split(",")]
+        try:
+            group_id = parts[0]
+            latitude = float(parts[1])
+            longitude = float(parts[2])
+            place_name = parts[3] if len(parts) > 3 and parts[3] else self.place_name
+            amplification = float(parts[4]) if len(parts) > 4 and parts[4] else 1.0
+        except (IndexError, ValueError):
+            logger.warning(f"[灾害预警] 无法解析群监控地点配置，已忽略: {entry}")
+            return
+        if not group_id:
+            return
+
+        self.group_sites[group_id].append(len(self.site_names))
+        self.site_names.append(place_name)
+        self.site_latitudes.append(latitude)
+        self.site_longitudes.append(longitude)
+        self.site_amplifications.append(amplification)
+
+    def estimate_sites(self, earthquake: EarthquakeData):
+        """
+        一次批量计算所有监控地点的预估烈度
+        :return: (烈度序列, 距离序列)，无坐标时返回 None
+        """
+        if earthquake.latitude is None or earthquake.longitude is None:
+            return None
+
+        key = (
+            earthquake.latitude,
+            earthquake.longitude,
+            earthquake.magnitude or 0.0,
+            earthquake.depth or 10.0,
+        )
+        if key != self._last_estimation_key:
+            self._last_estimation = IntensityCalculator.calculate_site_intensities(
+                key[2],
+                key[3],
+                earthquake.latitude,
+                earthquake.longitude,
+                self.site_latitudes,
+                self.site_longitudes,
+                self.site_amplifications,
+            )
+            self._last_estimation_key = key
+        return self._last_estimation
+
+    def check_event(
+        self, earthquake: EarthquakeData, group_id: str | None = None
+    ) -> tuple[bool, float, float]:
         """
         检查事件是否需要推送
+        :param group_id: 群号；该群配置了监控地点时按其中烈度最大的地点判断，否则使用默认本地地点
         :return: (is_allowed, distance, intensity)
         """
         if not self.enabled:
             return True, 0.0, 0.0
 
-        if earthquake.latitude is None or earthquake.longitude is None:
+        estimation = self.estimate_sites(earthquake)
+        if estimation is None:
             # 如果没有坐标，严格模式下过滤，非严格模式下允许
             return not self.strict_mode, 0.0, 0.0
 
-        distance = IntensityCalculator.calculate_distance(
-            earthquake.latitude, earthquake.longitude, self.latitude, self.longitude
-        )
-
-        intensity = IntensityCalculator.calculate_estimated_intensity(
-            earthquake.magnitude or 0.0,
-            distance,
-            earthquake.depth or 10.0,
-            event_longitude=earthquake.longitude,  # 传入经度以区分东西部
-        )
+        site = self.get_site_index(earthquake, group_id)
+        intensities, distances = estimation
+        intensity = float(intensities[site])
+        distance = float(distances[site])
 
         if self.strict_mode:
             if intensity < self.threshold:
                 logger.info(
-                    f"[灾害预警] 本地烈度 {intensity:.1f} < 阈值 {self.threshold}，严格模式已过滤"
+                    f"[灾害预警] {self.site_names[site]}烈度 {intensity:.1f} < 阈值 {self.threshold}，严格模式已过滤"
                 )
                 return False, distance, intensity
 
         return True, distance, intensity
 
+    def get_site_index(
+        self, earthquake: EarthquakeData, group_id: str | None = None
+    ) -> int:
+        """返回该群用于判断的监控地点下标（多个地点时取预估烈度最大者）"""
+        sites = self.group_sites.get(group_id) if group_id else None
+        if not sites:
+            return 0
+        estimation = self.estimate_sites(earthquake)
+        if estimation is None or len(sites) == 1:
+            return sites[0]
+        intensities = estimation[0]
+        return max(sites, key=lambda i: intensities[i])
+
 
 class ReportCountController:
     """报数控制器 - 仅对EEW数据源生效"""
@@ -240,12 +323,19 @@ class EventDeduplicator:
         location_tolerance_km: float = 20.0,
         magnitude_tolerance: float = 0.5,
     ):
+        self.time_window_minutes = time_window_minutes
         self.time_window = timedelta(minutes=time_window_minutes)
         self.location_tolerance = location_tolerance_km
         self.magnitude_tolerance = magnitude_tolerance
 
-        # 记录每个数据源的事件：事件指纹 -> {数据源: 事件信息}
-        self.recent_events: dict[str, dict[str, dict]] = {}
+        # 事件关联索引：各数据源对同一地震的报告归入同一事件簇
+        # 簇在最后一次报告后保留2倍时间窗口
+        self.correlation_index = EventCorrelationIndex(
+            location_tolerance_km=location_tolerance_km,
+            time_window_seconds=self.time_window.total_seconds(),
+            magnitude_tolerance=magnitude_tolerance,
+            retention_seconds=self.time_window.total_seconds() * 2,
+        )
 
     def should_push_event(self, event: DisasterEvent) -> bool:
         """判断是否应该推送事件 - 允许多数据源推送同一事件"""
@@ -254,9 +344,7 @@ class EventDeduplicator:
 
         earthquake = event.data
         source_id = self._get_source_id(event)
-
-        # 生成事件指纹
-        event_fingerprint = self._generate_event_fingerprint(earthquake)
+        event_id = earthquake.event_id or earthquake.id
 
         # 关键修复：如果地震时间解析失败，使用当前时间作为后备
         current_time = (
@@ -265,13 +353,29 @@ class EventDeduplicator:
             else datetime.now()
         )
 
+        # 震级为-1.0表示未知，不参与震级容差判断
+        magnitude = earthquake.magnitude
+        if magnitude is not None and magnitude < 0:
+            magnitude = None
+
+        # 查找所属事件簇（先按数据源事件ID，再按时空邻近）
+        cluster = self.correlation_index.find(
+            source_id,
+            event_id,
+            earthquake.latitude,
+            earthquake.longitude,
+            magnitude,
+            current_time,
+        )
+
         logger.debug(
-            f"[灾害预警] 检查事件: {event.source.value}, 指纹: {event_fingerprint}"
+            f"[灾害预警] 检查事件: {event.source.value}, 事件簇: {cluster.cluster_id if cluster else '新事件'}"
         )
 
-        # 检查是否已有相似事件
-        if event_fingerprint in self.recent_events:
-            source_events = self.recent_events[event_fingerprint]
+        if cluster is not None:
+            self.correlation_index.attach(cluster, source_id, event_id)
+            event.raw_data["cluster_id"] = cluster.cluster_id
+            source_events = cluster.sources
 
             # 检查同一数据源是否已推送过
             if source_id in source_events:
@@ -305,28 +409,30 @@ class EventDeduplicator:
 
             # 不同数据源，允许推送（允许多数据源推送同一事件）
             logger.info(f"[灾害预警] 不同数据源，允许推送: {event.source.value}")
-            current_report = getattr(earthquake, "updates", 1)
-            # 提取JMA issue_type
-            issue_type = ""
-            if hasattr(earthquake, "raw_data") and isinstance(
-                earthquake.raw_data, dict
-            ):
-                issue_type = earthquake.raw_data.get("issue", {}).get("type", "")
-
-            self.recent_events[event_fingerprint][source_id] = {
-                "timestamp": current_time,
-                "source": event.source.value,
-                "latitude": earthquake.latitude or 0,
-                "longitude": earthquake.longitude or 0,
-                "magnitude": earthquake.magnitude or 0,
-                "info_type": earthquake.info_type or "",
-                "issue_type": issue_type,  # 保存JMA issue type
-                "processed_reports": {current_report},  # 使用集合存储已处理的报数
-                "is_final": getattr(earthquake, "is_final", False),
-            }
+            source_events[source_id] = self._make_source_record(
+                event, earthquake, current_time
+            )
             return True
 
         # 新事件，记录并允许推送
+        cluster = self.correlation_index.create(
+            earthquake.latitude, earthquake.longitude, magnitude, current_time
+        )
+        self.correlation_index.attach(cluster, source_id, event_id)
+        event.raw_data["cluster_id"] = cluster.cluster_id
+        cluster.sources[source_id] = self._make_source_record(
+            event, earthquake, current_time
+        )
+
+        logger.info(
+            f"[灾害预警] 允许推送新事件: {event.source.value}（事件簇 {cluster.cluster_id}）"
+        )
+        return True
+
+    def _make_source_record(
+        self, event: DisasterEvent, earthquake: EarthquakeData, current_time: datetime
+    ) -> dict:
+        """生成某数据源对该事件的推送记录"""
         current_report = getattr(earthquake, "updates", 1)
 
         # 提取JMA issue_type
@@ -334,51 +440,18 @@ class EventDeduplicator:
         if hasattr(earthquake, "raw_data") and isinstance(earthquake.raw_data, dict):
             issue_type = earthquake.raw_data.get("issue", {}).get("type", "")
 
-        self.recent_events[event_fingerprint] = {
-            source_id: {
-                "timestamp": current_time,
-                "source": event.source.value,
-                "latitude": earthquake.latitude or 0,
-                "longitude": earthquake.longitude or 0,
-                "magnitude": earthquake.magnitude or 0,
-                "info_type": earthquake.info_type or "",
-                "issue_type": issue_type,  # 保存JMA issue type
-                "processed_reports": {current_report},  # 使用集合存储已处理的报数
-                "is_final": getattr(earthquake, "is_final", False),
-            }
+        return {
+            "timestamp": current_time,
+            "source": event.source.value,
+            "latitude": earthquake.latitude or 0,
+            "longitude": earthquake.longitude or 0,
+            "magnitude": earthquake.magnitude or 0,
+            "info_type": earthquake.info_type or "",
+            "issue_type": issue_type,  # 保存JMA issue type
+            "processed_reports": {current_report},  # 使用集合存储已处理的报数
+            "is_final": getattr(earthquake, "is_final", False),
         }
 
-        logger.info(f"[灾害预警] 允许推送新事件: {event.source.value}")
-        return True
-
-    def _generate_event_fingerprint(self, earthquake: EarthquakeData) -> str:
-        """生成事件指纹 - 基于地理位置和震级的简化指纹"""
-        if not earthquake.latitude or not earthquake.longitude:
-            return "unknown_location"
-
-        # 将坐标量化到指定精度（20km网格）
-        lat_grid = round(earthquake.latitude * (111.0 / self.location_tolerance)) / (
-            111.0 / self.location_tolerance
-        )
-        lon_grid = round(earthquake.longitude * (111.0 / self.location_tolerance)) / (
-            111.0 / self.location_tolerance
-        )
-
-        # 震级量化到容差级别
-        mag_grid = (
-            round((earthquake.magnitude or 0) / self.magnitude_tolerance)
-            * self.magnitude_tolerance
-        )
-
-        # 关键修复：处理时间可能为None的情况
-        if earthquake.shock_time is not None:
-            time_minute = earthquake.shock_time.replace(second=0, microsecond=0)
-        else:
-            # 如果时间解析失败，使用当前时间但标记为特殊值
-            time_minute = datetime.now().replace(second=0, microsecond=0)
-
-        return f"{lat_grid:.3f},{lon_grid:.3f},{mag_grid:.1f},{time_minute.strftime('%Y%m%d%H%M')}"
-
     def _should_allow_update(
         self, current_earthquake: EarthquakeData, existing_event: dict
     ) -> bool:
@@ -479,32 +552,37 @@ class EventDeduplicator:
         return source_mapping.get(event.source.value, event.source.value)
 
     def cleanup_old_events(self):
-        """清理过期事件"""
-        cutoff_time = datetime.now() - self.time_window * 2  # 保留2倍时间窗口
-
-        old_fingerprints = []
-        for fingerprint, source_events in self.recent_events.items():
-            # 检查所有数据源的事件是否都过期
-            all_expired = True
-            for event_info in source_events.values():
-                if event_info["timestamp"] >= cutoff_time:
-                    all_expired = False
-                    break
-
-            if all_expired:
-                old_fingerprints.append(fingerprint)
-
-        for fingerprint in old_fingerprints:
-            del self.recent_events[fingerprint]
+        """清理过期事件（只检查过期队列队首，无需全量扫描）"""
+        removed = self.correlation_index.expire()
+        if removed:
+            logger.debug(f"[灾害预警] 已清理 {removed} 个过期事件簇")
+
+    def get_deduplication_stats(self) -> dict[str, Any]:
+        """获取去重统计"""
+        self.correlation_index.expire()
+        return {
+            "time_window_minutes": self.time_window_minutes,
+            "location_tolerance_km": self.location_tolerance,
+            "magnitude_tolerance": self.magnitude_tolerance,
+            "recent_events_count": len(self.correlation_index),
+        }
 
 
 class MessagePushManager:
     """消息推送管理器"""
 
-    def __init__(self, config: dict[str, Any], context):
+    def __init__(
+        self,
+        config: dict[str, Any],
+        context,
+        push_history_path: Path | str | None = None,
+    ):
         self.config = config
         self.context = context
 
+        # 当前时间的偏移量（回放录制数据时把“当前时间”对齐到录制时刻）
+        self.clock_offset = timedelta(0)
+
         # 初始化过滤器 - 使用新的配置路径
         earthquake_filters = config.get("earthquake_filters", {})
 
@@ -556,10 +634,16 @@ class MessagePushManager:
             ),
         )
 
-        # 事件推送记录
-        self.event_push_records: dict[str, list[dict]] = defaultdict(list)
+        # 事件推送记录（SQLite 持久化，重启后保留）
+        if push_history_path is None:
+            push_history_path = (
+                StarTools.get_data_dir("astrbot_plugin_disaster_warning")
+                / "push_history.db"
+            )
+        self.push_history = PushHistoryStore(push_history_path)
 
         # 目标会话
+        self.session_groups: dict[str, str] = {}
         self.target_sessions = self._parse_target_sessions()
 
         # 初始化本地监控过滤器
@@ -576,6 +660,7 @@ class MessagePushManager:
                 platform_name = self.config.get("platform_name", "aiocqhttp")
                 session = f"{platform_name}:GroupMessage:{group_id}"
                 sessions.append(session)
+                self.session_groups[session] = str(group_id)
 
         return sessions
 
@@ -587,7 +672,7 @@ class MessagePushManager:
 
         if event_time_aware:
             # 使用UTC当前时间进行比较，确保时区无关性
-            current_time_utc = datetime.now(timezone.utc)
+            current_time_utc = datetime.now(timezone.utc) - self.clock_offset
             time_diff = (
                 current_time_utc - event_time_aware
             ).total_seconds() / 3600  # 小时
@@ -629,6 +714,14 @@ class MessagePushManager:
 
         # 本地烈度过滤
         is_allowed, distance, intensity = self.local_monitor.check_event(earthquake)
+        if self.local_monitor.group_sites:
+            # 配置了群监控地点时，任一目标群达标即继续，具体推送到哪些群在 push_event 中逐群判断
+            is_allowed = any(
+                self.local_monitor.check_event(
+                    earthquake, self.session_groups.get(session)
+                )[0]
+                for session in self.target_sessions
+            )
         if not is_allowed:
             return False
 
@@ -745,16 +838,27 @@ class MessagePushManager:
 
             # 5. 推送消息
             push_success_count = 0
+            deliveries: list[tuple[str, str, str | None]] = []
             for session in target_sessions:
+                session_message = message
+                if self.local_monitor.group_sites and isinstance(
+                    event.data, EarthquakeData
+                ):
+                    session_message = self._build_group_message(event, session, message)
+                    if session_message is None:
+                        deliveries.append((session, STATUS_SKIPPED, None))
+                        continue
                 try:
-                    await self._send_message(session, message)
+                    await self._send_message(session, session_message)
                     logger.info(f"[灾害预警] 消息已推送到 {session}")
                     push_success_count += 1
+                    deliveries.append((session, STATUS_SENT, None))
                 except Exception as e:
                     logger.error(f"[灾害预警] 推送到 {session} 失败: {e}")
+                    deliveries.append((session, STATUS_FAILED, str(e)))
 
             # 6. 记录推送
-            self._record_push(event)
+            self._record_push(event, deliveries)
             logger.info(
                 f"[灾害预警] 事件 {event.id} 推送完成，成功推送到 {push_success_count} 个会话"
             )
@@ -817,6 +921,34 @@ class MessagePushManager:
         chain = [Comp.Plain(message_text)]
         return MessageChain(chain)
 
+    def _build_group_message(
+        self, event: DisasterEvent, session: str, default_message: MessageChain
+    ) -> MessageChain | None:
+        """按群的监控地点构建消息；该群地点未达标（严格模式）时返回 None"""
+        earthquake = event.data
+        group_id = self.session_groups.get(session)
+        is_allowed, distance, intensity = self.local_monitor.check_event(
+            earthquake, group_id
+        )
+        if not is_allowed:
+            logger.info(f"[灾害预警] {session} 的本地烈度未达标，跳过推送")
+            return None
+
+        site = self.local_monitor.get_site_index(earthquake, group_id)
+        if site == 0:
+            return default_message
+
+        default_estimation = event.raw_data.get("local_estimation")
+        event.raw_data["local_estimation"] = {
+            "distance": distance,
+            "intensity": intensity,
+            "place_name": self.local_monitor.site_names[site],
+        }
+        try:
+            return self._build_message(event)
+        finally:
+            event.raw_data["local_estimation"] = default_estimation
+
     def _generate_map_link(
         self, latitude: float, longitude: float, provider: str, zoom: int
     ) -> str:
@@ -835,19 +967,20 @@ class MessagePushManager:
         """发送消息到指定会话"""
         await self.context.send_message(session, message)
 
-    def _record_push(self, event: DisasterEvent):
-        """记录推送"""
-        event_id = self._get_event_id(event)
-
-        # 记录推送信息
-        push_info = {
-            "timestamp": datetime.now(),
-            "event_id": event_id,
-            "disaster_type": event.disaster_type.value,
-            "source": self._get_source_id(event),
-        }
-
-        self.event_push_records[event_id].append(push_info)
+    def _record_push(
+        self,
+        event: DisasterEvent,
+        deliveries: list[tuple[str, str, str | None]] | None = None,
+    ):
+        """记录推送（写入由后台线程完成，不阻塞推送）"""
+        self.push_history.record_push(
+            event_id=self._get_event_id(event),
+            disaster_type=event.disaster_type.value,
+            source=self._get_source_id(event),
+            deliveries=deliveries or [],
+            cluster_id=event.raw_data.get("cluster_id"),
+            is_final=getattr(event.data, "is_final", False),
+        )
 
     def _get_event_id(self, event: DisasterEvent) -> str:
         """获取事件ID"""
@@ -858,56 +991,29 @@ class MessagePushManager:
         return event.id
 
     def get_push_stats(self) -> dict[str, Any]:
-        """获取推送统计"""
-        total_events = len(self.event_push_records)
-        total_pushes = sum(len(records) for records in self.event_push_records.values())
-
-        return {
-            "total_events": total_events,
-            "total_pushes": total_pushes,
-            "recent_events": self._get_recent_events(),
-        }
+        """获取推送统计（计数由写入线程增量维护）"""
+        stats: dict[str, Any] = self.push_history.get_counters()
+        stats["recent_events"] = self._get_recent_events()
+        return stats
 
     def _get_recent_events(self, hours: int = 24) -> list[dict]:
-        """获取最近的事件"""
-        recent_time = datetime.now() - timedelta(hours=hours)
-        recent_events = []
-
-        for event_id, records in self.event_push_records.items():
-            recent_records = [
-                record for record in records if record["timestamp"] > recent_time
-            ]
-
-            if recent_records:
-                recent_events.append(
-                    {
-                        "event_id": event_id,
-                        "push_count": len(recent_records),
-                        "last_push": max(
-                            record["timestamp"] for record in recent_records
-                        ),
-                    }
-                )
+        """获取最近的事件（按推送时间索引的范围查询）"""
+        return self.push_history.get_recent_events(time.time() - hours * 3600)
 
-        return sorted(recent_events, key=lambda x: x["last_push"], reverse=True)
+    def get_event_deliveries(self, event_id: str) -> list[dict]:
+        """获取某事件在各会话的投递结果"""
+        return self.push_history.get_event_deliveries(event_id)
 
     def cleanup_old_records(self, days: int = 7):
         """清理旧记录"""
-        cutoff_time = datetime.now() - timedelta(days=days)
-
-        # 清理事件推送记录
-        for event_id in list(self.event_push_records.keys()):
-            records = self.event_push_records[event_id]
-            recent_records = [
-                record for record in records if record["timestamp"] > cutoff_time
-            ]
-
-            if recent_records:
-                self.event_push_records[event_id] = recent_records
-            else:
-                del self.event_push_records[event_id]
+        # 清理事件推送记录（范围删除）
+        self.push_history.cleanup(time.time() - days * 86400)
 
         # 清理去重器
         self.deduplicator.cleanup_old_events()
 
         logger.info(f"[灾害预警] 已清理 {days} 天前的推送记录")
+
+    def close(self):
+        """写完剩余推送记录并关闭数据库（会阻塞，勿在事件循环中直接调用）"""
+        self.push_history.close()
@@ -0,0 +1,342 @@
+"""
+推送历史存储
+基于 SQLite 持久化每次推送及其在各会话的投递结果，重启后仍可审计漏推
+
+- 写入：推送路径只把记录放入队列，由后台线程批量写入（WAL 模式）
+- 查询：推送时间、事件ID、数据源、会话均有索引，最近事件为按时间的范围查询
+- 统计：总事件数 / 总推送数 / 最终报数由写入线程增量维护，统计时直接读取
+- 清理：按推送时间做范围删除，同时扣减统计计数
+"""
+
+import queue
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from astrbot.api import logger
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS pushes (
+    id INTEGER PRIMARY KEY,
+    pushed_at REAL NOT NULL,
+    event_id TEXT NOT NULL,
+    cluster_id TEXT,
+    disaster_type TEXT,
+    source TEXT,
+    is_final INTEGER NOT NULL DEFAULT 0,
+    sent_count INTEGER NOT NULL DEFAULT 0,
+    failed_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_pushes_time ON pushes(pushed_at);
+CREATE INDEX IF NOT EXISTS idx_pushes_event ON pushes(event_id, pushed_at);
+CREATE INDEX IF NOT EXISTS idx_pushes_source ON pushes(source, pushed_at);
+
+CREATE TABLE IF NOT EXISTS deliveries (
+    push_id INTEGER NOT NULL,
+    pushed_at REAL NOT NULL,
+    session TEXT NOT NULL,
+    status TEXT NOT NULL,
+    error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_deliveries_push ON deliveries(push_id);
+CREATE INDEX IF NOT EXISTS idx_deliveries_session ON deliveries(session, pushed_at);
+CREATE INDEX IF NOT EXISTS idx_deliveries_time ON deliveries(pushed_at);
+
+CREATE TABLE IF NOT EXISTS events (
+    event_id TEXT PRIMARY KEY,
+    first_push REAL NOT NULL,
+    last_push REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_last_push ON events(last_push);
+
+CREATE TABLE IF NOT EXISTS counters (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+# 投递状态
+STATUS_SENT = "sent"
+STATUS_FAILED = "failed"
+STATUS_SKIPPED = "skipped"  # 如该群本地烈度未达标
+
+
+class PushHistoryStore:
+    """推送历史存储（SQLite，后台线程批量写入）"""
+
+    COUNTER_NAMES = ("total_events", "total_pushes", "final_reports_pushed")
+
+    def __init__(self, db_path: Path | str, flush_interval: float = 1.0):
+        self.db_path = str(db_path)
+        self.flush_interval = flush_interval
+        self.max_batch_size = 500
+
+        self._lock = threading.Lock()  # 保护数据库连接与计数
+        self._conn = self._connect()
+        self.counters: dict[str, int] = self._load_counters()
+        row = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM pushes").fetchone()
+        self._next_id = row[0] + 1
+
+        self._queue: queue.Queue = queue.Queue()
+        self._stop_sentinel = object()
+        self._writer_thread = threading.Thread(
+            target=self._writer_loop, name="disaster-warning-push-history", daemon=True
+        )
+        self._writer_thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self.db_path != ":memory:":
+            Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(_SCHEMA)
+        conn.commit()
+        return conn
+
+    def _load_counters(self) -> dict[str, int]:
+        counters = dict.fromkeys(self.COUNTER_NAMES, 0)
+        for name, value in self._conn.execute("SELECT name, value FROM counters"):
+            if name in counters:
+                counters[name] = value
+        return counters
+
+    # ------------------------------------------------------------------ 写入
+    def record_push(
+        self,
+        event_id: str,
+        disaster_type: str,
+        source: str,
+        deliveries: list[tuple[str, str, str | None]],
+        cluster_id: str | None = None,
+        is_final: bool = False,
+        pushed_at: float | None = None,
+    ):
+        """
+        记录一次推送（只入队，不做磁盘 I/O）
+        :param deliveries: [(会话, 状态, 错误信息)]
+        """
+        self._queue.put(
+            (
+                time.time() if pushed_at is None else pushed_at,
+                event_id,
+                cluster_id,
+                disaster_type,
+                source,
+                bool(is_final),
+                deliveries,
+            )
+        )
+
+    def cleanup(self, before: float):
+        """删除指定时间（时间戳）之前的记录（在写入线程中执行）"""
+        self._queue.put(("cleanup", before))
+
+    def _writer_loop(self):
+        while True:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = [item]
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = any(entry is self._stop_sentinel for entry in batch)
+            records = [e for e in batch if e is not self._stop_sentinel]
+            if records:
+                try:
+                    self._write_batch(records)
+                except Exception as e:
+                    logger.error(f"[灾害预警] 写入推送历史失败: {e}")
+            for _ in batch:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _write_batch(self, batch: list[tuple]):
+        """整批在一个事务中写入；失败时回滚并逐条重试，只丢弃出错的那条记录"""
+        with self._lock:
+            try:
+                self._write_records(batch)
+            except Exception as e:
+                if len(batch) == 1:
+                    raise
+                logger.warning(f"[灾害预警] 批量写入推送历史失败，改为逐条写入: {e}")
+                for entry in batch:
+                    try:
+                        self._write_records([entry])
+                    except Exception as e:
+                        logger.error(f"[灾害预警] 写入推送历史失败，已跳过该记录: {e}")
+
+    def _write_records(self, batch: list[tuple]):
+        """在一个事务中写入记录（调用方持有 _lock）"""
+        counters = dict(self.counters)
+        conn = self._conn
+        try:
+            for entry in batch:
+                if entry[0] == "cleanup":
+                    self._delete_before(conn, entry[1], counters)
+                    continue
+
+                (
+                    pushed_at,
+                    event_id,
+                    cluster_id,
+                    disaster_type,
+                    source,
+                    is_final,
+                    deliveries,
+                ) = entry
+                push_id = self._next_id
+                sent = sum(1 for _, status, _ in deliveries if status == STATUS_SENT)
+                failed = sum(
+                    1 for _, status, _ in deliveries if status == STATUS_FAILED
+                )
+                conn.execute(
+                    "INSERT INTO pushes (id, pushed_at, event_id, cluster_id,"
+                    " disaster_type, source, is_final, sent_count, failed_count)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        push_id,
+                        pushed_at,
+                        event_id,
+                        cluster_id,
+                        disaster_type,
+                        source,
+                        int(is_final),
+                        sent,
+                        failed,
+                    ),
+                )
+                conn.executemany(
+                    "INSERT INTO deliveries (push_id, pushed_at, session, status, error)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    [
+                        (push_id, pushed_at, session, status, error)
+                        for session, status, error in deliveries
+                    ],
+                )
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO events (event_id, first_push, last_push)"
+                    " VALUES (?, ?, ?)",
+                    (event_id, pushed_at, pushed_at),
+                ).rowcount
+                if inserted:
+                    counters["total_events"] += 1
+                else:
+                    conn.execute(
+                        "UPDATE events SET last_push = MAX(last_push, ?)"
+                        " WHERE event_id = ?",
+                        (pushed_at, event_id),
+                    )
+                counters["total_pushes"] += 1
+                if is_final:
+                    counters["final_reports_pushed"] += 1
+                self._next_id += 1
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO counters (name, value) VALUES (?, ?)",
+                list(counters.items()),
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            # 回滚后重新读取下一个可用ID，避免与已提交的记录冲突
+            row = conn.execute("SELECT COALESCE(MAX(id), 0) FROM pushes").fetchone()
+            self._next_id = row[0] + 1
+            raise
+        self.counters = counters
+
+    def _delete_before(
+        self, conn: sqlite3.Connection, before: float, counters: dict[str, int]
+    ):
+        """范围删除过期记录并扣减计数"""
+        pushes, finals = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(is_final), 0) FROM pushes WHERE pushed_at < ?",
+            (before,),
+        ).fetchone()
+        events = conn.execute(
+            "SELECT COUNT(*) FROM events WHERE last_push < ?", (before,)
+        ).fetchone()[0]
+        conn.execute("DELETE FROM pushes WHERE pushed_at < ?", (before,))
+        conn.execute("DELETE FROM deliveries WHERE pushed_at < ?", (before,))
+        conn.execute("DELETE FROM events WHERE last_push < ?", (before,))
+        counters["total_pushes"] = max(0, counters["total_pushes"] - pushes)
+        counters["final_reports_pushed"] = max(
+            0, counters["final_reports_pushed"] - finals
+        )
+        counters["total_events"] = max(0, counters["total_events"] - events)
+
+    # ------------------------------------------------------------------ 查询
+    def get_counters(self) -> dict[str, int]:
+        """当前统计计数（已写入数据库的部分）"""
+        return dict(self.counters)
+
+    def get_recent_events(
+        self, since: float, limit: int | None = None
+    ) -> list[dict[str, Any]]:
+        """指定时间之后推送过的事件（按最后推送时间倒序，limit 为 None 时不限数量）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT event_id, COUNT(*), MAX(pushed_at) FROM pushes"
+                " WHERE pushed_at > ? GROUP BY event_id"
+                " ORDER BY MAX(pushed_at) DESC LIMIT ?",
+                (since, -1 if limit is None else limit),
+            ).fetchall()
+        return [
+            {
+                "event_id": event_id,
+                "push_count": push_count,
+                "last_push": datetime.fromtimestamp(last_push),
+            }
+            for event_id, push_count, last_push in rows
+        ]
+
+    def get_event_deliveries(self, event_id: str) -> list[dict[str, Any]]:
+        """某事件每次推送在各会话的投递结果（用于审计漏推）"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT p.pushed_at, p.source, d.session, d.status, d.error"
+                " FROM pushes p JOIN deliveries d ON d.push_id = p.id"
+                " WHERE p.event_id = ? ORDER BY p.pushed_at",
+                (event_id,),
+            ).fetchall()
+        return [
+            {
+                "pushed_at": datetime.fromtimestamp(pushed_at),
+                "source": source,
+                "session": session,
+                "status": status,
+                "error": error,
+            }
+            for pushed_at, source, session, status, error in rows
+        ]
+
+    # ------------------------------------------------------------------ 生命周期
+    def flush(self, timeout: float = 5.0) -> bool:
+        """等待队列中的记录全部写入（会阻塞，勿在事件循环中调用）"""
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks:
+            if time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+        return True
+
+    def close(self, timeout: float = 5.0):
+        """写完剩余记录并关闭数据库（会阻塞，勿在事件循环中调用）"""
+        if self._writer_thread.is_alive():
+            self._queue.put(self._stop_sentinel)
+            self._writer_thread.join(timeout)
+        with self._lock:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
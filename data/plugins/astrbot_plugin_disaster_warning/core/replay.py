@@ -0,0 +1,436 @@
+"""
+录制数据回放与推送延迟基准
+把录制的原始消息送入真实的处理器注册表，离线测量推送链路延迟并回归测试各数据处理器
+
+- 数据：MessageLogger 日志中的“📦 回放数据”行（支持轮转出的 .gz 文件），
+  或内置样例 resources/replay_fixtures.jsonl（CEA、CWA、JMA、Wolfx、USGS、Global Quake、气象预警）
+- 回放：按录制节奏、加速或不限速，依次交给 DisasterWarningService 注册的 WebSocket /
+  Global Quake / HTTP 处理器；消息发到假平台（只记录不发送），推送历史写入内存数据库
+- 时间：每条消息处理前把推送管理器的“当前时间”对齐到录制时刻，旧数据不会被时效检查过滤
+- 统计：解析 → 推送条件过滤 → 去重 → 消息构建 → 发送 各阶段及端到端耗时分位数、
+  吞吐量、推送/过滤/去重计数
+
+在 AstrBot 根目录运行：
+    python -m data.plugins.astrbot_plugin_disaster_warning.core.replay [日志文件 ...] [--speed 倍速]
+"""
+
+import argparse
+import asyncio
+import copy
+import gzip
+import json
+import math
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from astrbot.api import logger
+
+from .disaster_service import DisasterWarningService
+from .message_logger import REPLAY_DATA_PREFIX
+
+PLUGIN_DIR = Path(__file__).parent.parent
+FIXTURES_PATH = PLUGIN_DIR / "resources" / "replay_fixtures.jsonl"
+
+# 非 WebSocket 来源（MessageLogger 的来源名）对应的数据处理器
+SOURCE_HANDLERS = {
+    "tcp_global_quake": "global_quake",
+    "http_wolfx_cenc": "cenc_wolfx",
+    "http_wolfx_jma": "jma_wolfx_info",
+}
+
+# 统计项 -> 显示名称（按推送链路顺序）
+STAGE_NAMES = {
+    "parse": "解析",
+    "dedup": "去重",
+    "filter": "推送条件过滤",
+    "format": "消息构建",
+    "send": "发送",
+    "first_push": "收到→首条推送",
+    "total": "端到端处理",
+    "lag": "落后录制节奏",
+}
+
+COUNT_NAMES = {
+    "messages": "回放消息",
+    "unrouted": "无对应处理器",
+    "errors": "处理出错",
+    "events": "解析出事件",
+    "deduplicated": "被去重",
+    "filtered": "被推送条件过滤",
+    "pushed": "已推送事件",
+    "sends": "发送消息",
+    "send_failures": "发送失败",
+}
+
+
+@dataclass
+class ReplayMessage:
+    """一条录制的原始消息"""
+
+    ts: float  # 录制时的接收时间（时间戳）
+    source: str  # MessageLogger 的来源名，如 websocket_fan_studio_cea
+    raw: str
+    message_type: str = ""
+
+
+def _open_text(path: Path):
+    if path.suffix == ".gz":
+        return gzip.open(path, "rt", encoding="utf-8")
+    return open(path, encoding="utf-8")
+
+
+def load_messages(paths: list[Path | str]) -> list[ReplayMessage]:
+    """
+    读取回放数据，按接收时间排序
+    日志文件只读取“📦 回放数据”行；.jsonl 样例文件每行一个 JSON 对象
+    """
+    messages = []
+    for path in map(Path, paths):
+        is_jsonl = ".jsonl" in path.suffixes
+        with _open_text(path) as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.rstrip("\n")
+                if line.startswith(REPLAY_DATA_PREFIX):
+                    payload = line[len(REPLAY_DATA_PREFIX) :]
+                elif is_jsonl and line.startswith("{"):
+                    payload = line
+                else:
+                    continue
+
+                try:
+                    data = json.loads(payload)
+                    raw = data["raw"]
+                    if not isinstance(raw, str):
+                        raw = json.dumps(raw, ensure_ascii=False)
+                    messages.append(
+                        ReplayMessage(
+                            ts=float(data["ts"]),
+                            source=data["source"],
+                            raw=raw,
+                            message_type=data.get("message_type", ""),
+                        )
+                    )
+                except (ValueError, KeyError, TypeError) as e:
+                    logger.warning(f"[灾害预警] 回放数据解析失败 {path}:{line_no}: {e}")
+
+    messages.sort(key=lambda message: message.ts)
+    return messages
+
+
+def find_log_files(log_path: Path) -> list[Path]:
+    """当前原始消息日志及其轮转文件（按从旧到新排列）"""
+    files = []
+    for index in range(1, 100):
+        plain = log_path.with_suffix(f".log.{index}")
+        found = [p for p in (plain, plain.with_name(plain.name + ".gz")) if p.exists()]
+        if not found:
+            break
+        files.extend(found)
+    files.reverse()
+    if log_path.exists():
+        files.append(log_path)
+    return files
+
+
+def default_config() -> dict[str, Any]:
+    """按 _conf_schema.json 的默认值生成插件配置"""
+
+    def defaults(schema: dict[str, Any]) -> dict[str, Any]:
+        config = {}
+        for key, item in schema.items():
+            if item.get("type") == "object" and "items" in item:
+                config[key] = defaults(item["items"])
+            elif "default" in item:
+                config[key] = copy.deepcopy(item["default"])
+        return config
+
+    with open(PLUGIN_DIR / "_conf_schema.json", encoding="utf-8") as f:
+        return defaults(json.load(f))
+
+
+def _percentiles(samples: list[float]) -> dict[str, float]:
+    """最近秩法分位数（毫秒）"""
+    values = sorted(samples)
+    count = len(values)
+
+    def rank(q: float) -> float:
+        return values[max(0, math.ceil(q / 100 * count) - 1)] * 1000
+
+    return {
+        "count": count,
+        "p50": rank(50),
+        "p90": rank(90),
+        "p99": rank(99),
+        "max": values[-1] * 1000,
+    }
+
+
+class FakePlatform:
+    """假平台：只记录要发送的消息，可模拟平台发送耗时"""
+
+    def __init__(self, send_delay: float = 0.0):
+        self.send_delay = send_delay
+        self.sent: list[tuple[str, Any]] = []
+
+    async def send_message(self, session: str, message_chain) -> bool:
+        if self.send_delay > 0:
+            await asyncio.sleep(self.send_delay)
+        self.sent.append((session, message_chain))
+        return True
+
+
+class ReplayHarness:
+    """回放器：在独立的服务实例上回放消息并统计各阶段耗时"""
+
+    def __init__(
+        self, config: dict[str, Any], speed: float = 0.0, send_delay: float = 0.0
+    ):
+        """
+        :param speed: 回放倍速，1 为录制节奏，0 为不限速
+        :param send_delay: 模拟的平台发送耗时（秒）
+        """
+        replay_config = copy.deepcopy(dict(config))
+        # 回放的消息不再写入原始消息日志
+        debug_config = dict(replay_config.get("debug_config", {}))
+        debug_config["enable_raw_message_logging"] = False
+        replay_config["debug_config"] = debug_config
+        if not replay_config.get("target_groups"):
+            replay_config["target_groups"] = ["replay"]
+
+        self.speed = max(0.0, float(speed))
+        self.platform = FakePlatform(send_delay)
+        self.service = DisasterWarningService(
+            replay_config, self.platform, push_history_path=":memory:"
+        )
+        self.service._register_handlers()
+
+        self.counts = dict.fromkeys(COUNT_NAMES, 0)
+        self.timings: dict[str, list[float]] = {stage: [] for stage in STAGE_NAMES}
+        self._trace: dict[str, float] | None = None
+        self._trace_start = 0.0
+        self._instrument()
+
+    # ------------------------------------------------------------------ 计时
+    def _add(self, stage: str, elapsed: float):
+        if self._trace is not None:
+            self._trace[stage] = self._trace.get(stage, 0.0) + elapsed
+
+    def _timed(self, stage: str, func, on_result=None):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                self._add(stage, time.perf_counter() - start)
+            if on_result:
+                on_result(result)
+            return result
+
+        return wrapper
+
+    def _count_if(self, key: str, predicate):
+        def on_result(result):
+            if predicate(result):
+                self.counts[key] += 1
+
+        return on_result
+
+    def _instrument(self):
+        """给处理器与推送管理器的各阶段套上计时（仅作用于本回放实例）"""
+        manager = self.service.message_manager
+
+        for handler in self.service.handlers.values():
+            handler.parse_message = self._timed(
+                "parse",
+                handler.parse_message,
+                self._count_if("events", lambda event: event is not None),
+            )
+
+        manager.deduplicator.should_push_event = self._timed(
+            "dedup",
+            manager.deduplicator.should_push_event,
+            self._count_if("deduplicated", lambda allowed: not allowed),
+        )
+        manager.should_push_event = self._timed(
+            "filter",
+            manager.should_push_event,
+            self._count_if("filtered", lambda allowed: not allowed),
+        )
+        manager._build_message = self._timed("format", manager._build_message)
+        manager._build_group_message = self._timed(
+            "format", manager._build_group_message
+        )
+
+        send_message = manager._send_message
+
+        async def timed_send(session, message):
+            start = time.perf_counter()
+            try:
+                await send_message(session, message)
+            except Exception:
+                self.counts["send_failures"] += 1
+                raise
+            finally:
+                self._add("send", time.perf_counter() - start)
+            self.counts["sends"] += 1
+            if self._trace is not None and "first_push" not in self._trace:
+                self._trace["first_push"] = time.perf_counter() - self._trace_start
+
+        manager._send_message = timed_send
+
+        push_event = manager.push_event
+
+        async def counted_push(event):
+            pushed = await push_event(event)
+            if pushed:
+                self.counts["pushed"] += 1
+            return pushed
+
+        manager.push_event = counted_push
+
+    # ------------------------------------------------------------------ 回放
+    async def _route(self, message: ReplayMessage):
+        """按来源交给服务注册的处理器（与实际连接收到消息时相同的入口）"""
+        self.service.message_manager.clock_offset = datetime.now(
+            timezone.utc
+        ) - datetime.fromtimestamp(message.ts, timezone.utc)
+
+        if message.source.startswith("websocket_"):
+            connection_name = message.source[len("websocket_") :]
+            ws_manager = self.service.ws_manager
+            handler_name = ws_manager._find_handler_by_prefix(connection_name)
+            if not handler_name:
+                self.counts["unrouted"] += 1
+                return
+            await ws_manager.message_handlers[handler_name](
+                message.raw,
+                connection_name=connection_name,
+                connection_info={"uri": "replay", "connection_type": "replay"},
+            )
+        elif message.source in SOURCE_HANDLERS:
+            await self.service._dispatch_to_handler(
+                SOURCE_HANDLERS[message.source], message.raw
+            )
+        else:
+            self.counts["unrouted"] += 1
+
+    async def _dispatch(self, message: ReplayMessage):
+        self._trace = {}
+        self._trace_start = time.perf_counter()
+        try:
+            await self._route(message)
+        except Exception as e:
+            self.counts["errors"] += 1
+            logger.warning(f"[灾害预警] 回放消息处理出错 ({message.source}): {e}")
+        finally:
+            self.timings["total"].append(time.perf_counter() - self._trace_start)
+            for stage, elapsed in self._trace.items():
+                self.timings[stage].append(elapsed)
+            self._trace = None
+
+    async def run(self, messages: list[ReplayMessage]) -> dict[str, Any]:
+        """依次回放消息（与单个连接内的处理顺序一致），返回统计报告"""
+        started = time.perf_counter()
+        first_ts = messages[0].ts if messages else 0.0
+        for message in messages:
+            if self.speed > 0:
+                due = started + (message.ts - first_ts) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                else:
+                    self.timings["lag"].append(-delay)
+            self.counts["messages"] += 1
+            await self._dispatch(message)
+        return self.report(time.perf_counter() - started)
+
+    def report(self, elapsed: float) -> dict[str, Any]:
+        return {
+            "elapsed": elapsed,
+            "speed": self.speed,
+            "throughput": self.counts["messages"] / elapsed if elapsed > 0 else 0.0,
+            "counts": dict(self.counts),
+            "latency": {
+                stage: _percentiles(samples)
+                for stage, samples in self.timings.items()
+                if samples
+            },
+        }
+
+    def close(self):
+        """关闭回放实例的后台线程（会阻塞，勿在事件循环中直接调用）"""
+        self.service.message_manager.close()
+        self.service.message_logger.close()
+
+
+def format_report(report: dict[str, Any]) -> str:
+    """格式化回放报告"""
+    speed = report["speed"]
+    lines = [
+        "📼 回放结果",
+        f"  • 回放方式：{'不限速' if not speed else f'{speed:g} 倍速'}",
+        f"  • 用时：{report['elapsed']:.3f} 秒，吞吐量：{report['throughput']:.1f} 条/秒",
+        "",
+        "📊 计数：",
+    ]
+    for key, name in COUNT_NAMES.items():
+        lines.append(f"  • {name}：{report['counts'].get(key, 0)}")
+
+    lines += ["", "⏱️ 耗时（毫秒，次数 / p50 / p90 / p99 / 最大）："]
+    for stage, name in STAGE_NAMES.items():
+        stats = report["latency"].get(stage)
+        if stats:
+            lines.append(
+                f"  • {name}：{stats['count']} / {stats['p50']:.3f} / "
+                f"{stats['p90']:.3f} / {stats['p99']:.3f} / {stats['max']:.3f}"
+            )
+    return "\n".join(lines)
+
+
+async def replay(
+    messages: list[ReplayMessage],
+    config: dict[str, Any] | None = None,
+    speed: float = 0.0,
+    send_delay: float = 0.0,
+) -> dict[str, Any]:
+    """在独立服务实例上回放消息，返回统计报告"""
+    harness = ReplayHarness(config or default_config(), speed, send_delay)
+    try:
+        return await harness.run(messages)
+    finally:
+        await asyncio.to_thread(harness.close)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(description="回放录制的原始消息并测量推送延迟")
+    parser.add_argument(
+        "logs", nargs="*", help="原始消息日志（可为 .gz），不指定时使用内置样例"
+    )
+    parser.add_argument("--config", help="插件配置 JSON 文件，默认使用配置模板默认值")
+    parser.add_argument(
+        "--speed", type=float, default=0.0, help="回放倍速，1 为录制节奏，0 为不限速"
+    )
+    parser.add_argument(
+        "--send-delay", type=float, default=0.0, help="模拟的平台发送耗时（秒）"
+    )
+    parser.add_argument("--json", action="store_true", help="以 JSON 输出报告")
+    args = parser.parse_args(argv)
+
+    config = default_config()
+    if args.config:
+        with open(args.config, encoding="utf-8") as f:
+            config.update(json.load(f))
+
+    messages = load_messages(args.logs or [FIXTURES_PATH])
+    report = asyncio.run(replay(messages, config, args.speed, args.send_delay))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(report))
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,12 @@ WebSocket连接管理器
 """
 
 import asyncio
+import hashlib
+import json
+import random
+import time
 import traceback
+from collections import deque
 from collections.abc import Callable
 from typing import Any
 
@@ -416,38 +421,177 @@ class WebSocketManager:
 WebSocketManager = WebSocketManager
 
 
+class _EndpointState:
+    """单个HTTP端点的条件请求、退避与统计状态"""
+
+    __slots__ = (
+        "etag",
+        "last_modified",
+        "content_hash",
+        "failures",
+        "next_attempt",
+        "stats",
+        "latencies",
+    )
+
+    def __init__(self):
+        self.etag: str | None = None
+        self.last_modified: str | None = None
+        self.content_hash: str | None = None
+        self.failures = 0
+        self.next_attempt = 0.0  # 退避结束的时刻（monotonic）
+        self.stats = {
+            "requests": 0,
+            "changed": 0,  # 内容有变化，返回数据
+            "not_modified": 0,  # 304
+            "unchanged": 0,  # 200 但内容哈希与上次相同
+            "errors": 0,
+            "skipped": 0,  # 退避期间跳过的请求
+            "bytes": 0,
+        }
+        self.latencies: deque[float] = deque(maxlen=100)
+
+
 class HTTPDataFetcher:
-    """HTTP数据获取器 - 保持不变"""
+    """
+    HTTP数据获取器 - 长连接池 + 条件请求
+
+    - 整个服务共用一个 ClientSession（keep-alive），轮询不再每次重新握手
+    - 按端点记录 ETag / Last-Modified，发送条件请求；304 时不解析、不分发
+    - 服务器不提供校验字段时，按响应内容哈希判断是否有变化
+    - 失败后按带抖动的指数退避暂停该端点，并统计各端点延迟与流量
+    """
 
     def __init__(self, config: dict[str, Any]):
         self.config = config
         self.session: aiohttp.ClientSession | None = None
+        self.backoff_base = float(config.get("http_backoff_base", 5.0))
+        self.backoff_max = float(config.get("http_backoff_max", 600.0))
+        self._endpoints: dict[str, _EndpointState] = {}
 
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession(
-            timeout=aiohttp.ClientTimeout(total=self.config.get("http_timeout", 30))
-        )
+        self._ensure_session()
         return self
 
     async def __aexit__(self, exc_type=None, exc_val=None, exc_tb=None):
-        if self.session:
+        await self.close()
+
+    def _ensure_session(self) -> aiohttp.ClientSession:
+        """按需创建长期复用的会话（连接池与 keep-alive 由 TCPConnector 维护）"""
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(
+                    total=self.config.get("http_timeout", 30)
+                ),
+                connector=aiohttp.TCPConnector(
+                    limit=10, ttl_dns_cache=300, keepalive_timeout=330
+                ),
+            )
+        return self.session
+
+    async def close(self):
+        """关闭会话与连接池"""
+        if self.session and not self.session.closed:
             await self.session.close()
+        self.session = None
+
+    def _endpoint(self, url: str) -> _EndpointState:
+        state = self._endpoints.get(url)
+        if state is None:
+            state = self._endpoints[url] = _EndpointState()
+        return state
+
+    def _record_failure(self, url: str, state: _EndpointState, reason: str):
+        state.failures += 1
+        state.stats["errors"] += 1
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (state.failures - 1))
+        delay *= random.uniform(0.5, 1.0)
+        state.next_attempt = time.monotonic() + delay
+        logger.warning(
+            f"[灾害预警] HTTP请求失败 {url}: {reason}，{delay:.0f} 秒后重试"
+            f"（连续失败 {state.failures} 次）"
+        )
 
     async def fetch_json(self, url: str, headers: dict | None = None) -> dict | None:
-        """获取JSON数据"""
-        if not self.session:
+        """获取JSON数据（无论内容是否变化都返回）"""
+        return await self._fetch(url, headers, only_changed=False)
+
+    async def fetch_json_if_changed(
+        self, url: str, headers: dict | None = None
+    ) -> dict | None:
+        """获取JSON数据，内容与上次相同（304 或哈希相同）或处于退避期时返回 None"""
+        return await self._fetch(url, headers, only_changed=True)
+
+    async def _fetch(
+        self, url: str, headers: dict | None, only_changed: bool
+    ) -> dict | None:
+        state = self._endpoint(url)
+        if time.monotonic() < state.next_attempt:
+            state.stats["skipped"] += 1
             return None
 
+        request_headers = dict(headers or {})
+        if only_changed:
+            if state.etag:
+                request_headers["If-None-Match"] = state.etag
+            if state.last_modified:
+                request_headers["If-Modified-Since"] = state.last_modified
+
+        session = self._ensure_session()
+        state.stats["requests"] += 1
+        start = time.perf_counter()
         try:
-            async with self.session.get(url, headers=headers) as response:
-                if response.status == 200:
-                    return await response.json()
-                else:
-                    logger.warning(f"[灾害预警] HTTP请求失败 {url}: {response.status}")
+            async with session.get(url, headers=request_headers) as response:
+                if response.status == 304:
+                    state.latencies.append(time.perf_counter() - start)
+                    state.failures = 0
+                    state.stats["not_modified"] += 1
+                    return None
+                if response.status != 200:
+                    self._record_failure(url, state, f"HTTP {response.status}")
+                    return None
+                body = await response.read()
+                etag = response.headers.get("ETag")
+                last_modified = response.headers.get("Last-Modified")
         except Exception as e:
-            logger.error(f"[灾害预警] HTTP请求异常 {url}: {e}")
+            self._record_failure(url, state, f"{type(e).__name__} {e}")
+            return None
 
-        return None
+        state.latencies.append(time.perf_counter() - start)
+        state.stats["bytes"] += len(body)
+        state.failures = 0
+
+        content_hash = hashlib.sha1(body).hexdigest()
+        unchanged = content_hash == state.content_hash
+        try:
+            data = json.loads(body)
+        except ValueError as e:
+            self._record_failure(url, state, f"JSON解析失败 {e}")
+            return None
+
+        state.etag = etag
+        state.last_modified = last_modified
+        state.content_hash = content_hash
+        if unchanged and only_changed:
+            state.stats["unchanged"] += 1
+            return None
+        state.stats["changed"] += 1
+        return data
+
+    def get_metrics(self) -> dict[str, dict[str, Any]]:
+        """各端点的请求统计与延迟（毫秒）"""
+        metrics = {}
+        for url, state in self._endpoints.items():
+            latencies = sorted(state.latencies)
+            metrics[url] = {
+                **state.stats,
+                "consecutive_failures": state.failures,
+                "latency_p50_ms": latencies[len(latencies) // 2] * 1000
+                if latencies
+                else None,
+                "latency_max_ms": latencies[-1] * 1000 if latencies else None,
+            }
+        return metrics
 
 
 class GlobalQuakeClient:
@@ -13,6 +13,13 @@ from astrbot.api.event import AstrMessageEvent, filter
 from astrbot.api.star import Context, Star
 
 from .core.disaster_service import get_disaster_service, stop_disaster_service
+from .core.replay import (
+    FIXTURES_PATH,
+    find_log_files,
+    format_report,
+    load_messages,
+    replay,
+)
 from .models.models import (
     DATA_SOURCE_MAPPING,
     DisasterEvent,
@@ -91,6 +98,7 @@ class DisasterWarningPlugin(Star):
 • /灾害预警日志 - 查看原始消息日志统计
 • /灾害预警日志开关 - 开关原始消息日志记录
 • /灾害预警日志清除 - 清除所有原始消息日志
+• /灾害预警回放 [样例|日志] [倍速] - 离线回放录制消息并测量推送延迟
 
 🧪 测试功能说明：
 /灾害预警测试 [群号] [灾害类型] [格式]
@@ -147,6 +155,22 @@ class DisasterWarningPlugin(Star):
   • 总推送数：{push_stats.get("total_pushes", 0)}
   • 最终报数：{push_stats.get("final_reports_pushed", 0)}"""
 
+            # HTTP轮询统计
+            http_stats = status.get("http_fetch_stats", {})
+            if http_stats:
+                status_text += "\n🌐 HTTP轮询统计："
+                for url, stats in http_stats.items():
+                    status_text += (
+                        f"\n  • {url.rsplit('/', 1)[-1]}：请求 {stats['requests']} 次，"
+                        f"有更新 {stats['changed']}，未变化 "
+                        f"{stats['not_modified'] + stats['unchanged']}，"
+                        f"失败 {stats['errors']}，"
+                        f"流量 {stats['bytes'] / 1024:.1f} KB"
+                    )
+                    latency = stats.get("latency_p50_ms")
+                    if latency is not None:
+                        status_text += f"，延迟中位数 {latency:.0f} ms"
+
             # 过滤统计（如果启用）
             if self.disaster_service and self.disaster_service.message_logger:
                 filter_stats = self.disaster_service.message_logger.filter_stats
@@ -163,7 +187,7 @@ class DisasterWarningPlugin(Star):
             recent_events = push_stats.get("recent_events", [])
             if recent_events:
                 status_text += f"""
-🕐 最近24小时事件 (插件启动后)：{len(recent_events)} 个"""
+🕐 最近24小时事件：{len(recent_events)} 个"""
 
             yield event.plain_result(status_text)
 
@@ -338,7 +362,7 @@ class DisasterWarningPlugin(Star):
   • 总推送数：{stats["total_pushes"]}
   • 最终报数：{stats["final_reports_pushed"]}
 
-🕐 最近24小时 (插件启动后)：
+🕐 最近24小时：
   • 事件数：{len(stats["recent_events"])}"""
 
             # 显示最近的事件
@@ -460,7 +484,10 @@ class DisasterWarningPlugin(Star):
             return
 
         try:
-            log_summary = self.disaster_service.message_logger.get_log_summary()
+            # 读取日志文件在线程中进行，避免阻塞预警推送
+            log_summary = await asyncio.to_thread(
+                self.disaster_service.message_logger.get_log_summary
+            )
 
             if not log_summary["enabled"]:
                 yield event.plain_result(
@@ -486,6 +513,14 @@ class DisasterWarningPlugin(Star):
             for source in log_summary["data_sources"]:
                 log_info += f"\n  • {source}"
 
+            queue_stats = log_summary.get("queue_stats")
+            if queue_stats:
+                log_info += (
+                    f"\n\n📝 写入统计：已写入 {queue_stats['written']} 条，"
+                    f"待写入 {log_summary.get('queue_pending', 0)} 条，"
+                    f"队列满丢弃 {queue_stats['dropped']} 条"
+                )
+
             log_info += "\n\n💡 提示：使用 /灾害预警日志开关 可以关闭日志记录"
 
             yield event.plain_result(log_info)
@@ -531,7 +566,7 @@ class DisasterWarningPlugin(Star):
             return
 
         try:
-            self.disaster_service.message_logger.clear_logs()
+            await asyncio.to_thread(self.disaster_service.message_logger.clear_logs)
             yield event.plain_result(
                 "✅ 所有原始消息日志已清除\n\n日志文件已被删除，新的消息记录将重新开始。"
             )
@@ -540,6 +575,45 @@ class DisasterWarningPlugin(Star):
             logger.error(f"[灾害预警] 清除日志失败: {e}")
             yield event.plain_result(f"❌ 清除日志失败: {str(e)}")
 
+    @filter.command("灾害预警回放")
+    async def replay_messages(
+        self, event: AstrMessageEvent, data: str = "样例", speed: float = 0.0
+    ):
+        """回放录制的原始消息并测量推送延迟（在独立实例中运行，消息不会真正发送）
+        格式：/灾害预警回放 [样例|日志] [倍速]
+
+        • 样例：内置的各数据源样例消息（默认）
+        • 日志：原始消息日志中记录的回放数据
+        • 倍速：1 为录制节奏，0 为不限速（默认）
+        """
+        try:
+            if data in ("日志", "log"):
+                if (
+                    not self.disaster_service
+                    or not self.disaster_service.message_logger
+                ):
+                    yield event.plain_result("❌ 日志功能不可用")
+                    return
+                message_logger = self.disaster_service.message_logger
+                await asyncio.to_thread(message_logger.flush)
+                log_files = find_log_files(message_logger.log_file_path)
+            else:
+                log_files = [FIXTURES_PATH]
+
+            messages = await asyncio.to_thread(load_messages, log_files)
+            if not messages:
+                yield event.plain_result(
+                    "📋 没有可回放的数据\n\n需开启原始消息日志，并保持“记录回放数据”配置开启"
+                )
+                return
+
+            report = await replay(messages, self.config, speed)
+            yield event.plain_result(format_report(report))
+
+        except Exception as e:
+            logger.error(f"[灾害预警] 回放失败: {e}")
+            yield event.plain_result(f"❌ 回放失败: {str(e)}")
+
     @filter.command("灾害预警去重统计")
     async def deduplication_stats(self, event: AstrMessageEvent):
         """查看事件去重统计信息"""
@@ -0,0 +1,122 @@
+import math
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from data.plugins.astrbot_plugin_disaster_warning.core.event_correlator import (
+    EventCorrelationIndex,
+)
+from data.plugins.astrbot_plugin_disaster_warning.core.intensity_calculator import (
+    IntensityCalculator,
+)
+
+T0 = datetime(2026, 10, 19, 10, 0, 0)
+distance = IntensityCalculator.calculate_distance
+
+
+def spatial_index(tolerance_km: float) -> EventCorrelationIndex:
+    """只比较空间关系：时间窗口、震级容差、保留时间都放到足够大"""
+    return EventCorrelationIndex(
+        location_tolerance_km=tolerance_km,
+        time_window_seconds=1e9,
+        magnitude_tolerance=100,
+        retention_seconds=1e9,
+    )
+
+
+def offset_point(rnd: random.Random, lat: float, lon: float, tolerance_km: float):
+    """在 (lat, lon) 附近约一个容差范围内取点，经度按纬度放大并绕回 [-180, 180)"""
+    dlat = rnd.uniform(-1, 1) * tolerance_km / 111
+    new_lat = max(-89.99, min(89.99, lat + dlat))
+    scale = max(0.01, math.cos(math.radians(new_lat)))
+    dlon = rnd.uniform(-1.2, 1.2) * tolerance_km / 111 / scale
+    return new_lat, (lon + dlon + 180) % 360 - 180
+
+
+# ------------------------------------------------------------------ 跨格子边界
+@pytest.mark.parametrize("tolerance", [5.0, 20.0, 100.0])
+@pytest.mark.parametrize("row", [3, 500, 1000])
+def test_events_straddling_row_boundary_match(tolerance, row):
+    index = spatial_index(tolerance)
+    row = min(row, index._row_count - 2)
+    boundary = -90.0 + (row + 1) * index._row_height
+    below, above = boundary - 1e-4, boundary + 1e-4
+    assert index._row(below) != index._row(above)
+
+    cluster = index.create(below, 103.0, 6.0, T0)
+    assert index.find("jma", None, above, 103.0, 6.1, T0) is cluster
+
+
+@pytest.mark.parametrize("tolerance", [5.0, 20.0, 100.0])
+@pytest.mark.parametrize("latitude", [0.0, 30.09, 60.0, 85.0])
+def test_events_straddling_column_boundary_match(tolerance, latitude):
+    index = spatial_index(tolerance)
+    row = index._row(latitude)
+    width = 360.0 / index._columns(row)
+    boundary = -180.0 + width * (index._columns(row) // 2)
+    west, east = boundary - 1e-4, boundary + 1e-4
+    assert index._column(row, west) != index._column(row, east)
+
+    cluster = index.create(latitude, west, 6.0, T0)
+    assert index.find("jma", None, latitude, east, 6.0, T0) is cluster
+
+
+@pytest.mark.parametrize("latitude", [-15.0, 0.0, 52.0])
+def test_events_straddling_dateline_match(latitude):
+    index = spatial_index(20.0)
+    cluster = index.create(latitude, 179.95, 6.5, T0)
+    assert index.find("gq", None, latitude, -179.95, 6.6, T0) is cluster
+
+
+def test_events_near_pole_match_across_longitudes():
+    index = spatial_index(20.0)
+    cluster = index.create(89.95, 10.0, 6.0, T0)
+    assert index.find("gq", None, 89.95, -170.0, 6.0, T0) is cluster
+
+
+def test_far_late_or_different_magnitude_events_do_not_match():
+    index = spatial_index(20.0)
+    index.time_window = 60
+    index.magnitude_tolerance = 0.5
+    index.create(30.09, 103.0, 6.0, T0)
+    assert index.find("gq", None, 30.5, 103.0, 6.0, T0) is None
+    assert index.find("gq", None, 30.09, 103.0, 6.0, T0 + timedelta(minutes=2)) is None
+    assert index.find("gq", None, 30.09, 103.0, 7.5, T0) is None
+
+
+# ------------------------------------------------------------------ 3×3 邻域等价性
+@pytest.mark.parametrize("tolerance", [5.0, 20.0, 100.0])
+def test_neighbor_cells_cover_every_point_within_tolerance(tolerance):
+    index = spatial_index(tolerance)
+    rnd = random.Random(7)
+    for _ in range(3000):
+        lat, lon = rnd.uniform(-89.9, 89.9), rnd.uniform(-180, 180)
+        other = offset_point(rnd, lat, lon, tolerance)
+        if distance(lat, lon, *other) <= tolerance:
+            assert index._cell(*other) in set(index._neighbor_cells(lat, lon))
+
+
+@pytest.mark.parametrize("tolerance", [5.0, 20.0, 100.0])
+def test_find_matches_brute_force_nearest(tolerance):
+    index = spatial_index(tolerance)
+    rnd = random.Random(3)
+    points = []
+    for _ in range(1000):
+        if points and rnd.random() < 0.7:
+            lat, lon = offset_point(rnd, *rnd.choice(points), tolerance)
+        else:
+            lat, lon = rnd.uniform(-89.9, 89.9), rnd.uniform(-180, 180)
+        points.append((lat, lon))
+        index.create(lat, lon, 5.0, T0)
+
+    for _ in range(600):
+        lat, lon = offset_point(rnd, *rnd.choice(points), tolerance)
+        nearest = min(distance(lat, lon, a, b) for a, b in points)
+        found = index.find("probe", None, lat, lon, 5.0, T0)
+        if nearest <= tolerance:
+            assert found is not None
+            got = distance(lat, lon, found.latitude, found.longitude)
+            assert got == pytest.approx(nearest, abs=1e-9)
+        else:
+            assert found is None
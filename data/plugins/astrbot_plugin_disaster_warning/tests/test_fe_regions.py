@@ -0,0 +1,84 @@
+import json
+
+import pytest
+
+from data.plugins.astrbot_plugin_disaster_warning.utils import fe_regions
+
+GRID_LATS = [i - 90 + 0.5 for i in range(180) for _ in range(360)]
+GRID_LNGS = [j - 180 + 0.5 for _ in range(180) for j in range(360)]
+EDGE_POINTS = [
+    (-90, -180),
+    (90, 180),
+    (-95, 200),
+    (89.99, 179.99),
+    (-0.5, -0.5),
+    (0, 0),
+    (float("nan"), 0),
+    (0, float("inf")),
+]
+
+
+@pytest.fixture(scope="module")
+def source():
+    with open(fe_regions._DATA_FILE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def reference_name(source, lat, lng, add_suffix=True):
+    """原始的逐点实现：直接在 JSON 的二维网格上查表"""
+    try:
+        lat_i = min(max(int(lat + 90), 0), 179)
+        lng_i = min(max(int(lng + 180), 0), 359)
+        region_number = source["fe_numbers"][lat_i][lng_i]
+    except (IndexError, ValueError, TypeError, OverflowError):
+        return None
+    if 1 <= region_number <= len(source["fe_names"]):
+        name = source["fe_names"][region_number - 1]
+        if name == "未定义":
+            return None
+        if add_suffix and not name.endswith("附近"):
+            name += "附近"
+        return name
+    return None
+
+
+@pytest.fixture
+def fresh_grid(tmp_path, monkeypatch):
+    """编译到临时目录并重新加载，不影响插件自带的资源目录"""
+    monkeypatch.setattr(fe_regions, "_GRID_FILE", str(tmp_path / "grid.u16"))
+    monkeypatch.setattr(fe_regions, "_NAMES_FILE", str(tmp_path / "names.json"))
+    monkeypatch.setattr(fe_regions, "_FE_NUMBERS", None)
+    monkeypatch.setattr(fe_regions, "_FE_NAMES", None)
+    monkeypatch.setattr(fe_regions, "_FE_MMAP", None)
+    return fe_regions
+
+
+@pytest.mark.parametrize("add_suffix", [True, False])
+def test_full_grid_matches_reference(source, fresh_grid, add_suffix):
+    expected = [
+        reference_name(source, lat, lng, add_suffix)
+        for lat, lng in zip(GRID_LATS, GRID_LNGS)
+    ]
+    scalar = [
+        fresh_grid.get_fe_name(lat, lng, add_suffix)
+        for lat, lng in zip(GRID_LATS, GRID_LNGS)
+    ]
+    assert scalar == expected
+    assert fresh_grid.get_fe_names(GRID_LATS, GRID_LNGS, add_suffix) == expected
+
+
+def test_edge_points_match_reference(source, fresh_grid):
+    lats = [lat for lat, _ in EDGE_POINTS]
+    lngs = [lng for _, lng in EDGE_POINTS]
+    expected = [reference_name(source, lat, lng) for lat, lng in EDGE_POINTS]
+    assert [fresh_grid.get_fe_name(lat, lng) for lat, lng in EDGE_POINTS] == expected
+    assert fresh_grid.get_fe_names(lats, lngs) == expected
+
+
+def test_full_grid_without_numpy(source, fresh_grid, monkeypatch):
+    monkeypatch.setattr(fresh_grid, "np", None)
+    expected = [
+        reference_name(source, lat, lng) for lat, lng in zip(GRID_LATS, GRID_LNGS)
+    ]
+    assert fresh_grid.get_fe_names(GRID_LATS, GRID_LNGS) == expected
+    assert not fresh_grid.get_fe_names([], [])
@@ -0,0 +1,111 @@
+import asyncio
+import json
+
+import pytest
+
+pytest.importorskip("astrbot")
+web = pytest.importorskip("aiohttp.web")
+
+from data.plugins.astrbot_plugin_disaster_warning.core.websocket_manager import (  # noqa: E402
+    HTTPDataFetcher,
+)
+
+
+class FeedServer:
+    """本地测试服务器：/etag 支持 If-None-Match，/plain 不提供校验字段，/error 总是 500"""
+
+    def __init__(self):
+        self.version = 1
+        self.conditional_requests = 0
+        self.runner: web.AppRunner | None = None
+        self.base_url = ""
+
+    async def etag(self, request: web.Request) -> web.Response:
+        tag = f'"v{self.version}"'
+        if request.headers.get("If-None-Match"):
+            self.conditional_requests += 1
+        if request.headers.get("If-None-Match") == tag:
+            return web.Response(status=304, headers={"ETag": tag})
+        body = json.dumps({"type": "cenc_eqlist", "version": self.version})
+        return web.Response(
+            text=body, headers={"ETag": tag}, content_type="application/json"
+        )
+
+    async def plain(self, request: web.Request) -> web.Response:
+        return web.json_response({"version": self.version})
+
+    async def error(self, request: web.Request) -> web.Response:
+        return web.Response(status=500)
+
+    async def __aenter__(self):
+        app = web.Application()
+        app.router.add_get("/etag", self.etag)
+        app.router.add_get("/plain", self.plain)
+        app.router.add_get("/error", self.error)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        port = self.runner.addresses[0][1]
+        self.base_url = f"http://127.0.0.1:{port}"
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.runner.cleanup()
+
+
+def test_etag_304_returns_none_until_content_changes():
+    async def scenario():
+        async with FeedServer() as server, HTTPDataFetcher({}) as fetcher:
+            url = server.base_url + "/etag"
+            first = await fetcher.fetch_json_if_changed(url)
+            assert first == {"type": "cenc_eqlist", "version": 1}
+
+            # 带上 ETag 的条件请求得到 304，不返回数据
+            assert await fetcher.fetch_json_if_changed(url) is None
+            assert await fetcher.fetch_json_if_changed(url) is None
+            assert server.conditional_requests == 2
+
+            server.version = 2
+            assert (await fetcher.fetch_json_if_changed(url))["version"] == 2
+
+            metrics = fetcher.get_metrics()[url]
+            assert metrics["not_modified"] == 2
+            assert metrics["changed"] == 2
+            assert metrics["errors"] == 0
+
+            # fetch_json 不论是否变化都返回数据
+            assert (await fetcher.fetch_json(url)) is not None
+
+    asyncio.run(scenario())
+
+
+def test_unchanged_body_without_validators_is_detected_by_hash():
+    async def scenario():
+        async with FeedServer() as server, HTTPDataFetcher({}) as fetcher:
+            url = server.base_url + "/plain"
+            assert await fetcher.fetch_json_if_changed(url) == {"version": 1}
+            assert await fetcher.fetch_json_if_changed(url) is None
+            assert fetcher.get_metrics()[url]["unchanged"] == 1
+
+    asyncio.run(scenario())
+
+
+def test_failures_back_off_and_skip_requests():
+    async def scenario():
+        config = {"http_backoff_base": 0.2, "http_backoff_max": 0.2}
+        async with FeedServer() as server, HTTPDataFetcher(config) as fetcher:
+            url = server.base_url + "/error"
+            assert await fetcher.fetch_json_if_changed(url) is None
+            # 退避期内不发请求
+            assert await fetcher.fetch_json_if_changed(url) is None
+            metrics = fetcher.get_metrics()[url]
+            assert metrics["requests"] == 1
+            assert metrics["skipped"] == 1
+            assert metrics["consecutive_failures"] == 1
+
+            await asyncio.sleep(0.25)
+            await fetcher.fetch_json_if_changed(url)
+            assert fetcher.get_metrics()[url]["requests"] == 2
+
+    asyncio.run(scenario())
@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from data.plugins.astrbot_plugin_disaster_warning.core.intensity_calculator import (
+    IntensityCalculator,
+)
+
+np = pytest.importorskip("numpy")
+
+
+def _random_sites(rnd: random.Random, n: int):
+    lats = [rnd.uniform(-80, 80) for _ in range(n)]
+    lons = [rnd.uniform(-180, 180) for _ in range(n)]
+    return lats, lons
+
+
+@pytest.fixture
+def always_vectorize(monkeypatch):
+    monkeypatch.setattr(IntensityCalculator, "VECTORIZE_MIN_SITES", 0)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_matches_scalar_functions(seed, always_vectorize):
+    rnd = random.Random(seed)
+    for _ in range(40):
+        event_lat, event_lon = rnd.uniform(15, 50), rnd.uniform(70, 150)
+        magnitude, depth = rnd.uniform(2, 8.5), rnd.uniform(0, 600)
+        lats, lons = _random_sites(rnd, rnd.randint(1, 50))
+
+        intensities, distances = IntensityCalculator.calculate_site_intensities(
+            magnitude, depth, event_lat, event_lon, lats, lons
+        )
+        for i, (lat, lon) in enumerate(zip(lats, lons)):
+            distance = IntensityCalculator.calculate_distance(
+                event_lat, event_lon, lat, lon
+            )
+            intensity = IntensityCalculator.calculate_estimated_intensity(
+                magnitude, distance, depth, event_longitude=event_lon
+            )
+            assert distances[i] == pytest.approx(distance, abs=1e-6)
+            assert intensities[i] == pytest.approx(intensity, abs=1e-9)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_batch_amplification_matches_scalar_path(seed, always_vectorize):
+    rnd = random.Random(seed)
+    event_lat, event_lon = rnd.uniform(15, 50), rnd.uniform(70, 150)
+    lats, lons = _random_sites(rnd, 64)
+    # 含 0 和负数：视为不修正
+    amplifications = [rnd.choice([-1.0, 0.0, 0.5, 1.0, 2.0, 3.3]) for _ in lats]
+
+    vector, vector_dist = IntensityCalculator.calculate_site_intensities(
+        6.5, 10, event_lat, event_lon, lats, lons, amplifications
+    )
+    scalar, scalar_dist = IntensityCalculator._calculate_site_intensities_scalar(
+        6.5, 10, event_lat, event_lon, lats, lons, amplifications
+    )
+    assert np.allclose(vector, scalar, rtol=0, atol=1e-9)
+    assert np.allclose(vector_dist, scalar_dist, rtol=0, atol=1e-6)
+
+
+def test_small_batches_use_scalar_path():
+    lats, lons = _random_sites(random.Random(0), 3)
+    intensities, distances = IntensityCalculator.calculate_site_intensities(
+        5.0, 10, 30, 110, lats, lons
+    )
+    assert isinstance(intensities, list) and isinstance(distances, list)
+    assert len(intensities) == len(distances) == 3
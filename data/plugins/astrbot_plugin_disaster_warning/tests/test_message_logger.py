@@ -0,0 +1,125 @@
+import gzip
+import json
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from data.plugins.astrbot_plugin_disaster_warning.core import message_logger  # noqa: E402
+from data.plugins.astrbot_plugin_disaster_warning.core.message_logger import (  # noqa: E402
+    REPLAY_DATA_PREFIX,
+    MessageLogger,
+)
+
+
+@pytest.fixture
+def make_logger(monkeypatch, tmp_path):
+    monkeypatch.setattr(message_logger.StarTools, "get_data_dir", lambda *args: tmp_path)
+    created = []
+
+    def make(**debug_config):
+        debug_config.setdefault("enable_raw_message_logging", True)
+        instance = MessageLogger({"debug_config": debug_config}, "disaster_warning")
+        created.append(instance)
+        return instance
+
+    yield make
+    for instance in created:
+        instance.close(timeout=2)
+
+
+def log(instance, index, size=0):
+    """写入一条不会被过滤的消息（每条内容不同，避免去重）"""
+    raw = json.dumps({"type": "test_feed", "id": index, "padding": "x" * size})
+    instance.log_raw_message("websocket_test", "websocket_message", raw)
+
+
+def replay_ids(text):
+    return [
+        json.loads(json.loads(line[len(REPLAY_DATA_PREFIX) :])["raw"])["id"]
+        for line in text.splitlines()
+        if line.startswith(REPLAY_DATA_PREFIX)
+    ]
+
+
+def read_all(instance):
+    """按时间顺序读出所有轮转文件与当前日志中的回放数据"""
+    ids = []
+    for index in range(instance.max_files, 0, -1):
+        for path in instance._rotated_files(index):
+            if path.exists():
+                opener = gzip.open if path.suffix == ".gz" else open
+                with opener(path, "rt", encoding="utf-8") as f:
+                    ids += replay_ids(f.read())
+    if instance.log_file_path.exists():
+        ids += replay_ids(instance.log_file_path.read_text(encoding="utf-8"))
+    return ids
+
+
+def test_full_queue_drops_and_counts(make_logger, monkeypatch):
+    instance = make_logger(log_queue_size=3)
+    # 写入线程未启动时队列不会被消费
+    with monkeypatch.context() as m:
+        m.setattr(instance, "_ensure_writer", lambda: None)
+        for i in range(5):
+            log(instance, i)
+
+    assert instance.queue_stats["enqueued"] == 3
+    assert instance.queue_stats["dropped"] == 2
+
+    instance._ensure_writer()
+    assert instance.flush(timeout=2)
+    assert read_all(instance) == [0, 1, 2]
+    assert instance.queue_stats["written"] == 3
+
+
+def test_size_rotation_compresses_and_keeps_every_message(make_logger):
+    instance = make_logger(log_max_size_mb=0.001, log_max_files=20, log_compress_rotated=True)
+    for i in range(12):
+        log(instance, i, size=300)
+        assert instance.flush(timeout=2)
+
+    assert instance.queue_stats["rotations"] >= 3
+    assert instance.log_file_path.with_suffix(".log.1.gz").exists()
+    assert not instance.log_file_path.with_suffix(".log.1").exists()
+    assert read_all(instance) == list(range(12))
+
+
+def test_rotation_prunes_beyond_max_files(make_logger):
+    instance = make_logger(log_max_size_mb=0.001, log_max_files=2)
+    for i in range(12):
+        log(instance, i, size=300)
+        assert instance.flush(timeout=2)
+
+    names = {p.name for p in instance.log_file_path.parent.iterdir()}
+    assert {"raw_messages.log.1", "raw_messages.log.2"} <= names
+    assert names <= {"raw_messages.log", "raw_messages.log.1", "raw_messages.log.2"}
+    ids = read_all(instance)
+    assert ids == sorted(ids) and ids[-1] == 11
+
+
+def test_interval_rotation(make_logger):
+    instance = make_logger(log_rotate_interval_hours=1, log_compress_rotated=True)
+    log(instance, 0)
+    assert instance.flush(timeout=2)
+    instance._segment_started -= 2 * 3600
+    log(instance, 1)
+    assert instance.flush(timeout=2)
+
+    assert instance.queue_stats["rotations"] == 1
+    assert instance.log_file_path.with_suffix(".log.1.gz").exists()
+    assert read_all(instance) == [0, 1]
+
+
+def test_close_drains_queue(make_logger):
+    instance = make_logger(log_queue_size=100)
+    with instance._file_lock:  # 写入线程拿不到文件锁，消息都留在队列中
+        for i in range(50):
+            log(instance, i)
+        assert instance._queue.unfinished_tasks == 50
+    instance.close(timeout=5)
+
+    assert not instance._writer_thread.is_alive()
+    assert instance._log_file is None
+    assert instance.queue_stats["written"] == 50
+    assert read_all(instance) == list(range(50))
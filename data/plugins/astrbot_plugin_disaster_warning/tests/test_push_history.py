@@ -0,0 +1,156 @@
+import sqlite3
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from data.plugins.astrbot_plugin_disaster_warning.core.push_history import (  # noqa: E402
+    STATUS_FAILED,
+    STATUS_SENT,
+    STATUS_SKIPPED,
+    PushHistoryStore,
+)
+
+DELIVERIES = [
+    ("qq:GroupMessage:1", STATUS_SENT, None),
+    ("qq:GroupMessage:2", STATUS_FAILED, "timeout"),
+    ("qq:GroupMessage:3", STATUS_SKIPPED, None),
+]
+
+
+@pytest.fixture
+def store():
+    store = PushHistoryStore(":memory:", flush_interval=0.05)
+    yield store
+    store.close()
+
+
+def push(store, event_id, pushed_at, is_final=False, deliveries=DELIVERIES):
+    store.record_push(
+        event_id,
+        "earthquake",
+        "cenc_fanstudio",
+        deliveries,
+        is_final=is_final,
+        pushed_at=pushed_at,
+    )
+
+
+def entry(event_id, pushed_at, is_final=False, deliveries=DELIVERIES):
+    """与 record_push 入队格式一致的记录，用于直接调用 _write_batch"""
+    return (pushed_at, event_id, None, "earthquake", "cenc_fanstudio", is_final, deliveries)
+
+
+def recount(store):
+    """按表内容重新统计，应与增量维护的计数一致"""
+    conn = store._conn
+    return {
+        "total_events": conn.execute("SELECT COUNT(*) FROM events").fetchone()[0],
+        "total_pushes": conn.execute("SELECT COUNT(*) FROM pushes").fetchone()[0],
+        "final_reports_pushed": conn.execute(
+            "SELECT COUNT(*) FROM pushes WHERE is_final"
+        ).fetchone()[0],
+    }
+
+
+def test_counters_are_maintained_incrementally(store):
+    push(store, "e1", 100)
+    push(store, "e1", 150, is_final=True)
+    push(store, "e2", 200)
+    assert store.flush(timeout=2)
+
+    assert store.get_counters() == {
+        "total_events": 2,
+        "total_pushes": 3,
+        "final_reports_pushed": 1,
+    }
+    assert store.get_counters() == recount(store)
+    deliveries = store.get_event_deliveries("e1")
+    assert len(deliveries) == 6
+    assert {d["status"] for d in deliveries} == {STATUS_SENT, STATUS_FAILED, STATUS_SKIPPED}
+    sent, failed = store._conn.execute(
+        "SELECT sent_count, failed_count FROM pushes WHERE event_id = 'e2'"
+    ).fetchone()
+    assert (sent, failed) == (1, 1)
+
+
+def test_cleanup_decrements_counters(store):
+    push(store, "old", 100, is_final=True)
+    push(store, "both", 150)
+    push(store, "both", 300, is_final=True)
+    push(store, "new", 400)
+    store.cleanup(before=250)
+    assert store.flush(timeout=2)
+
+    # old 的推送与事件都被删除；both 只删除较早的一次推送，事件仍保留
+    assert store.get_counters() == {
+        "total_events": 2,
+        "total_pushes": 2,
+        "final_reports_pushed": 1,
+    }
+    assert store.get_counters() == recount(store)
+    assert store._conn.execute(
+        "SELECT COUNT(*) FROM deliveries WHERE pushed_at < 250"
+    ).fetchone()[0] == 0
+    assert [e["event_id"] for e in store.get_recent_events(since=0)] == ["new", "both"]
+
+
+def test_counters_and_ids_survive_reopen(tmp_path):
+    path = tmp_path / "push_history.db"
+    store = PushHistoryStore(path, flush_interval=0.05)
+    push(store, "e1", 100)
+    push(store, "e2", 200, is_final=True)
+    store.close()
+
+    store = PushHistoryStore(path, flush_interval=0.05)
+    try:
+        assert store.get_counters() == {
+            "total_events": 2,
+            "total_pushes": 2,
+            "final_reports_pushed": 1,
+        }
+        assert store._next_id == 3
+        push(store, "e1", 300)
+        assert store.flush(timeout=2)
+        assert store.get_counters()["total_pushes"] == 3
+        assert store.get_counters()["total_events"] == 2
+    finally:
+        store.close()
+
+
+def test_failed_record_rolls_back_and_recovers_next_id(store):
+    push(store, "e1", 100)
+    assert store.flush(timeout=2)
+    before = store.get_counters()
+
+    # 无法绑定的参数：插入 pushes 时出错
+    with pytest.raises(sqlite3.Error):
+        store._write_batch([entry({"bad": "id"}, 200)])
+
+    assert store.get_counters() == before == recount(store)
+    assert store._next_id == 2
+    push(store, "e2", 300)
+    assert store.flush(timeout=2)
+    assert store._conn.execute("SELECT id FROM pushes ORDER BY id").fetchall() == [(1,), (2,)]
+
+
+def test_bad_record_does_not_discard_rest_of_batch(store):
+    batch = [
+        entry("e1", 100),
+        entry("e2", 110, is_final=True),
+        entry({"bad": "id"}, 120),  # 批次中途出错
+        entry("e3", 130, deliveries=[("qq:GroupMessage:1", STATUS_SENT)]),  # 解包出错
+        entry("e1", 140),
+        ("cleanup", 105),
+    ]
+    store._write_batch(batch)
+
+    rows = store._conn.execute("SELECT id, event_id FROM pushes ORDER BY id").fetchall()
+    assert rows == [(2, "e2"), (3, "e1")]
+    assert store._next_id == 4
+    assert store.get_counters() == {
+        "total_events": 2,
+        "total_pushes": 2,
+        "final_reports_pushed": 1,
+    }
+    assert store.get_counters() == recount(store)
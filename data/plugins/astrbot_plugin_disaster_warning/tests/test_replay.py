@@ -0,0 +1,33 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from astrbot.api.star import StarTools  # noqa: E402
+
+from data.plugins.astrbot_plugin_disaster_warning.core.replay import (  # noqa: E402
+    FIXTURES_PATH,
+    load_messages,
+    replay,
+)
+
+
+@pytest.fixture(autouse=True)
+def data_dir(monkeypatch, tmp_path):
+    monkeypatch.setattr(StarTools, "get_data_dir", lambda *args: tmp_path)
+
+
+def test_fixtures_replay_counts():
+    messages = load_messages([FIXTURES_PATH])
+    report = asyncio.run(replay(messages))
+
+    counts = report["counts"]
+    assert counts["messages"] == 26
+    assert counts["pushed"] == 21
+    assert counts["deduplicated"] == 2
+    assert counts["errors"] == 0
+    assert counts["unrouted"] == 0
+    assert counts["send_failures"] == 0
+    assert counts["sends"] == counts["pushed"]
+    assert report["latency"]["total"]["count"] == 26
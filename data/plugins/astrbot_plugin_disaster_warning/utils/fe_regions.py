@@ -5,37 +5,150 @@ FERegions - 全球地震区域中文翻译模块
 
 原始数据来源: kanameishi-dev/src/utils/FERegions.js
 转换为 Python 适用于灾害预警插件
+
+fe_regions_data.json 在首次使用时预编译为二进制网格（fe_regions_grid.u16）
+与名称表（fe_regions_names.json），之后以内存映射方式按下标读取；
+也可直接运行本文件重新编译
 """
 
 import json
+import mmap
 import os
+import sys
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # numpy 不可用时使用标准库 mmap，批量查询退化为逐个查询
+    np = None
+
+GRID_ROWS = 180
+GRID_COLS = 360
 
 # 懒加载数据
+# _FE_NUMBERS: 180×360 区域编号网格（按行展开的 uint16，内存映射或内存数组）
+# _FE_NAMES: 区域名称表，下标为区域编号-1
 _FE_NUMBERS = None
 _FE_NAMES = None
-_DATA_FILE = os.path.join(
-    os.path.dirname(os.path.dirname(__file__)), "resources", "fe_regions_data.json"
-)
+_FE_MMAP = None
+_RESOURCES_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), "resources")
+_DATA_FILE = os.path.join(_RESOURCES_DIR, "fe_regions_data.json")
+# 由 JSON 预编译得到：小端 uint16 网格 + 名称表，首次运行时生成
+_GRID_FILE = os.path.join(_RESOURCES_DIR, "fe_regions_grid.u16")
+_NAMES_FILE = os.path.join(_RESOURCES_DIR, "fe_regions_names.json")
+
+
+def _is_compiled() -> bool:
+    """预编译文件是否存在且不旧于 JSON 源数据"""
+    try:
+        grid_stat = os.stat(_GRID_FILE)
+        names_mtime = os.stat(_NAMES_FILE).st_mtime
+    except OSError:
+        return False
+    if grid_stat.st_size != GRID_ROWS * GRID_COLS * 2:
+        return False
+    try:
+        source_mtime = os.stat(_DATA_FILE).st_mtime
+    except OSError:
+        return True
+    return grid_stat.st_mtime >= source_mtime and names_mtime >= source_mtime
+
+
+def _read_source() -> tuple[array, list[str]]:
+    """读取 JSON 源数据，返回 (按行展开的区域编号, 名称表)"""
+    with open(_DATA_FILE, encoding="utf-8") as f:
+        data = json.load(f)
+    numbers = array("H", (num for row in data["fe_numbers"] for num in row))
+    if len(numbers) != GRID_ROWS * GRID_COLS:
+        raise ValueError(f"F-E 网格大小异常: {len(numbers)}")
+    return numbers, data["fe_names"]
+
+
+def compile_data(force: bool = False) -> bool:
+    """
+    将 fe_regions_data.json 预编译为紧凑的二进制网格与名称表
+
+    参数:
+        force: 即使已编译且未过期也重新生成
+
+    返回:
+        编译文件是否可用
+    """
+    if not force and _is_compiled():
+        return True
+
+    try:
+        numbers, names = _read_source()
+        if sys.byteorder != "little":
+            numbers.byteswap()
+        # 先写临时文件再替换，避免并发加载读到半个文件
+        for path, payload in (
+            (_GRID_FILE, numbers.tobytes()),
+            (_NAMES_FILE, json.dumps(names, ensure_ascii=False).encode("utf-8")),
+        ):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(payload)
+            os.replace(tmp_path, path)
+        return True
+    except (OSError, ValueError, KeyError):
+        return False
 
 
 def _load_data():
-    """懒加载 FE Regions 数据"""
-    global _FE_NUMBERS, _FE_NAMES
+    """懒加载 FE Regions 数据（优先内存映射预编译网格）"""
+    global _FE_NUMBERS, _FE_NAMES, _FE_MMAP
 
     if _FE_NUMBERS is not None and _FE_NAMES is not None:
         return
 
     try:
-        with open(_DATA_FILE, encoding="utf-8") as f:
-            data = json.load(f)
-            _FE_NUMBERS = data["fe_numbers"]
-            _FE_NAMES = data["fe_names"]
+        if compile_data():
+            with open(_NAMES_FILE, encoding="utf-8") as f:
+                names = json.load(f)
+            if np is not None:
+                numbers = np.memmap(
+                    _GRID_FILE,
+                    dtype="<u2",
+                    mode="r",
+                    shape=(GRID_ROWS * GRID_COLS,),
+                )
+            elif sys.byteorder == "little":
+                with open(_GRID_FILE, "rb") as f:
+                    _FE_MMAP = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                numbers = memoryview(_FE_MMAP).cast("H")
+            else:
+                numbers = _read_source()[0]
+        else:
+            # 资源目录不可写时直接在内存中使用紧凑数组
+            numbers, names = _read_source()
+        _FE_NAMES = names
+        _FE_NUMBERS = numbers
     except FileNotFoundError:
         # 如果数据文件不存在，使用内嵌的简化数据
-        _FE_NUMBERS = [[729] * 360 for _ in range(180)]  # 默认为"未定义"
+        _FE_NUMBERS = array("H", [729]) * (GRID_ROWS * GRID_COLS)  # 默认为"未定义"
         _FE_NAMES = ["未定义"] * 729
 
 
+def _region_name(region_number: int, add_suffix: bool) -> str | None:
+    """区域编号转中文名称"""
+    # 转换为地名 (编号从1开始，数组索引从0开始)
+    if 1 <= region_number <= len(_FE_NAMES):
+        region_name = _FE_NAMES[region_number - 1]
+
+        # 过滤"未定义"区域
+        if region_name == "未定义":
+            return None
+
+        # 添加"附近"后缀
+        if add_suffix and not region_name.endswith("附近"):
+            region_name += "附近"
+
+        return region_name
+
+    return None
+
+
 def get_fe_name(lat: float, lng: float, add_suffix: bool = True) -> str | None:
     """
     根据经纬度获取 F-E 区域中文名称
@@ -62,30 +175,62 @@ def get_fe_name(lat: float, lng: float, add_suffix: bool = True) -> str | None:
 
     try:
         # 坐标转换: (-90~90, -180~180) -> (0~179, 0~359)
-        lat_i = min(max(int(lat + 90), 0), 179)
-        lng_i = min(max(int(lng + 180), 0), 359)
+        lat_i = min(max(int(lat + 90), 0), GRID_ROWS - 1)
+        lng_i = min(max(int(lng + 180), 0), GRID_COLS - 1)
 
         # 查询区域编号
-        region_number = _FE_NUMBERS[lat_i][lng_i]
+        region_number = int(_FE_NUMBERS[lat_i * GRID_COLS + lng_i])
 
-        # 转换为地名 (编号从1开始，数组索引从0开始)
-        if 1 <= region_number <= len(_FE_NAMES):
-            region_name = _FE_NAMES[region_number - 1]
+        return _region_name(region_number, add_suffix)
 
-            # 过滤"未定义"区域
-            if region_name == "未定义":
-                return None
+    except (IndexError, ValueError, TypeError, OverflowError):
+        return None
 
-            # 添加"附近"后缀
-            if add_suffix and not region_name.endswith("附近"):
-                region_name += "附近"
 
-            return region_name
+def get_fe_names(lats, lngs, add_suffix: bool = True) -> list[str | None]:
+    """
+    批量获取 F-E 区域中文名称（numpy 可用时一次向量化查表）
 
-        return None
+    参数:
+        lats: 纬度序列
+        lngs: 经度序列（长度与 lats 相同）
+        add_suffix: 是否添加"附近"后缀，默认True
 
-    except (IndexError, ValueError, TypeError):
-        return None
+    返回:
+        与输入顺序一致的地名列表，无效坐标或未定义区域为 None
+    """
+    _load_data()
+
+    if _FE_NUMBERS is None or _FE_NAMES is None:
+        return [None] * len(lats)
+
+    if np is None or not isinstance(_FE_NUMBERS, np.ndarray):
+        return [get_fe_name(lat, lng, add_suffix) for lat, lng in zip(lats, lngs)]
+
+    try:
+        lat_arr = np.asarray(lats, dtype=np.float64) + 90
+        lng_arr = np.asarray(lngs, dtype=np.float64) + 180
+    except (TypeError, ValueError):
+        return [get_fe_name(lat, lng, add_suffix) for lat, lng in zip(lats, lngs)]
+
+    valid = np.isfinite(lat_arr) & np.isfinite(lng_arr)
+    # 与 int() 一致向零截断后再夹到网格范围内
+    lat_i = np.clip(np.trunc(np.where(valid, lat_arr, 0)), 0, GRID_ROWS - 1)
+    lng_i = np.clip(np.trunc(np.where(valid, lng_arr, 0)), 0, GRID_COLS - 1)
+    region_numbers = _FE_NUMBERS[
+        lat_i.astype(np.intp) * GRID_COLS + lng_i.astype(np.intp)
+    ]
+
+    names_cache: dict[int, str | None] = {}
+    result: list[str | None] = []
+    for region_number, ok in zip(region_numbers.tolist(), valid.tolist()):
+        if not ok:
+            result.append(None)
+            continue
+        if region_number not in names_cache:
+            names_cache[region_number] = _region_name(region_number, add_suffix)
+        result.append(names_cache[region_number])
+    return result
 
 
 def translate_place_name(
@@ -143,14 +288,16 @@ def get_region_stats() -> dict:
         }
 
     # 统计唯一区域
-    flat_numbers = [num for row in _FE_NUMBERS for num in row]
-    unique_regions = len(set(flat_numbers))
+    if np is not None and isinstance(_FE_NUMBERS, np.ndarray):
+        unique_regions = len(np.unique(_FE_NUMBERS))
+    else:
+        unique_regions = len(set(_FE_NUMBERS))
 
     return {
         "loaded": True,
         "total_names": len(_FE_NAMES),
-        "grid_rows": len(_FE_NUMBERS),
-        "grid_cols": len(_FE_NUMBERS[0]) if _FE_NUMBERS else 0,
+        "grid_rows": GRID_ROWS,
+        "grid_cols": GRID_COLS,
         "unique_regions": unique_regions,
         "grid_precision": "1° × 1°",
         "coverage": "全球 (-90°~90°, -180°~180°)",
@@ -159,6 +306,8 @@ def get_region_stats() -> dict:
 
 # 测试代码
 if __name__ == "__main__":
+    print(f"预编译数据: {'成功' if compile_data(force=True) else '失败'}")
+
     # 测试几个知名地震区域
     test_cases = [
         (35.6, 139.7, "东京"),
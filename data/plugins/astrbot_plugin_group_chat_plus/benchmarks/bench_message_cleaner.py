@@ -0,0 +1,121 @@
+"""
+消息清理耗时对比：
+原实现对每条消息逐条执行全部清理正则（re.sub 字符串模式），
+现实现先用合并的特征字面量正则预筛选，只对可能含系统提示词的消息执行规则，并缓存清理结果。
+两者对同一批聊天记录的输出逐字节比对，不一致时直接报错。
+
+聊天记录：普通群聊消息为主，约三成夹带插件自己追加的系统提示词（@提示、戳一戳提示、
+背景信息、历史上下文、核心原则等），与保存官方历史、格式化上下文时实际经过清理器的文本一致。
+
+在 AstrBot 根目录运行:
+    python data/plugins/astrbot_plugin_group_chat_plus/benchmarks/bench_message_cleaner.py
+"""
+
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from data.plugins.astrbot_plugin_group_chat_plus.utils.message_cleaner import MessageCleaner  # noqa: E402
+
+MESSAGES = 20000
+WINDOW = 200
+WINDOW_ROUNDS = 50
+
+CHAT_LINES = [
+    "今天吃什么",
+    "哈哈哈哈笑死我了",
+    "有人打游戏吗",
+    "周末去爬山吗，天气预报说是晴天",
+    "[图片]",
+    "[At:123456] 在吗",
+    "1 + 1 = 2",
+    "刚下班，累死了",
+    "这个版本的更新日志有人看了吗？改动还挺多的",
+    "[Poke:poke]",
+]
+PROMPT_FRAGMENTS = [
+    "\n[系统提示]注意,现在有人在直接@你并且给你发送了这条消息，@你的那个人是小明(ID:10001)",
+    "\n[系统提示]注意，你看到了这条消息，发送这条消息的人是小红",
+    "\n[戳一戳提示]有人在戳你，戳你的人是阿强",
+    "[当前时间:2025-01-02 03:04:05]",
+    "[User ID: 42, Nickname: 路人]",
+    "[当前情绪状态: 开心]",
+    "\n\n=== 背景信息 ===\n💭 相关记忆：\n- 喜欢猫\n- 住在杭州\n... 还有 3 条记忆",
+    "\n\n=== 历史消息上下文 ===\n张三: 早\n李四: 早上好\n=== 当前新消息 ===\n",
+    "\n当前和你对话的人是 小明（ID:10001），不是其他人\n",
+    "\n核心原则（重要！）：\n1. 自然\n2. 简短\n3. 不要复读\n请开始回复",
+    "\n回复要求：别太长\n请开始回复：",
+    "\n(这些信息可能对理解当前对话有帮助，按需使用)",
+]
+
+
+def legacy_clean(message_text):
+    """原实现：逐条 re.sub"""
+    if not message_text:
+        return message_text
+    cleaned = message_text
+    for pattern in MessageCleaner.AT_MESSAGE_PROMPT_PATTERNS:
+        cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL)
+    for pattern in MessageCleaner.DECISION_AI_PROMPT_PATTERNS:
+        cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL)
+    cleaned = re.sub(r"\n*=+\n*", "\n", cleaned)
+    cleaned = re.sub(r"\n\s*\n\s*\n", "\n\n", cleaned)
+    return cleaned.strip()
+
+
+def make_chat(rnd, size):
+    messages = []
+    for i in range(size):
+        parts = [f"{rnd.choice(CHAT_LINES)} #{i}"]
+        if rnd.random() < 0.3:
+            for _ in range(rnd.randint(1, 4)):
+                parts.append(rnd.choice(PROMPT_FRAGMENTS))
+        messages.append("".join(parts))
+    return messages
+
+
+def timed(func):
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def main():
+    rnd = random.Random(11)
+    chat = make_chat(rnd, MESSAGES)
+
+    MessageCleaner._clean_cache.clear()
+    expected = [legacy_clean(m) for m in chat]
+    actual = [MessageCleaner.clean_message(m) for m in chat]
+    mismatched = sum(a != b for a, b in zip(actual, expected))
+    if mismatched:
+        raise SystemExit(f"输出不一致: {mismatched} 条")
+    changed = sum(m != c for m, c in zip(chat, expected))
+    print(f"{len(chat)} 条消息，其中 {changed} 条被清理，输出逐字节一致")
+
+    def uncached():
+        for m in chat:
+            MessageCleaner._clean_cache.clear()
+            MessageCleaner.clean_message(m)
+
+    old = timed(lambda: [legacy_clean(m) for m in chat])
+    new = timed(uncached)
+    print("单次清理（不走缓存）:")
+    print(f"  原实现 {len(chat) / old:10.0f} 条/秒")
+    print(f"  现实现 {len(chat) / new:10.0f} 条/秒")
+
+    window = chat[:WINDOW]
+    MessageCleaner._clean_cache.clear()
+    old = timed(lambda: [legacy_clean(m) for _ in range(WINDOW_ROUNDS) for m in window])
+    new = timed(lambda: [MessageCleaner.clean_message(m) for _ in range(WINDOW_ROUNDS) for m in window])
+    print(f"反复格式化 {WINDOW} 条上下文窗口 {WINDOW_ROUNDS} 次:")
+    print(f"  原实现 {old * 1000:8.1f} ms")
+    print(f"  现实现 {new * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
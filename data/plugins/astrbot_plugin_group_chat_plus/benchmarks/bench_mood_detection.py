@@ -0,0 +1,109 @@
+"""
+情绪关键词检测耗时对比：
+原实现按 情绪 × 关键词 × 出现位置 × 否定词 逐层循环（str.find / 子串检查），
+现实现使用 CategoryKeywordScorer（合并正则预筛选 + 按规模选择扫描方式）。
+每个场景先逐条比对两者的得分，不一致时直接报错。
+
+场景（约300字符的消息）：
+- 无命中：普通聊天文本，不含任何情绪关键词
+- 默认关键词、密集命中：插件默认的情绪关键词与否定词，文本中频繁出现
+- 600个关键词：自定义的大规模关键词表
+
+在 AstrBot 根目录运行:
+    python data/plugins/astrbot_plugin_group_chat_plus/benchmarks/bench_mood_detection.py
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from data.plugins.astrbot_plugin_group_chat_plus.utils.mood_tracker import MoodTracker  # noqa: E402
+
+MESSAGES = 5000
+MESSAGE_CHARS = 300
+FILLER = "今天下班后去吃饭然后回家看电视顺便聊聊最近的游戏和电影大家都在讨论什么呢"
+
+
+def legacy_scores(tracker, text):
+    """原实现：逐情绪、逐关键词查找所有出现位置，再逐个否定词检查前文"""
+    mood_scores = {}
+    for mood, keywords in tracker.mood_keywords.items():
+        score = 0
+        for keyword in keywords:
+            start = 0
+            while True:
+                pos = text.find(keyword, start)
+                if pos == -1:
+                    break
+                negated = False
+                if tracker.enable_negation:
+                    context_before = text[max(0, pos - tracker.negation_check_range) : pos]
+                    negated = any(neg in context_before for neg in tracker.negation_words)
+                if not negated:
+                    score += 1
+                start = pos + 1
+        if score > 0:
+            mood_scores[mood] = score
+    return mood_scores
+
+
+def make_messages(rnd, words, density):
+    messages = []
+    for _ in range(MESSAGES):
+        parts = []
+        length = 0
+        while length < MESSAGE_CHARS:
+            if rnd.random() < density:
+                piece = rnd.choice(words)
+            else:
+                start = rnd.randrange(len(FILLER) - 6)
+                piece = FILLER[start : start + rnd.randint(2, 6)]
+            parts.append(piece)
+            length += len(piece)
+        messages.append("".join(parts)[:MESSAGE_CHARS])
+    return messages
+
+
+def run(name, tracker, messages):
+    scorer = tracker._get_mood_scorer()
+    for text in messages:
+        expected = legacy_scores(tracker, text)
+        actual = scorer.score(text)
+        if actual != expected:
+            raise SystemExit(f"[{name}] 得分不一致: {text!r}\n  原: {expected}\n  现: {actual}")
+
+    start = time.perf_counter()
+    for text in messages:
+        legacy_scores(tracker, text)
+    old = time.perf_counter() - start
+    start = time.perf_counter()
+    for text in messages:
+        scorer.score(text)
+    new = time.perf_counter() - start
+    print(f"{name}:")
+    print(f"  原实现 {len(messages) / old:10.0f} 条/秒")
+    print(f"  现实现 {len(messages) / new:10.0f} 条/秒")
+
+
+def main():
+    rnd = random.Random(5)
+
+    tracker = MoodTracker({})
+    keywords = [k for words in tracker.mood_keywords.values() for k in words]
+    hot_words = keywords + list(tracker.negation_words)
+    run("无命中", tracker, make_messages(rnd, hot_words, 0.0))
+    run(f"默认关键词（{len(keywords)}个）、密集命中", tracker, make_messages(rnd, hot_words, 0.35))
+
+    big_keywords = {}
+    for mood in tracker.mood_keywords:
+        big_keywords[mood] = [f"{mood}{i}号" for i in range(600 // len(tracker.mood_keywords))]
+    big = MoodTracker({"mood_keywords": big_keywords})
+    big_words = [k for words in big_keywords.values() for k in words] + list(big.negation_words)
+    run("600个关键词", big, make_messages(rnd, big_words, 0.1))
+
+
+if __name__ == "__main__":
+    main()
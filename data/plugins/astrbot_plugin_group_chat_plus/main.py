@@ -93,8 +93,11 @@ from .utils import (
     ImageHandler,
     ContextManager,
     DecisionAI,
+    DecisionBatcher,
+    ImageCaptionCache,
     ReplyHandler,
     MemoryInjector,
+    MemoryRecall,
     ToolsReminder,
     KeywordChecker,
     MessageCleaner,
@@ -181,6 +184,15 @@ class ChatPlus(Star):
         # 🆕 v1.1.0: 初始化概率管理器（用于动态时间段调整）
         ProbabilityManager.initialize(config)
 
+        # 初始化决策调度器（读空气判断的防抖合并、缓存与并发上限）
+        DecisionBatcher.initialize(config)
+
+        # 初始化图片描述缓存（图片转文字结果的缓存、合并与并发上限）
+        ImageCaptionCache.initialize(config, str(data_dir))
+
+        # 初始化记忆召回调度器（召回结果缓存、截止时间与预取）
+        MemoryRecall.initialize(config)
+
         # 初始化消息缓存（用于保存"通过筛选但未回复"的消息）
         # 格式: {chat_id: [{"role": "user", "content": "消息内容", "timestamp": 时间戳}]}
         self.pending_messages_cache = {}
@@ -574,6 +586,10 @@ class ChatPlus(Star):
                 logger.error(f"[主动对话] 停止后台任务失败: {e}", exc_info=True)
         if hasattr(self, "session"):
             await self.session.close()
+        logger.info(f"[决策调度] {DecisionBatcher.format_metrics()}")
+        logger.info(f"[图片描述缓存] {ImageCaptionCache.format_metrics()}")
+        ImageCaptionCache.close()
+        logger.info(f"[记忆召回] {MemoryRecall.format_metrics()}")
 
     @filter.on_platform_loaded()
     async def on_platform_loaded(self):
@@ -1342,6 +1358,16 @@ class ChatPlus(Star):
                     )
             except Exception:
                 logger.warning("【插件重置】清空频率检查状态失败", exc_info=True)
+            try:
+                # 图片描述缓存：清空内存与持久化记录
+                caption_count = ImageCaptionCache.clear()
+
+                logger.info(
+                    "【插件重置】已清空图片描述缓存 清理条目=%s",
+                    caption_count,
+                )
+            except Exception:
+                logger.warning("【插件重置】清空图片描述缓存失败", exc_info=True)
             try:
                 # 删除本插件数据目录下的持久化缓存文件/目录
                 data_dir = StarTools.get_data_dir()
@@ -1608,7 +1634,7 @@ class ChatPlus(Star):
                 self.context, mode=memory_mode
             ):
                 try:
-                    memories = await MemoryInjector.get_memories(
+                    memories = await MemoryRecall.recall(
                         self.context,
                         event,
                         mode=memory_mode,
@@ -1658,6 +1684,23 @@ class ChatPlus(Star):
 
             _decision_start = time.time()
 
+            # 判定后注入记忆时，在读空气判断期间提前发起记忆召回
+            if (
+                self.config.get("enable_memory_injection", False)
+                and self.config.get("memory_insertion_timing", "post_decision")
+                == "post_decision"
+            ):
+                memory_mode = self.config.get("memory_plugin_mode", "legacy")
+                if MemoryInjector.check_memory_plugin_available(
+                    self.context, mode=memory_mode
+                ):
+                    MemoryRecall.prefetch(
+                        self.context,
+                        event,
+                        mode=memory_mode,
+                        top_k=self.config.get("livingmemory_top_k", 5),
+                    )
+
             should_reply = await DecisionAI.should_reply(
                 self.context,
                 event,
@@ -1681,10 +1724,15 @@ class ChatPlus(Star):
                 logger.info(f"【步骤9】决策AI判断完成，耗时: {_decision_elapsed:.2f}秒")
 
             if not should_reply:
-                logger.info("决策AI判断: 不应该回复此消息")
+                # 被同会话新消息取代的请求并非AI判定不回复，不做注意力衰减
+                superseded = getattr(event, "_gcp_decision_superseded", False)
+                if not superseded:
+                    logger.info("决策AI判断: 不应该回复此消息")
 
                 # 🆕 注意力衰减：如果注意力机制启用且对该用户注意力较高，进行衰减
-                if self.config.get("enable_attention_mechanism", False):
+                if not superseded and self.config.get(
+                    "enable_attention_mechanism", False
+                ):
                     try:
                         user_id = event.get_sender_id()
                         user_name = event.get_sender_name() or "未知用户"
@@ -2546,7 +2594,7 @@ class ChatPlus(Star):
             if MemoryInjector.check_memory_plugin_available(
                 self.context, mode=memory_mode
             ):
-                memories = await MemoryInjector.get_memories(
+                memories = await MemoryRecall.recall(
                     self.context, event, mode=memory_mode, top_k=livingmemory_top_k
                 )
                 if memories:
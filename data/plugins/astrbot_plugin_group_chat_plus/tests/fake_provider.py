@@ -0,0 +1,124 @@
+"""
+测试用离线提供商
+模拟 AstrBot Provider / Context 的最小接口，用于在不连接真实AI的情况下
+驱动 DecisionAI / DecisionBatcher（例如模拟刷屏突发消息、观察合并与缓存效果），
+以及 ImageHandler / ImageCaptionCache（图片转文字）
+
+用法示例：
+    provider = FakeDecisionProvider(answer="yes", latency=0.5)
+    context = FakeDecisionContext(provider)
+    await DecisionAI.should_reply(context, event, formatted_message, "", "")
+    print(provider.calls, provider.max_concurrent)
+
+    vision = FakeVisionProvider(answer=lambda path: f"图片 {path}", latency=2.0)
+    await ImageHandler.process_message_images(
+        event, FakeDecisionContext(vision), True, "all", "vision", "描述图片", False, False
+    )
+    print(vision.calls, vision.image_urls)
+
+作者: Him666233
+版本: v1.1.2
+"""
+
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Union
+
+
+class FakeDecisionProvider:
+    """
+    假的AI提供商，只实现 text_chat
+
+    Args:
+        answer: 固定回复文本，或接收 prompt 返回回复文本的函数
+        latency: 每次调用的模拟耗时（秒）
+    """
+
+    def __init__(
+        self,
+        answer: Union[str, Callable[[str], str]] = "yes",
+        latency: float = 0.0,
+    ):
+        self.answer = answer
+        self.latency = latency
+        self.calls = 0  # 发起的调用次数（含被取消的）
+        self.completed = 0  # 完成的调用次数
+        self.concurrent = 0
+        self.max_concurrent = 0  # 观察到的最大并发数
+        self.prompts: List[str] = []
+
+    async def text_chat(
+        self,
+        prompt: str = "",
+        contexts: Optional[list] = None,
+        image_urls: Optional[list] = None,
+        func_tool: Any = None,
+        system_prompt: str = "",
+        **kwargs,
+    ):
+        self.calls += 1
+        self.prompts.append(prompt)
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            if self.latency > 0:
+                await asyncio.sleep(self.latency)
+            text = self._render(prompt, image_urls or [])
+            self.completed += 1
+            return SimpleNamespace(completion_text=text)
+        finally:
+            self.concurrent -= 1
+
+    def _render(self, prompt: str, image_urls: List[str]) -> str:
+        return self.answer(prompt) if callable(self.answer) else self.answer
+
+
+class FakeVisionProvider(FakeDecisionProvider):
+    """
+    假的图片转文字提供商
+
+    Args:
+        answer: 固定描述文本，或接收图片路径返回描述的函数
+        latency: 每次调用的模拟耗时（秒）
+    """
+
+    def __init__(
+        self,
+        answer: Union[str, Callable[[str], str]] = "一张图片",
+        latency: float = 0.0,
+    ):
+        super().__init__(answer, latency)
+        self.image_urls: List[str] = []  # 收到过的图片路径（按调用顺序）
+
+    def _render(self, prompt: str, image_urls: List[str]) -> str:
+        self.image_urls.extend(image_urls)
+        image_path = image_urls[0] if image_urls else ""
+        return self.answer(image_path) if callable(self.answer) else self.answer
+
+
+class _FakePersonaManager:
+    def __init__(self, persona: Dict[str, Any]):
+        self.persona = persona
+
+    async def get_default_persona_v3(self, umo: str = None) -> Dict[str, Any]:
+        return self.persona
+
+
+class FakeDecisionContext:
+    """假的 Context，所有提供商查询都返回同一个 FakeDecisionProvider"""
+
+    def __init__(
+        self,
+        provider: FakeDecisionProvider,
+        persona: Optional[Dict[str, Any]] = None,
+    ):
+        self.provider = provider
+        self.persona_manager = _FakePersonaManager(
+            persona or {"name": "default", "prompt": ""}
+        )
+
+    def get_provider_by_id(self, provider_id: str):
+        return self.provider
+
+    def get_using_provider(self, umo: str = None):
+        return self.provider
@@ -0,0 +1,143 @@
+import asyncio
+import math
+import random
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("pypinyin")
+
+from data.plugins.astrbot_plugin_group_chat_plus.utils import attention_manager  # noqa: E402
+from data.plugins.astrbot_plugin_group_chat_plus.utils.attention_manager import (  # noqa: E402
+    AttentionManager,
+)
+
+BOOST = 0.4
+DECREASE = 0.1
+EMOTION_BOOST = 0.1
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch, tmp_path):
+    clock = Clock()
+    monkeypatch.setattr(attention_manager.time, "time", clock.time)
+    monkeypatch.setattr(AttentionManager, "_attention_map", {})
+    monkeypatch.setattr(AttentionManager, "_chat_penalty", {})
+    monkeypatch.setattr(AttentionManager, "_storage_path", tmp_path / "attention_data.json")
+    monkeypatch.setattr(AttentionManager, "_last_save_time", clock.now)
+    monkeypatch.setattr(AttentionManager, "_lock", asyncio.Lock())
+    monkeypatch.setattr(AttentionManager, "ENABLE_EMOTION_DETECTION", False)
+    return clock
+
+
+class EagerModel:
+    """逐次衰减、逐次扣减的参考实现：每次回复都把会话内所有用户结算到当前时刻"""
+
+    def __init__(self):
+        self.users = {}  # uid -> [注意力, 情绪, 结算时间]
+
+    def _settle(self, entry, now):
+        elapsed = now - entry[2]
+        entry[0] *= math.pow(0.5, elapsed / AttentionManager.ATTENTION_DECAY_HALFLIFE)
+        entry[1] *= math.pow(0.5, elapsed / AttentionManager.EMOTION_DECAY_HALFLIFE)
+        entry[2] = now
+
+    def reply(self, uid, now):
+        for entry in self.users.values():
+            self._settle(entry, now)
+        entry = self.users.setdefault(uid, [0.0, 0.0, now])
+        entry[0] = min(entry[0] + BOOST, AttentionManager.MAX_ATTENTION_SCORE)
+        entry[1] = min(entry[1] + EMOTION_BOOST, 1.0)
+        for other, other_entry in self.users.items():
+            if other != uid:
+                other_entry[0] = max(other_entry[0] - DECREASE, AttentionManager.MIN_ATTENTION_SCORE)
+
+    def view(self, now):
+        result = {}
+        for uid, (attention, emotion, at) in self.users.items():
+            entry = [attention, emotion, at]
+            self._settle(entry, now)
+            result[uid] = (entry[0], entry[1])
+        return result
+
+
+def reply(uid):
+    return AttentionManager.record_replied_user(
+        "qq", False, "1", uid, f"用户{uid}", "", "", BOOST, DECREASE, EMOTION_BOOST
+    )
+
+
+async def lazy_view():
+    info = await AttentionManager.get_attention_info("qq", False, "1") or {}
+    return {uid: (p["attention_score"], p["emotion"]) for uid, p in info.items()}
+
+
+def assert_close(lazy, eager):
+    assert lazy.keys() == eager.keys()
+    for uid in eager:
+        assert lazy[uid][0] == pytest.approx(eager[uid][0], abs=1e-9), uid
+        assert lazy[uid][1] == pytest.approx(eager[uid][1], abs=1e-9), uid
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_lazy_decay_matches_eager_decay(clock, seed):
+    rnd = random.Random(seed)
+    eager = EagerModel()
+    users = [str(i) for i in range(6)]  # 不超过 MAX_TRACKED_USERS，避免淘汰干扰比较
+
+    async def main():
+        for _ in range(200):
+            clock.now += rnd.choice([0, 1, 5, 30, 120, 600, 1800])
+            uid = rnd.choice(users[: rnd.randint(1, len(users))])
+            await reply(uid)
+            eager.reply(uid, clock.now)
+            if rnd.random() < 0.3:
+                assert_close(await lazy_view(), eager.view(clock.now))
+        clock.now += 450
+        assert_close(await lazy_view(), eager.view(clock.now))
+
+    asyncio.run(main())
+
+
+def test_repeated_reads_do_not_compound_decay(clock):
+    async def main():
+        await reply("a")
+        await reply("b")
+        clock.now += 300
+        first = await lazy_view()
+        for _ in range(10):
+            again = await lazy_view()
+        return first, again
+
+    first, again = asyncio.run(main())
+    assert first == again
+    # 一个半衰期后：a 被扣减一次后衰减，b 直接衰减
+    assert first["a"][0] == pytest.approx((BOOST - DECREASE) / 2)
+    assert first["b"][0] == pytest.approx(BOOST / 2)
+
+
+def test_saved_snapshot_is_settled_and_reloads_equal(clock):
+    async def main():
+        for uid in ("a", "b", "a", "c"):
+            clock.now += 60
+            await reply(uid)
+        clock.now += 200
+        before = await lazy_view()
+        AttentionManager._save_to_disk(force=True)
+        AttentionManager._load_from_disk()
+        after = await lazy_view()
+        clock.now += 300
+        return before, after, await lazy_view()
+
+    before, after, later = asyncio.run(main())
+    assert_close(after, before)
+    for uid in before:
+        assert later[uid][0] == pytest.approx(before[uid][0] / 2, abs=1e-9)
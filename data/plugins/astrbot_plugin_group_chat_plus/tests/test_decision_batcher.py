@@ -0,0 +1,133 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("pypinyin")
+
+from data.plugins.astrbot_plugin_group_chat_plus.tests.fake_provider import (  # noqa: E402
+    FakeDecisionContext,
+    FakeDecisionProvider,
+)
+from data.plugins.astrbot_plugin_group_chat_plus.utils.decision_ai import DecisionAI  # noqa: E402
+from data.plugins.astrbot_plugin_group_chat_plus.utils.decision_batcher import (  # noqa: E402
+    DecisionBatcher,
+)
+
+
+class FakeEvent:
+    def __init__(self, chat="group:1", sender="10001"):
+        self.unified_msg_origin = chat
+        self.sender = sender
+
+    def get_sender_id(self):
+        return self.sender
+
+    def get_sender_name(self):
+        return "小明"
+
+
+def setup(**config):
+    DecisionBatcher.initialize(
+        {
+            "decision_debounce_window": config.pop("window", 0.2),
+            "decision_cache_ttl": config.pop("ttl", 120),
+            **config,
+        }
+    )
+
+
+def should_reply(context, event, message):
+    return DecisionAI.should_reply(context, event, message, "", "", timeout=5)
+
+
+def test_single_message_is_judged_without_waiting_for_the_window():
+    setup(window=1.0)
+    provider = FakeDecisionProvider("yes")
+    context = FakeDecisionContext(provider)
+
+    async def main():
+        start = time.monotonic()
+        result = await should_reply(context, FakeEvent(), "在吗")
+        return result, time.monotonic() - start
+
+    result, elapsed = asyncio.run(main())
+    assert result is True
+    assert elapsed < 0.5
+    assert provider.calls == 1
+
+
+def test_burst_is_coalesced_into_one_completed_decision():
+    setup(window=0.2)
+    provider = FakeDecisionProvider("yes", latency=0.1)
+    context = FakeDecisionContext(provider)
+    events = [FakeEvent() for _ in range(5)]
+
+    async def main():
+        tasks = []
+        for i, event in enumerate(events):
+            tasks.append(asyncio.create_task(should_reply(context, event, f"刷屏 {i}")))
+            await asyncio.sleep(0.02)
+        return await asyncio.gather(*tasks)
+
+    results = asyncio.run(main())
+    # 只有最后一条得到判定，其余都被取代
+    assert results == [False, False, False, False, True]
+    assert [getattr(e, "_gcp_decision_superseded", False) for e in events] == [True] * 4 + [False]
+    # 第一条立即发起（随后被取消），最后一条在窗口后发起，中间的消息不调用
+    assert provider.calls == 2
+    assert provider.completed == 1
+    metrics = DecisionBatcher.get_metrics()
+    assert metrics["requests"] == 5
+    assert metrics["superseded"] == 4
+    assert metrics["cancelled_inflight"] == 1
+    assert metrics["active_chats"] == 0
+
+
+def test_same_context_reuses_cached_decision():
+    setup(window=0.2)
+    provider = FakeDecisionProvider("no")
+    context = FakeDecisionContext(provider)
+
+    async def main():
+        first = await should_reply(context, FakeEvent(), "同一段上下文")
+        second = await should_reply(context, FakeEvent(), "同一段上下文")
+        return first, second
+
+    assert asyncio.run(main()) == (False, False)
+    assert provider.calls == 1
+    assert DecisionBatcher.get_metrics()["cache_hits"] == 1
+
+
+def test_failed_decision_is_not_cached():
+    setup(window=0.2)
+
+    def broken(prompt):
+        raise RuntimeError("provider down")
+
+    provider = FakeDecisionProvider(broken)
+    context = FakeDecisionContext(provider)
+
+    async def main():
+        for _ in range(2):
+            await should_reply(context, FakeEvent(), "同一段上下文")
+
+    asyncio.run(main())
+    assert provider.calls == 2
+    assert DecisionBatcher.get_metrics()["failed_calls"] == 2
+
+
+def test_global_concurrency_is_bounded():
+    setup(window=0.2, decision_max_concurrency_global=2)
+    provider = FakeDecisionProvider("yes", latency=0.05)
+    context = FakeDecisionContext(provider)
+
+    async def main():
+        return await asyncio.gather(
+            *(should_reply(context, FakeEvent(chat=f"group:{i}"), "你好") for i in range(6))
+        )
+
+    assert asyncio.run(main()) == [True] * 6
+    assert provider.calls == 6
+    assert provider.max_concurrent == 2
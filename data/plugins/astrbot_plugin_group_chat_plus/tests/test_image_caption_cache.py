@@ -0,0 +1,213 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("pypinyin")
+
+from astrbot.api.message_components import Image, Plain  # noqa: E402
+
+from data.plugins.astrbot_plugin_group_chat_plus.tests.fake_provider import (  # noqa: E402
+    FakeDecisionContext,
+    FakeVisionProvider,
+)
+from data.plugins.astrbot_plugin_group_chat_plus.utils import image_caption_cache  # noqa: E402
+from data.plugins.astrbot_plugin_group_chat_plus.utils.image_caption_cache import (  # noqa: E402
+    ImageCaptionCache,
+)
+from data.plugins.astrbot_plugin_group_chat_plus.utils.image_handler import ImageHandler  # noqa: E402
+
+VARIANT = ImageCaptionCache.make_variant("vision", "描述图片")
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def time(self):
+        return self.now
+
+
+class Vision:
+    """记录调用次数与最大并发的视觉AI"""
+
+    def __init__(self, latency=0.0, caption=lambda path: f"描述:{path.rsplit('/', 1)[-1]}"):
+        self.latency = latency
+        self.caption = caption
+        self.calls = 0
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def __call__(self, path):
+        self.calls += 1
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            await asyncio.sleep(self.latency)
+            return self.caption(path)
+        finally:
+            self.concurrent -= 1
+
+
+class Downloader:
+    """模拟下载图片：记录被调用次数"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.calls = 0
+
+    async def __call__(self):
+        self.calls += 1
+        return self.path
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(image_caption_cache.time, "time", clock.time)
+    return clock
+
+
+@pytest.fixture
+def cache(tmp_path, clock):
+    ImageCaptionCache.initialize({"image_caption_cache_ttl": 3600}, str(tmp_path / "db"))
+    yield ImageCaptionCache
+    ImageCaptionCache.close()
+
+
+@pytest.fixture
+def image(tmp_path):
+    def make(name, content=None):
+        path = tmp_path / name
+        path.write_bytes(content if content is not None else name.encode())
+        return path
+
+    return make
+
+
+def get(pre_key, downloader, vision, timeout=5):
+    return ImageCaptionCache.get_caption(pre_key, downloader, VARIANT, vision, timeout)
+
+
+def test_pre_key_hit_skips_download_and_vision(cache, image):
+    vision = Vision()
+    first = Downloader(image("cat.png"))
+    again = Downloader(image("cat.png"))
+
+    async def main():
+        return await get("file:cat", first, vision), await get("file:cat", again, vision)
+
+    assert asyncio.run(main()) == ("描述:cat.png", "描述:cat.png")
+    assert (first.calls, again.calls, vision.calls) == (1, 0, 1)
+    metrics = cache.get_metrics()
+    assert metrics["pre_key_hits"] == 1
+    assert metrics["memory_hits"] == 1
+
+
+def test_same_content_under_new_pre_key_hits_by_content(cache, image):
+    vision = Vision()
+    shared = b"same picture bytes"
+
+    async def main():
+        await get("file:a", Downloader(image("a.png", shared)), vision)
+        return await get("url:http://x/b", Downloader(image("b.png", shared)), vision)
+
+    assert asyncio.run(main()) == "描述:a.png"
+    assert vision.calls == 1
+    assert cache.get_metrics()["pre_key_hits"] == 0
+
+
+def test_concurrent_requests_for_one_image_are_coalesced(cache, image):
+    vision = Vision(latency=0.05)
+    path = image("meme.gif")
+
+    async def main():
+        return await asyncio.gather(*(get(None, Downloader(path), vision) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["描述:meme.gif"] * 5
+    assert vision.calls == 1
+    assert cache.get_metrics()["coalesced"] == 4
+    assert cache.get_metrics()["inflight"] == 0
+
+
+def test_vision_calls_share_a_bounded_pool(tmp_path, clock, image):
+    ImageCaptionCache.initialize({"image_to_text_max_concurrency": 2}, None)
+    vision = Vision(latency=0.02)
+
+    async def main():
+        return await asyncio.gather(
+            *(get(None, Downloader(image(f"{i}.png")), vision) for i in range(6))
+        )
+
+    assert len(set(asyncio.run(main()))) == 6
+    assert vision.calls == 6
+    assert vision.max_concurrent == 2
+
+
+def test_expired_captions_are_recomputed(cache, clock, image):
+    vision = Vision()
+    path = image("cat.png")
+
+    async def main():
+        await get("file:cat", Downloader(path), vision)
+        clock.now += 3599
+        await get("file:cat", Downloader(path), vision)
+        clock.now += 2
+        downloader = Downloader(path)
+        await get("file:cat", downloader, vision)
+        return downloader.calls
+
+    assert asyncio.run(main()) == 1
+    assert vision.calls == 2
+
+
+def test_failed_captions_are_not_cached(cache, image):
+    vision = Vision(caption=lambda path: "")
+    path = image("cat.png")
+
+    async def main():
+        return [await get("file:cat", Downloader(path), vision) for _ in range(2)]
+
+    assert asyncio.run(main()) == [None, None]
+    assert vision.calls == 2
+    assert cache.get_metrics()["failed_calls"] == 2
+
+
+def test_captions_persist_across_initialize(tmp_path, clock, image):
+    db_dir = str(tmp_path / "db")
+    config = {"image_caption_cache_ttl": 3600}
+    vision = Vision()
+    path = image("cat.png")
+
+    ImageCaptionCache.initialize(config, db_dir)
+    asyncio.run(get("file:cat", Downloader(path), vision))
+
+    # 重新初始化：内存缓存清空，从 SQLite 读回
+    ImageCaptionCache.initialize(config, db_dir)
+    downloader = Downloader(path)
+    assert asyncio.run(get("file:cat", downloader, vision)) == "描述:cat.png"
+    assert (downloader.calls, vision.calls) == (0, 1)
+    assert ImageCaptionCache.get_metrics()["disk_hits"] == 1
+
+    # 过期记录在打开存储时清理
+    clock.now += 3601
+    ImageCaptionCache.initialize(config, db_dir)
+    rows = ImageCaptionCache._db.execute("SELECT COUNT(*) FROM captions").fetchone()[0]
+    assert rows == 0
+    ImageCaptionCache.close()
+
+
+def test_image_handler_describes_repeated_image_once(tmp_path, clock, image):
+    ImageCaptionCache.initialize({}, None)
+    provider = FakeVisionProvider(answer=lambda path: "一只猫", latency=0.02)
+    path = str(image("cat.png"))
+    chain = [Plain("看"), Image.fromFileSystem(path), Plain("和"), Image.fromFileSystem(path)]
+
+    text = asyncio.run(
+        ImageHandler._convert_images_to_text(
+            chain, FakeDecisionContext(provider), "vision", "描述图片", [chain[1], chain[3]]
+        )
+    )
+
+    assert text.count("[图片内容: 一只猫]") == 2
+    assert provider.calls == 1
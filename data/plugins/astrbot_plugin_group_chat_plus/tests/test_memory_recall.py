@@ -0,0 +1,151 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("pypinyin")
+
+from data.plugins.astrbot_plugin_group_chat_plus.utils.memory_injector import (  # noqa: E402
+    MemoryInjector,
+)
+from data.plugins.astrbot_plugin_group_chat_plus.utils.memory_recall import (  # noqa: E402
+    MemoryRecall,
+)
+
+
+class Backend:
+    """替代 MemoryInjector.get_memories：记录调用并按需延迟返回"""
+
+    def __init__(self, latency=0.0, result="记忆"):
+        self.latency = latency
+        self.result = result
+        self.calls = []
+
+    async def __call__(self, context, event, mode="legacy", top_k=5):
+        self.calls.append((event.message_str, mode, top_k))
+        await asyncio.sleep(self.latency)
+        if isinstance(self.result, Exception):
+            raise self.result
+        return self.result
+
+
+def make_event(text="你好", origin="qq:GroupMessage:1"):
+    return SimpleNamespace(message_str=text, unified_msg_origin=origin)
+
+
+@pytest.fixture
+def backend(monkeypatch):
+    backend = Backend()
+    monkeypatch.setattr(MemoryInjector, "get_memories", backend)
+    monkeypatch.setattr(MemoryInjector, "get_persona_id", lambda context, session_id: "猫娘")
+    monkeypatch.setattr(MemoryRecall, "CACHE_SIZE", 256)
+    MemoryRecall.initialize({"memory_recall_cache_ttl": 60, "memory_recall_deadline": 0.05})
+    return backend
+
+
+def test_deadline_returns_none_and_caches_late_result(backend):
+    backend.latency = 0.15
+    event = make_event()
+
+    async def main():
+        first = await MemoryRecall.recall(None, event)
+        await asyncio.sleep(0.2)  # 等待迟到的结果写入缓存
+        second = await MemoryRecall.recall(None, event)
+        return first, second
+
+    assert asyncio.run(main()) == (None, "记忆")
+    assert len(backend.calls) == 1
+    metrics = MemoryRecall.get_metrics()
+    assert metrics["timeouts"] == 1
+    assert metrics["late_cached"] == 1
+    assert metrics["cache_hits"] == 1
+    assert metrics["inflight"] == 0
+
+
+def test_result_within_deadline_is_not_counted_late(backend):
+    backend.latency = 0.01
+
+    assert asyncio.run(MemoryRecall.recall(None, make_event())) == "记忆"
+    metrics = MemoryRecall.get_metrics()
+    assert (metrics["timeouts"], metrics["late_cached"]) == (0, 0)
+
+
+def test_late_failure_is_not_cached(backend):
+    backend.latency = 0.1
+    backend.result = RuntimeError("记忆插件挂了")
+
+    async def main():
+        first = await MemoryRecall.recall(None, make_event())
+        await asyncio.sleep(0.15)
+        return first
+
+    assert asyncio.run(main()) is None
+    metrics = MemoryRecall.get_metrics()
+    assert (metrics["failures"], metrics["late_cached"], metrics["cache_size"]) == (1, 0, 0)
+    assert MemoryRecall._late_keys == set()
+
+
+def test_concurrent_recalls_join_one_backend_call(backend):
+    backend.latency = 0.03
+    MemoryRecall.DEADLINE = 1.0
+
+    async def main():
+        return await asyncio.gather(*(MemoryRecall.recall(None, make_event()) for _ in range(4)))
+
+    assert asyncio.run(main()) == ["记忆"] * 4
+    assert len(backend.calls) == 1
+    assert MemoryRecall.get_metrics()["joined"] == 3
+
+
+def test_prefetch_is_joined_by_recall(backend):
+    backend.latency = 0.03
+    MemoryRecall.DEADLINE = 1.0
+
+    async def main():
+        MemoryRecall.prefetch(None, make_event())
+        MemoryRecall.prefetch(None, make_event())  # 进行中时不重复发起
+        return await MemoryRecall.recall(None, make_event())
+
+    assert asyncio.run(main()) == "记忆"
+    assert len(backend.calls) == 1
+    metrics = MemoryRecall.get_metrics()
+    assert (metrics["prefetches"], metrics["joined"], metrics["requests"]) == (1, 1, 1)
+
+
+def test_livingmemory_key_normalises_query_text(backend):
+    key = MemoryRecall.make_key(None, make_event("  Hello\n\tWorld  "), "livingmemory", 5)
+    assert key == ("livingmemory", "qq:GroupMessage:1", "猫娘", 5, "hello world")
+    assert key == MemoryRecall.make_key(None, make_event("hello   WORLD"), "livingmemory", 5)
+    assert key != MemoryRecall.make_key(None, make_event("hello world"), "livingmemory", 3)
+    assert key != MemoryRecall.make_key(
+        None, make_event("hello world", "qq:GroupMessage:2"), "livingmemory", 5
+    )
+
+    long_text = "前缀" + "字" * MemoryRecall.QUERY_WINDOW
+    assert MemoryRecall.make_key(None, make_event(long_text), "livingmemory", 5)[-1] == (
+        "字" * MemoryRecall.QUERY_WINDOW
+    )
+
+
+def test_legacy_key_ignores_query_text(backend):
+    assert MemoryRecall.make_key(None, make_event("第一句"), "legacy", 5) == MemoryRecall.make_key(
+        None, make_event("第二句"), "legacy", 5
+    )
+
+    async def main():
+        await MemoryRecall.recall(None, make_event("第一句"))
+        return await MemoryRecall.recall(None, make_event("第二句"))
+
+    assert asyncio.run(main()) == "记忆"
+    assert len(backend.calls) == 1
+
+
+def test_normalised_queries_share_cache_entry(backend):
+    async def main():
+        await MemoryRecall.recall(None, make_event("今天 吃什么"), mode="livingmemory")
+        return await MemoryRecall.recall(None, make_event("今天\n吃什么 "), mode="livingmemory")
+
+    assert asyncio.run(main()) == "记忆"
+    assert len(backend.calls) == 1
+    assert MemoryRecall.get_metrics()["cache_hits"] == 1
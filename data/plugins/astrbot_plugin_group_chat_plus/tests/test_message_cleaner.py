@@ -0,0 +1,141 @@
+import random
+import re
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("pypinyin")
+
+from data.plugins.astrbot_plugin_group_chat_plus.utils.message_cleaner import (  # noqa: E402
+    MessageCleaner,
+)
+from data.plugins.astrbot_plugin_group_chat_plus.utils.text_matcher import (  # noqa: E402
+    AhoCorasick,
+    KeywordMatcher,
+)
+
+
+def legacy_clean(message_text):
+    """预编译之前的实现：逐条 re.sub"""
+    if not message_text:
+        return message_text
+    cleaned = message_text
+    for pattern in MessageCleaner.AT_MESSAGE_PROMPT_PATTERNS:
+        cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL)
+    for pattern in MessageCleaner.DECISION_AI_PROMPT_PATTERNS:
+        cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL)
+    cleaned = re.sub(r"\n*=+\n*", "\n", cleaned)
+    cleaned = re.sub(r"\n\s*\n\s*\n", "\n\n", cleaned)
+    return cleaned.strip()
+
+
+def legacy_is_proactive(message_text):
+    if not message_text:
+        return False
+    if MessageCleaner.PROACTIVE_CHAT_MARKER in message_text:
+        return True
+    return any(re.search(p, message_text) for p in MessageCleaner.PROACTIVE_CHAT_PROMPT_PATTERNS)
+
+
+CHAT_LINES = [
+    "今天吃什么",
+    "哈哈哈哈笑死我了",
+    "有人打游戏吗",
+    "[图片]",
+    "[At:123456] 在吗",
+    "1 + 1 = 2",
+    "a == b",
+    "=====",
+    "",
+    "   ",
+    "ok\n\n\n\nfine",
+    "[Poke:poke]",
+    "请开始回复：",
+]
+PROMPT_FRAGMENTS = [
+    "\n[系统提示]注意,现在有人在直接@你并且给你发送了这条消息，@你的那个人是小明(ID:10001)",
+    "\n[系统提示]注意，你看到了这条消息，发送这条消息的人是小红",
+    "\n[戳一戳提示]有人在戳你，戳你的人是阿强",
+    "\n[戳过对方提示]你刚刚戳过这条消息的发送者",
+    "[当前时间:2025-01-02 03:04:05]",
+    "[User ID: 42, Nickname: 路人]",
+    "[当前情绪状态: 开心]",
+    "注意，你正在社交媒体上中与用户进行聊天，不要输出其他任何东西",
+    "\n\n=== 背景信息 ===\n💭 相关记忆：\n- 喜欢猫\n... 还有 3 条记忆",
+    "\n\n=== 历史消息上下文 ===\n张三: 早\n=== 当前新消息 ===\n",
+    "\n当前和你对话的人是 小明（ID:10001），不是其他人\n",
+    "\n核心原则（重要！）：\n1. 自然\n2. 简短\n请开始回复",
+    "\n回复要求：别太长\n请开始回复：",
+    "\n=== 可用工具列表 ===\n- search\n当前平台共有 3 个可用工具:\n请根据上述对话",
+    "\n(这些信息可能对理解当前对话有帮助，按需使用)",
+    "\n用户补充说明: 语气轻松一点",
+    "\n请特别注意：不要复读\n\n",
+    "\n[🎯主动发起新话题]",
+    "\n你刚刚主动发起了一个新话题",
+    "\n[PROACTIVE_CHAT]",
+]
+
+
+def make_chat(seed, size):
+    """普通聊天为主，约三成消息夹带插件自己追加的系统提示词片段"""
+    rnd = random.Random(seed)
+    messages = []
+    for _ in range(size):
+        parts = [rnd.choice(CHAT_LINES)]
+        if rnd.random() < 0.3:
+            for _ in range(rnd.randint(1, 4)):
+                parts.append(rnd.choice(PROMPT_FRAGMENTS))
+                if rnd.random() < 0.5:
+                    parts.append(rnd.choice(CHAT_LINES))
+        messages.append("".join(parts))
+    return messages
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache():
+    MessageCleaner._clean_cache.clear()
+    yield
+    MessageCleaner._clean_cache.clear()
+
+
+def test_clean_message_matches_legacy_chain():
+    for text in make_chat(seed=1, size=3000):
+        assert MessageCleaner.clean_message(text) == legacy_clean(text), repr(text)
+
+
+def test_preserve_proactive_and_detection_match_legacy():
+    for text in make_chat(seed=2, size=3000):
+        assert MessageCleaner.is_proactive_chat_message(text) == legacy_is_proactive(text), repr(text)
+        assert MessageCleaner.clean_message_preserve_proactive(text) == legacy_clean(text), repr(text)
+
+
+def test_cached_result_is_reused_and_bounded(monkeypatch):
+    monkeypatch.setattr(MessageCleaner, "CLEAN_CACHE_SIZE", 4)
+    text = "在吗\n[系统提示]注意，你看到了这条消息，发送这条消息的人是小红"
+    assert MessageCleaner.clean_message(text) == "在吗"
+    assert MessageCleaner._clean_cache[text] == "在吗"
+    for i in range(10):
+        MessageCleaner.clean_message(f"消息{i}")
+    assert len(MessageCleaner._clean_cache) == 4
+    assert text not in MessageCleaner._clean_cache
+
+
+def test_keyword_matcher_backends_agree_with_substring_search():
+    rnd = random.Random(3)
+    alphabet = "abc猫狗"
+    for size in (5, KeywordMatcher.AUTOMATON_THRESHOLD + 50):
+        keywords = {"".join(rnd.choice(alphabet) for _ in range(rnd.randint(2, 5))) for _ in range(size)}
+        matcher = KeywordMatcher(keywords)
+        assert (matcher._automaton is not None) == (len(matcher.keywords) > KeywordMatcher.AUTOMATON_THRESHOLD)
+        for _ in range(300):
+            text = "".join(rnd.choice(alphabet + " ") for _ in range(rnd.randint(0, 30)))
+            hit = matcher.search(text)
+            if hit is None:
+                assert not any(k in text for k in keywords), text
+            else:
+                assert hit in keywords and hit in text
+
+
+def test_aho_corasick_reports_overlapping_matches():
+    automaton = AhoCorasick(["he", "she", "hers", "his"])
+    assert sorted(automaton.iter_matches("ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
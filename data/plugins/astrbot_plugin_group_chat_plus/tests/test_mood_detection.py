@@ -0,0 +1,123 @@
+import random
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("pypinyin")
+
+from data.plugins.astrbot_plugin_group_chat_plus.utils.mood_tracker import MoodTracker  # noqa: E402
+from data.plugins.astrbot_plugin_group_chat_plus.utils.text_matcher import (  # noqa: E402
+    CategoryKeywordScorer,
+)
+
+
+def legacy_scores(tracker, text):
+    """自动机之前的实现：逐情绪、逐关键词查找所有出现位置，再逐个否定词检查前文"""
+    mood_scores = {}
+    for mood, keywords in tracker.mood_keywords.items():
+        score = 0
+        for keyword in keywords:
+            start = 0
+            while True:
+                pos = text.find(keyword, start)
+                if pos == -1:
+                    break
+                negated = False
+                if tracker.enable_negation:
+                    context_before = text[max(0, pos - tracker.negation_check_range) : pos]
+                    negated = any(neg in context_before for neg in tracker.negation_words)
+                if not negated:
+                    score += 1
+                start = pos + 1
+        if score > 0:
+            mood_scores[mood] = score
+    return mood_scores
+
+
+def legacy_detect(tracker, text):
+    scores = legacy_scores(tracker, text)
+    return max(scores, key=scores.get) if scores else None
+
+
+FILLER = "今天下班后去吃饭然后回家看电视哈哈"
+
+
+def make_corpus(rnd, words, size):
+    corpus = []
+    for _ in range(size):
+        parts = []
+        for _ in range(rnd.randint(0, 25)):
+            if rnd.random() < 0.5:
+                parts.append(rnd.choice(words))
+            else:
+                start = rnd.randrange(len(FILLER) - 3)
+                parts.append(FILLER[start : start + rnd.randint(1, 4)])
+        corpus.append("".join(parts))
+    return corpus
+
+
+def big_keywords(tracker):
+    return {
+        mood: list(words) + [f"{mood}{i}" for i in range(80)]
+        for mood, words in tracker.mood_keywords.items()
+    }
+
+
+CONFIGS = {
+    "默认": {},
+    "关闭否定词": {"enable_negation_detection": False},
+    "否定范围2": {"negation_check_range": 2},
+    "否定范围0": {"negation_check_range": 0},
+    "重复与重叠关键词": {
+        "mood_keywords": {
+            "开心": ["哈哈", "哈哈哈", "开心", "开心"],
+            "难过": ["难过", "不开心", "哈"],
+        },
+        "negation_words": ["不", "不是", "没"],
+    },
+}
+
+
+@pytest.mark.parametrize("name", list(CONFIGS) + ["超过自动机阈值"])
+def test_scores_match_legacy_on_corpus(name):
+    rnd = random.Random(name)
+    if name == "超过自动机阈值":
+        tracker = MoodTracker({})
+        tracker.mood_keywords = big_keywords(tracker)
+    else:
+        tracker = MoodTracker(dict(CONFIGS[name]))
+    scorer = tracker._get_mood_scorer()
+    if name == "超过自动机阈值":
+        assert scorer._automaton is not None
+    else:
+        assert scorer._automaton is None
+
+    words = [k for ws in tracker.mood_keywords.values() for k in ws] + list(tracker.negation_words)
+    for text in make_corpus(rnd, words, 2000):
+        assert scorer.score(text) == legacy_scores(tracker, text), text
+        assert tracker._detect_mood_from_text(text) == legacy_detect(tracker, text), text
+
+
+def test_backends_agree_on_negated_hits():
+    categories = {"开心": ["开心", "哈哈"], "难过": ["难过"]}
+    negations = ["不", "没有"]
+    small = CategoryKeywordScorer(categories, negations, 3)
+    big = CategoryKeywordScorer(categories, negations, 3)
+    big._automaton = CategoryKeywordScorer(
+        {**categories, "填充": [f"x{i}" for i in range(300)]}, negations, 3
+    )._automaton
+    for text in ("我不开心哈哈", "没有难过，开心", "不 开心", "开心不", "不不不开心"):
+        small_hits, big_hits = [], []
+        assert small.score(text, small_hits) == big._score_by_automaton(text, big_hits)
+        assert sorted(small_hits) == sorted(big_hits)
+
+
+def test_scorer_is_rebuilt_when_config_changes():
+    tracker = MoodTracker({})
+    first = tracker._get_mood_scorer()
+    assert tracker._get_mood_scorer() is first
+    tracker.negation_check_range = 1
+    second = tracker._get_mood_scorer()
+    assert second is not first
+    tracker.mood_keywords = {"开心": ["耶"]}
+    assert tracker._detect_mood_from_text("耶耶") == "开心"
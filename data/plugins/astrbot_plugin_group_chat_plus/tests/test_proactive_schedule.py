@@ -0,0 +1,103 @@
+import asyncio
+import time
+
+import pytest
+
+pytest.importorskip("astrbot")
+pytest.importorskip("pypinyin")
+
+from data.plugins.astrbot_plugin_group_chat_plus.utils.proactive_chat_manager import (  # noqa: E402
+    ProactiveChatManager,
+)
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    cls = ProactiveChatManager
+    monkeypatch.setattr(cls, "_chat_states", {k: {} for k in ("a", "b", "c", "d")})
+    monkeypatch.setattr(cls, "_schedule_heap", [])
+    monkeypatch.setattr(cls, "_next_check_at", {})
+    monkeypatch.setattr(cls, "_schedule_seq", 0)
+    monkeypatch.setattr(cls, "_temp_probability_boost", {})
+    monkeypatch.setattr(cls, "_is_running", False)
+    monkeypatch.setattr(cls, "_save_states_to_disk", classmethod(lambda c: None))
+    return cls
+
+
+def test_due_chats_pop_in_deadline_order(manager):
+    manager._schedule_check("a", 30.0)
+    manager._schedule_check("b", 10.0)
+    manager._schedule_check("c", 20.0)
+    manager._schedule_check("d", 5.0)
+
+    assert manager._pop_due_chats(4.0) == []
+    assert manager._pop_due_chats(25.0) == ["d", "b", "c"]
+    assert manager._next_check_at == {"a": 30.0}
+    assert manager._pop_due_chats(100.0) == ["a"]
+    assert manager._pop_due_chats(100.0) == []
+
+
+def test_rescheduling_discards_the_stale_deadline(manager):
+    manager._schedule_check("a", 5.0)
+    manager._schedule_check("a", 50.0)
+    manager._schedule_check("b", 40.0)
+    manager._schedule_check("b", 8.0)
+
+    assert manager._pop_due_chats(10.0) == ["b"]
+    assert manager._pop_due_chats(45.0) == []
+    assert manager._pop_due_chats(60.0) == ["a"]
+
+
+def test_mark_dirty_moves_chat_to_now_but_never_later(manager):
+    now = time.time()
+    manager._schedule_check("a", now + 1000)
+    manager._schedule_check("b", now - 10)
+
+    manager.mark_chat_dirty("a")
+    manager.mark_chat_dirty("b")
+    assert manager._next_check_at["a"] <= time.time()
+    assert manager._next_check_at["b"] == now - 10
+    assert manager._pop_due_chats(time.time()) == ["b", "a"]
+
+
+def test_removed_chats_are_not_returned(manager):
+    manager._schedule_check("a", 1.0)
+    manager._schedule_check("gone", 2.0)
+    assert manager._pop_due_chats(10.0) == ["a"]
+
+
+def test_stale_entries_are_compacted(manager):
+    for i in range(500):
+        manager._schedule_check("a", 1000.0 + i)
+    assert manager._pop_due_chats(0.0) == []
+    assert len(manager._schedule_heap) <= 4 * len(manager._next_check_at) + 64
+    assert manager._pop_due_chats(2000.0) == ["a"]
+
+
+def test_background_loop_checks_only_due_chats_in_deadline_order(manager, monkeypatch):
+    now = time.time()
+    manager._schedule_check("a", now + 1000)
+    manager._schedule_check("c", now - 2)
+    manager._schedule_check("b", now - 3)
+    manager._schedule_check("d", now - 1)
+
+    checked = []
+    later = now + 1000
+
+    def compute_next_check(cls, chat_key, config, current):
+        return later if chat_key in checked else current
+
+    async def check_chat(cls, context, config, plugin, chat_key):
+        checked.append(chat_key)
+        if len(checked) == 3:
+            cls._is_running = False
+
+    monkeypatch.setattr(manager, "_compute_next_check", classmethod(compute_next_check))
+    monkeypatch.setattr(manager, "_check_chat", classmethod(check_chat))
+
+    manager._is_running = True
+    asyncio.run(manager._background_check_loop(None, {"proactive_check_interval": 0}, None))
+
+    assert checked == ["b", "c", "d"]
+    # 检查过的群聊按新状态重新登记，未到期的群聊保持原截止时间
+    assert manager._next_check_at == {"a": now + 1000, "b": later, "c": later, "d": later}
@@ -9,10 +9,13 @@
 from .probability_manager import ProbabilityManager
 from .message_processor import MessageProcessor
 from .image_handler import ImageHandler
+from .image_caption_cache import ImageCaptionCache
 from .context_manager import ContextManager
 from .decision_ai import DecisionAI
+from .decision_batcher import DecisionBatcher
 from .reply_handler import ReplyHandler
 from .memory_injector import MemoryInjector
+from .memory_recall import MemoryRecall
 from .tools_reminder import ToolsReminder
 from .keyword_checker import KeywordChecker
 from .message_cleaner import MessageCleaner
@@ -48,10 +51,13 @@ __all__ = [
     "ProbabilityManager",
     "MessageProcessor",
     "ImageHandler",
+    "ImageCaptionCache",
     "ContextManager",
     "DecisionAI",
+    "DecisionBatcher",
     "ReplyHandler",
     "MemoryInjector",
+    "MemoryRecall",
     "ToolsReminder",
     "KeywordChecker",
     "MessageCleaner",
@@ -19,13 +19,16 @@
 
 import time
 import asyncio
+import heapq
 import math
 import json
 import os
 from pathlib import Path
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from astrbot.api.all import *
 
+from .text_matcher import CategoryKeywordScorer
+
 # 详细日志开关（与 main.py 同款方式：单独用 if 控制）
 DEBUG_MODE: bool = False
 
@@ -52,8 +55,10 @@ class AttentionManager:
     # 格式: {
     #   "chat_key": {
     #     "user_123": {
-    #       "attention_score": 0.8,  # 注意力分数 0-1
-    #       "emotion": 0.5,          # 情绪值 -1(负面)到1(正面)
+    #       "attention_score": 0.8,  # last_update 时刻的注意力分数 0-1
+    #       "emotion": 0.5,          # last_update 时刻的情绪值 -1(负面)到1(正面)
+    #       "last_update": timestamp,  # 上面两个值的记录时间（读取时按此闭式衰减）
+    #       "penalty_ref": 0.0,      # 记录时的会话累计扣减量（见 _chat_penalty）
     #       "last_interaction": timestamp,
     #       "interaction_count": 5,
     #       "last_message_preview": "最后一条消息的预览"
@@ -61,6 +66,9 @@ class AttentionManager:
     #   }
     # }
     _attention_map: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    # 会话级"其他用户注意力扣减"累计量: {chat_key: (累计量, 记录时间)}
+    # 与注意力按同一半衰期衰减，回复某个用户时只需累加一次，无需遍历其他用户
+    _chat_penalty: Dict[str, Tuple[float, float]] = {}
     _lock = asyncio.Lock()  # 异步锁
     _storage_path: Optional[Path] = None  # 持久化存储路径
     _initialized: bool = False
@@ -83,6 +91,14 @@ class AttentionManager:
     POSITIVE_EMOTION_BOOST = 0.1  # 正面消息额外提升
     NEGATIVE_EMOTION_DECREASE = 0.15  # 负面消息降低幅度
 
+    # 情感关键词自动机缓存（相关配置变化时重建）
+    _emotion_scorer: Optional[CategoryKeywordScorer] = None
+    _emotion_scorer_source: Optional[tuple] = None
+
+    # 不活跃用户判定（超出追踪上限时优先淘汰）
+    INACTIVE_THRESHOLD = 1800  # 30分钟未互动
+    INACTIVE_ATTENTION_THRESHOLD = 0.05  # 注意力几乎为0
+
     @staticmethod
     def initialize(
         data_dir: Optional[str] = None, config: Optional[Dict[str, Any]] = None
@@ -199,6 +215,7 @@ class AttentionManager:
             with open(AttentionManager._storage_path, "r", encoding="utf-8") as f:
                 data = json.load(f)
                 AttentionManager._attention_map = data
+                AttentionManager._chat_penalty = {}
                 if DEBUG_MODE:
                     logger.info(f"[注意力机制] 已加载 {len(data)} 个会话的注意力数据")
         except Exception as e:
@@ -229,11 +246,16 @@ class AttentionManager:
             # 确保目录存在
             AttentionManager._storage_path.parent.mkdir(parents=True, exist_ok=True)
 
-            # 保存数据
+            # 保存数据（写入当前时刻的衰减值，会话累计扣减量不落盘）
+            snapshot = {
+                chat_key: {
+                    uid: AttentionManager._profile_view(chat_key, profile, current_time)
+                    for uid, profile in chat_users.items()
+                }
+                for chat_key, chat_users in AttentionManager._attention_map.items()
+            }
             with open(AttentionManager._storage_path, "w", encoding="utf-8") as f:
-                json.dump(
-                    AttentionManager._attention_map, f, ensure_ascii=False, indent=2
-                )
+                json.dump(snapshot, f, ensure_ascii=False, indent=2)
 
             AttentionManager._last_save_time = current_time
             if DEBUG_MODE:
@@ -307,58 +329,173 @@ class AttentionManager:
         }
 
     @staticmethod
-    async def _apply_attention_decay(
-        profile: Dict[str, Any], current_time: float
+    def _ensure_chat(chat_key: str) -> Dict[str, Dict[str, Any]]:
+        """获取会话的用户表，不存在时创建（同时丢弃该会话残留的累计扣减量）"""
+        chat_users = AttentionManager._attention_map.get(chat_key)
+        if chat_users is None:
+            chat_users = {}
+            AttentionManager._attention_map[chat_key] = chat_users
+            AttentionManager._chat_penalty.pop(chat_key, None)
+        return chat_users
+
+    @staticmethod
+    def _chat_penalty_at(chat_key: str, current_time: float) -> float:
+        """
+        会话累计扣减量在 current_time 时刻的衰减值
+
+        Args:
+            chat_key: 会话标识
+            current_time: 当前时间戳
+
+        Returns:
+            衰减后的累计扣减量
+        """
+        entry = AttentionManager._chat_penalty.get(chat_key)
+        if entry is None:
+            return 0.0
+        amount, recorded_at = entry
+        return amount * AttentionManager._calculate_decay(
+            current_time - recorded_at, AttentionManager.ATTENTION_DECAY_HALFLIFE
+        )
+
+    @staticmethod
+    def _add_chat_penalty(
+        chat_key: str,
+        amount: float,
+        current_time: float,
+        exclude_profile: Optional[Dict[str, Any]] = None,
     ) -> None:
         """
-        应用注意力和情绪的时间衰减
+        对会话内所有用户记一次注意力扣减（O(1)，读取时才真正扣除）
+
+        Args:
+            chat_key: 会话标识
+            amount: 扣减幅度
+            current_time: 当前时间戳
+            exclude_profile: 不参与本次扣减的用户档案（需已按当前时刻结算）
+        """
+        total = AttentionManager._chat_penalty_at(chat_key, current_time) + amount
+        AttentionManager._chat_penalty[chat_key] = (total, current_time)
+        if exclude_profile is not None:
+            exclude_profile["penalty_ref"] = total
+
+    @staticmethod
+    def _decayed_values(
+        chat_key: str, profile: Dict[str, Any], current_time: float
+    ) -> Tuple[float, float]:
+        """
+        闭式计算用户在 current_time 时刻的注意力与情绪（不修改档案）
+
+        档案保存 last_update 时刻的值，之后回复其他用户产生的扣减记在会话累计量中：
+            注意力 = max(0, 存储值·d - (累计量(now) - penalty_ref·d))，d = 0.5^(Δt/半衰期)
+        衰减和扣减都只会让注意力趋向0，降到0后不会回升，因此与逐次衰减、逐次扣减的结果一致。
 
         Args:
+            chat_key: 会话标识
             profile: 用户档案
             current_time: 当前时间戳
+
+        Returns:
+            (注意力分数, 情绪值)
         """
-        elapsed = current_time - profile.get("last_interaction", current_time)
+        anchor = profile.get(
+            "last_update", profile.get("last_interaction", current_time)
+        )
+        elapsed = current_time - anchor
 
-        # 注意力衰减
+        # 注意力衰减，并扣除记录之后累计的扣减量
         attention_decay = AttentionManager._calculate_decay(
             elapsed, AttentionManager.ATTENTION_DECAY_HALFLIFE
         )
-        profile["attention_score"] *= attention_decay
+        penalty = (
+            AttentionManager._chat_penalty_at(chat_key, current_time)
+            - profile.get("penalty_ref", 0.0) * attention_decay
+        )
+        attention = max(
+            profile.get("attention_score", 0.0) * attention_decay - penalty,
+            AttentionManager.MIN_ATTENTION_SCORE,
+        )
 
         # 情绪衰减（向0中性值）
         emotion_decay = AttentionManager._calculate_decay(
             elapsed, AttentionManager.EMOTION_DECAY_HALFLIFE
         )
-        profile["emotion"] *= emotion_decay
+        emotion = profile.get("emotion", 0.0) * emotion_decay
+        return attention, emotion
 
     @staticmethod
-    def _has_negation_before(text: str, keyword_pos: int) -> bool:
+    async def _apply_attention_decay(
+        chat_key: str, profile: Dict[str, Any], current_time: float
+    ) -> None:
         """
-        检查关键词前是否有否定词（照搬自MoodTracker）
+        将注意力和情绪结算到当前时刻（修改档案前调用）
 
         Args:
-            text: 完整文本
-            keyword_pos: 关键词在文本中的位置
-
-        Returns:
-            如果检测到否定词返回True
+            chat_key: 会话标识
+            profile: 用户档案
+            current_time: 当前时间戳
         """
-        # 提取关键词前的上下文
-        start_pos = max(0, keyword_pos - AttentionManager.NEGATION_CHECK_RANGE)
-        context_before = text[start_pos:keyword_pos]
+        attention, emotion = AttentionManager._decayed_values(
+            chat_key, profile, current_time
+        )
+        profile["attention_score"] = attention
+        profile["emotion"] = emotion
+        profile["last_update"] = current_time
+        profile["penalty_ref"] = AttentionManager._chat_penalty_at(
+            chat_key, current_time
+        )
 
-        # 检查是否包含否定词
-        for neg_word in AttentionManager.NEGATION_WORDS:
-            if neg_word in context_before:
-                return True
+    @staticmethod
+    def _profile_view(
+        chat_key: str, profile: Dict[str, Any], current_time: float
+    ) -> Dict[str, Any]:
+        """返回按当前时刻结算后的档案副本（不修改原档案）"""
+        view = profile.copy()
+        view["attention_score"], view["emotion"] = AttentionManager._decayed_values(
+            chat_key, profile, current_time
+        )
+        view["last_update"] = current_time
+        view["penalty_ref"] = 0.0
+        return view
 
-        return False
+    @staticmethod
+    def _get_emotion_scorer() -> CategoryKeywordScorer:
+        """按当前情感检测配置返回关键词自动机（配置变化时重建）"""
+        source = (
+            AttentionManager.EMOTION_KEYWORDS,
+            AttentionManager.NEGATION_WORDS,
+            AttentionManager.ENABLE_NEGATION,
+            AttentionManager.NEGATION_CHECK_RANGE,
+        )
+        cached = AttentionManager._emotion_scorer_source
+        if (
+            cached is None
+            or source[0] is not cached[0]
+            or source[1] is not cached[1]
+            or source[2:] != cached[2:]
+        ):
+            keywords = AttentionManager.EMOTION_KEYWORDS
+            if not isinstance(keywords, dict):
+                keywords = {}
+            AttentionManager._emotion_scorer = CategoryKeywordScorer(
+                {t: keywords.get(t) for t in ("正面", "负面")},
+                (
+                    AttentionManager.NEGATION_WORDS
+                    if AttentionManager.ENABLE_NEGATION
+                    else ()
+                ),
+                AttentionManager.NEGATION_CHECK_RANGE,
+            )
+            AttentionManager._emotion_scorer_source = source
+        return AttentionManager._emotion_scorer
 
     @staticmethod
     def _detect_emotion_from_message(message_text: str) -> Optional[str]:
         """
         从消息文本中检测情感（正面/负面/中性）
 
+        关键词与否定词合并为一个预编译自动机，只扫描一遍，耗时与关键词数量无关
+
         Args:
             message_text: 要分析的消息文本
 
@@ -371,41 +508,16 @@ class AttentionManager:
         if not message_text:
             return None
 
-        # 统计正面和负面关键词的得分
-        emotion_scores = {"正面": 0, "负面": 0}
-
-        for emotion_type, keywords in AttentionManager.EMOTION_KEYWORDS.items():
-            if emotion_type not in ["正面", "负面"]:
-                continue
-
-            score = 0
-            for keyword in keywords:
-                # 查找所有该关键词的出现位置
-                start = 0
-                while True:
-                    pos = message_text.find(keyword, start)
-                    if pos == -1:
-                        break
-
-                    # 如果启用了否定词检测，检查前面是否有否定词
-                    if (
-                        AttentionManager.ENABLE_NEGATION
-                        and AttentionManager._has_negation_before(message_text, pos)
-                    ):
-                        # 检测到否定词，跳过这个关键词
-                        if DEBUG_MODE:
-                            logger.info(
-                                f"[注意力机制-情感检测] 检测到否定词，忽略关键词 '{keyword}' "
-                                f"(位置: {pos})"
-                            )
-                    else:
-                        # 没有否定词，正常计分
-                        score += 1
-
-                    start = pos + 1
-
-            if score > 0:
-                emotion_scores[emotion_type] = score
+        # 统计正面和负面关键词的得分（关键词的每次出现都计分，含重叠；
+        # 关键词前 NEGATION_CHECK_RANGE 个字内出现否定词则不计分）
+        negated = [] if DEBUG_MODE else None
+        scores = AttentionManager._get_emotion_scorer().score(message_text, negated)
+        for pos, keyword in negated or ():
+            logger.info(
+                f"[注意力机制-情感检测] 检测到否定词，忽略关键词 '{keyword}' "
+                f"(位置: {pos})"
+            )
+        emotion_scores = {"正面": scores.get("正面", 0), "负面": scores.get("负面", 0)}
 
         # 如果没有检测到任何情感关键词，返回None（中性）
         if emotion_scores["正面"] == 0 and emotion_scores["负面"] == 0:
@@ -429,47 +541,62 @@ class AttentionManager:
             return None
 
     @staticmethod
-    async def _cleanup_inactive_users(
-        chat_users: Dict[str, Dict[str, Any]], current_time: float
+    def _evict_overflow_users(
+        chat_key: str,
+        chat_users: Dict[str, Dict[str, Any]],
+        current_time: float,
+        keep_user_id: Optional[str] = None,
     ) -> int:
         """
-        清理长时间未互动且注意力极低的用户
+        用户数超过 MAX_TRACKED_USERS 时淘汰优先级最低的用户
 
-        清理条件：
-        1. 注意力分数 < 0.05 (几乎为0)
-        2. 超过 30分钟 未互动
+        用户表始终被限制在上限以内，单次淘汰代价与群内累计出现过的人数无关。
+        淘汰顺序：长时间未互动且注意力极低的用户 → 注意力最低 → 最久未互动
 
         Args:
+            chat_key: 会话标识
             chat_users: 用户字典
             current_time: 当前时间戳
+            keep_user_id: 不参与淘汰的用户ID（刚被回复的用户）
 
         Returns:
-            清理的用户数量
+            淘汰的用户数量
         """
-        INACTIVE_THRESHOLD = 1800  # 30分钟
-        ATTENTION_THRESHOLD = 0.05  # 注意力阈值
+        overflow = len(chat_users) - max(1, AttentionManager.MAX_TRACKED_USERS)
+        if overflow <= 0:
+            return 0
 
-        to_remove = []
+        candidates = []
         for user_id, profile in chat_users.items():
-            elapsed = current_time - profile.get("last_interaction", current_time)
-            attention = profile.get("attention_score", 0.0)
-
-            # 满足清理条件：长时间未互动 且 注意力极低
-            if elapsed > INACTIVE_THRESHOLD and attention < ATTENTION_THRESHOLD:
-                to_remove.append(
-                    (user_id, profile.get("user_name", "unknown"), attention, elapsed)
-                )
+            if user_id == keep_user_id:
+                continue
+            attention, _ = AttentionManager._decayed_values(
+                chat_key, profile, current_time
+            )
+            last_interaction = profile.get("last_interaction", current_time)
+            inactive = (
+                current_time - last_interaction > AttentionManager.INACTIVE_THRESHOLD
+                and attention < AttentionManager.INACTIVE_ATTENTION_THRESHOLD
+            )
+            candidates.append((not inactive, attention, last_interaction, user_id))
 
-        # 执行清理
         removed_count = 0
-        for user_id, user_name, attention, elapsed in to_remove:
-            del chat_users[user_id]
+        for active, attention, last_interaction, user_id in heapq.nsmallest(
+            overflow, candidates
+        ):
+            removed_name = chat_users.pop(user_id).get("user_name", "unknown")
             removed_count += 1
-
-            logger.info(
-                f"[注意力机制-清理] 移除不活跃用户: {user_name}(ID:{user_id}), "
-                f"注意力={attention:.3f}, 未互动{elapsed / 60:.1f}分钟"
-            )
+            if not active:
+                logger.info(
+                    f"[注意力机制-清理] 移除不活跃用户: {removed_name}(ID:{user_id}), "
+                    f"注意力={attention:.3f}, "
+                    f"未互动{(current_time - last_interaction) / 60:.1f}分钟"
+                )
+            elif DEBUG_MODE:
+                logger.info(
+                    f"[注意力机制] 移除低优先级用户: {removed_name}(ID:{user_id}), "
+                    f"注意力={attention:.3f}"
+                )
 
         return removed_count
 
@@ -508,10 +635,7 @@ class AttentionManager:
 
         async with AttentionManager._lock:
             # 初始化chat_key
-            if chat_key not in AttentionManager._attention_map:
-                AttentionManager._attention_map[chat_key] = {}
-
-            chat_users = AttentionManager._attention_map[chat_key]
+            chat_users = AttentionManager._ensure_chat(chat_key)
 
             # 获取或创建用户档案
             if user_id not in chat_users:
@@ -522,7 +646,9 @@ class AttentionManager:
             profile = chat_users[user_id]
 
             # 应用衰减（更新前先衰减）
-            await AttentionManager._apply_attention_decay(profile, current_time)
+            await AttentionManager._apply_attention_decay(
+                chat_key, profile, current_time
+            )
 
             # 提升注意力（渐进式，使用配置的增加幅度）
             old_attention = profile["attention_score"]
@@ -567,43 +693,19 @@ class AttentionManager:
                 profile["last_message_preview"] = message_preview[:50]
 
             # 降低其他用户的注意力（使用配置的减少幅度）
-            for other_user_id, other_profile in chat_users.items():
-                if other_user_id != user_id:
-                    await AttentionManager._apply_attention_decay(
-                        other_profile, current_time
-                    )
-                    other_profile["attention_score"] = max(
-                        other_profile["attention_score"] - attention_decrease_step,
-                        AttentionManager.MIN_ATTENTION_SCORE,
-                    )
-
-            # 智能清理：移除注意力极低且长时间未互动的用户
-            await AttentionManager._cleanup_inactive_users(chat_users, current_time)
-
-            # 如果还是超过限制，按优先级移除
-            if len(chat_users) > AttentionManager.MAX_TRACKED_USERS:
-                # 综合排序：注意力分数和最后互动时间
-                # 注意力越低、时间越久远 → 优先级越低
-                sorted_users = sorted(
-                    chat_users.items(),
-                    key=lambda x: (
-                        x[1]["attention_score"] + 0.0001,  # 避免除零
-                        x[1]["last_interaction"],
-                    ),
+            # 记入会话累计扣减量，读取其他用户时再闭式扣除，不逐个遍历
+            if attention_decrease_step > 0:
+                AttentionManager._add_chat_penalty(
+                    chat_key,
+                    attention_decrease_step,
+                    current_time,
+                    exclude_profile=profile,
                 )
-                # 移除最低优先级的用户
-                to_remove_count = len(chat_users) - AttentionManager.MAX_TRACKED_USERS
-                for i in range(to_remove_count):
-                    removed_user_id = sorted_users[i][0]
-                    removed_name = chat_users[removed_user_id].get(
-                        "user_name", "unknown"
-                    )
-                    del chat_users[removed_user_id]
-                    if DEBUG_MODE:
-                        logger.info(
-                            f"[注意力机制] 移除低优先级用户: {removed_name}(ID:{removed_user_id}), "
-                            f"注意力={sorted_users[i][1]['attention_score']:.3f}"
-                        )
+
+            # 超过追踪上限时淘汰优先级最低的用户
+            AttentionManager._evict_overflow_users(
+                chat_key, chat_users, current_time, keep_user_id=user_id
+            )
 
             logger.info(
                 f"[注意力机制-增强] 会话 {chat_key} - 回复 {user_name}(ID:{user_id}), "
@@ -724,6 +826,20 @@ class AttentionManager:
 
             chat_users = AttentionManager._attention_map[chat_key]
 
+            # 清理长时间未互动的档案（超过 attention_duration * 3）
+            # 只检查当前用户，其余用户在被读取或超出追踪上限时处理
+            stale_profile = chat_users.get(current_user_id)
+            if stale_profile is not None and stale_profile.get(
+                "last_interaction", 0
+            ) < current_time - (attention_duration * 3):
+                del chat_users[current_user_id]
+                if DEBUG_MODE:
+                    logger.info(
+                        f"[注意力机制-增强] 清理长时间未互动用户: {current_user_id}"
+                    )
+                # 清理后保存
+                await AttentionManager._auto_save_if_needed()
+
             # 如果当前用户没有档案，检查是否有戳一戳增值
             if current_user_id not in chat_users:
                 if poke_boost_reference > 0:
@@ -746,27 +862,10 @@ class AttentionManager:
 
             profile = chat_users[current_user_id]
 
-            # 应用时间衰减
-            await AttentionManager._apply_attention_decay(profile, current_time)
-
-            # 清理长时间未互动的用户（超过 attention_duration * 3）
-            cleanup_threshold = current_time - (attention_duration * 3)
-            users_to_remove = [
-                uid
-                for uid, prof in chat_users.items()
-                if prof.get("last_interaction", 0) < cleanup_threshold
-            ]
-            if users_to_remove:
-                for uid in users_to_remove:
-                    del chat_users[uid]
-                    if DEBUG_MODE:
-                        logger.info(f"[注意力机制-增强] 清理长时间未互动用户: {uid}")
-                # 清理后保存
-                await AttentionManager._auto_save_if_needed()
-
-            # 获取注意力分数和情绪
-            attention_score = profile.get("attention_score", 0.0)
-            emotion = profile.get("emotion", 0.0)
+            # 获取注意力分数和情绪（闭式计算时间衰减，不修改档案）
+            attention_score, emotion = AttentionManager._decayed_values(
+                chat_key, profile, current_time
+            )
             last_interaction = profile.get("last_interaction", current_time)
             elapsed = current_time - last_interaction
 
@@ -936,6 +1035,7 @@ class AttentionManager:
             注意力信息字典，如果没有记录则返回None
         """
         chat_key = AttentionManager.get_chat_key(platform_name, is_private, chat_id)
+        current_time = time.time()
 
         async with AttentionManager._lock:
             if chat_key not in AttentionManager._attention_map:
@@ -944,11 +1044,17 @@ class AttentionManager:
             chat_users = AttentionManager._attention_map[chat_key]
 
             if user_id:
-                # 返回特定用户
-                return chat_users.get(user_id, None)
+                # 返回特定用户（按当前时刻结算后的副本）
+                profile = chat_users.get(user_id, None)
+                if profile is None:
+                    return None
+                return AttentionManager._profile_view(chat_key, profile, current_time)
             else:
-                # 返回所有用户（深拷贝）
-                return {uid: profile.copy() for uid, profile in chat_users.items()}
+                # 返回所有用户（拷贝）
+                return {
+                    uid: AttentionManager._profile_view(chat_key, profile, current_time)
+                    for uid, profile in chat_users.items()
+                }
 
     # ========== 扩展接口（供未来功能使用） ==========
 
@@ -978,20 +1084,22 @@ class AttentionManager:
         current_time = time.time()
 
         async with AttentionManager._lock:
-            if chat_key not in AttentionManager._attention_map:
-                AttentionManager._attention_map[chat_key] = {}
-
-            chat_users = AttentionManager._attention_map[chat_key]
+            chat_users = AttentionManager._ensure_chat(chat_key)
 
             if user_id not in chat_users:
                 chat_users[user_id] = await AttentionManager._init_user_profile(
                     user_id, user_name
                 )
+                AttentionManager._evict_overflow_users(
+                    chat_key, chat_users, current_time, keep_user_id=user_id
+                )
 
             profile = chat_users[user_id]
 
             # 应用衰减
-            await AttentionManager._apply_attention_decay(profile, current_time)
+            await AttentionManager._apply_attention_decay(
+                chat_key, profile, current_time
+            )
 
             # 更新情绪
             old_emotion = profile["emotion"]
@@ -1052,20 +1160,22 @@ class AttentionManager:
         current_time = time.time()
 
         async with AttentionManager._lock:
-            if chat_key not in AttentionManager._attention_map:
-                AttentionManager._attention_map[chat_key] = {}
-
-            chat_users = AttentionManager._attention_map[chat_key]
+            chat_users = AttentionManager._ensure_chat(chat_key)
 
             if user_id not in chat_users:
                 chat_users[user_id] = await AttentionManager._init_user_profile(
                     user_id, user_name
                 )
+                AttentionManager._evict_overflow_users(
+                    chat_key, chat_users, current_time, keep_user_id=user_id
+                )
 
             profile = chat_users[user_id]
 
             # 应用衰减
-            await AttentionManager._apply_attention_decay(profile, current_time)
+            await AttentionManager._apply_attention_decay(
+                chat_key, profile, current_time
+            )
 
             # 更新注意力
             if attention_delta != 0.0:
@@ -1120,11 +1230,11 @@ class AttentionManager:
 
             chat_users = AttentionManager._attention_map[chat_key]
 
-            # 应用衰减并排序
-            user_list = []
-            for user_id, profile in chat_users.items():
-                await AttentionManager._apply_attention_decay(profile, current_time)
-                user_list.append(profile.copy())
+            # 按当前时刻结算（不修改档案）并排序
+            user_list = [
+                AttentionManager._profile_view(chat_key, profile, current_time)
+                for profile in chat_users.values()
+            ]
 
             # 按注意力分数降序排序
             user_list.sort(key=lambda x: x.get("attention_score", 0.0), reverse=True)
@@ -1181,7 +1291,9 @@ class AttentionManager:
             profile = chat_users[user_id]
 
             # 应用时间衰减（先应用自然衰减）
-            await AttentionManager._apply_attention_decay(profile, current_time)
+            await AttentionManager._apply_attention_decay(
+                chat_key, profile, current_time
+            )
 
             # 获取当前注意力分数
             current_attention = profile.get("attention_score", 0.0)
@@ -10,6 +10,7 @@ import asyncio
 from typing import List, Optional
 from astrbot.api.all import *
 from .ai_response_filter import AIResponseFilter
+from .decision_batcher import DecisionBatcher
 
 # 详细日志开关（与 main.py 同款方式：单独用 if 控制）
 DEBUG_MODE: bool = False
@@ -164,6 +165,10 @@ class DecisionAI:
         """
         调用AI判断是否应该回复
 
+        判断经由 DecisionBatcher 调度：同一会话防抖窗口内的多条消息只判断最新一条，
+        相同的近期上下文复用缓存判定，并受会话/全局并发上限约束。
+        被新消息取代的请求返回 False，并在 event 上标记 _gcp_decision_superseded。
+
         Args:
             context: Context对象
             event: 消息事件
@@ -177,6 +182,75 @@ class DecisionAI:
         Returns:
             True=应该回复，False=不回复
         """
+        try:
+            chat_key = str(event.unified_msg_origin)
+            cache_key = DecisionBatcher.make_cache_key(
+                chat_key,
+                formatted_message,
+                provider_id,
+                prompt_mode,
+                extra_prompt,
+                is_proactive_reply,
+                event.get_sender_id() if include_sender_info else "",
+                "|".join(image_urls or []),
+            )
+        except Exception as e:
+            logger.error(f"构建决策调度键失败: {e}")
+            return False
+
+        decision, source = await DecisionBatcher.decide(
+            chat_key,
+            cache_key,
+            lambda: DecisionAI._request_decision(
+                context,
+                event,
+                formatted_message,
+                provider_id,
+                extra_prompt,
+                timeout,
+                prompt_mode,
+                image_urls,
+                is_proactive_reply,
+                config,
+                include_sender_info,
+            ),
+        )
+
+        if source == DecisionBatcher.SOURCE_SUPERSEDED:
+            logger.info("决策AI判断: 该消息已被同会话的新消息取代，合并为一次判断")
+            try:
+                setattr(event, "_gcp_decision_superseded", True)
+            except Exception:
+                pass
+        elif source == DecisionBatcher.SOURCE_CACHE:
+            logger.info(
+                f"决策AI判断: 命中判定缓存 ({'yes' if decision else 'no'})，跳过AI调用"
+            )
+        if DEBUG_MODE:
+            logger.info(f"[决策调度] {DecisionBatcher.format_metrics()}")
+
+        return bool(decision)
+
+    @staticmethod
+    async def _request_decision(
+        context: Context,
+        event: AstrMessageEvent,
+        formatted_message: str,
+        provider_id: str,
+        extra_prompt: str,
+        timeout: int = 30,
+        prompt_mode: str = "append",
+        image_urls: Optional[List[str]] = None,
+        is_proactive_reply: bool = False,
+        config: dict = None,
+        include_sender_info: bool = True,
+    ) -> bool:
+        """
+        实际调用决策AI（不经调度）
+
+        Returns:
+            True=应该回复，False=不回复，None=调用失败（超时/出错/无提供商，不缓存）
+        """
         try:
             # 获取AI提供商
             if provider_id:
@@ -189,7 +263,7 @@ class DecisionAI:
 
             if not provider:
                 logger.error("无法获取AI提供商")
-                return False
+                return None
 
             # 🔧 修复：直接使用 persona_manager 获取最新人格配置，支持多会话和实时更新
             try:
@@ -223,6 +297,8 @@ class DecisionAI:
             # 🆕 提取当前发送者信息，用于强化识别（仅在开启 include_sender_info 时添加）
             sender_emphasis = ""
             separator = "=" * 60
+            sender_id = event.get_sender_id()
+            sender_name = event.get_sender_name()
 
             # 🆕 v1.2.0: 如果是主动对话后的回复，添加上下文说明
             proactive_hint = ""
@@ -259,8 +335,6 @@ class DecisionAI:
                 )
 
             if include_sender_info:
-                sender_id = event.get_sender_id()
-                sender_name = event.get_sender_name()
                 if sender_name:
                     sender_emphasis = (
                         f"\n\n{separator}\n"
@@ -353,10 +427,10 @@ class DecisionAI:
             logger.warning(
                 f"决策AI调用超时（超过 {timeout} 秒），默认不回复，可在配置中调整 decision_ai_timeout 参数"
             )
-            return False
+            return None
         except Exception as e:
             logger.error(f"调用决策AI时发生错误: {e}")
-            return False
+            return None
 
     @staticmethod
     async def call_decision_ai(
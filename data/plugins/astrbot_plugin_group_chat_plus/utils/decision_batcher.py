@@ -0,0 +1,265 @@
+"""
+决策调度模块
+负责合并、缓存并限流读空气AI的判断调用
+
+群聊刷屏时（例如10秒内15条消息），逐条调用决策AI会产生大量上下文几乎相同的判断请求。
+本模块在调用决策AI之前做三件事：
+1. 防抖合并：会话内没有其他待处理消息时立即判断；突发期间后到的消息才等待防抖窗口，
+   窗口内的多条候选消息只对最新一条做判断，较早的请求（包括已在进行中的调用）
+   会被取消，视为"已被新消息取代"
+2. 判定缓存：以"裁剪后的近期上下文 + 判断参数"的哈希为键缓存判定结果
+3. 并发上限：限制单个会话和全局同时进行的决策调用数量
+
+作者: Him666233
+版本: v1.1.2
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from astrbot.api.all import *
+
+# 详细日志开关（与 main.py 同款方式：单独用 if 控制）
+DEBUG_MODE: bool = False
+
+
+class _ChatDecisionState:
+    """单个会话的调度状态（没有等待者时即被回收）"""
+
+    __slots__ = ("generation", "waiters", "inflight", "semaphore")
+
+    def __init__(self, per_chat_limit: int):
+        self.generation = 0  # 每来一条候选消息 +1，用于判断请求是否已过时
+        self.waiters = 0
+        self.inflight: Optional[asyncio.Task] = None
+        self.semaphore = asyncio.Semaphore(per_chat_limit)
+
+
+class DecisionBatcher:
+    """
+    决策调度器
+
+    主要功能：
+    1. 会话级防抖，合并突发消息为一次判断（只判断最新状态）
+    2. 判定结果的 LRU + TTL 缓存
+    3. 会话级与全局并发上限
+    4. 统计调用量与节省的调用数
+    """
+
+    # 默认配置（initialize 时按插件配置覆盖）
+    ENABLED: bool = True
+    DEBOUNCE_WINDOW: float = 1.0  # 防抖窗口（秒）
+    CACHE_TTL: float = 120.0  # 判定缓存有效期（秒）
+    CACHE_SIZE: int = 256  # 判定缓存条目上限
+    CACHE_CONTEXT_CHARS: int = 2000  # 参与缓存键计算的上下文末尾字符数
+    MAX_CONCURRENCY_PER_CHAT: int = 1
+    MAX_CONCURRENCY_GLOBAL: int = 4
+
+    # 来源标记
+    SOURCE_LLM = "llm"
+    SOURCE_CACHE = "cache"
+    SOURCE_SUPERSEDED = "superseded"
+
+    _chat_states: Dict[str, _ChatDecisionState] = {}
+    _cache: "OrderedDict[str, Tuple[float, bool]]" = OrderedDict()
+    _global_semaphore: asyncio.Semaphore = asyncio.Semaphore(MAX_CONCURRENCY_GLOBAL)
+    _metrics: Dict[str, int] = {
+        "requests": 0,  # 进入调度的判断请求数
+        "decision_calls": 0,  # 实际发起的决策AI调用数
+        "cache_hits": 0,
+        "superseded": 0,  # 被同会话新消息取代而放弃的请求
+        "cancelled_inflight": 0,  # 其中已在调用中途被取消的请求
+        "failed_calls": 0,  # 超时/出错（结果不缓存）
+    }
+
+    @staticmethod
+    def initialize(config: dict):
+        """
+        读取插件配置并重置调度状态
+
+        Args:
+            config: 插件配置字典
+        """
+        cls = DecisionBatcher
+        cls.ENABLED = bool(config.get("decision_batch_enabled", True))
+        cls.DEBOUNCE_WINDOW = max(
+            0.0, float(config.get("decision_debounce_window", 1.0))
+        )
+        cls.CACHE_TTL = max(0.0, float(config.get("decision_cache_ttl", 120)))
+        cls.CACHE_SIZE = max(1, int(config.get("decision_cache_size", 256)))
+        cls.CACHE_CONTEXT_CHARS = max(
+            1, int(config.get("decision_cache_context_chars", 2000))
+        )
+        cls.MAX_CONCURRENCY_PER_CHAT = max(
+            1, int(config.get("decision_max_concurrency_per_chat", 1))
+        )
+        cls.MAX_CONCURRENCY_GLOBAL = max(
+            1, int(config.get("decision_max_concurrency_global", 4))
+        )
+        cls._chat_states = {}
+        cls._cache = OrderedDict()
+        cls._global_semaphore = asyncio.Semaphore(cls.MAX_CONCURRENCY_GLOBAL)
+        for key in cls._metrics:
+            cls._metrics[key] = 0
+        if DEBUG_MODE:
+            logger.info(
+                f"[决策调度] 已初始化: 启用={cls.ENABLED}, 防抖={cls.DEBOUNCE_WINDOW}s, "
+                f"缓存={cls.CACHE_SIZE}条/{cls.CACHE_TTL}s, "
+                f"并发=会话{cls.MAX_CONCURRENCY_PER_CHAT}/全局{cls.MAX_CONCURRENCY_GLOBAL}"
+            )
+
+    @staticmethod
+    def make_cache_key(chat_key: str, formatted_message: str, *params: Any) -> str:
+        """
+        生成判定缓存键
+
+        只取上下文末尾 CACHE_CONTEXT_CHARS 个字符（近期窗口），
+        其余影响判断结果的参数（提供商、提示词、发送者等）一并参与哈希。
+        """
+        window = (formatted_message or "").strip()[
+            -DecisionBatcher.CACHE_CONTEXT_CHARS :
+        ]
+        parts = [chat_key, window]
+        parts.extend("" if p is None else str(p) for p in params)
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------ 缓存
+    @staticmethod
+    def _cache_get(cache_key: str) -> Optional[bool]:
+        cache = DecisionBatcher._cache
+        item = cache.get(cache_key)
+        if item is None:
+            return None
+        expires_at, decision = item
+        if expires_at <= time.monotonic():
+            del cache[cache_key]
+            return None
+        cache.move_to_end(cache_key)
+        return decision
+
+    @staticmethod
+    def _cache_put(cache_key: str, decision: bool) -> None:
+        cls = DecisionBatcher
+        if cls.CACHE_TTL <= 0:
+            return
+        cls._cache[cache_key] = (time.monotonic() + cls.CACHE_TTL, decision)
+        cls._cache.move_to_end(cache_key)
+        while len(cls._cache) > cls.CACHE_SIZE:
+            cls._cache.popitem(last=False)
+
+    # ------------------------------------------------------------------ 调度
+    @staticmethod
+    async def decide(
+        chat_key: str,
+        cache_key: str,
+        compute: Callable[[], Awaitable[Optional[bool]]],
+    ) -> Tuple[Optional[bool], str]:
+        """
+        调度一次判断
+
+        Args:
+            chat_key: 会话标识（同一会话内的请求互相合并）
+            cache_key: 判定缓存键（见 make_cache_key）
+            compute: 实际调用决策AI的协程工厂，失败时返回 None
+
+        Returns:
+            (判定结果, 来源)；来源为 llm / cache / superseded，
+            被取代时判定结果为 None
+        """
+        cls = DecisionBatcher
+        metrics = cls._metrics
+        metrics["requests"] += 1
+
+        if not cls.ENABLED:
+            metrics["decision_calls"] += 1
+            decision = await compute()
+            if decision is None:
+                metrics["failed_calls"] += 1
+            return decision, cls.SOURCE_LLM
+
+        state = cls._chat_states.get(chat_key)
+        if state is None:
+            state = _ChatDecisionState(cls.MAX_CONCURRENCY_PER_CHAT)
+            cls._chat_states[chat_key] = state
+        state.generation += 1
+        my_generation = state.generation
+        state.waiters += 1
+
+        # 新消息到达：进行中的旧判断针对的是过时状态，直接取消
+        if state.inflight is not None and not state.inflight.done():
+            state.inflight.cancel()
+
+        try:
+            # 只有本消息时立即判断；同一会话还有其他待处理消息（突发）时才等待防抖窗口
+            if cls.DEBOUNCE_WINDOW > 0 and state.waiters > 1:
+                await asyncio.sleep(cls.DEBOUNCE_WINDOW)
+            if state.generation != my_generation:
+                metrics["superseded"] += 1
+                return None, cls.SOURCE_SUPERSEDED
+
+            cached = cls._cache_get(cache_key)
+            if cached is not None:
+                metrics["cache_hits"] += 1
+                return cached, cls.SOURCE_CACHE
+
+            async with state.semaphore:
+                async with cls._global_semaphore:
+                    # 排队期间可能已有更新的消息或相同判定写入缓存
+                    if state.generation != my_generation:
+                        metrics["superseded"] += 1
+                        return None, cls.SOURCE_SUPERSEDED
+                    cached = cls._cache_get(cache_key)
+                    if cached is not None:
+                        metrics["cache_hits"] += 1
+                        return cached, cls.SOURCE_CACHE
+
+                    metrics["decision_calls"] += 1
+                    task = asyncio.ensure_future(compute())
+                    state.inflight = task
+                    try:
+                        decision = await task
+                    except asyncio.CancelledError:
+                        # 仅当是被新消息取消时吞掉取消；调用方自身被取消则继续抛出
+                        if task.cancelled() and state.generation != my_generation:
+                            metrics["superseded"] += 1
+                            metrics["cancelled_inflight"] += 1
+                            return None, cls.SOURCE_SUPERSEDED
+                        raise
+                    finally:
+                        if state.inflight is task:
+                            state.inflight = None
+
+            if decision is None:
+                metrics["failed_calls"] += 1
+                return None, cls.SOURCE_LLM
+            cls._cache_put(cache_key, decision)
+            return decision, cls.SOURCE_LLM
+        finally:
+            state.waiters -= 1
+            if state.waiters <= 0 and cls._chat_states.get(chat_key) is state:
+                del cls._chat_states[chat_key]
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """返回调度统计（含节省的调用数）"""
+        cls = DecisionBatcher
+        metrics = dict(cls._metrics)
+        requests = metrics["requests"]
+        saved = max(0, requests - metrics["decision_calls"])
+        metrics["saved_calls"] = saved
+        metrics["saved_ratio"] = (saved / requests) if requests else 0.0
+        metrics["cache_size"] = len(cls._cache)
+        metrics["active_chats"] = len(cls._chat_states)
+        return metrics
+
+    @staticmethod
+    def format_metrics() -> str:
+        m = DecisionBatcher.get_metrics()
+        return (
+            f"判断请求 {m['requests']} 次，实际调用 {m['decision_calls']} 次，"
+            f"节省 {m['saved_calls']} 次（{m['saved_ratio']:.0%}）；"
+            f"缓存命中 {m['cache_hits']}，合并取代 {m['superseded']}"
+            f"（中途取消 {m['cancelled_inflight']}），失败 {m['failed_calls']}"
+        )
@@ -0,0 +1,467 @@
+"""
+图片描述缓存模块
+负责缓存图片转文字的结果，并限制视觉AI的调用并发
+
+热门表情包、截图经常被转发到多个群，每次都重新调用图片转文字AI既慢又费调用次数。
+本模块在调用视觉AI之前做四件事：
+1. 预键查找：先用 QQ 文件ID / 图片URL 查到已知的内容哈希，命中时连图片都不用下载
+2. 内容缓存：按"图片内容 sha256 + 提供商 + 提示词"查找描述，内存 LRU → SQLite 持久化，带有效期
+3. 单飞合并：多个会话同时请求同一张图片时只调用一次视觉AI，其余请求等待同一结果
+4. 并发上限：所有会话的视觉AI调用共享一个有界并发池
+
+作者: Him666233
+版本: v1.1.2
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from astrbot.api.all import *
+
+# 详细日志开关（与 main.py 同款方式：单独用 if 控制）
+DEBUG_MODE: bool = False
+
+
+class ImageCaptionCache:
+    """
+    图片描述缓存
+
+    主要功能：
+    1. 预键（文件ID/URL）→ 内容哈希 的别名表
+    2. 内容哈希 → 图片描述 的 LRU + TTL 缓存（可持久化到 SQLite）
+    3. 同一图片并发请求的单飞合并
+    4. 视觉AI调用的全局并发上限
+    5. 统计命中率与节省的调用耗时
+    """
+
+    # 默认配置（initialize 时按插件配置覆盖）
+    ENABLED: bool = True
+    CACHE_TTL: float = 7 * 86400  # 描述有效期（秒），0 表示不缓存
+    CACHE_SIZE: int = 512  # 内存中的描述条目上限
+    ALIAS_SIZE: int = 2048  # 内存中的预键条目上限
+    PERSIST: bool = True  # 是否持久化到 SQLite
+    MAX_CONCURRENCY: int = 2  # 全局同时进行的视觉AI调用数
+    LOG_INTERVAL: int = 50  # 每处理多少张图片输出一次统计
+    DB_FILENAME = "image_caption_cache.db"
+
+    # 预键长度上限（过长的通常是 base64 数据，不适合作为键）
+    _MAX_PRE_KEY_LENGTH = 512
+
+    _cache: "OrderedDict[str, Tuple[float, str, float]]" = OrderedDict()
+    _aliases: "OrderedDict[str, str]" = OrderedDict()
+    _inflight: Dict[str, asyncio.Future] = {}
+    _semaphore: asyncio.Semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    _db: Optional[sqlite3.Connection] = None
+    _db_lock = threading.Lock()
+    _metrics: Dict[str, float] = {
+        "lookups": 0,  # 处理的图片数
+        "memory_hits": 0,
+        "disk_hits": 0,
+        "pre_key_hits": 0,  # 其中通过预键命中、无需下载图片的次数
+        "coalesced": 0,  # 合并到进行中调用的请求数
+        "vision_calls": 0,  # 实际发起的视觉AI调用数
+        "failed_calls": 0,  # 超时/出错/空结果
+        "saved_seconds": 0.0,  # 缓存命中节省的视觉AI耗时（按原调用耗时计）
+    }
+
+    @staticmethod
+    def initialize(config: dict, data_dir: Optional[str] = None) -> None:
+        """
+        读取插件配置，重置缓存状态并打开持久化存储
+
+        Args:
+            config: 插件配置字典
+            data_dir: 插件数据目录（为空时只使用内存缓存）
+        """
+        cls = ImageCaptionCache
+        cls.ENABLED = bool(config.get("image_caption_cache_enabled", True))
+        cls.CACHE_TTL = max(0.0, float(config.get("image_caption_cache_ttl", 604800)))
+        cls.CACHE_SIZE = max(1, int(config.get("image_caption_cache_size", 512)))
+        cls.ALIAS_SIZE = cls.CACHE_SIZE * 4
+        cls.PERSIST = bool(config.get("image_caption_cache_persist", True))
+        cls.MAX_CONCURRENCY = max(
+            1, int(config.get("image_to_text_max_concurrency", 2))
+        )
+        cls._cache = OrderedDict()
+        cls._aliases = OrderedDict()
+        cls._inflight = {}
+        cls._semaphore = asyncio.Semaphore(cls.MAX_CONCURRENCY)
+        for key in cls._metrics:
+            cls._metrics[key] = 0
+        cls.close()
+        if cls.ENABLED and cls.PERSIST and cls.CACHE_TTL > 0 and data_dir:
+            cls._open_db(Path(data_dir) / cls.DB_FILENAME)
+        if DEBUG_MODE:
+            logger.info(
+                f"[图片描述缓存] 已初始化: 启用={cls.ENABLED}, "
+                f"缓存={cls.CACHE_SIZE}条/{cls.CACHE_TTL:.0f}s, "
+                f"持久化={'是' if cls._db is not None else '否'}, "
+                f"视觉AI并发={cls.MAX_CONCURRENCY}"
+            )
+
+    @staticmethod
+    def _open_db(db_path: Path) -> None:
+        """打开（必要时创建）SQLite 存储并清理过期记录"""
+        cls = ImageCaptionCache
+        try:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(str(db_path), check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS captions ("
+                "key TEXT PRIMARY KEY, caption TEXT NOT NULL, "
+                "latency REAL NOT NULL, created_at REAL NOT NULL)"
+            )
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS aliases ("
+                "pre_key TEXT PRIMARY KEY, content_hash TEXT NOT NULL, "
+                "created_at REAL NOT NULL)"
+            )
+            expire_before = time.time() - cls.CACHE_TTL
+            db.execute("DELETE FROM captions WHERE created_at < ?", (expire_before,))
+            db.execute("DELETE FROM aliases WHERE created_at < ?", (expire_before,))
+            db.commit()
+            cls._db = db
+        except Exception as e:
+            logger.error(f"[图片描述缓存] 打开持久化存储失败: {e}，仅使用内存缓存")
+            cls._db = None
+
+    @staticmethod
+    def close() -> None:
+        """关闭持久化存储"""
+        cls = ImageCaptionCache
+        with cls._db_lock:
+            if cls._db is not None:
+                try:
+                    cls._db.close()
+                except Exception:
+                    pass
+                cls._db = None
+
+    @staticmethod
+    def clear() -> int:
+        """
+        清空内存与持久化中的全部描述（插件重置时调用）
+
+        Returns:
+            清空前内存中的描述条目数
+        """
+        cls = ImageCaptionCache
+        count = len(cls._cache)
+        cls._cache.clear()
+        cls._aliases.clear()
+        with cls._db_lock:
+            if cls._db is not None:
+                try:
+                    cls._db.execute("DELETE FROM captions")
+                    cls._db.execute("DELETE FROM aliases")
+                    cls._db.commit()
+                except Exception as e:
+                    logger.warning(f"[图片描述缓存] 清空持久化存储失败: {e}")
+        return count
+
+    @staticmethod
+    async def _db_call(sql: str, params: tuple, fetch: bool = False) -> Any:
+        """在线程中执行一条 SQL（不阻塞事件循环），出错时返回 None"""
+        cls = ImageCaptionCache
+        if cls._db is None:
+            return None
+
+        def run():
+            with cls._db_lock:
+                if cls._db is None:
+                    return None
+                cursor = cls._db.execute(sql, params)
+                if fetch:
+                    return cursor.fetchone()
+                cls._db.commit()
+                return None
+
+        try:
+            return await asyncio.to_thread(run)
+        except Exception as e:
+            logger.warning(f"[图片描述缓存] 持久化存储读写失败: {e}")
+            return None
+
+    # ------------------------------------------------------------------ 键
+    @staticmethod
+    def make_pre_key(image_component: Any) -> Optional[str]:
+        """
+        从图片组件提取预键（QQ 文件ID 或 http(s) URL）
+
+        本地路径和 base64 数据不作为预键（内容可能变化或过长），返回 None
+        """
+        for attr in ("file_unique", "file", "url"):
+            value = getattr(image_component, attr, None)
+            if not isinstance(value, str):
+                continue
+            value = value.strip()
+            if not value or len(value) > ImageCaptionCache._MAX_PRE_KEY_LENGTH:
+                continue
+            if value.startswith(("base64://", "data:", "file://")) or os.path.isabs(
+                value
+            ):
+                continue
+            return f"{attr}:{value}"
+        return None
+
+    @staticmethod
+    def make_variant(provider_id: str, prompt: str) -> str:
+        """同一张图片在不同提供商/提示词下的描述分开缓存"""
+        raw = f"{provider_id or ''}\x1f{prompt or ''}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+    @staticmethod
+    def _hash_file(image_path: str) -> str:
+        """计算图片内容哈希；不是可读的本地文件时退化为对路径字符串哈希"""
+        path = image_path[7:] if image_path.startswith("file://") else image_path
+        try:
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(1 << 16), b""):
+                    digest.update(chunk)
+            return digest.hexdigest()
+        except OSError:
+            return "ref-" + hashlib.sha256(image_path.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------ 缓存
+    @staticmethod
+    async def _get_alias(pre_key: str) -> Optional[str]:
+        cls = ImageCaptionCache
+        content_hash = cls._aliases.get(pre_key)
+        if content_hash is not None:
+            cls._aliases.move_to_end(pre_key)
+            return content_hash
+        row = await cls._db_call(
+            "SELECT content_hash FROM aliases WHERE pre_key = ? AND created_at >= ?",
+            (pre_key, time.time() - cls.CACHE_TTL),
+            fetch=True,
+        )
+        if row is None:
+            return None
+        cls._remember_alias(pre_key, row[0])
+        return row[0]
+
+    @staticmethod
+    def _remember_alias(pre_key: str, content_hash: str) -> None:
+        cls = ImageCaptionCache
+        cls._aliases[pre_key] = content_hash
+        cls._aliases.move_to_end(pre_key)
+        while len(cls._aliases) > cls.ALIAS_SIZE:
+            cls._aliases.popitem(last=False)
+
+    @staticmethod
+    async def _put_alias(pre_key: str, content_hash: str) -> None:
+        cls = ImageCaptionCache
+        if cls._aliases.get(pre_key) == content_hash:
+            return
+        cls._remember_alias(pre_key, content_hash)
+        await cls._db_call(
+            "INSERT OR REPLACE INTO aliases (pre_key, content_hash, created_at) "
+            "VALUES (?, ?, ?)",
+            (pre_key, content_hash, time.time()),
+        )
+
+    @staticmethod
+    def _remember(
+        cache_key: str, created_at: float, caption: str, latency: float
+    ) -> None:
+        cls = ImageCaptionCache
+        cls._cache[cache_key] = (created_at, caption, latency)
+        cls._cache.move_to_end(cache_key)
+        while len(cls._cache) > cls.CACHE_SIZE:
+            cls._cache.popitem(last=False)
+
+    @staticmethod
+    async def _lookup(cache_key: str) -> Optional[Tuple[str, float, str]]:
+        """
+        查找描述
+
+        Returns:
+            (描述, 原调用耗时, 来源 memory/disk)，未命中返回 None
+        """
+        cls = ImageCaptionCache
+        expire_before = time.time() - cls.CACHE_TTL
+        item = cls._cache.get(cache_key)
+        if item is not None:
+            created_at, caption, latency = item
+            if created_at >= expire_before:
+                cls._cache.move_to_end(cache_key)
+                return caption, latency, "memory"
+            del cls._cache[cache_key]
+
+        row = await cls._db_call(
+            "SELECT caption, latency, created_at FROM captions "
+            "WHERE key = ? AND created_at >= ?",
+            (cache_key, expire_before),
+            fetch=True,
+        )
+        if row is None:
+            return None
+        caption, latency, created_at = row
+        cls._remember(cache_key, created_at, caption, latency)
+        return caption, latency, "disk"
+
+    @staticmethod
+    async def _store(cache_key: str, caption: str, latency: float) -> None:
+        cls = ImageCaptionCache
+        now = time.time()
+        cls._remember(cache_key, now, caption, latency)
+        await cls._db_call(
+            "INSERT OR REPLACE INTO captions (key, caption, latency, created_at) "
+            "VALUES (?, ?, ?, ?)",
+            (cache_key, caption, latency, now),
+        )
+
+    @staticmethod
+    def _record_hit(source: str, latency: float, via_pre_key: bool) -> None:
+        metrics = ImageCaptionCache._metrics
+        metrics["memory_hits" if source == "memory" else "disk_hits"] += 1
+        metrics["saved_seconds"] += latency
+        if via_pre_key:
+            metrics["pre_key_hits"] += 1
+
+    # ------------------------------------------------------------------ 调度
+    @staticmethod
+    async def _run_vision(
+        cache_key: str,
+        image_path: str,
+        compute: Callable[[str], Awaitable[Optional[str]]],
+        timeout: float,
+    ) -> Optional[str]:
+        """在并发池内调用视觉AI，成功时写入缓存；失败返回 None（不抛出）"""
+        cls = ImageCaptionCache
+        async with cls._semaphore:
+            cls._metrics["vision_calls"] += 1
+            started = time.monotonic()
+            try:
+                caption = await asyncio.wait_for(compute(image_path), timeout=timeout)
+            except asyncio.TimeoutError:
+                cls._metrics["failed_calls"] += 1
+                return None
+            except Exception as e:
+                cls._metrics["failed_calls"] += 1
+                logger.error(f"[图片描述缓存] 视觉AI调用出错: {e}")
+                return None
+            latency = time.monotonic() - started
+        if not caption:
+            cls._metrics["failed_calls"] += 1
+            return None
+        if cls.ENABLED and cls.CACHE_TTL > 0:
+            await cls._store(cache_key, caption, latency)
+        return caption
+
+    @staticmethod
+    async def get_caption(
+        pre_key: Optional[str],
+        resolve_path: Callable[[], Awaitable[Optional[str]]],
+        variant: str,
+        compute: Callable[[str], Awaitable[Optional[str]]],
+        timeout: float,
+    ) -> Optional[str]:
+        """
+        获取一张图片的描述
+
+        Args:
+            pre_key: 预键（见 make_pre_key），没有时为 None
+            resolve_path: 获取图片本地路径的协程工厂（会下载图片，仅在需要时调用）
+            variant: 提供商/提示词标识（见 make_variant）
+            compute: 以图片路径调用视觉AI的协程工厂
+            timeout: 本次请求的等待上限（秒）
+
+        Returns:
+            图片描述；无法获取图片路径或调用失败时返回 None
+
+        Raises:
+            asyncio.TimeoutError: 等待视觉AI结果超时（调用本身会继续完成并写入缓存）
+        """
+        cls = ImageCaptionCache
+        metrics = cls._metrics
+        metrics["lookups"] += 1
+        try:
+            use_cache = cls.ENABLED and cls.CACHE_TTL > 0
+
+            # 预键命中：无需下载图片
+            if use_cache and pre_key:
+                content_hash = await cls._get_alias(pre_key)
+                if content_hash is not None:
+                    hit = await cls._lookup(f"{content_hash}:{variant}")
+                    if hit is not None:
+                        caption, latency, source = hit
+                        cls._record_hit(source, latency, via_pre_key=True)
+                        if DEBUG_MODE:
+                            logger.info(
+                                f"[图片描述缓存] 预键命中({source})，节省约 {latency:.1f}s"
+                            )
+                        return caption
+
+            image_path = await resolve_path()
+            if not image_path:
+                return None
+            content_hash = await asyncio.to_thread(cls._hash_file, image_path)
+            cache_key = f"{content_hash}:{variant}"
+
+            if use_cache:
+                if pre_key:
+                    await cls._put_alias(pre_key, content_hash)
+                hit = await cls._lookup(cache_key)
+                if hit is not None:
+                    caption, latency, source = hit
+                    cls._record_hit(source, latency, via_pre_key=False)
+                    if DEBUG_MODE:
+                        logger.info(
+                            f"[图片描述缓存] 内容命中({source})，节省约 {latency:.1f}s"
+                        )
+                    return caption
+
+            # 单飞：同一图片已有进行中的调用时直接等待它的结果
+            task = cls._inflight.get(cache_key)
+            if task is not None:
+                metrics["coalesced"] += 1
+                if DEBUG_MODE:
+                    logger.info("[图片描述缓存] 合并到进行中的视觉AI调用")
+            else:
+                task = asyncio.ensure_future(
+                    cls._run_vision(cache_key, image_path, compute, timeout)
+                )
+                cls._inflight[cache_key] = task
+
+                def _release(done: asyncio.Future, key: str = cache_key) -> None:
+                    if cls._inflight.get(key) is done:
+                        del cls._inflight[key]
+
+                task.add_done_callback(_release)
+            # shield：单个等待方超时不取消共享的调用
+            return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+        finally:
+            if metrics["lookups"] % cls.LOG_INTERVAL == 0:
+                logger.info(f"[图片描述缓存] {cls.format_metrics()}")
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """返回缓存统计（含命中率）"""
+        cls = ImageCaptionCache
+        metrics = dict(cls._metrics)
+        lookups = metrics["lookups"]
+        hits = metrics["memory_hits"] + metrics["disk_hits"]
+        metrics["hits"] = hits
+        metrics["hit_ratio"] = (hits / lookups) if lookups else 0.0
+        metrics["cache_size"] = len(cls._cache)
+        metrics["inflight"] = len(cls._inflight)
+        return metrics
+
+    @staticmethod
+    def format_metrics() -> str:
+        m = ImageCaptionCache.get_metrics()
+        return (
+            f"处理图片 {m['lookups']} 张，命中 {m['hits']} 次（{m['hit_ratio']:.0%}，"
+            f"内存 {m['memory_hits']}/持久化 {m['disk_hits']}，免下载 {m['pre_key_hits']}），"
+            f"合并 {m['coalesced']}，视觉AI调用 {m['vision_calls']} 次"
+            f"（失败 {m['failed_calls']}），节省耗时约 {m['saved_seconds']:.1f}s"
+        )
@@ -11,6 +11,8 @@ from typing import List, Optional, Tuple
 from astrbot.api.all import *
 from astrbot.api.message_components import Face, At
 
+from .image_caption_cache import ImageCaptionCache
+
 # 详细日志开关（与 main.py 同款方式：单独用 if 控制）
 DEBUG_MODE: bool = False
 
@@ -22,7 +24,7 @@ class ImageHandler:
     主要功能：
     1. 检测消息中的图片
     2. 过滤纯图片消息或移除图片
-    3. 调用AI将图片转为文字描述
+    3. 调用AI将图片转为文字描述（经 ImageCaptionCache 缓存、合并与限流）
     4. 将描述融入原消息
     """
 
@@ -338,48 +340,61 @@ class ImageHandler:
                     image_chain_to_idx[chain_idx] = img_count
                     img_count += 1
 
-            # 对每张图片进行转文字
-            image_descriptions = {}
-            for idx, img_component in enumerate(image_components):
-                try:
-                    # 获取图片URL或路径
+            # 调用AI进行图片转文字
+            async def call_vision_ai(image_path: str) -> Optional[str]:
+                response = await provider.text_chat(
+                    prompt=prompt,
+                    contexts=[],
+                    image_urls=[image_path],
+                    func_tool=None,
+                    system_prompt="",
+                )
+                return response.completion_text
+
+            variant = ImageCaptionCache.make_variant(provider_id, prompt)
+
+            async def describe(idx: int, img_component: Image) -> Optional[str]:
+                async def resolve_path() -> Optional[str]:
+                    # 获取图片URL或路径（缓存命中时不会调用，避免重复下载）
                     image_path = await img_component.convert_to_file_path()
                     if not image_path:
                         logger.warning(f"无法获取图片 {idx} 的路径")
-                        continue
-
-                    if DEBUG_MODE:
+                    elif DEBUG_MODE:
                         logger.info(f"正在转换图片 {idx}: {image_path}")
+                    return image_path
 
-                    # 调用AI进行图片转文字,添加超时控制
-                    async def call_vision_ai():
-                        response = await provider.text_chat(
-                            prompt=prompt,
-                            contexts=[],
-                            image_urls=[image_path],
-                            func_tool=None,
-                            system_prompt="",
-                        )
-                        return response.completion_text
-
+                try:
                     # 使用用户配置的超时时间
-                    description = await asyncio.wait_for(
-                        call_vision_ai(), timeout=timeout
+                    description = await ImageCaptionCache.get_caption(
+                        ImageCaptionCache.make_pre_key(img_component),
+                        resolve_path,
+                        variant,
+                        call_vision_ai,
+                        timeout,
                     )
-
-                    if description:
-                        image_descriptions[idx] = description
-                        if DEBUG_MODE:
-                            logger.info(f"图片 {idx} 转换成功: {description[:50]}...")
-
+                    if description and DEBUG_MODE:
+                        logger.info(f"图片 {idx} 转换成功: {description[:50]}...")
+                    return description
                 except asyncio.TimeoutError:
                     logger.warning(
                         f"图片 {idx} 转文字超时（超过 {timeout} 秒），可在配置中调整 image_to_text_timeout 参数"
                     )
-                    continue
                 except Exception as e:
                     logger.error(f"转换图片 {idx} 时发生错误: {e}")
-                    continue
+                return None
+
+            # 同一条消息的多张图片并发转换（全局并发由 ImageCaptionCache 限制）
+            results = await asyncio.gather(
+                *(
+                    describe(idx, img_component)
+                    for idx, img_component in enumerate(image_components)
+                )
+            )
+            image_descriptions = {
+                idx: description
+                for idx, description in enumerate(results)
+                if description
+            }
 
             # 如果没有成功转换任何图片,返回None
             if not image_descriptions:
@@ -6,7 +6,9 @@
 版本: v1.1.2
 """
 
+from typing import Dict, Tuple
 from astrbot.api.all import *
+from .text_matcher import KeywordMatcher
 
 # 详细日志开关（与 main.py 同款方式：单独用 if 控制）
 DEBUG_MODE: bool = False
@@ -15,6 +17,21 @@ DEBUG_MODE: bool = False
 class KeywordChecker:
     """关键词检查工具类"""
 
+    # 按关键词列表缓存编译好的匹配器，配置变化时自动重建
+    _matchers: Dict[Tuple[str, Tuple], KeywordMatcher] = {}
+
+    @staticmethod
+    def _get_matcher(keywords: list, keyword_type: str) -> KeywordMatcher:
+        key = (keyword_type, tuple(keywords))
+        matcher = KeywordChecker._matchers.get(key)
+        if matcher is None:
+            # 每种关键词只保留最新配置对应的匹配器
+            for old_key in [k for k in KeywordChecker._matchers if k[0] == keyword_type]:
+                del KeywordChecker._matchers[old_key]
+            matcher = KeywordMatcher(keywords)
+            KeywordChecker._matchers[key] = matcher
+        return matcher
+
     @staticmethod
     def _check_keywords(
         event: AstrMessageEvent, keywords: list, keyword_type: str
@@ -37,12 +54,14 @@ class KeywordChecker:
             # 获取消息文本
             message_text = event.get_message_outline()
 
-            # 检查是否包含关键词
-            for keyword in keywords:
-                if keyword and keyword in message_text:
-                    if DEBUG_MODE:
-                        logger.info(f"检测到{keyword_type}: {keyword}")
-                    return True
+            # 单次扫描检查是否包含任一关键词
+            keyword = KeywordChecker._get_matcher(keywords, keyword_type).search(
+                message_text
+            )
+            if keyword is not None:
+                if DEBUG_MODE:
+                    logger.info(f"检测到{keyword_type}: {keyword}")
+                return True
 
             return False
 
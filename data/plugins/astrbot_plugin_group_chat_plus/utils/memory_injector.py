@@ -142,6 +142,45 @@ class MemoryInjector:
             logger.error(f"检查记忆插件时发生错误 (mode={mode}): {e}")
             return False
 
+    @staticmethod
+    def get_persona_id(context: Context, session_id: str) -> Optional[str]:
+        """
+        实时获取会话当前使用的人格ID（不缓存，支持动态人格切换）
+
+        Args:
+            context: Context对象
+            session_id: 会话标识（unified_msg_origin）
+
+        Returns:
+            人格ID，获取失败返回None
+        """
+        try:
+            return (
+                context.persona_manager.get_personas_by_key(session_id).name
+                if context.persona_manager
+                else None
+            )
+        except Exception as pe:
+            logger.debug(f"[LivingMemory模式] 获取人格ID失败: {pe}")
+            return None
+
+    @staticmethod
+    def get_query_text(event: AstrMessageEvent) -> str:
+        """
+        获取用于检索记忆的用户消息内容
+
+        Args:
+            event: 消息事件
+
+        Returns:
+            消息文本，获取不到时返回空字符串
+        """
+        if hasattr(event, "message_str") and event.message_str:
+            return event.message_str
+        if hasattr(event, "message") and event.message:
+            return str(event.message)
+        return ""
+
     @staticmethod
     async def get_memories(
         context: Context, event: AstrMessageEvent, mode: str = "legacy", top_k: int = 5
@@ -240,22 +279,10 @@ class MemoryInjector:
                 session_id = event.unified_msg_origin
 
                 # 实时获取当前人格ID（支持动态人格切换）
-                try:
-                    persona_id = (
-                        context.persona_manager.get_personas_by_key(session_id).name
-                        if context.persona_manager
-                        else None
-                    )
-                except Exception as pe:
-                    logger.debug(f"[LivingMemory模式] 获取人格ID失败: {pe}")
-                    persona_id = None
+                persona_id = MemoryInjector.get_persona_id(context, session_id)
 
                 # 获取用户消息内容
-                user_message = ""
-                if hasattr(event, "message_str") and event.message_str:
-                    user_message = event.message_str
-                elif hasattr(event, "message") and event.message:
-                    user_message = str(event.message)
+                user_message = MemoryInjector.get_query_text(event)
 
                 if not user_message:
                     logger.warning("[LivingMemory模式] 无法获取用户消息内容")
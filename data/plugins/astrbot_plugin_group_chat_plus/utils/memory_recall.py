@@ -0,0 +1,301 @@
+"""
+记忆召回调度模块
+负责缓存记忆插件的召回结果、限制等待时间并支持预取
+
+每次尝试回复都会调用记忆插件（Legacy 的 get_memories 工具或 LivingMemory 的
+memory_engine.search_memories），后端慢时整条回复都要等它。本模块在 MemoryInjector 之上：
+1. 结果缓存：按 (模式, 会话, 人格, 召回数量, 归一化后的查询窗口) 缓存召回结果，短有效期
+2. 截止时间：等待超过截止时间即放弃本次注入，回复照常进行；迟到的结果写入缓存供下一轮使用
+3. 预取：在调用读空气AI的同时提前发起召回，生成回复时直接取用
+4. 单飞：同一键的并发召回只调用一次记忆插件
+
+作者: Him666233
+版本: v1.2.0
+"""
+
+import asyncio
+import re
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from astrbot.api.all import *
+
+from .memory_injector import MemoryInjector
+
+# 详细日志开关（与 main.py 同款方式：单独用 if 控制）
+DEBUG_MODE: bool = False
+
+
+class MemoryRecall:
+    """
+    记忆召回调度器
+
+    主要功能：
+    1. 召回结果的 LRU + TTL 缓存
+    2. 召回截止时间（超时不阻塞回复，迟到结果留给下一轮）
+    3. 与读空气判断并行的预取
+    4. 统计命中率与超时次数
+    """
+
+    # 默认配置（initialize 时按插件配置覆盖）
+    CACHE_TTL: float = 60.0  # 召回结果有效期（秒），0 表示不缓存
+    CACHE_SIZE: int = 256
+    DEADLINE: float = 3.0  # 等待召回结果的截止时间（秒），0 表示一直等待
+    PREFETCH: bool = True  # 是否在读空气判断期间预取
+    QUERY_WINDOW: int = 200  # 参与缓存键的查询文本末尾字符数
+    BACKGROUND_TIMEOUT: float = 60.0  # 召回调用本身的最长运行时间（秒）
+    LOG_INTERVAL: int = 50  # 每多少次召回输出一次统计
+
+    _cache: "OrderedDict[Tuple, Tuple[float, str]]" = OrderedDict()
+    _inflight: Dict[Tuple, asyncio.Task] = {}
+    _late_keys: set = set()  # 已超时、结果仍在路上的键
+    _metrics: Dict[str, int] = {
+        "requests": 0,  # 需要记忆的次数（不含预取）
+        "cache_hits": 0,
+        "joined": 0,  # 加入进行中（含预取）召回的次数
+        "backend_calls": 0,  # 实际调用记忆插件的次数
+        "prefetches": 0,  # 发起的预取次数
+        "timeouts": 0,  # 超过截止时间、本次未注入记忆的次数
+        "late_cached": 0,  # 超时后仍完成并写入缓存的结果数
+        "failures": 0,  # 记忆插件返回失败/出错
+    }
+
+    _WHITESPACE = re.compile(r"\s+")
+
+    @staticmethod
+    def initialize(config: dict) -> None:
+        """
+        读取插件配置并重置调度状态
+
+        Args:
+            config: 插件配置字典
+        """
+        cls = MemoryRecall
+        cls.CACHE_TTL = max(0.0, float(config.get("memory_recall_cache_ttl", 60)))
+        cls.DEADLINE = max(0.0, float(config.get("memory_recall_deadline", 3.0)))
+        cls.PREFETCH = bool(config.get("memory_recall_prefetch", True))
+        cls.BACKGROUND_TIMEOUT = max(60.0, cls.DEADLINE * 10)
+        cls._cache = OrderedDict()
+        cls._inflight = {}
+        cls._late_keys = set()
+        for key in cls._metrics:
+            cls._metrics[key] = 0
+        if DEBUG_MODE:
+            logger.info(
+                f"[记忆召回] 已初始化: 缓存={cls.CACHE_TTL}s, "
+                f"截止时间={cls.DEADLINE}s, 预取={cls.PREFETCH}"
+            )
+
+    @staticmethod
+    def make_key(
+        context: Context, event: AstrMessageEvent, mode: str, top_k: int
+    ) -> Tuple:
+        """
+        生成召回缓存键
+
+        Legacy 模式的召回只取决于会话；LivingMemory 模式还取决于人格与查询文本，
+        查询文本归一化（合并空白、小写）后只取末尾 QUERY_WINDOW 个字符。
+        """
+        session_id = getattr(event, "unified_msg_origin", "") or ""
+        if mode != "livingmemory":
+            return (mode, session_id, None, top_k, "")
+        persona_id = MemoryInjector.get_persona_id(context, session_id)
+        query = MemoryInjector.get_query_text(event)
+        query = MemoryRecall._WHITESPACE.sub(" ", query).strip().lower()
+        return (
+            mode,
+            session_id,
+            persona_id,
+            top_k,
+            query[-MemoryRecall.QUERY_WINDOW :],
+        )
+
+    # ------------------------------------------------------------------ 缓存
+    @staticmethod
+    def _cache_get(key: Tuple) -> Optional[str]:
+        cache = MemoryRecall._cache
+        item = cache.get(key)
+        if item is None:
+            return None
+        expires_at, memories = item
+        if expires_at <= time.monotonic():
+            del cache[key]
+            return None
+        cache.move_to_end(key)
+        return memories
+
+    @staticmethod
+    def _cache_put(key: Tuple, memories: str) -> None:
+        cls = MemoryRecall
+        if cls.CACHE_TTL <= 0:
+            return
+        cls._cache[key] = (time.monotonic() + cls.CACHE_TTL, memories)
+        cls._cache.move_to_end(key)
+        while len(cls._cache) > cls.CACHE_SIZE:
+            cls._cache.popitem(last=False)
+
+    # ------------------------------------------------------------------ 调度
+    @staticmethod
+    async def _run(
+        key: Tuple,
+        context: Context,
+        event: AstrMessageEvent,
+        mode: str,
+        top_k: int,
+    ) -> Optional[str]:
+        """调用记忆插件并缓存结果（不抛出异常）"""
+        cls = MemoryRecall
+        cls._metrics["backend_calls"] += 1
+        try:
+            memories = await asyncio.wait_for(
+                MemoryInjector.get_memories(context, event, mode=mode, top_k=top_k),
+                timeout=cls.BACKGROUND_TIMEOUT,
+            )
+        except asyncio.TimeoutError:
+            logger.warning(
+                f"[记忆召回] 记忆插件超过 {cls.BACKGROUND_TIMEOUT:.0f} 秒未返回，已放弃"
+            )
+            memories = None
+        except Exception as e:
+            logger.error(f"[记忆召回] 调用记忆插件出错: {e}")
+            memories = None
+
+        if memories is None:
+            cls._metrics["failures"] += 1
+            cls._late_keys.discard(key)
+            return None
+        cls._cache_put(key, memories)
+        if key in cls._late_keys:
+            cls._late_keys.discard(key)
+            cls._metrics["late_cached"] += 1
+            if DEBUG_MODE:
+                logger.info("[记忆召回] 迟到的召回结果已缓存，供下一轮使用")
+        return memories
+
+    @staticmethod
+    def _start(
+        key: Tuple,
+        context: Context,
+        event: AstrMessageEvent,
+        mode: str,
+        top_k: int,
+    ) -> asyncio.Task:
+        """发起召回（同一键已在进行中时复用）"""
+        cls = MemoryRecall
+        task = cls._inflight.get(key)
+        if task is not None:
+            return task
+        task = asyncio.ensure_future(cls._run(key, context, event, mode, top_k))
+        cls._inflight[key] = task
+
+        def _release(done: asyncio.Future) -> None:
+            if cls._inflight.get(key) is done:
+                del cls._inflight[key]
+
+        task.add_done_callback(_release)
+        return task
+
+    @staticmethod
+    def prefetch(
+        context: Context, event: AstrMessageEvent, mode: str = "legacy", top_k: int = 5
+    ) -> None:
+        """
+        提前发起召回（不等待结果），供稍后的 recall 直接取用
+
+        在调用读空气AI之前调用，使记忆召回与读空气判断并行进行
+        """
+        cls = MemoryRecall
+        if not cls.PREFETCH:
+            return
+        try:
+            key = cls.make_key(context, event, mode, top_k)
+            if cls._cache_get(key) is not None or key in cls._inflight:
+                return
+            cls._metrics["prefetches"] += 1
+            cls._start(key, context, event, mode, top_k)
+            if DEBUG_MODE:
+                logger.info(f"[记忆召回] 已发起预取({mode}模式)")
+        except Exception as e:
+            logger.warning(f"[记忆召回] 预取失败: {e}")
+
+    @staticmethod
+    async def recall(
+        context: Context, event: AstrMessageEvent, mode: str = "legacy", top_k: int = 5
+    ) -> Optional[str]:
+        """
+        获取记忆内容（与 MemoryInjector.get_memories 返回值一致）
+
+        依次尝试：缓存 → 进行中的召回（含预取）→ 新发起召回；
+        超过截止时间返回 None，召回在后台继续并把结果写入缓存
+
+        Args:
+            context: Context对象
+            event: 消息事件
+            mode: 插件模式，"legacy" 或 "livingmemory"
+            top_k: 召回记忆数量（仅LivingMemory模式有效）
+
+        Returns:
+            记忆文本；失败或超过截止时间返回None
+        """
+        cls = MemoryRecall
+        metrics = cls._metrics
+        metrics["requests"] += 1
+        try:
+            key = cls.make_key(context, event, mode, top_k)
+
+            cached = cls._cache_get(key)
+            if cached is not None:
+                metrics["cache_hits"] += 1
+                if DEBUG_MODE:
+                    logger.info(f"[记忆召回] 命中缓存({mode}模式)")
+                return cached
+
+            if key in cls._inflight:
+                metrics["joined"] += 1
+            task = cls._start(key, context, event, mode, top_k)
+
+            if cls.DEADLINE <= 0:
+                return await asyncio.shield(task)
+            started = time.monotonic()
+            try:
+                memories = await asyncio.wait_for(
+                    asyncio.shield(task), timeout=cls.DEADLINE
+                )
+            except asyncio.TimeoutError:
+                metrics["timeouts"] += 1
+                cls._late_keys.add(key)
+                logger.info(
+                    f"[记忆召回] 记忆插件超过 {cls.DEADLINE:.1f} 秒未返回，"
+                    f"本次不注入记忆（结果返回后缓存供下一轮使用）"
+                )
+                return None
+            if DEBUG_MODE:
+                logger.info(
+                    f"[记忆召回] 召回完成，等待 {time.monotonic() - started:.2f}s"
+                )
+            return memories
+        finally:
+            if metrics["requests"] % cls.LOG_INTERVAL == 0:
+                logger.info(f"[记忆召回] {cls.format_metrics()}")
+
+    @staticmethod
+    def get_metrics() -> Dict[str, Any]:
+        """返回召回统计（含命中率与超时率）"""
+        cls = MemoryRecall
+        metrics: Dict[str, Any] = dict(cls._metrics)
+        requests = metrics["requests"]
+        metrics["hit_ratio"] = (metrics["cache_hits"] / requests) if requests else 0.0
+        metrics["timeout_ratio"] = (metrics["timeouts"] / requests) if requests else 0.0
+        metrics["cache_size"] = len(cls._cache)
+        metrics["inflight"] = len(cls._inflight)
+        return metrics
+
+    @staticmethod
+    def format_metrics() -> str:
+        m = MemoryRecall.get_metrics()
+        return (
+            f"召回 {m['requests']} 次，缓存命中 {m['cache_hits']}（{m['hit_ratio']:.0%}），"
+            f"复用进行中/预取 {m['joined']}，预取 {m['prefetches']}，"
+            f"调用记忆插件 {m['backend_calls']} 次（失败 {m['failures']}），"
+            f"超时 {m['timeouts']}（{m['timeout_ratio']:.0%}，迟到后缓存 {m['late_cached']}）"
+        )
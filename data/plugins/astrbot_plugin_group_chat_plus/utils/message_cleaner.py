@@ -22,12 +22,50 @@ v1.1.2 更新：
 """
 
 import re
+from collections import OrderedDict
+from typing import List, Optional, Tuple
 from astrbot.api.all import *
 from astrbot.api.message_components import Plain, At, Image, Reply
 
+try:
+    from re import _parser as _sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover - 旧版本 Python
+    import sre_parse as _sre_parse
+
 # 详细日志开关（与 main.py 同款方式：单独用 if 控制）
 DEBUG_MODE: bool = False
 
+_SEPARATOR_PATTERN = re.compile(r"\n*=+\n*")
+_BLANK_LINES_PATTERN = re.compile(r"\n\s*\n\s*\n")
+_POKE_MARKER_PATTERN = re.compile(r"\[\s*Poke\s*:\s*poke\s*\]", re.IGNORECASE)
+_ONLY_POKE_MARKER_PATTERN = re.compile(r"^\[\s*Poke\s*:\s*poke\s*\]$", re.IGNORECASE)
+_AT_MARKER_PATTERN = re.compile(r"\[At:\d+\]")
+
+
+def _required_literal(pattern: str, flags: int = 0) -> str:
+    """
+    提取正则每次匹配都必然包含的最长字面量片段（只看顶层序列）
+
+    用于在执行 re.sub 之前先做一次廉价的子串预筛选；
+    无法提取（含忽略大小写、顶层分支等）时返回空串，表示该规则不做预筛选。
+    """
+    if flags & re.IGNORECASE:
+        return ""
+    try:
+        parsed = _sre_parse.parse(pattern, flags)
+    except Exception:
+        return ""
+    best = ""
+    run: List[str] = []
+    for op, av in list(parsed) + [(None, None)]:
+        if op == _sre_parse.LITERAL:
+            run.append(chr(av))
+            continue
+        if len(run) > len(best):
+            best = "".join(run)
+        run = []
+    return best
+
 
 class MessageCleaner:
     """
@@ -119,6 +157,73 @@ class MessageCleaner:
         r"\(以上是你可以调用的所有工具[\s\S]*?\)",  # 工具说明提示
     ]
 
+    # 编译后的清理规则 [(正则, 必含字面量)]，首次使用时按上面的模式列表构建
+    _compiled_rules: Optional[List[Tuple[re.Pattern, str]]] = None
+    # 所有必含字面量合并成的一条正则，用于一次扫描判断消息是否可能含系统提示词
+    _marker_pattern: Optional[re.Pattern] = None
+    _has_unguarded_rules: bool = False
+    _proactive_pattern: Optional[re.Pattern] = None
+
+    # 清理结果缓存：同一条消息在保存历史、格式化上下文时会反复出现，只清理一次
+    CLEAN_CACHE_SIZE = 2048
+    CLEAN_CACHE_MAX_TEXT_LEN = 16384
+    _clean_cache: "OrderedDict[str, str]" = OrderedDict()
+
+    @classmethod
+    def _ensure_compiled(cls) -> None:
+        """把字符串模式编译为规则表（只执行一次）"""
+        if cls._compiled_rules is not None:
+            return
+        rules = []
+        for pattern in cls.AT_MESSAGE_PROMPT_PATTERNS + cls.DECISION_AI_PROMPT_PATTERNS:
+            rules.append(
+                (re.compile(pattern, re.DOTALL), _required_literal(pattern, re.DOTALL))
+            )
+        literals = sorted({lit for _, lit in rules if lit}, key=len, reverse=True)
+        cls._marker_pattern = re.compile("|".join(re.escape(lit) for lit in literals))
+        cls._has_unguarded_rules = any(not lit for _, lit in rules)
+        cls._proactive_pattern = re.compile(
+            "|".join(f"(?:{p})" for p in cls.PROACTIVE_CHAT_PROMPT_PATTERNS)
+        )
+        cls._compiled_rules = rules
+
+    @classmethod
+    def _strip_system_prompts(cls, message_text: str) -> str:
+        """
+        依次执行全部清理规则，结果与逐条 re.sub 完全一致
+
+        - 先用合并正则扫描一次，普通聊天消息不含任何特征字面量时直接跳过全部规则
+        - 每条规则执行前检查其必含字面量是否仍在当前文本中，不在则该规则必然无匹配
+        """
+        cached = cls._clean_cache.get(message_text)
+        if cached is not None:
+            cls._clean_cache.move_to_end(message_text)
+            return cached
+
+        cls._ensure_compiled()
+        cleaned = message_text
+        if cls._has_unguarded_rules or cls._marker_pattern.search(cleaned):
+            for pattern, literal in cls._compiled_rules:
+                if not literal or literal in cleaned:
+                    cleaned = pattern.sub("", cleaned)
+
+        # 清理多余的分隔符（=====）
+        if "=" in cleaned:
+            cleaned = _SEPARATOR_PATTERN.sub("\n", cleaned)
+
+        # 清理多余的空白行
+        if cleaned.count("\n") >= 3:
+            cleaned = _BLANK_LINES_PATTERN.sub("\n\n", cleaned)
+
+        # 去除首尾空白
+        cleaned = cleaned.strip()
+
+        if len(message_text) <= cls.CLEAN_CACHE_MAX_TEXT_LEN:
+            cls._clean_cache[message_text] = cleaned
+            if len(cls._clean_cache) > cls.CLEAN_CACHE_SIZE:
+                cls._clean_cache.popitem(last=False)
+        return cleaned
+
     @staticmethod
     def clean_message(message_text: str) -> str:
         """
@@ -136,26 +241,8 @@ class MessageCleaner:
         if not message_text:
             return message_text
 
-        cleaned = message_text
-
-        # 移除@消息提示词
-        for pattern in MessageCleaner.AT_MESSAGE_PROMPT_PATTERNS:
-            cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL)
-
-        # 移除决策AI提示词
-        for pattern in MessageCleaner.DECISION_AI_PROMPT_PATTERNS:
-            cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL)
-
-        # 清理多余的分隔符（=====）
-        cleaned = re.sub(r"\n*=+\n*", "\n", cleaned)
-
-        # 清理多余的空白行
-        cleaned = re.sub(r"\n\s*\n\s*\n", "\n\n", cleaned)
-
-        # 去除首尾空白
-        cleaned = cleaned.strip()
-
-        return cleaned
+        # 移除@消息提示词、决策AI提示词，并整理分隔符与空白行
+        return MessageCleaner._strip_system_prompts(message_text)
 
     @staticmethod
     def is_proactive_chat_message(message_text: str) -> bool:
@@ -176,11 +263,8 @@ class MessageCleaner:
             return True
 
         # 检查是否包含主动对话提示词特征
-        for pattern in MessageCleaner.PROACTIVE_CHAT_PROMPT_PATTERNS:
-            if re.search(pattern, message_text):
-                return True
-
-        return False
+        MessageCleaner._ensure_compiled()
+        return bool(MessageCleaner._proactive_pattern.search(message_text))
 
     @staticmethod
     def clean_message_preserve_proactive(message_text: str) -> str:
@@ -203,28 +287,9 @@ class MessageCleaner:
             return MessageCleaner.clean_message(message_text)
 
         # 是主动对话消息，需要保留主动对话提示词
-        cleaned = message_text
-
-        # 移除@消息提示词
-        for pattern in MessageCleaner.AT_MESSAGE_PROMPT_PATTERNS:
-            cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL)
-
-        # 移除决策AI提示词
-        for pattern in MessageCleaner.DECISION_AI_PROMPT_PATTERNS:
-            cleaned = re.sub(pattern, "", cleaned, flags=re.DOTALL)
-
+        # 只移除@消息提示词和决策AI提示词
         # ⚠️ 不移除主动对话提示词 - 这是关键区别！
-
-        # 清理多余的分隔符（=====）
-        cleaned = re.sub(r"\n*=+\n*", "\n", cleaned)
-
-        # 清理多余的空白行
-        cleaned = re.sub(r"\n\s*\n\s*\n", "\n\n", cleaned)
-
-        # 去除首尾空白
-        cleaned = cleaned.strip()
-
-        return cleaned
+        return MessageCleaner._strip_system_prompts(message_text)
 
     @staticmethod
     def mark_proactive_chat_message(message_text: str) -> str:
@@ -266,9 +331,7 @@ class MessageCleaner:
 
         # 使用正则表达式过滤，考虑可能的空格
         # 匹配 [Poke:poke]、[ Poke : poke ]、[Poke: poke] 等变体
-        filtered_text = re.sub(
-            r"\[\s*Poke\s*:\s*poke\s*\]", "", text, flags=re.IGNORECASE
-        )
+        filtered_text = _POKE_MARKER_PATTERN.sub("", text)
 
         return filtered_text.strip()
 
@@ -289,8 +352,7 @@ class MessageCleaner:
         # 移除所有空白字符后检查
         cleaned = text.strip()
         # 使用正则匹配，忽略大小写和空格
-        pattern = r"^\[\s*Poke\s*:\s*poke\s*\]$"
-        return bool(re.match(pattern, cleaned, flags=re.IGNORECASE))
+        return bool(_ONLY_POKE_MARKER_PATTERN.match(cleaned))
 
     @staticmethod
     def extract_raw_message_from_event(event: AstrMessageEvent) -> str:
@@ -452,7 +514,7 @@ class MessageCleaner:
             return False
 
         # 移除所有@标记
-        without_at = re.sub(r"\[At:\d+\]", "", raw_message)
+        without_at = _AT_MARKER_PATTERN.sub("", raw_message)
         # 移除空白字符
         without_at = without_at.strip()
 
@@ -497,7 +559,7 @@ class MessageCleaner:
             return False, ""
 
         # 移除所有图片标记
-        text_without_images = re.sub(r"\[图片\]", "", message_text)
+        text_without_images = message_text.replace("[图片]", "")
         text_without_images = text_without_images.strip()
 
         # 判断是否是纯图片消息
@@ -19,6 +19,8 @@ import os
 from typing import Optional, Dict, List, Any
 from astrbot.api.all import logger
 
+from .text_matcher import CategoryKeywordScorer
+
 
 class MoodTracker:
     """
@@ -29,6 +31,7 @@ class MoodTracker:
     - 根据关键词和上下文更新情绪
     - 情绪自动衰减回归平静
     - 支持否定词检测，避免误判（v1.0.6新增）
+    - 情绪关键词与否定词合并为一个自动机，每条文本只扫描一遍
     """
 
     # 默认情绪
@@ -212,6 +215,10 @@ class MoodTracker:
             )
             self.mood_keywords = self._get_default_mood_keywords()
 
+        # 情绪关键词自动机（首次检测时构建，相关配置变化时自动重建）
+        self._mood_scorer: Optional[CategoryKeywordScorer] = None
+        self._mood_scorer_source: Optional[tuple] = None
+
         if self.debug_mode:
             logger.info(
                 f"[情绪追踪系统] 已初始化 | "
@@ -223,32 +230,50 @@ class MoodTracker:
                 f"清理间隔: {self._cleanup_interval}秒"
             )
 
-    def _has_negation_before(self, text: str, keyword_pos: int) -> bool:
+    def _get_mood_scorer(self) -> CategoryKeywordScorer:
         """
-        检查关键词前是否有否定词
+        获取情绪关键词自动机
 
-        Args:
-            text: 完整文本
-            keyword_pos: 关键词在文本中的位置
+        关键词/否定词配置对象被替换，或否定词开关、检查范围变化时自动重建
 
         Returns:
-            如果检测到否定词返回True
+            当前配置对应的关键词自动机
         """
-        # 提取关键词前的上下文
-        start_pos = max(0, keyword_pos - self.negation_check_range)
-        context_before = text[start_pos:keyword_pos]
-
-        # 检查是否包含否定词
-        for neg_word in self.negation_words:
-            if neg_word in context_before:
-                return True
-
-        return False
+        source = (
+            self.mood_keywords,
+            self.negation_words,
+            self.enable_negation,
+            self.negation_check_range,
+        )
+        cached = self._mood_scorer_source
+        if (
+            cached is None
+            or source[0] is not cached[0]
+            or source[1] is not cached[1]
+            or source[2:] != cached[2:]
+        ):
+            mood_keywords = (
+                self.mood_keywords if isinstance(self.mood_keywords, dict) else {}
+            )
+            self._mood_scorer = CategoryKeywordScorer(
+                mood_keywords,
+                self.negation_words if self.enable_negation else (),
+                self.negation_check_range,
+            )
+            self._mood_scorer_source = source
+            if self.debug_mode:
+                logger.info(
+                    f"[情绪检测] 已构建关键词自动机: 情绪类型 {len(mood_keywords)} 种"
+                )
+        return self._mood_scorer
 
     def _detect_mood_from_text(self, text: str) -> Optional[str]:
         """
         从文本中检测情绪（v1.0.6增强：支持否定词检测）
 
+        所有情绪关键词与否定词合并为一个自动机，文本只线性扫描一遍；
+        关键词每次出现计1分，其前 negation_check_range 个字符内出现否定词则不计分
+
         Args:
             text: 要分析的文本
 
@@ -259,35 +284,15 @@ class MoodTracker:
             return None
 
         # 统计各种情绪的关键词出现次数
-        mood_scores = {}
-
-        for mood, keywords in self.mood_keywords.items():
-            score = 0
-
-            for keyword in keywords:
-                # 查找所有该关键词的出现位置
-                start = 0
-                while True:
-                    pos = text.find(keyword, start)
-                    if pos == -1:
-                        break
-
-                    # 如果启用了否定词检测，检查前面是否有否定词
-                    if self.enable_negation and self._has_negation_before(text, pos):
-                        # 检测到否定词，跳过这个关键词
-                        if self.debug_mode:
-                            logger.info(
-                                f"[情绪检测] 检测到否定词，忽略关键词 '{keyword}' "
-                                f"(位置: {pos}, 前文: '{text[max(0, pos - self.negation_check_range) : pos]}')"
-                            )
-                    else:
-                        # 没有否定词，正常计分
-                        score += 1
-
-                    start = pos + 1
-
-            if score > 0:
-                mood_scores[mood] = score
+        negated = [] if self.debug_mode else None
+        mood_scores = self._get_mood_scorer().score(text, negated)
+
+        for pos, keyword in negated or ():
+            # 检测到否定词，跳过这个关键词
+            logger.info(
+                f"[情绪检测] 检测到否定词，忽略关键词 '{keyword}' "
+                f"(位置: {pos}, 前文: '{text[max(0, pos - self.negation_check_range) : pos]}')"
+            )
 
         if not mood_scores:
             return None
@@ -14,11 +14,13 @@
 """
 
 import time
+import math
+import heapq
 import asyncio
 import random
 import threading
 from datetime import datetime, timedelta
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
 from pathlib import Path
 import json
 
@@ -70,6 +72,18 @@ class ProactiveChatManager:
     # 格式: {chat_key: {"boost_value": 0.5, "boost_until": timestamp, "triggered_by_proactive": True}}
     _temp_probability_boost: Dict[str, dict] = {}
 
+    # 🆕 截止时间调度：每个群聊登记"下一次需要检查的时间"，后台循环只处理到期的群聊
+    # 堆元素: (到期时间, 序号, chat_key)；_next_check_at 保存每个群聊当前有效的到期时间，
+    # 堆中被重新登记覆盖的旧条目在弹出时惰性丢弃
+    _schedule_heap: List[Tuple[float, int, str]] = []
+    _next_check_at: Dict[str, float] = {}
+    _schedule_seq: int = 0
+    # 状态无变化时的最长复查间隔（秒），保证运行中修改的配置（白名单等）最终生效
+    MAX_IDLE_RECHECK: int = 1800
+
+    # 惰性衰减结算使用的配置引用（后台任务启动时设置）
+    _config: Optional[dict] = None
+
     # ========== 初始化和生命周期 ==========
 
     @classmethod
@@ -110,6 +124,13 @@ class ProactiveChatManager:
         # 🆕 配置合理性检查：吐槽系统配置
         cls._validate_complaint_config(config)
 
+        cls._config = config
+        # 已有群聊全部登记为立即检查，之后按各自状态重新计算到期时间
+        cls._schedule_heap = []
+        cls._next_check_at = {}
+        for chat_key in list(cls._chat_states.keys()):
+            cls.mark_chat_dirty(chat_key)
+
         cls._is_running = True
         cls._background_task = asyncio.create_task(
             cls._background_check_loop(context, config, plugin_instance)
@@ -380,6 +401,7 @@ class ProactiveChatManager:
         """
         if chat_key not in cls._chat_states:
             cls._chat_states[chat_key] = cls._get_default_state()
+            cls.mark_chat_dirty(chat_key)
         else:
             # 兼容性处理：为旧数据补充缺失字段
             state = cls._chat_states[chat_key]
@@ -387,6 +409,8 @@ class ProactiveChatManager:
             for key, value in default_state.items():
                 if key not in state:
                     state[key] = value
+            # 读取前结算自上次以来累积的时间衰减
+            cls._settle_decay(chat_key, state)
         return cls._chat_states[chat_key]
 
     @classmethod
@@ -413,6 +437,8 @@ class ProactiveChatManager:
                 cls._initialize_chat_state(chat_key)
             current_time = time.time()
             state = cls._chat_states[chat_key]
+            # 更新互动时间前先结算衰减（衰减是否生效取决于此前的互动时间）
+            cls._settle_decay(chat_key, state, current_time)
             state["last_user_message_time"] = current_time
             state["silent_failures"] = 0  # 重置连续失败计数
             # 更新用户消息计数和时间戳（用于活跃度检测）
@@ -425,6 +451,7 @@ class ProactiveChatManager:
                 for ts in state["user_message_timestamps"]
                 if current_time - ts <= activity_window
             ]
+        cls.mark_chat_dirty(chat_key)
 
     @classmethod
     def record_bot_reply(cls, chat_key: str, is_proactive: bool = True):
@@ -440,6 +467,7 @@ class ProactiveChatManager:
                 cls._initialize_chat_state(chat_key)
             current_time = time.time()
             state = cls._chat_states[chat_key]
+            cls._settle_decay(chat_key, state, current_time)
             state["last_bot_reply_time"] = current_time
             if is_proactive:
                 state["last_proactive_time"] = current_time
@@ -478,6 +506,7 @@ class ProactiveChatManager:
             # 但为了确保活跃度检测正确，我们需要清空所有时间戳
             # 因为活跃度检测应该基于"距离上次AI回复后"的用户消息
             state["user_message_timestamps"] = []
+        cls.mark_chat_dirty(chat_key)
 
     @classmethod
     def record_proactive_failure(
@@ -541,6 +570,7 @@ class ProactiveChatManager:
                 f"⚠️ [主动对话失败] 群{chat_key[-8:]} - "
                 f"连续失败{failure_count}次，进入冷却期{cooldown_duration}秒"
             )
+        cls.mark_chat_dirty(chat_key)
 
     @classmethod
     def enter_cooldown(cls, chat_key: str, duration: int):
@@ -564,6 +594,7 @@ class ProactiveChatManager:
             pass
         state["proactive_attempts_count"] = 0
         state["last_proactive_content"] = None  # 🆕 清空上一次主动对话内容
+        cls.mark_chat_dirty(chat_key)
 
     @classmethod
     def is_in_cooldown(cls, chat_key: str) -> bool:
@@ -611,6 +642,7 @@ class ProactiveChatManager:
             "boost_until": time.time() + duration,
             "triggered_by_proactive": True,
         }
+        cls.mark_chat_dirty(chat_key)
         logger.info(
             f"✨ [临时概率提升] 群{chat_key[-8:]} - "
             f"激活临时提升(+{boost_value:.2f})，持续{duration}秒"
@@ -627,6 +659,7 @@ class ProactiveChatManager:
         """
         if chat_key in cls._temp_probability_boost:
             del cls._temp_probability_boost[chat_key]
+            cls.mark_chat_dirty(chat_key)
             logger.info(
                 f"🔻 [临时概率提升] 群{chat_key[-8:]} - 已取消（原因: {reason}）"
             )
@@ -693,6 +726,8 @@ class ProactiveChatManager:
                 )
             return
 
+        cls.mark_chat_dirty(chat_key)
+
         # 有主动对话相关状态，需要处理
         if has_active_proactive and not state.get("proactive_outcome_recorded", False):
             # 场景1: 有活跃的主动对话等待判定 → 判定为间接成功
@@ -786,6 +821,8 @@ class ProactiveChatManager:
         new_score = max(min_score, min(max_score, old_score + delta))
 
         state["interaction_score"] = new_score
+        if new_score != old_score:
+            cls.mark_chat_dirty(chat_key)
 
         # 记录评分变化
         # 调试模式：输出所有变化
@@ -957,61 +994,112 @@ class ProactiveChatManager:
     @classmethod
     def apply_score_decay(cls, config: dict):
         """
-        应用评分衰减（每24小时执行一次）
+        结算所有群聊的评分衰减（每满24小时无互动 -decay_rate）
+
+        衰减按经过时间闭式计算（见 _settle_score_decay），平时在读取群聊状态时惰性结算，
+        此方法仅用于需要立即结算全部群聊的场合。
 
         Args:
             config: 插件配置
         """
-        if not config.get("enable_adaptive_proactive", True):
-            return
-
         current_time = time.time()
-        decay_interval = 24 * 3600  # 24小时
-        decay_rate = config.get("interaction_score_decay_rate", 2)
-
-        # 统计衰减情况（非调试模式用于汇总）
-        decay_count = 0
-
-        for chat_key, state in cls._chat_states.items():
-            last_decay = state.get("last_score_decay_time", 0)
-
-            # 检查是否需要衰减
-            if current_time - last_decay >= decay_interval:
-                # 检查是否有新互动
-                last_success = state.get("last_success_time", 0)
-                last_user_msg = state.get("last_user_message_time", 0)
-
-                # 如果24小时内没有任何互动，进行衰减
-                if current_time - max(last_success, last_user_msg) >= decay_interval:
-                    cls.update_interaction_score(
-                        chat_key, -decay_rate, "24小时无互动自然衰减", config
-                    )
-                    decay_count += 1
-
-                # 更新衰减时间
-                state["last_score_decay_time"] = current_time
-
-        # 非调试模式：输出汇总信息（只在有衰减时）
-        if not cls._debug_mode and decay_count > 0:
-            logger.info(f"📉 [评分衰减] 已对 {decay_count} 个群聊执行24小时无互动衰减")
+        for chat_key, state in list(cls._chat_states.items()):
+            cls._settle_score_decay(chat_key, state, config, current_time)
 
     @classmethod
     def apply_complaint_decay(cls, config: dict):
         """
-        🆕 应用累积失败次数的时间自然衰减
+        🆕 结算所有群聊的累积失败次数时间自然衰减
 
         改进逻辑：
         1. 长时间没有新的失败，失败次数会逐渐减少
         2. 防止历史累积的失败次数影响当前的吐槽判断
         3. 更拟人化：偶尔的失败不会因为历史原因触发过度吐槽
 
+        与评分衰减相同，平时在读取群聊状态时惰性结算（见 _settle_complaint_decay）。
+
         Args:
             config: 插件配置
         """
-        if not config.get("enable_complaint_system", True):
+        current_time = time.time()
+        for chat_key, state in list(cls._chat_states.items()):
+            cls._settle_complaint_decay(chat_key, state, config, current_time)
+
+    @staticmethod
+    def _count_idle_checkpoints(
+        start: float,
+        interval: float,
+        periods: int,
+        last_activity: float,
+        idle_required: float,
+    ) -> int:
+        """
+        统计检查点 start + k*interval (k=1..periods) 中，
+        距离 last_activity 已满 idle_required 秒的检查点个数
+        """
+        first = max(1, math.ceil((last_activity + idle_required - start) / interval))
+        return max(0, periods - first + 1)
+
+    @classmethod
+    def _settle_decay(cls, chat_key: str, state: dict, now: float = None):
+        """按经过时间一次性结算评分衰减与累积失败衰减（替代后台逐轮扫描）"""
+        config = cls._config
+        if not config:
             return
+        if now is None:
+            now = time.time()
+        cls._settle_score_decay(chat_key, state, config, now)
+        cls._settle_complaint_decay(chat_key, state, config, now)
 
-        current_time = time.time()
+    @classmethod
+    def _settle_score_decay(cls, chat_key: str, state: dict, config: dict, now: float):
+        """
+        评分衰减的闭式结算
+
+        等价于每满24小时检查一次：若检查点前24小时内没有任何互动则扣 decay_rate 分。
+        必须在更新互动时间（last_user_message_time / last_success_time）之前调用。
+        """
+        if not config.get("enable_adaptive_proactive", True):
+            return
+        decay_interval = 24 * 3600
+        last_decay = float(state.get("last_score_decay_time", 0) or 0)
+        if last_decay <= 0:
+            state["last_score_decay_time"] = now
+            return
+        periods = int((now - last_decay) // decay_interval)
+        if periods <= 0:
+            return
+        # 先推进衰减时间，避免 update_interaction_score 内部读取状态时重复结算
+        state["last_score_decay_time"] = last_decay + periods * decay_interval
+        last_activity = max(
+            float(state.get("last_success_time", 0) or 0),
+            float(state.get("last_user_message_time", 0) or 0),
+        )
+        decayed = cls._count_idle_checkpoints(
+            last_decay, decay_interval, periods, last_activity, decay_interval
+        )
+        if decayed > 0:
+            decay_rate = config.get("interaction_score_decay_rate", 2)
+            cls.update_interaction_score(
+                chat_key,
+                -decay_rate * decayed,
+                f"24小时无互动自然衰减×{decayed}",
+                config,
+            )
+
+    @classmethod
+    def _settle_complaint_decay(
+        cls, chat_key: str, state: dict, config: dict, now: float
+    ):
+        """
+        累积失败次数衰减的闭式结算
+
+        等价于每隔 complaint_decay_check_interval 检查一次：若距上次主动对话活动
+        已满 complaint_decay_no_failure_threshold，则减少 complaint_decay_amount 次。
+        必须在更新 last_proactive_time / last_proactive_success_time 之前调用。
+        """
+        if not config.get("enable_complaint_system", True):
+            return
         # 每隔一段时间检查一次（默认6小时）
         check_interval = config.get("complaint_decay_check_interval", 6 * 3600)
         # 多久没有新失败就开始衰减（默认12小时）
@@ -1020,47 +1108,38 @@ class ProactiveChatManager:
         )
         # 每次衰减的数量（默认1次）
         decay_amount = config.get("complaint_decay_amount", 1)
+        if check_interval <= 0:
+            return
 
-        for chat_key, state in cls._chat_states.items():
-            try:
-                last_check = state.get("last_complaint_decay_time", 0)
-
-                # 检查是否需要衰减
-                if current_time - last_check >= check_interval:
-                    total_failures = state.get("total_proactive_failures", 0)
-
-                    # 只有累积失败次数 > 0 才需要检查衰减
-                    if total_failures > 0:
-                        # 获取上次失败时间（通过 last_proactive_time 判断）
-                        last_proactive_time = state.get("last_proactive_time", 0)
-                        last_success_time = state.get("last_proactive_success_time", 0)
-
-                        # 如果距离上次主动对话失败已经很久了（通过判断是否有新的成功）
-                        # 或者长时间没有任何主动对话活动
-                        time_since_last_activity = current_time - max(
-                            last_proactive_time, last_success_time
-                        )
-
-                        if time_since_last_activity >= no_failure_threshold:
-                            # 执行衰减
-                            old_failures = total_failures
-                            new_failures = max(0, total_failures - decay_amount)
-                            state["total_proactive_failures"] = new_failures
-
-                            if cls._debug_mode and new_failures != old_failures:
-                                logger.info(
-                                    f"🕐 [时间自然衰减] 群{chat_key[-8:]} - "
-                                    f"{time_since_last_activity / 3600:.1f}小时无主动对话活动，"
-                                    f"累积失败次数: {old_failures} → {new_failures} (衰减-{decay_amount})"
-                                )
-
-                    # 更新检查时间
-                    state["last_complaint_decay_time"] = current_time
+        last_check = float(state.get("last_complaint_decay_time", 0) or 0)
+        if last_check <= 0:
+            state["last_complaint_decay_time"] = now
+            return
+        periods = int((now - last_check) // check_interval)
+        if periods <= 0:
+            return
+        state["last_complaint_decay_time"] = last_check + periods * check_interval
 
-            except Exception as e:
-                logger.error(
-                    f"[时间自然衰减] 处理群{chat_key[-8:]}时出错: {e}", exc_info=True
-                )
+        total_failures = state.get("total_proactive_failures", 0)
+        if total_failures <= 0:
+            return
+        last_activity = max(
+            float(state.get("last_proactive_time", 0) or 0),
+            float(state.get("last_proactive_success_time", 0) or 0),
+        )
+        decayed = cls._count_idle_checkpoints(
+            last_check, check_interval, periods, last_activity, no_failure_threshold
+        )
+        if decayed <= 0:
+            return
+        new_failures = max(0, total_failures - decay_amount * decayed)
+        state["total_proactive_failures"] = new_failures
+        if cls._debug_mode and new_failures != total_failures:
+            logger.info(
+                f"🕐 [时间自然衰减] 群{chat_key[-8:]} - "
+                f"{(now - last_activity) / 3600:.1f}小时无主动对话活动，"
+                f"累积失败次数: {total_failures} → {new_failures} (衰减-{decay_amount}×{decayed})"
+            )
 
     @classmethod
     def get_score_level(cls, score: int) -> str:
@@ -1762,6 +1841,117 @@ class ProactiveChatManager:
 
     # ========== 后台任务 ==========
 
+    @classmethod
+    def _schedule_check(cls, chat_key: str, due_at: float):
+        """登记群聊的下一次检查时间（覆盖之前的登记）"""
+        cls._next_check_at[chat_key] = due_at
+        cls._schedule_seq += 1
+        heapq.heappush(cls._schedule_heap, (due_at, cls._schedule_seq, chat_key))
+
+    @classmethod
+    def mark_chat_dirty(cls, chat_key: str):
+        """
+        群聊状态发生变化（新消息、回复、冷却、临时提升、评分变化等）时调用，
+        让后台任务在下一轮重新计算该群聊的下一次检查时间
+
+        Args:
+            chat_key: 群聊唯一标识
+        """
+        now = time.time()
+        if cls._next_check_at.get(chat_key, float("inf")) <= now:
+            return
+        cls._schedule_check(chat_key, now)
+
+    @classmethod
+    def _pop_due_chats(cls, now: float) -> List[str]:
+        """
+        弹出所有已到期的群聊
+
+        Args:
+            now: 当前时间戳
+
+        Returns:
+            到期的 chat_key 列表
+        """
+        heap = cls._schedule_heap
+        due_chats = []
+        while heap and heap[0][0] <= now:
+            due_at, _, chat_key = heapq.heappop(heap)
+            if cls._next_check_at.get(chat_key) != due_at:
+                continue  # 已被重新登记的旧条目
+            del cls._next_check_at[chat_key]
+            if chat_key in cls._chat_states:
+                due_chats.append(chat_key)
+
+        # 旧条目堆积过多时重建堆
+        if len(heap) > 4 * len(cls._next_check_at) + 64:
+            heap = [item for item in heap if cls._next_check_at.get(item[2]) == item[0]]
+            heapq.heapify(heap)
+            cls._schedule_heap = heap
+        return due_chats
+
+    @classmethod
+    def _compute_next_check(cls, chat_key: str, config: dict, now: float) -> float:
+        """
+        根据群聊当前状态计算下一次需要检查的时间（不产生副作用，不掷概率）
+
+        与 _check_chat 的判断顺序一致；返回值 <= now 表示现在就需要检查。
+        只会随时间推移而满足的条件（冷却结束、维持期结束、沉默时长达标）返回对应时刻；
+        只能由状态变化满足的条件（用户活跃度不足等）返回 MAX_IDLE_RECHECK 之后，
+        期间如有新消息会通过 mark_chat_dirty 提前重新计算。
+
+        Args:
+            chat_key: 群聊唯一标识
+            config: 插件配置
+            now: 当前时间戳
+
+        Returns:
+            下一次检查的时间戳
+        """
+        horizon = now + cls.MAX_IDLE_RECHECK
+        state = cls._chat_states.get(chat_key)
+        if state is None:
+            return horizon
+
+        due_at = horizon
+
+        # 连续尝试：维持期内不检查，维持期结束即需要判定本次尝试结果
+        if int(state.get("proactive_attempts_count", 0)) > 0:
+            boost_info = cls._temp_probability_boost.get(chat_key)
+            boost_until = 0.0
+            if boost_info and isinstance(boost_info, dict):
+                boost_until = float(boost_info.get("boost_until", 0))
+            if now < boost_until:
+                return min(boost_until, horizon)
+            last_pt = float(state.get("last_proactive_time", 0))
+            if last_pt > 0:
+                retry_at = last_pt + config.get("proactive_temp_boost_duration", 120)
+                if retry_at <= now:
+                    return now
+                due_at = min(due_at, retry_at)
+
+        if not cls.is_group_enabled(chat_key, config):
+            return due_at
+
+        if state.get("is_in_cooldown", False):
+            cooldown_until = float(state.get("cooldown_until", 0))
+            if now < cooldown_until:
+                return min(due_at, cooldown_until)
+
+        silence_threshold = cls.calculate_adaptive_parameters(chat_key, config)[
+            "silence_threshold"
+        ]
+        silence_at = float(state.get("last_bot_reply_time", 0)) + silence_threshold
+        if now < silence_at:
+            return min(due_at, silence_at)
+
+        if config.get(
+            "proactive_require_user_activity", True
+        ) and not cls.check_user_activity(chat_key, config):
+            return due_at
+
+        return now
+
     @classmethod
     async def _background_check_loop(
         cls, context: Context, config_getter, plugin_instance
@@ -1777,11 +1967,9 @@ class ProactiveChatManager:
         if cls._debug_mode:
             logger.info("🔄 [主动对话后台任务] 已启动")
 
-        # 🆕 v1.2.0 定期保存和衰减计时器
+        # 🆕 v1.2.0 定期保存计时器（评分/累积失败衰减改为读取状态时惰性结算）
         last_save_time = time.time()
-        last_decay_time = time.time()
         save_interval = 300  # 每5分钟保存一次
-        decay_interval = 3600  # 每小时检查一次衰减
 
         while cls._is_running:
             try:
@@ -1790,6 +1978,7 @@ class ProactiveChatManager:
                     config = config_getter.config
                 else:
                     config = config_getter
+                cls._config = config
 
                 # 获取检查间隔
                 check_interval = config.get("proactive_check_interval", 60)
@@ -1805,140 +1994,144 @@ class ProactiveChatManager:
                     if cls._debug_mode:
                         logger.info("💾 [自动保存] 主动对话状态已保存")
 
-                # 🆕 v1.2.0 定期执行评分衰减
-                if current_time - last_decay_time >= decay_interval:
-                    cls.apply_score_decay(config)
-                    cls.apply_complaint_decay(
-                        config
-                    )  # 🆕 同时执行累积失败次数的时间衰减
-                    last_decay_time = current_time
-
-                # 遍历所有群聊状态
-                for chat_key in list(cls._chat_states.keys()):
+                # 只处理到期的群聊（截止时间调度），其余群聊本轮不做任何计算
+                for chat_key in cls._pop_due_chats(current_time):
                     try:
-                        current_time = time.time()
-
-                        # 🆕 v1.2.0 获取自适应参数（根据互动评分调整）
-                        adaptive_params = cls.calculate_adaptive_parameters(
-                            chat_key, config
+                        if (
+                            cls._compute_next_check(chat_key, config, current_time)
+                            <= current_time
+                        ):
+                            await cls._check_chat(
+                                context, config, plugin_instance, chat_key
+                            )
+                    except Exception as e:
+                        logger.error(
+                            f"[主动对话检查] 群{chat_key[-8:]} 检查失败: {e}",
+                            exc_info=True,
                         )
-                        max_failures = adaptive_params["max_failures"]
-                        cooldown_duration = adaptive_params["cooldown_duration"]
+                    finally:
+                        # 按检查后的最新状态登记下一次检查时间
+                        if chat_key in cls._chat_states:
+                            cls._schedule_check(
+                                chat_key,
+                                cls._compute_next_check(chat_key, config, time.time()),
+                            )
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"[主动对话后台任务] 发生错误: {e}", exc_info=True)
 
-                        # 固定参数
-                        boost_duration = config.get(
-                            "proactive_temp_boost_duration", 120
-                        )
+        if cls._debug_mode:
+            logger.info("🛑 [主动对话后台任务] 已停止")
 
-                        # ========== 连续尝试机制：检测维持期是否结束且未触发AI回复 ==========
-                        state = cls.get_chat_state(chat_key)
+    @classmethod
+    async def _check_chat(
+        cls, context: Context, config: dict, plugin_instance, chat_key: str
+    ):
+        """
+        检查单个到期群聊：处理连续尝试的维持期结束，或判断是否触发主动对话
 
-                        in_retry_sequence = (
-                            int(state.get("proactive_attempts_count", 0)) > 0
-                        )
+        Args:
+            context: AstrBot Context对象
+            config: 插件配置
+            plugin_instance: 插件实例
+            chat_key: 群聊唯一标识
+        """
+        current_time = time.time()
 
-                        # 判断临时提升是否仍然有效
-                        boost_info = cls._temp_probability_boost.get(chat_key)
-                        boost_active = False
-                        if boost_info and isinstance(boost_info, dict):
-                            boost_active = current_time < float(
-                                boost_info.get("boost_until", 0)
-                            )
+        # 🆕 v1.2.0 获取自适应参数（根据互动评分调整）
+        adaptive_params = cls.calculate_adaptive_parameters(chat_key, config)
+        max_failures = adaptive_params["max_failures"]
+        cooldown_duration = adaptive_params["cooldown_duration"]
 
-                        # 如果处于连续尝试序列中且临时提升仍然有效，则在维持期内不再触发新的主动对话
-                        if in_retry_sequence and boost_active:
-                            if cls._debug_mode:
-                                logger.info(
-                                    f"[连续尝试] 群{chat_key[-8:]} 处于维持期内，跳过本轮should_trigger检查"
-                                )
-                            continue
+        # 固定参数
+        boost_duration = config.get("proactive_temp_boost_duration", 120)
 
-                        # 如果处于连续尝试序列中，但临时提升已过期（且未被上层在AI决定回复时清理）
-                        if in_retry_sequence and not boost_active:
-                            # 结合 last_proactive_time + 配置的维持时长，双重判断避免错判
-                            last_pt = float(state.get("last_proactive_time", 0))
-                            if last_pt > 0 and current_time >= last_pt + boost_duration:
-                                # 视为一次失败尝试
-                                cls.record_proactive_failure(
-                                    chat_key, max_failures, cooldown_duration, config
-                                )
+        # ========== 连续尝试机制：检测维持期是否结束且未触发AI回复 ==========
+        state = cls.get_chat_state(chat_key)
 
-                                # 若进入冷却，跳过本轮
-                                if cls.is_in_cooldown(chat_key):
-                                    # 确保临时提升关闭、连续尝试清零
-                                    try:
-                                        cls.deactivate_temp_probability_boost(
-                                            chat_key, "失败达到上限，进入冷却"
-                                        )
-                                    except Exception:
-                                        pass
-                                    state["proactive_attempts_count"] = 0
-                                    continue
+        in_retry_sequence = int(state.get("proactive_attempts_count", 0)) > 0
 
-                                # 未达上限：立即进行下一次连续尝试（不再依赖沉默阈值）
-                                try:
-                                    # 连续尝试也需尊重白名单与禁用时段（有效概率>0）
-                                    if not cls.is_group_enabled(chat_key, config):
-                                        if cls._debug_mode:
-                                            logger.info(
-                                                f"[连续尝试] 群{chat_key[-8:]} 不在白名单，跳过连续尝试"
-                                            )
-                                        continue
+        # 判断临时提升是否仍然有效
+        boost_info = cls._temp_probability_boost.get(chat_key)
+        boost_active = False
+        if boost_info and isinstance(boost_info, dict):
+            boost_active = current_time < float(boost_info.get("boost_until", 0))
 
-                                    base_prob = config.get("proactive_probability", 0.3)
-                                    eff_prob = cls.calculate_effective_probability(
-                                        base_prob, config
-                                    )
-                                    if eff_prob <= 0:
-                                        logger.info(
-                                            f"[连续尝试] 群{chat_key[-8:]} 处于禁用/极低时段，跳过本次连续尝试"
-                                        )
-                                        continue
+        # 如果处于连续尝试序列中且临时提升仍然有效，则在维持期内不再触发新的主动对话
+        if in_retry_sequence and boost_active:
+            if cls._debug_mode:
+                logger.info(
+                    f"[连续尝试] 群{chat_key[-8:]} 处于维持期内，跳过本轮should_trigger检查"
+                )
+            return
 
-                                    await cls.trigger_proactive_chat(
-                                        context, config, plugin_instance, chat_key
-                                    )
-                                    # 进入下一轮后，继续处理下一个群
-                                    continue
-                                except Exception as e:
-                                    logger.error(
-                                        f"[连续尝试] 触发下一次主动对话失败: {e}",
-                                        exc_info=True,
-                                    )
+        # 如果处于连续尝试序列中，但临时提升已过期（且未被上层在AI决定回复时清理）
+        if in_retry_sequence and not boost_active:
+            # 结合 last_proactive_time + 配置的维持时长，双重判断避免错判
+            last_pt = float(state.get("last_proactive_time", 0))
+            if last_pt > 0 and current_time >= last_pt + boost_duration:
+                # 视为一次失败尝试
+                cls.record_proactive_failure(
+                    chat_key, max_failures, cooldown_duration, config
+                )
 
-                        # 检查是否应该触发主动对话
-                        should_trigger, reason = cls.should_trigger_proactive_chat(
-                            chat_key, config
+                # 若进入冷却，跳过本轮
+                if cls.is_in_cooldown(chat_key):
+                    # 确保临时提升关闭、连续尝试清零
+                    try:
+                        cls.deactivate_temp_probability_boost(
+                            chat_key, "失败达到上限，进入冷却"
                         )
+                    except Exception:
+                        pass
+                    state["proactive_attempts_count"] = 0
+                    return
 
-                        if should_trigger:
-                            # 触发主动对话
-                            await cls.trigger_proactive_chat(
-                                context, config, plugin_instance, chat_key
+                # 未达上限：立即进行下一次连续尝试（不再依赖沉默阈值）
+                try:
+                    # 连续尝试也需尊重白名单与禁用时段（有效概率>0）
+                    if not cls.is_group_enabled(chat_key, config):
+                        if cls._debug_mode:
+                            logger.info(
+                                f"[连续尝试] 群{chat_key[-8:]} 不在白名单，跳过连续尝试"
                             )
-                        else:
-                            # 如果概率判断失败，重置计时器
-                            if "概率判断失败" in reason:
-                                state = cls.get_chat_state(chat_key)
-                                state["last_bot_reply_time"] = time.time()
-                                if cls._debug_mode:
-                                    logger.info(
-                                        f"[主动对话检查] 群{chat_key[-8:]} - {reason}，重置计时器"
-                                    )
+                        return
 
-                    except Exception as e:
-                        logger.error(
-                            f"[主动对话检查] 群{chat_key[-8:]} 检查失败: {e}",
-                            exc_info=True,
+                    base_prob = config.get("proactive_probability", 0.3)
+                    eff_prob = cls.calculate_effective_probability(base_prob, config)
+                    if eff_prob <= 0:
+                        logger.info(
+                            f"[连续尝试] 群{chat_key[-8:]} 处于禁用/极低时段，跳过本次连续尝试"
                         )
+                        return
 
-            except asyncio.CancelledError:
-                break
-            except Exception as e:
-                logger.error(f"[主动对话后台任务] 发生错误: {e}", exc_info=True)
+                    await cls.trigger_proactive_chat(
+                        context, config, plugin_instance, chat_key
+                    )
+                    # 进入下一轮后，继续处理下一个群
+                    return
+                except Exception as e:
+                    logger.error(
+                        f"[连续尝试] 触发下一次主动对话失败: {e}",
+                        exc_info=True,
+                    )
 
-        if cls._debug_mode:
-            logger.info("🛑 [主动对话后台任务] 已停止")
+        # 检查是否应该触发主动对话
+        should_trigger, reason = cls.should_trigger_proactive_chat(chat_key, config)
+
+        if should_trigger:
+            # 触发主动对话
+            await cls.trigger_proactive_chat(context, config, plugin_instance, chat_key)
+        else:
+            # 如果概率判断失败，重置计时器
+            if "概率判断失败" in reason:
+                state = cls.get_chat_state(chat_key)
+                state["last_bot_reply_time"] = time.time()
+                if cls._debug_mode:
+                    logger.info(
+                        f"[主动对话检查] 群{chat_key[-8:]} - {reason}，重置计时器"
+                    )
 
     @classmethod
     async def trigger_proactive_chat(
@@ -0,0 +1,247 @@
+"""
+多关键词匹配工具
+提供 Aho-Corasick 自动机与按规模自动选择后端的关键词匹配器
+
+- AhoCorasick: 一次线性扫描找出文本中所有关键词（含重叠），适合关键词很多的场景
+- CategoryKeywordScorer: 按类别统计关键词命中（带否定词窗口），用于情绪/情感检测
+- KeywordMatcher: 关键词较少时使用合并后的正则（C 实现更快），
+  超过阈值时切换到自动机，调用方无需关心
+
+作者: Him666233
+版本: v1.1.2
+"""
+
+import re
+from collections import deque
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+class AhoCorasick:
+    """Aho-Corasick 多模式匹配自动机（构建后只读，可被多个协程共享）"""
+
+    def __init__(self, words: Iterable[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[str, ...]] = [()]
+        self.words: Tuple[str, ...] = tuple(dict.fromkeys(w for w in words if w))
+        for word in self.words:
+            self._add(word)
+        self._build()
+
+    def _add(self, word: str) -> None:
+        state = 0
+        for ch in word:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][ch] = nxt
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = nxt
+        self._out[state] = self._out[state] + (word,)
+
+    def _build(self) -> None:
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, str]]:
+        """按结束位置顺序产出 (起始下标, 关键词)"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                for word in out[state]:
+                    yield index - len(word) + 1, word
+
+    def search(self, text: str) -> Optional[str]:
+        """返回文本中最先结束的关键词，没有时返回 None"""
+        for _, word in self.iter_matches(text):
+            return word
+        return None
+
+
+class CategoryKeywordScorer:
+    """
+    按类别统计关键词命中次数（支持否定词窗口）
+
+    关键词每次出现（含重叠）计 1 分；若关键词前 negation_range 个字符内
+    完整出现过否定词，则该次出现不计分。构建后只读，可被多个协程共享。
+
+    - 关键词与否定词合计不超过 AUTOMATON_THRESHOLD 个时，先用合并正则（C 实现）
+      定位第一个命中，没有命中直接返回；有命中时从该位置起逐个词 str.find，
+      命中密集时比纯 Python 的逐字符扫描快
+    - 超过阈值时合并为一个 Aho-Corasick 自动机，文本只线性扫描一遍，耗时与词数无关
+    """
+
+    AUTOMATON_THRESHOLD = 200
+
+    def __init__(
+        self,
+        categories: Dict[str, Iterable[str]],
+        negation_words: Iterable[str] = (),
+        negation_range: int = 0,
+    ):
+        self.categories: Tuple[str, ...] = tuple(categories)
+        self.negation_range = negation_range
+        # 关键词 → {类别: 次数}（同一关键词在列表中重复出现时按次数计分）
+        self._word_categories: Dict[str, Dict[str, int]] = {}
+        for category, keywords in categories.items():
+            for keyword in keywords or ():
+                if not isinstance(keyword, str) or not keyword:
+                    continue
+                counts = self._word_categories.setdefault(keyword, {})
+                counts[category] = counts.get(category, 0) + 1
+        self._negation_words = frozenset(
+            w for w in negation_words or () if isinstance(w, str) and w
+        )
+        words = tuple(
+            dict.fromkeys(list(self._word_categories) + list(self._negation_words))
+        )
+        self._automaton: Optional[AhoCorasick] = None
+        self._prefilter: Optional[re.Pattern] = None
+        if len(words) > self.AUTOMATON_THRESHOLD:
+            self._automaton = AhoCorasick(words)
+        elif words:
+            self._prefilter = re.compile("|".join(re.escape(w) for w in words))
+
+    def score(
+        self, text: str, negated: Optional[List[Tuple[int, str]]] = None
+    ) -> Dict[str, int]:
+        """
+        统计文本中各类别的得分
+
+        Args:
+            text: 要分析的文本
+            negated: 可选，传入列表时追加被否定词抵消的 (位置, 关键词)
+
+        Returns:
+            {类别: 得分}，只包含得分大于0的类别，按构建时的类别顺序排列
+        """
+        if not text or not self._word_categories:
+            return {}
+        if self._automaton is None:
+            # 所有匹配的起点都不早于最左命中
+            first = self._prefilter.search(text)
+            if first is None:
+                return {}
+            return self._score_by_find(text, first.start(), negated)
+        return self._score_by_automaton(text, negated)
+
+    def _score_by_find(
+        self, text: str, begin: int, negated: Optional[List[Tuple[int, str]]]
+    ) -> Dict[str, int]:
+        """词数较少时：从 begin 起逐个词查找全部出现位置（含重叠）"""
+        # 被否定词抵消的关键词起点：否定词 [s, e) 需完整落在关键词前 negation_range 个字符内，
+        # 即关键词起点 p 满足 e <= p <= s + negation_range
+        negation_range = int(self.negation_range)
+        blocked: Set[int] = set()
+        for word in self._negation_words:
+            size = len(word)
+            pos = text.find(word, begin)
+            while pos != -1:
+                blocked.update(range(pos + size, pos + negation_range + 1))
+                pos = text.find(word, pos + 1)
+
+        counts: Dict[str, int] = {}
+        for word, categories in self._word_categories.items():
+            pos = text.find(word, begin)
+            while pos != -1:
+                if pos in blocked:
+                    if negated is not None:
+                        negated.append((pos, word))
+                else:
+                    for category, count in categories.items():
+                        counts[category] = counts.get(category, 0) + count
+                pos = text.find(word, pos + 1)
+
+        return {c: counts[c] for c in self.categories if counts.get(c)}
+
+    def _score_by_automaton(
+        self, text: str, negated: Optional[List[Tuple[int, str]]]
+    ) -> Dict[str, int]:
+        """词数较多时：自动机一遍扫描"""
+        word_categories = self._word_categories
+        negation_words = self._negation_words
+        goto, fail, out = (
+            self._automaton._goto,
+            self._automaton._fail,
+            self._automaton._out,
+        )
+        negation_range = int(self.negation_range)
+        # 被否定词抵消的关键词起点（规则同 _score_by_find）
+        # 匹配按结束位置顺序产出，处理某个关键词时，结束于其起点之前的否定词都已登记
+        blocked: Set[int] = set()
+        counts: Dict[str, int] = {}
+        state = 0
+        for index, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = index + 1
+            for word in out[state]:
+                start = end - len(word)
+                if word in negation_words:
+                    blocked.update(range(end, start + negation_range + 1))
+                categories = word_categories.get(word)
+                if categories is None:
+                    continue
+                if start in blocked:
+                    if negated is not None:
+                        negated.append((start, word))
+                    continue
+                for category, count in categories.items():
+                    counts[category] = counts.get(category, 0) + count
+
+        return {c: counts[c] for c in self.categories if counts.get(c)}
+
+
+class KeywordMatcher:
+    """
+    关键词包含检测
+
+    关键词数量不超过 AUTOMATON_THRESHOLD 时使用合并正则，
+    超过后使用 Aho-Corasick 自动机（耗时与关键词数量无关）。
+    """
+
+    AUTOMATON_THRESHOLD = 200
+
+    def __init__(self, keywords: Iterable[str]):
+        self.keywords: Tuple[str, ...] = tuple(
+            dict.fromkeys(str(k) for k in keywords if k)
+        )
+        self._automaton: Optional[AhoCorasick] = None
+        self._pattern: Optional[re.Pattern] = None
+        if len(self.keywords) > self.AUTOMATON_THRESHOLD:
+            self._automaton = AhoCorasick(self.keywords)
+        elif self.keywords:
+            self._pattern = re.compile(
+                "|".join(
+                    re.escape(k) for k in sorted(self.keywords, key=len, reverse=True)
+                )
+            )
+
+    def search(self, text: str) -> Optional[str]:
+        """返回文本中出现的某个关键词，没有时返回 None"""
+        if not text:
+            return None
+        if self._automaton is not None:
+            return self._automaton.search(text)
+        if self._pattern is not None:
+            match = self._pattern.search(text)
+            return match.group(0) if match else None
+        return None
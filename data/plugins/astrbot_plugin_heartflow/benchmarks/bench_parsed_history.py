@@ -0,0 +1,102 @@
+"""
+单条消息处理期间读取对话历史的耗时对比：
+原实现三个辅助方法各自获取会话并完整 json.loads 一次，
+现实现共享一个对话快照，只从尾部解码需要的消息（历史未变化时复用已解码部分）
+
+在 AstrBot 根目录运行:
+    python data/plugins/astrbot_plugin_heartflow/benchmarks/bench_parsed_history.py
+"""
+
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from data.plugins.astrbot_plugin_heartflow.main import HeartflowPlugin  # noqa: E402
+
+HISTORY_SIZES = (50, 200, 1000)
+CONTEXT_MESSAGES = 5
+ROUNDS = 300
+
+
+class Conversation:
+    def __init__(self, history: str):
+        self.history = history
+        self.persona_id = None
+
+
+class ConversationManager:
+    """每次获取都返回新的字符串对象，与从数据库读取一致"""
+
+    def __init__(self, history: str):
+        self.history = history
+
+    async def get_curr_conversation_id(self, umo):
+        return "cid"
+
+    async def get_conversation(self, umo, cid):
+        return Conversation((self.history + " ")[:-1])
+
+
+class Event:
+    unified_msg_origin = "group:1"
+
+
+async def per_call_parsing(plugin, event):
+    """原实现：三个辅助方法各获取一次会话、完整解码一次历史"""
+    manager = plugin.context.conversation_manager
+    for _ in range(3):
+        cid = await manager.get_curr_conversation_id(event.unified_msg_origin)
+        conversation = await manager.get_conversation(event.unified_msg_origin, cid)
+        json.loads(conversation.history)
+
+
+async def shared_snapshot(plugin, event):
+    snapshot = await plugin._get_conversation_snapshot(event)
+    await plugin._get_recent_contexts(event, snapshot)
+    await plugin._get_recent_messages(event, snapshot)
+    await plugin._get_last_bot_reply(event, snapshot)
+
+
+async def timeit(func, plugin, event, clear_cache=False) -> float:
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        if clear_cache:
+            plugin.history_cache.clear()
+        await func(plugin, event)
+    return (time.perf_counter() - start) / ROUNDS
+
+
+async def main():
+    print(
+        f"{'消息数':>6} {'大小':>7} {'逐次解析(us)':>12} {'快照冷(us)':>10} {'快照热(us)':>10}"
+    )
+    for n in HISTORY_SIZES:
+        history = [
+            {"role": "user" if i % 2 else "assistant", "content": "群聊消息内容 " * 20}
+            for i in range(n)
+        ]
+        raw = json.dumps(history)
+
+        plugin = object.__new__(HeartflowPlugin)
+        plugin.context = type("Context", (), {})()
+        plugin.context.conversation_manager = ConversationManager(raw)
+        plugin.context_messages_count = CONTEXT_MESSAGES
+        plugin.history_cache = {}
+        plugin.history_cache_max_size = 256
+        event = Event()
+
+        old = await timeit(per_call_parsing, plugin, event)
+        cold = await timeit(shared_snapshot, plugin, event, clear_cache=True)
+        warm = await timeit(shared_snapshot, plugin, event)
+        print(
+            f"{n:>6} {len(raw) // 1024:>5}KB {old * 1e6:>12.1f} "
+            f"{cold * 1e6:>10.1f} {warm * 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,9 @@
 import json
 import time
+import asyncio
 import datetime
 from typing import Dict
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 import astrbot.api.star as star
 from astrbot.api.event import AstrMessageEvent, filter
@@ -36,8 +37,98 @@ class ChatState:
     last_reset_date: str = ""
     total_messages: int = 0
     total_replies: int = 0
+    # 判断统计
+    judge_calls: int = 0  # 实际发起的判断次数
+    judged_messages: int = 0  # 判断覆盖的消息数（含被合并的消息）
+    judge_latency_total: float = 0.0
+    last_judge_latency: float = 0.0
 
 
+@dataclass
+class JudgeBatch:
+    """同一群聊在合并窗口内等待判断的一批消息"""
+    events: list = field(default_factory=list)
+    result: asyncio.Future = None
+
+
+# 对话历史中每条顶层消息的起始标记。json.dumps 会把字符串内的引号转义为 \"，
+# 因此该标记只可能出现在结构位置上，可用于从尾部定位消息边界
+_MESSAGE_MARK = '{"role"'
+_json_decoder = json.JSONDecoder()
+
+
+class ParsedHistory:
+    """按需从尾部解码的对话历史
+
+    只需要最近N条消息时，仅解码尾部的N条，不解析整段历史；
+    遇到无法按消息边界切分的历史时，回退为一次完整解码。
+    """
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        self._reversed = []  # 已解码的消息，按时间倒序
+        self._cursor = raw.rstrip().rfind("]")  # 尚未解码部分的结束位置
+        self._first = True
+        self._exhausted = False
+
+    def _decode_full(self):
+        """回退：完整解码整段历史"""
+        context = json.loads(self.raw)
+        self._reversed = list(reversed(context))
+        self._exhausted = True
+
+    def _decode_until(self, count: int):
+        """从尾部继续解码，直到已解码 count 条消息或历史已全部解码"""
+        if self._cursor < 0 and not self._exhausted:
+            self._decode_full()
+        raw = self.raw
+        while len(self._reversed) < count and not self._exhausted:
+            start = raw.rfind(_MESSAGE_MARK, 0, self._cursor)
+            if start < 0:
+                if raw[:self._cursor].strip() != "[":
+                    self._decode_full()
+                self._exhausted = True
+                return
+            try:
+                msg, end = _json_decoder.raw_decode(raw, start)
+            except ValueError:
+                self._decode_full()
+                return
+            # 与后一条消息之间只能是逗号分隔（最后一条之后只能是空白），否则说明命中了嵌套对象
+            gap = raw[end:self._cursor].strip()
+            if gap != ("" if self._first else ","):
+                self._decode_full()
+                return
+            self._reversed.append(msg)
+            self._cursor = start
+            self._first = False
+
+    def tail(self, count: int) -> list:
+        """获取最近 count 条消息（按时间正序）"""
+        if count <= 0:
+            return []
+        self._decode_until(count)
+        return list(reversed(self._reversed[:count]))
+
+    def iter_reversed(self):
+        """从最新消息开始逐条向前遍历，按需继续解码"""
+        index = 0
+        while True:
+            if index >= len(self._reversed):
+                self._decode_until(index + 1)
+                if index >= len(self._reversed):
+                    return
+            yield self._reversed[index]
+            index += 1
+
+
+@dataclass
+class ConversationSnapshot:
+    """单条消息处理期间共享的对话快照，会话和历史只获取、解码一次"""
+    conversation_id: str = ""
+    conversation: object = None
+    history: ParsedHistory = None
+
 
 class HeartflowPlugin(star.Star):
 
@@ -62,9 +153,24 @@ class HeartflowPlugin(star.Star):
         # 系统提示词缓存：{conversation_id: {"original": str, "summarized": str, "persona_id": str}}
         self.system_prompt_cache: Dict[str, Dict[str, str]] = {}
 
+        # 对话历史解析缓存：{conversation_id: ParsedHistory}，历史内容变化（写入新消息）时失效
+        self.history_cache: Dict[str, ParsedHistory] = {}
+        self.history_cache_max_size = 256
+
         # 判断配置
         self.judge_include_reasoning = self.config.get("judge_include_reasoning", True)
         self.judge_max_retries = max(0, self.config.get("judge_max_retries", 3))  # 确保最小为0
+
+        # 判断调度配置：合并窗口内的同群消息只判断一次，并限制全局并发
+        self.judge_coalesce_window = max(0.0, self.config.get("judge_coalesce_window", 1.5))
+        self.judge_semaphore = asyncio.Semaphore(max(1, self.config.get("judge_max_concurrency", 4)))
+        self.pending_judge_batches: Dict[str, JudgeBatch] = {}
+        # 正在运行的批次判断任务，持有引用防止任务在运行中被垃圾回收
+        self.judge_tasks: set = set()
+
+        # 判断提示词稳定前缀缓存：{精简人格提示词: 前缀}，前缀不随消息变化，便于提供商复用前缀缓存
+        self.judge_prefix_cache: Dict[str, str] = {}
+        self.judge_prefix_cache_max_size = 16
         
         # 判断权重配置
         self.weights = {
@@ -84,16 +190,53 @@ class HeartflowPlugin(star.Star):
 
         logger.info("心流插件已初始化")
 
-    async def _get_or_create_summarized_system_prompt(self, event: AstrMessageEvent, original_prompt: str) -> str:
+    async def _get_conversation_snapshot(self, event: AstrMessageEvent) -> ConversationSnapshot:
+        """获取当前对话快照（会话对象与解析后的历史）"""
+        snapshot = ConversationSnapshot()
+        try:
+            curr_cid = await self.context.conversation_manager.get_curr_conversation_id(event.unified_msg_origin)
+            if not curr_cid:
+                return snapshot
+            snapshot.conversation_id = curr_cid
+
+            conversation = await self.context.conversation_manager.get_conversation(event.unified_msg_origin, curr_cid)
+            snapshot.conversation = conversation
+            if conversation and conversation.history:
+                snapshot.history = self._get_parsed_history(curr_cid, conversation.history)
+
+        except Exception as e:
+            logger.debug(f"获取对话快照失败: {e}")
+
+        return snapshot
+
+    def _get_parsed_history(self, conversation_id: str, raw_history: str) -> ParsedHistory:
+        """获取对话历史的解析结果，历史未变化时复用已解码的部分"""
+        cached = self.history_cache.get(conversation_id)
+        if cached is not None and cached.raw == raw_history:
+            return cached
+
+        # 历史已被写入（或首次获取），重建解析结果
+        parsed = ParsedHistory(raw_history)
+        self.history_cache.pop(conversation_id, None)
+        if len(self.history_cache) >= self.history_cache_max_size:
+            # 淘汰最早加入的会话
+            self.history_cache.pop(next(iter(self.history_cache)))
+        self.history_cache[conversation_id] = parsed
+        return parsed
+
+    async def _get_or_create_summarized_system_prompt(self, event: AstrMessageEvent, original_prompt: str, snapshot: ConversationSnapshot = None) -> str:
         """获取或创建精简版系统提示词"""
         try:
+            if snapshot is None:
+                snapshot = await self._get_conversation_snapshot(event)
+
             # 获取当前会话ID
-            curr_cid = await self.context.conversation_manager.get_curr_conversation_id(event.unified_msg_origin)
+            curr_cid = snapshot.conversation_id
             if not curr_cid:
                 return original_prompt
             
             # 获取当前人格ID作为缓存键的一部分
-            conversation = await self.context.conversation_manager.get_conversation(event.unified_msg_origin, curr_cid)
+            conversation = snapshot.conversation
             persona_id = conversation.persona_id if conversation else "default"
             
             # 构建缓存键
@@ -182,68 +325,30 @@ class HeartflowPlugin(star.Star):
             logger.error(f"总结系统提示词异常: {e}")
             return original_prompt
 
-    async def judge_with_tiny_model(self, event: AstrMessageEvent) -> JudgeResult:
-        """使用小模型进行智能判断"""
-
-        if not self.judge_provider_name:
-            logger.warning("小参数判断模型提供商名称未配置，跳过心流判断")
-            return JudgeResult(should_reply=False, reasoning="提供商未配置")
-
-        # 获取指定的 provider
-        try:
-            judge_provider = self.context.get_provider_by_id(self.judge_provider_name)
-            if not judge_provider:
-                logger.warning(f"未找到提供商: {self.judge_provider_name}")
-                return JudgeResult(should_reply=False, reasoning=f"提供商不存在: {self.judge_provider_name}")
-        except Exception as e:
-            logger.error(f"获取提供商失败: {e}")
-            return JudgeResult(should_reply=False, reasoning=f"获取提供商失败: {str(e)}")
-
-        # 获取群聊状态
-        chat_state = self._get_chat_state(event.unified_msg_origin)
-
-        # 获取当前对话的人格系统提示词，让模型了解大参数LLM的角色设定
-        original_persona_prompt = await self._get_persona_system_prompt(event)
-        logger.debug(f"小参数模型获取原始人格提示词: {'有' if original_persona_prompt else '无'} | 长度: {len(original_persona_prompt) if original_persona_prompt else 0}")
-        
-        # 获取或创建精简版系统提示词
-        persona_system_prompt = await self._get_or_create_summarized_system_prompt(event, original_persona_prompt)
-        logger.debug(f"小参数模型使用精简人格提示词: {'有' if persona_system_prompt else '无'} | 长度: {len(persona_system_prompt) if persona_system_prompt else 0}")
+    def _build_judge_prompt_prefix(self, persona_system_prompt: str) -> str:
+        """构建判断提示词的稳定前缀（角色设定、评估要求、输出格式）
 
-        # 构建判断上下文
-        chat_context = await self._build_chat_context(event)
-        recent_messages = await self._get_recent_messages(event)
-        last_bot_reply = await self._get_last_bot_reply(event)  # 新增：获取上次bot回复
+        前缀只依赖精简人格提示词和配置，同一人格下每次判断都完全相同，
+        作为系统提示词传入，支持前缀缓存的提供商可以直接复用。
+        """
+        cached = self.judge_prefix_cache.get(persona_system_prompt)
+        if cached is not None:
+            return cached
 
         reasoning_part = ""
         if self.judge_include_reasoning:
             reasoning_part = ',\n    "reasoning": "详细分析原因，说明为什么应该或不应该回复，需要结合机器人角色特点进行分析，特别说明与上次回复的关联性"'
 
-        judge_prompt = f"""
-你是群聊机器人的决策系统，需要判断是否应该主动回复以下消息。
+        prefix = "你是一个专业的群聊回复决策系统，能够准确判断消息价值和回复时机。"
+        if persona_system_prompt:
+            prefix += f"\n\n你正在为以下角色的机器人做决策：\n{persona_system_prompt}"
+        prefix += "\n\n**重要提醒：你必须严格按照JSON格式返回结果，不要包含任何其他内容！请不要进行对话，只返回JSON！**\n\n"
+        prefix += f"""
+你是群聊机器人的决策系统，需要判断是否应该主动回复用户给出的待判断消息。
 
 ## 机器人角色设定
 {persona_system_prompt if persona_system_prompt else "默认角色：智能助手"}
 
-## 当前群聊情况
-- 群聊ID: {event.unified_msg_origin}
-- 我的精力水平: {chat_state.energy:.1f}/1.0
-- 上次发言: {self._get_minutes_since_last_reply(event.unified_msg_origin)}分钟前
-
-## 群聊基本信息
-{chat_context}
-
-## 最近{self.context_messages_count}条对话历史
-{recent_messages}
-
-## 上次机器人回复
-{last_bot_reply if last_bot_reply else "暂无上次回复记录"}
-
-## 待判断消息
-发送者: {event.get_sender_name()}
-内容: {event.message_str}
-时间: {datetime.datetime.now().strftime('%H:%M:%S')}
-
 ## 评估要求
 请从以下5个维度评估（0-10分），**重要提醒：基于上述机器人角色设定来判断是否适合回复**：
 
@@ -285,17 +390,137 @@ class HeartflowPlugin(star.Star):
 
 **注意：你的回复必须是完整的JSON对象，不要包含任何解释性文字或其他内容！**
 """
+        if len(self.judge_prefix_cache) >= self.judge_prefix_cache_max_size:
+            # 淘汰最早加入的人格（人格提示词变化后旧前缀不会再被使用）
+            self.judge_prefix_cache.pop(next(iter(self.judge_prefix_cache)))
+        self.judge_prefix_cache[persona_system_prompt] = prefix
+        return prefix
+
+    async def _schedule_judge(self, event: AstrMessageEvent) -> JudgeResult:
+        """调度判断：同一群聊在合并窗口内的消息只判断一次，结果作用于窗口内最新的消息"""
+        if self.judge_coalesce_window <= 0:
+            return await self.judge_with_tiny_model(event)
 
+        chat_id = event.unified_msg_origin
+        batch = self.pending_judge_batches.get(chat_id)
+        if batch is None:
+            # 窗口内的第一条消息，创建批次并在窗口结束后统一判断
+            batch = JudgeBatch(result=asyncio.get_running_loop().create_future())
+            self.pending_judge_batches[chat_id] = batch
+            task = asyncio.create_task(self._run_judge_batch(chat_id, batch))
+            self.judge_tasks.add(task)
+            task.add_done_callback(self.judge_tasks.discard)
+        batch.events.append(event)
+
+        judge_result = await asyncio.shield(batch.result)
+        if batch.events[-1] is not event:
+            return JudgeResult(should_reply=False, reasoning="已合并到同一群聊后续消息的判断中")
+        return judge_result
+
+    async def _run_judge_batch(self, chat_id: str, batch: JudgeBatch):
+        """合并窗口结束后，针对批次中最新的消息发起一次判断"""
+        judge_result = JudgeResult(should_reply=False, reasoning="判断已取消")
         try:
-            # 使用 provider 调用模型，传入最近的对话历史作为上下文
-            recent_contexts = await self._get_recent_contexts(event)
+            try:
+                await asyncio.sleep(self.judge_coalesce_window)
+            finally:
+                # 窗口关闭，之后到达的消息进入新的批次
+                if self.pending_judge_batches.get(chat_id) is batch:
+                    del self.pending_judge_batches[chat_id]
+
+            try:
+                judge_result = await self.judge_with_tiny_model(batch.events[-1], batch.events)
+            except Exception as e:
+                logger.error(f"心流合并判断异常: {e}")
+                judge_result = JudgeResult(should_reply=False, reasoning=f"异常: {str(e)}")
+        finally:
+            # 任务被取消时也要给出结果，否则批次中等待的消息会一直挂起
+            if not batch.result.done():
+                batch.result.set_result(judge_result)
+
+    async def judge_with_tiny_model(self, event: AstrMessageEvent, batch_events: list = None) -> JudgeResult:
+        """使用小模型进行智能判断
+
+        batch_events 为合并窗口内同一群聊的消息（按到达顺序，最后一条即 event），
+        为空时只判断 event 本身。
+        """
+
+        if not self.judge_provider_name:
+            logger.warning("小参数判断模型提供商名称未配置，跳过心流判断")
+            return JudgeResult(should_reply=False, reasoning="提供商未配置")
+
+        # 获取指定的 provider
+        try:
+            judge_provider = self.context.get_provider_by_id(self.judge_provider_name)
+            if not judge_provider:
+                logger.warning(f"未找到提供商: {self.judge_provider_name}")
+                return JudgeResult(should_reply=False, reasoning=f"提供商不存在: {self.judge_provider_name}")
+        except Exception as e:
+            logger.error(f"获取提供商失败: {e}")
+            return JudgeResult(should_reply=False, reasoning=f"获取提供商失败: {str(e)}")
+
+        if not batch_events:
+            batch_events = [event]
+
+        # 获取群聊状态
+        chat_state = self._get_chat_state(event.unified_msg_origin)
+
+        # 获取当前对话快照，后续各步骤共享同一份会话与解析后的历史
+        snapshot = await self._get_conversation_snapshot(event)
+
+        # 获取当前对话的人格系统提示词，让模型了解大参数LLM的角色设定
+        original_persona_prompt = await self._get_persona_system_prompt(event, snapshot)
+        logger.debug(f"小参数模型获取原始人格提示词: {'有' if original_persona_prompt else '无'} | 长度: {len(original_persona_prompt) if original_persona_prompt else 0}")
+        
+        # 获取或创建精简版系统提示词
+        persona_system_prompt = await self._get_or_create_summarized_system_prompt(event, original_persona_prompt, snapshot)
+        logger.debug(f"小参数模型使用精简人格提示词: {'有' if persona_system_prompt else '无'} | 长度: {len(persona_system_prompt) if persona_system_prompt else 0}")
+
+        # 稳定前缀：角色设定 + 评估要求 + 输出格式，作为系统提示词
+        judge_prefix = self._build_judge_prompt_prefix(persona_system_prompt)
+
+        # 构建判断上下文
+        chat_context = await self._build_chat_context(event)
+        recent_messages = await self._get_recent_messages(event, snapshot)
+        last_bot_reply = await self._get_last_bot_reply(event, snapshot)  # 新增：获取上次bot回复
+
+        # 待判断消息：窗口内连续到达的多条消息一并给出，以最后一条为准
+        if len(batch_events) > 1:
+            earlier_messages = "\n".join(f"{e.get_sender_name()}: {e.message_str}" for e in batch_events[:-1])
+            pending_part = f"""以下{len(batch_events)}条消息在短时间内连续到达，请结合前面的消息，判断是否应该回复最后一条：
+{earlier_messages}
+
+最后一条消息：
+"""
+        else:
+            pending_part = ""
+
+        # 可变后缀：随每次判断变化的群聊状态与消息
+        judge_suffix = f"""## 当前群聊情况
+- 群聊ID: {event.unified_msg_origin}
+- 我的精力水平: {chat_state.energy:.1f}/1.0
+- 上次发言: {self._get_minutes_since_last_reply(event.unified_msg_origin)}分钟前
+
+## 群聊基本信息
+{chat_context}
+
+## 最近{self.context_messages_count}条对话历史
+{recent_messages}
+
+## 上次机器人回复
+{last_bot_reply if last_bot_reply else "暂无上次回复记录"}
+
+## 待判断消息
+{pending_part}发送者: {event.get_sender_name()}
+内容: {event.message_str}
+时间: {datetime.datetime.now().strftime('%H:%M:%S')}
 
-            # 构建完整的判断提示词，将系统提示直接整合到prompt中
-            complete_judge_prompt = "你是一个专业的群聊回复决策系统，能够准确判断消息价值和回复时机。"
-            if persona_system_prompt:
-                complete_judge_prompt += f"\n\n你正在为以下角色的机器人做决策：\n{persona_system_prompt}"
-            complete_judge_prompt += "\n\n**重要提醒：你必须严格按照JSON格式返回结果，不要包含任何其他内容！请不要进行对话，只返回JSON！**\n\n"
-            complete_judge_prompt += judge_prompt
+请按照评估要求，只返回JSON。"""
+
+        try:
+            # 使用 provider 调用模型，传入最近的对话历史作为上下文
+            recent_contexts = await self._get_recent_contexts(event, snapshot)
+            judge_prompt = judge_suffix
 
             # 重试机制：使用配置的重试次数
             max_retries = self.judge_max_retries + 1  # 配置的次数+原始尝试=总尝试次数
@@ -303,76 +528,84 @@ class HeartflowPlugin(star.Star):
             # 如果配置的重试次数为0，只尝试一次
             if self.judge_max_retries == 0:
                 max_retries = 1
-            
-            for attempt in range(max_retries):
+
+            # 限制全局判断并发，并统计判断次数、合并消息数与耗时
+            async with self.judge_semaphore:
+                start_time = time.time()
                 try:
-                    logger.debug(f"小参数模型判断尝试 {attempt + 1}/{max_retries}")
-                    
-                    llm_response = await judge_provider.text_chat(
-                        prompt=complete_judge_prompt,
-                        contexts=recent_contexts  # 传入最近的对话历史
-                    )
-
-                    content = llm_response.completion_text.strip()
-                    logger.debug(f"小参数模型原始返回内容: {content[:200]}...")
-
-                    # 尝试提取JSON
-                    if content.startswith("```json"):
-                        content = content.replace("```json", "").replace("```", "").strip()
-                    elif content.startswith("```"):
-                        content = content.replace("```", "").strip()
-
-                    judge_data = json.loads(content)
-
-                    # 直接从JSON根对象获取分数
-                    relevance = judge_data.get("relevance", 0)
-                    willingness = judge_data.get("willingness", 0)
-                    social = judge_data.get("social", 0)
-                    timing = judge_data.get("timing", 0)
-                    continuity = judge_data.get("continuity", 0)
-                    
-                    # 计算综合评分
-                    overall_score = (
-                        relevance * self.weights["relevance"] +
-                        willingness * self.weights["willingness"] +
-                        social * self.weights["social"] +
-                        timing * self.weights["timing"] +
-                        continuity * self.weights["continuity"]
-                    ) / 10.0
-
-                    # 根据综合评分判断是否应该回复
-                    should_reply = overall_score >= self.reply_threshold
-
-                    logger.debug(f"小参数模型判断成功，综合评分: {overall_score:.3f}, 是否回复: {should_reply}")
-
-                    return JudgeResult(
-                        relevance=relevance,
-                        willingness=willingness,
-                        social=social,
-                        timing=timing,
-                        continuity=continuity,
-                        reasoning=judge_data.get("reasoning", "") if self.judge_include_reasoning else "",
-                        should_reply=should_reply,
-                        confidence=overall_score,  # 使用综合评分作为置信度
-                        overall_score=overall_score,
-                        related_messages=[]  # 不再使用关联消息功能
-                    )
-                    
-                except json.JSONDecodeError as e:
-                    logger.warning(f"小参数模型返回JSON解析失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
-                    logger.warning(f"无法解析的内容: {content[:500]}...")
-                    
-                    if attempt == max_retries - 1:
-                        # 最后一次尝试失败，返回失败结果
-                        logger.error(f"小参数模型重试{self.judge_max_retries}次后仍然返回无效JSON，放弃处理")
-                        return JudgeResult(should_reply=False, reasoning=f"JSON解析失败，重试{self.judge_max_retries}次")
-                    else:
-                        # 还有重试机会，添加更强的提示
-                        complete_judge_prompt = complete_judge_prompt.replace(
-                            "**重要提醒：你必须严格按照JSON格式返回结果，不要包含任何其他内容！请不要进行对话，只返回JSON！**",
-                            f"**重要提醒：你必须严格按照JSON格式返回结果，不要包含任何其他内容！请不要进行对话，只返回JSON！这是第{attempt + 2}次尝试，请确保返回有效的JSON格式！**"
-                        )
-                        continue
+                    for attempt in range(max_retries):
+                        try:
+                            logger.debug(f"小参数模型判断尝试 {attempt + 1}/{max_retries}")
+
+                            llm_response = await judge_provider.text_chat(
+                                prompt=judge_prompt,
+                                contexts=recent_contexts,  # 传入最近的对话历史
+                                system_prompt=judge_prefix
+                            )
+
+                            content = llm_response.completion_text.strip()
+                            logger.debug(f"小参数模型原始返回内容: {content[:200]}...")
+
+                            # 尝试提取JSON
+                            if content.startswith("```json"):
+                                content = content.replace("```json", "").replace("```", "").strip()
+                            elif content.startswith("```"):
+                                content = content.replace("```", "").strip()
+
+                            judge_data = json.loads(content)
+
+                            # 直接从JSON根对象获取分数
+                            relevance = judge_data.get("relevance", 0)
+                            willingness = judge_data.get("willingness", 0)
+                            social = judge_data.get("social", 0)
+                            timing = judge_data.get("timing", 0)
+                            continuity = judge_data.get("continuity", 0)
+
+                            # 计算综合评分
+                            overall_score = (
+                                relevance * self.weights["relevance"] +
+                                willingness * self.weights["willingness"] +
+                                social * self.weights["social"] +
+                                timing * self.weights["timing"] +
+                                continuity * self.weights["continuity"]
+                            ) / 10.0
+
+                            # 根据综合评分判断是否应该回复
+                            should_reply = overall_score >= self.reply_threshold
+
+                            logger.debug(f"小参数模型判断成功，综合评分: {overall_score:.3f}, 是否回复: {should_reply}")
+
+                            return JudgeResult(
+                                relevance=relevance,
+                                willingness=willingness,
+                                social=social,
+                                timing=timing,
+                                continuity=continuity,
+                                reasoning=judge_data.get("reasoning", "") if self.judge_include_reasoning else "",
+                                should_reply=should_reply,
+                                confidence=overall_score,  # 使用综合评分作为置信度
+                                overall_score=overall_score,
+                                related_messages=[]  # 不再使用关联消息功能
+                            )
+
+                        except json.JSONDecodeError as e:
+                            logger.warning(f"小参数模型返回JSON解析失败 (尝试 {attempt + 1}/{max_retries}): {str(e)}")
+                            logger.warning(f"无法解析的内容: {content[:500]}...")
+
+                            if attempt == max_retries - 1:
+                                # 最后一次尝试失败，返回失败结果
+                                logger.error(f"小参数模型重试{self.judge_max_retries}次后仍然返回无效JSON，放弃处理")
+                                return JudgeResult(should_reply=False, reasoning=f"JSON解析失败，重试{self.judge_max_retries}次")
+                            else:
+                                # 还有重试机会，在可变后缀末尾追加更强的提示，保持前缀不变
+                                judge_prompt = judge_suffix + f"\n\n**重要提醒：你必须严格按照JSON格式返回结果，不要包含任何其他内容！请不要进行对话，只返回JSON！这是第{attempt + 2}次尝试，请确保返回有效的JSON格式！**"
+                                continue
+                finally:
+                    latency = time.time() - start_time
+                    chat_state.judge_calls += 1
+                    chat_state.judged_messages += len(batch_events)
+                    chat_state.judge_latency_total += latency
+                    chat_state.last_judge_latency = latency
 
         except Exception as e:
             logger.error(f"小参数模型判断异常: {e}")
@@ -387,8 +620,8 @@ class HeartflowPlugin(star.Star):
             return
 
         try:
-            # 小参数模型判断是否需要回复
-            judge_result = await self.judge_with_tiny_model(event)
+            # 小参数模型判断（同群短时间内的消息会被合并为一次判断）
+            judge_result = await self._schedule_judge(event)
 
             if judge_result.should_reply:
                 logger.info(f"🔥 心流触发主动回复 | {event.unified_msg_origin[:20]}... | 评分:{judge_result.overall_score:.2f}")
@@ -469,25 +702,20 @@ class HeartflowPlugin(star.Star):
 
         return int((time.time() - chat_state.last_reply_time) / 60)
 
-    async def _get_recent_contexts(self, event: AstrMessageEvent) -> list:
+    async def _get_recent_contexts(self, event: AstrMessageEvent, snapshot: ConversationSnapshot = None) -> list:
         """获取最近的对话上下文（用于传递给小参数模型）
         
         注意：此方法会过滤掉函数调用相关内容，只保留纯文本消息，
         以避免小参数模型因不支持函数调用而报错。
         """
         try:
-            curr_cid = await self.context.conversation_manager.get_curr_conversation_id(event.unified_msg_origin)
-            if not curr_cid:
+            if snapshot is None:
+                snapshot = await self._get_conversation_snapshot(event)
+            if not snapshot.history:
                 return []
 
-            conversation = await self.context.conversation_manager.get_conversation(event.unified_msg_origin, curr_cid)
-            if not conversation or not conversation.history:
-                return []
-
-            context = json.loads(conversation.history)
-
-            # 获取最近的 context_messages_count 条消息
-            recent_context = context[-self.context_messages_count:] if len(context) > self.context_messages_count else context
+            # 获取最近的 context_messages_count 条消息（只解码尾部）
+            recent_context = snapshot.history.tail(self.context_messages_count)
 
             # 过滤掉函数调用相关内容，避免小参数模型报错
             filtered_context = []
@@ -519,21 +747,16 @@ class HeartflowPlugin(star.Star):
 当前时间: {datetime.datetime.now().strftime('%H:%M')}"""
         return context_info
 
-    async def _get_recent_messages(self, event: AstrMessageEvent) -> str:
+    async def _get_recent_messages(self, event: AstrMessageEvent, snapshot: ConversationSnapshot = None) -> str:
         """获取最近的消息历史（用于小参数模型判断）"""
         try:
-            curr_cid = await self.context.conversation_manager.get_curr_conversation_id(event.unified_msg_origin)
-            if not curr_cid:
+            if snapshot is None:
+                snapshot = await self._get_conversation_snapshot(event)
+            if not snapshot.history:
                 return "暂无对话历史"
 
-            conversation = await self.context.conversation_manager.get_conversation(event.unified_msg_origin, curr_cid)
-            if not conversation or not conversation.history:
-                return "暂无对话历史"
-
-            context = json.loads(conversation.history)
-
-            # 获取最近的 context_messages_count 条消息
-            recent_context = context[-self.context_messages_count:] if len(context) > self.context_messages_count else context
+            # 获取最近的 context_messages_count 条消息（只解码尾部）
+            recent_context = snapshot.history.tail(self.context_messages_count)
 
             # 直接返回原始的对话历史，让小参数模型自己判断
             messages_text = []
@@ -549,21 +772,16 @@ class HeartflowPlugin(star.Star):
             logger.debug(f"获取消息历史失败: {e}")
             return "暂无对话历史"
 
-    async def _get_last_bot_reply(self, event: AstrMessageEvent) -> str:
+    async def _get_last_bot_reply(self, event: AstrMessageEvent, snapshot: ConversationSnapshot = None) -> str:
         """获取上次机器人的回复消息"""
         try:
-            curr_cid = await self.context.conversation_manager.get_curr_conversation_id(event.unified_msg_origin)
-            if not curr_cid:
+            if snapshot is None:
+                snapshot = await self._get_conversation_snapshot(event)
+            if not snapshot.history:
                 return None
 
-            conversation = await self.context.conversation_manager.get_conversation(event.unified_msg_origin, curr_cid)
-            if not conversation or not conversation.history:
-                return None
-
-            context = json.loads(conversation.history)
-
-            # 从后往前查找最后一条assistant消息
-            for msg in reversed(context):
+            # 从后往前查找最后一条assistant消息（按需向前解码）
+            for msg in snapshot.history.iter_reversed():
                 role = msg.get("role", "unknown")
                 content = msg.get("content", "")
                 if role == "assistant" and content.strip():
@@ -624,15 +842,24 @@ class HeartflowPlugin(star.Star):
 - 总回复数: {chat_state.total_replies}
 - 回复率: {(chat_state.total_replies / max(1, chat_state.total_messages) * 100):.1f}%
 
+⚡ **判断统计**
+- 判断次数: {chat_state.judge_calls}
+- 覆盖消息数: {chat_state.judged_messages}
+- 合并比: {(chat_state.judged_messages / max(1, chat_state.judge_calls)):.2f} 条/次
+- 平均耗时: {(chat_state.judge_latency_total / max(1, chat_state.judge_calls)):.2f}秒
+- 最近耗时: {chat_state.last_judge_latency:.2f}秒
+
 ⚙️ **配置参数**
 - 回复阈值: {self.reply_threshold}
 - 判断提供商: {self.judge_provider_name}
 - 最大重试次数: {self.judge_max_retries}
+- 判断合并窗口: {self.judge_coalesce_window}秒
 - 白名单模式: {'✅ 开启' if self.whitelist_enabled else '❌ 关闭'}
 - 白名单群聊数: {len(self.chat_whitelist) if self.whitelist_enabled else 0}
 
 🧠 **智能缓存**
 - 系统提示词缓存: {len(self.system_prompt_cache)} 个
+- 对话历史缓存: {len(self.history_cache)} 个
 
 🎯 **评分权重**
 - 内容相关度: {self.weights['relevance']:.0%}
@@ -689,21 +916,25 @@ class HeartflowPlugin(star.Star):
         
         cache_count = len(self.system_prompt_cache)
         self.system_prompt_cache.clear()
+        self.judge_prefix_cache.clear()
         
         event.set_result(event.plain_result(f"✅ 已清除 {cache_count} 个系统提示词缓存"))
         logger.info(f"系统提示词缓存已清除，共清除 {cache_count} 个缓存")
 
-    async def _get_persona_system_prompt(self, event: AstrMessageEvent) -> str:
+    async def _get_persona_system_prompt(self, event: AstrMessageEvent, snapshot: ConversationSnapshot = None) -> str:
         """获取当前对话的人格系统提示词"""
         try:
+            if snapshot is None:
+                snapshot = await self._get_conversation_snapshot(event)
+
             # 获取当前对话
-            curr_cid = await self.context.conversation_manager.get_curr_conversation_id(event.unified_msg_origin)
+            curr_cid = snapshot.conversation_id
             if not curr_cid:
                 # 如果没有对话ID，使用默认人格
                 default_persona_name = self.context.provider_manager.selected_default_persona["name"]
                 return self._get_persona_prompt_by_name(default_persona_name)
 
-            conversation = await self.context.conversation_manager.get_conversation(event.unified_msg_origin, curr_cid)
+            conversation = snapshot.conversation
             if not conversation:
                 # 如果没有对话对象，使用默认人格
                 default_persona_name = self.context.provider_manager.selected_default_persona["name"]
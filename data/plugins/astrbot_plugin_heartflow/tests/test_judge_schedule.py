@@ -0,0 +1,159 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from data.plugins.astrbot_plugin_heartflow.main import HeartflowPlugin  # noqa: E402
+
+HIGH_SCORES = json.dumps(
+    {"relevance": 10, "willingness": 10, "social": 10, "timing": 10, "continuity": 10}
+)
+
+
+class FakeProvider:
+    """记录调用次数、提示词与最大并发的判断模型"""
+
+    def __init__(self, latency=0.02):
+        self.latency = latency
+        self.prompts = []
+        self.concurrent = 0
+        self.max_concurrent = 0
+
+    async def text_chat(self, prompt, contexts=None, system_prompt=None, **kwargs):
+        self.prompts.append(prompt)
+        self.concurrent += 1
+        self.max_concurrent = max(self.max_concurrent, self.concurrent)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.concurrent -= 1
+        return SimpleNamespace(completion_text=HIGH_SCORES)
+
+
+class FakeConversationManager:
+    async def get_curr_conversation_id(self, umo):
+        return None
+
+
+class FakeEvent:
+    def __init__(self, chat_id, text, sender="群友"):
+        self.unified_msg_origin = chat_id
+        self.message_str = text
+        self.sender = sender
+
+    def get_sender_name(self):
+        return self.sender
+
+
+def make_plugin(provider, **config):
+    context = SimpleNamespace(
+        get_provider_by_id=lambda name: provider,
+        conversation_manager=FakeConversationManager(),
+    )
+    config.setdefault("judge_provider_name", "judge")
+    config.setdefault("judge_coalesce_window", 0.05)
+    return HeartflowPlugin(context, config)
+
+
+def test_messages_in_window_are_judged_once():
+    provider = FakeProvider()
+    plugin = make_plugin(provider)
+
+    async def main():
+        first = [plugin._schedule_judge(FakeEvent("group:1", f"消息{i}")) for i in range(3)]
+        results = await asyncio.gather(*first)
+        # 窗口关闭后到达的消息进入新的批次
+        results.append(await plugin._schedule_judge(FakeEvent("group:1", "消息3")))
+        return results
+
+    results = asyncio.run(main())
+    assert [r.should_reply for r in results] == [False, False, True, True]
+    assert results[0].reasoning == results[1].reasoning == "已合并到同一群聊后续消息的判断中"
+    assert len(provider.prompts) == 2
+    state = plugin.chat_states["group:1"]
+    assert (state.judge_calls, state.judged_messages) == (2, 4)
+    assert plugin.pending_judge_batches == {}
+
+
+def test_merged_prompt_contains_whole_batch():
+    provider = FakeProvider()
+    plugin = make_plugin(provider)
+
+    async def main():
+        return await asyncio.gather(
+            plugin._schedule_judge(FakeEvent("group:1", "今天去哪玩", "小明")),
+            plugin._schedule_judge(FakeEvent("group:1", "爬山怎么样", "小红")),
+        )
+
+    earlier, latest = asyncio.run(main())
+    assert latest.should_reply and latest.overall_score == pytest.approx(1.0)
+    assert not earlier.should_reply
+    (prompt,) = provider.prompts
+    assert "以下2条消息在短时间内连续到达" in prompt
+    assert "小明: 今天去哪玩" in prompt
+    assert "发送者: 小红\n内容: 爬山怎么样" in prompt
+
+
+def test_different_chats_are_judged_separately_within_semaphore():
+    provider = FakeProvider(latency=0.03)
+    plugin = make_plugin(provider, judge_max_concurrency=2)
+
+    async def main():
+        return await asyncio.gather(
+            *(plugin._schedule_judge(FakeEvent(f"group:{i}", "你好")) for i in range(5))
+        )
+
+    assert all(r.should_reply for r in asyncio.run(main()))
+    assert len(provider.prompts) == 5
+    assert provider.max_concurrent == 2
+
+
+def test_zero_window_judges_every_message():
+    provider = FakeProvider()
+    plugin = make_plugin(provider, judge_coalesce_window=0)
+
+    async def main():
+        return await asyncio.gather(
+            *(plugin._schedule_judge(FakeEvent("group:1", f"消息{i}")) for i in range(3))
+        )
+
+    assert all(r.should_reply for r in asyncio.run(main()))
+    assert len(provider.prompts) == 3
+    assert plugin.judge_tasks == set()
+
+
+def test_cancelled_batch_releases_waiters():
+    provider = FakeProvider()
+    plugin = make_plugin(provider, judge_coalesce_window=10)
+
+    async def main():
+        waiters = [
+            asyncio.ensure_future(plugin._schedule_judge(FakeEvent("group:1", f"消息{i}")))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0.01)
+        (task,) = plugin.judge_tasks
+        task.cancel()
+        return await asyncio.wait_for(asyncio.gather(*waiters), timeout=1)
+
+    results = asyncio.run(main())
+    assert [r.should_reply for r in results] == [False, False]
+    assert results[1].reasoning == "判断已取消"
+    assert provider.prompts == []
+    assert plugin.pending_judge_batches == {}
+
+
+def test_judge_prefix_cache_is_bounded():
+    plugin = make_plugin(FakeProvider())
+    first = plugin._build_judge_prompt_prefix("人格0")
+    assert plugin._build_judge_prompt_prefix("人格0") is first
+
+    for i in range(1, 40):
+        plugin._build_judge_prompt_prefix(f"人格{i}")
+    assert len(plugin.judge_prefix_cache) == plugin.judge_prefix_cache_max_size
+    assert "人格39" in plugin.judge_prefix_cache
+    assert "人格0" not in plugin.judge_prefix_cache
+    assert plugin._build_judge_prompt_prefix("人格0") == first
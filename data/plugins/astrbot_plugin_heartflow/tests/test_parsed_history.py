@@ -0,0 +1,185 @@
+import asyncio
+import json
+import random
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from data.plugins.astrbot_plugin_heartflow.main import (  # noqa: E402
+    HeartflowPlugin,
+    ParsedHistory,
+)
+
+
+def make_history(rnd: random.Random, n: int) -> list:
+    """含工具调用、嵌套 role 字段和转义引号的随机历史"""
+    history = []
+    for i in range(n):
+        r = rnd.random()
+        if r < 0.1:
+            arguments = json.dumps({"q": '{"role": "x"}'})
+            history.append(
+                {
+                    "role": "assistant",
+                    "content": None,
+                    "tool_calls": [
+                        {
+                            "id": "call",
+                            "type": "function",
+                            "function": {"name": "f", "arguments": arguments},
+                        }
+                    ],
+                }
+            )
+        elif r < 0.15:
+            history.append(
+                {"role": "tool", "tool_call_id": "call", "content": '{"role": "user"}'}
+            )
+        else:
+            content = "消息内容 " * rnd.randint(1, 30) + '"{\\"role\\"}'
+            history.append(
+                {"role": "user" if i % 2 else "assistant", "content": content}
+            )
+    return history
+
+
+@pytest.mark.parametrize("n", [0, 1, 2, 7, 50, 200])
+@pytest.mark.parametrize("ensure_ascii", [True, False])
+def test_tail_and_reverse_iteration_match_full_decode(n, ensure_ascii):
+    history = make_history(random.Random(n), n)
+    raw = json.dumps(history, ensure_ascii=ensure_ascii)
+    for count in (0, 1, 5, n, n + 3):
+        expected = history[-count:] if count else []
+        assert ParsedHistory(raw).tail(count) == expected
+    assert list(ParsedHistory(raw).iter_reversed()) == history[::-1]
+
+    # 同一个对象上先取少量再取更多，结果与完整解码一致
+    parsed = ParsedHistory(raw)
+    parsed.tail(1)
+    assert parsed.tail(n) == history
+
+
+@pytest.mark.parametrize(
+    "history",
+    [
+        # content 中嵌套了带 role 的对象，需回退为完整解码
+        [
+            {"role": "user", "content": "a"},
+            {"role": "assistant", "content": [{"role": "x"}]},
+        ],
+        # role 不是第一个字段
+        [{"content": "a", "role": "user"}, {"role": "assistant", "content": "b"}],
+    ],
+)
+def test_irregular_histories_fall_back_to_full_decode(history):
+    raw = json.dumps(history)
+    assert ParsedHistory(raw).tail(5) == history
+    assert list(ParsedHistory(raw).iter_reversed()) == history[::-1]
+
+
+# ------------------------------------------------------------------ 与原逐次解析的实现对比
+def old_recent_contexts(raw: str, count: int) -> list:
+    context = json.loads(raw)
+    recent = context[-count:] if len(context) > count else context
+    return [
+        {"role": msg["role"], "content": msg["content"]}
+        for msg in recent
+        if msg.get("role", "") in ["user", "assistant"]
+        and msg.get("content", "")
+        and isinstance(msg.get("content", ""), str)
+    ]
+
+
+def old_recent_messages(raw: str, count: int) -> str:
+    try:
+        context = json.loads(raw)
+        recent = context[-count:] if len(context) > count else context
+        texts = [
+            msg.get("content", "")
+            for msg in recent
+            if msg.get("role", "unknown") in ["user", "assistant"]
+        ]
+        return "\n---\n".join(texts) if texts else "暂无对话历史"
+    except Exception:
+        return "暂无对话历史"
+
+
+def old_last_bot_reply(raw: str):
+    try:
+        for msg in reversed(json.loads(raw)):
+            content = msg.get("content", "")
+            if msg.get("role", "unknown") == "assistant" and content.strip():
+                return content
+        return None
+    except Exception:
+        return None
+
+
+class FakeConversation:
+    def __init__(self, history: str):
+        self.history = history
+        self.persona_id = None
+
+
+class FakeConversationManager:
+    def __init__(self, history: str):
+        self.history = history
+
+    async def get_curr_conversation_id(self, umo):
+        return "cid"
+
+    async def get_conversation(self, umo, cid):
+        return FakeConversation(self.history)
+
+
+class FakeEvent:
+    unified_msg_origin = "group:1"
+
+
+def make_plugin(history: str, count: int) -> HeartflowPlugin:
+    plugin = object.__new__(HeartflowPlugin)
+    plugin.context = type("Context", (), {})()
+    plugin.context.conversation_manager = FakeConversationManager(history)
+    plugin.context_messages_count = count
+    plugin.history_cache = {}
+    plugin.history_cache_max_size = 256
+    return plugin
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_snapshot_helpers_match_per_call_parsing(seed):
+    rnd = random.Random(seed)
+    history = make_history(rnd, rnd.randint(1, 120))
+    # 保证最后一条 assistant 消息是纯文本，避免两边都因 None.strip() 返回 None
+    history.append({"role": "assistant", "content": "上次的回复"})
+    history.extend(make_history(rnd, rnd.randint(0, 3)))
+    raw = json.dumps(history)
+    count = rnd.choice([1, 5, 10])
+
+    async def scenario():
+        plugin = make_plugin(raw, count)
+        event = FakeEvent()
+        snapshot = await plugin._get_conversation_snapshot(event)
+        return (
+            await plugin._get_recent_contexts(event, snapshot),
+            await plugin._get_recent_messages(event, snapshot),
+            await plugin._get_last_bot_reply(event, snapshot),
+        )
+
+    contexts, messages, last_reply = asyncio.run(scenario())
+    assert contexts == old_recent_contexts(raw, count)
+    assert messages == old_recent_messages(raw, count)
+    assert last_reply == old_last_bot_reply(raw)
+
+
+def test_history_cache_reuses_parse_until_history_changes():
+    history = make_history(random.Random(0), 20)
+    plugin = make_plugin(json.dumps(history), 5)
+    first = plugin._get_parsed_history("cid", json.dumps(history))
+    assert plugin._get_parsed_history("cid", json.dumps(history)) is first
+
+    history.append({"role": "user", "content": "新消息"})
+    updated = plugin._get_parsed_history("cid", json.dumps(history))
+    assert updated is not first
+    assert updated.tail(1) == [{"role": "user", "content": "新消息"}]
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from datetime import datetime, date
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, date, timedelta
+from typing import Awaitable, Callable
 import zoneinfo
 
 from astrbot.api import logger
@@ -67,6 +71,71 @@ PLATFORM_DISPLAY_NAMES = {
 }
 
 
+@dataclass
+class DailyCalendarContext:
+    """某一本地日期的日历感知信息，每天只计算一次"""
+
+    day: date
+    day_type: str = ""  # 星期与节假日/工作日，如 "周三, 工作日"
+    calendar_parts: list[str] = field(default_factory=list)  # 农历、节气、黄历
+
+
+class GroupNameCache:
+    """群名称 TTL 缓存
+
+    未过期时直接返回缓存；过期后先返回旧值，并在后台刷新；
+    同一群聊同一时间最多只有一个获取请求（single-flight）。
+    获取失败不会覆盖已有的缓存，而是在下一个 TTL 周期后再重试。
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: dict[str, tuple[str | None, float]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def put(self, key: str, name: str | None):
+        self._entries[key] = (name, time.monotonic())
+
+    async def get(self, key: str, fetch: Callable[[], Awaitable[str | None]]) -> str | None:
+        entry = self._entries.get(key)
+        if entry is not None:
+            name, fetched_at = entry
+            if time.monotonic() - fetched_at >= self.ttl:
+                self._refresh(key, fetch)
+            return name
+        return await asyncio.shield(self._refresh(key, fetch))
+
+    def _refresh(self, key: str, fetch: Callable[[], Awaitable[str | None]]) -> asyncio.Task:
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._fetch(key, fetch))
+            self._inflight[key] = task
+        return task
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[str | None]]) -> str | None:
+        try:
+            name = await fetch()
+        except Exception as exc:
+            logger.debug(f"LLMPerception: 获取群聊信息失败: {exc}")
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            # 保留旧值，推迟到下一个 TTL 周期再重试
+            self.put(key, entry[0])
+            return entry[0]
+        else:
+            self.put(key, name)
+            return name
+        finally:
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+        self._entries.clear()
+
+
 @register("add_time", "miaomiao", "让每次请求都携带这次请求的时间", "1.1.0")
 class MyPlugin(Star):
     def __init__(self, context: Context, config: AstrBotConfig):
@@ -81,6 +150,13 @@ class MyPlugin(Star):
         self.enable_almanac = config.get("enable_almanac_perception", False)
         self.holiday_country = config.get("holiday_country", "CN")
 
+        # 群名称缓存，避免每次请求都调用协议端接口
+        self.group_name_cache = GroupNameCache(config.get("group_name_cache_ttl", 3600))
+
+        # 日历感知信息按本地日期预计算，由零点定时器刷新
+        self._daily_context: DailyCalendarContext | None = None
+        self._daily_refresh_task: asyncio.Task | None = None
+
         # 初始化时区
         try:
             self.timezone = zoneinfo.ZoneInfo(timezone_name)
@@ -101,11 +177,8 @@ class MyPlugin(Star):
             f"黄历感知: {self.enable_almanac}"
         )
 
-    def _get_holiday_info(self, current_time: datetime) -> str:
-        """获取节假日信息"""
-        if not self.enable_holiday:
-            return ""
-
+    def _get_day_type_info(self, current_time: datetime) -> str:
+        """获取星期与节假日/工作日信息（按日期计算，不含时间段）"""
         info_parts = []
 
         # 判断是否为周末
@@ -113,14 +186,19 @@ class MyPlugin(Star):
         info_parts.append(WEEKDAY_NAMES[weekday])
 
         # 使用 chinese-calendar 库进行节假日判断（仅支持中国）
+        is_holiday = is_workday = None
         if self.holiday_country == "CN" and CHINESE_CALENDAR_AVAILABLE:
             current_date = date(current_time.year, current_time.month, current_time.day)
-
-            # 判断是否为法定节假日
-            is_holiday = calendar_cn.is_holiday(current_date)
-            # 判断是否为工作日（考虑调休）
-            is_workday = calendar_cn.is_workday(current_date)
-
+            try:
+                # 判断是否为法定节假日
+                is_holiday = calendar_cn.is_holiday(current_date)
+                # 判断是否为工作日（考虑调休）
+                is_workday = calendar_cn.is_workday(current_date)
+            except NotImplementedError:
+                # chinese-calendar 尚未收录该年份的节假日安排
+                logger.warning(f"chinese-calendar 不支持 {current_date.year} 年，节假日识别降级为按周末判断")
+
+        if is_holiday is not None:
             if is_holiday:
                 # 获取节日名称
                 # get_holiday_detail 返回 (is_on_holiday, holiday_name) 元组
@@ -146,22 +224,22 @@ class MyPlugin(Star):
             else:
                 info_parts.append("工作日")
 
-        # 判断时间段
-        hour = current_time.hour
+        safe_parts = [str(part) for part in info_parts if part]
+        return ", ".join(safe_parts)
+
+    @staticmethod
+    def _get_time_period(hour: int) -> str:
+        """获取时间段"""
         if 5 <= hour < 12:
-            time_period = "上午"
+            return "上午"
         elif 12 <= hour < 14:
-            time_period = "中午"
+            return "中午"
         elif 14 <= hour < 18:
-            time_period = "下午"
+            return "下午"
         elif 18 <= hour < 22:
-            time_period = "晚上"
+            return "晚上"
         else:
-            time_period = "深夜"
-        info_parts.append(time_period)
-
-        safe_parts = [str(part) for part in info_parts if part]
-        return ", ".join(safe_parts)
+            return "深夜"
 
     def _get_lunar_info(self, current_time: datetime) -> str:
         """获取农历日期信息"""
@@ -283,6 +361,42 @@ class MyPlugin(Star):
             logger.debug(f"获取黄历信息失败: {e}")
             return ""
 
+    def _build_daily_context(self, current_time: datetime) -> DailyCalendarContext:
+        """计算某一天的全部日历感知信息（节假日、农历、节气、黄历）"""
+        context = DailyCalendarContext(day=current_time.date())
+
+        if self.enable_holiday:
+            context.day_type = self._get_day_type_info(current_time)
+
+        for part in (
+            self._get_lunar_info(current_time),
+            self._get_solar_term_info(current_time),
+            self._get_almanac_info(current_time),
+        ):
+            if part:
+                context.calendar_parts.append(part)
+
+        return context
+
+    def _get_daily_context(self, current_time: datetime) -> DailyCalendarContext:
+        """获取当天的日历感知信息；零点定时器未及时刷新时按日期兜底重建"""
+        if self._daily_context is None or self._daily_context.day != current_time.date():
+            self._daily_context = self._build_daily_context(current_time)
+        return self._daily_context
+
+    async def _daily_refresh_loop(self):
+        """每到本地零点预计算新一天的日历感知信息"""
+        while True:
+            now = datetime.now(self.timezone)
+            next_midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time(), tzinfo=self.timezone)
+            # 用时间戳相减，避免同一时区下 aware datetime 相减忽略夏令时偏移
+            await asyncio.sleep(max(1.0, next_midnight.timestamp() - now.timestamp()))
+            try:
+                self._get_daily_context(datetime.now(self.timezone))
+                logger.debug(f"LLMPerception: 已刷新日历感知信息 {self._daily_context.day}")
+            except Exception as e:
+                logger.error(f"LLMPerception: 刷新日历感知信息失败: {e}")
+
     @staticmethod
     def _clean_group_name(name: str | None) -> str | None:
         if not name:
@@ -296,12 +410,14 @@ class MyPlugin(Star):
         return candidate
 
     async def _get_group_name(self, event: AstrMessageEvent) -> str | None:
-        """优先从消息对象中读取群名称，否则调用协议端接口获取"""
+        """优先从消息对象中读取群名称，否则从缓存或协议端接口获取"""
         message_obj = getattr(event, "message_obj", None)
         group_obj = getattr(message_obj, "group", None) if message_obj else None
+        cache_key = event.unified_msg_origin
         if group_obj:
             group_name = self._clean_group_name(getattr(group_obj, "group_name", None))
             if group_name:
+                self.group_name_cache.put(cache_key, group_name)
                 return group_name
 
         get_group_fn = getattr(event, "get_group", None)
@@ -317,17 +433,13 @@ class MyPlugin(Star):
         if not group_id:
             return None
 
-        try:
+        async def fetch_group_name() -> str | None:
             group_info = await get_group_fn(group_id=group_id)
-        except Exception as exc:
-            logger.debug(f"LLMPerception: 获取群聊信息失败: {exc}")
+            if group_info:
+                return self._clean_group_name(getattr(group_info, "group_name", None))
             return None
 
-        if group_info:
-            group_name = self._clean_group_name(getattr(group_info, "group_name", None))
-            if group_name:
-                return group_name
-        return None
+        return await self.group_name_cache.get(cache_key, fetch_group_name)
 
     async def _get_platform_info(self, event: AstrMessageEvent) -> str:
         """获取平台环境信息"""
@@ -396,25 +508,15 @@ class MyPlugin(Star):
         # 构建感知信息
         perception_parts = [f"发送时间: {timestr}"]
 
-        # 添加节假日信息
-        holiday_info = self._get_holiday_info(current_time)
-        if holiday_info:
-            perception_parts.append(holiday_info)
+        # 当天预计算的日历感知信息
+        daily_context = self._get_daily_context(current_time)
 
-        # 添加农历信息
-        lunar_info = self._get_lunar_info(current_time)
-        if lunar_info:
-            perception_parts.append(lunar_info)
+        # 添加节假日信息（星期、节假日按天缓存，时间段按当前时间计算）
+        if self.enable_holiday:
+            perception_parts.append(f"{daily_context.day_type}, {self._get_time_period(current_time.hour)}")
 
-        # 添加节气信息
-        solar_term_info = self._get_solar_term_info(current_time)
-        if solar_term_info:
-            perception_parts.append(solar_term_info)
-
-        # 添加黄历信息
-        almanac_info = self._get_almanac_info(current_time)
-        if almanac_info:
-            perception_parts.append(almanac_info)
+        # 添加农历、节气、黄历信息
+        perception_parts.extend(daily_context.calendar_parts)
 
         # 添加平台信息
         platform_info = await self._get_platform_info(event)
@@ -429,6 +531,19 @@ class MyPlugin(Star):
 
         logger.info(f"已添加感知信息: {perception_text}")
 
+    async def initialize(self):
+        """插件加载时预计算当天的日历感知信息，并启动零点刷新定时器"""
+        try:
+            self._get_daily_context(datetime.now(self.timezone))
+        except Exception as e:
+            # 预计算失败不影响插件加载，留给请求时按日期重建
+            self._daily_context = None
+            logger.error(f"LLMPerception: 预计算日历感知信息失败: {e}")
+        self._daily_refresh_task = asyncio.create_task(self._daily_refresh_loop())
+
     async def terminate(self):
-        """Plugin shutdown hook (currently no-op)."""
-        return
+        """插件卸载时停止零点刷新定时器并清理群名称缓存"""
+        if self._daily_refresh_task:
+            self._daily_refresh_task.cancel()
+            self._daily_refresh_task = None
+        self.group_name_cache.clear()
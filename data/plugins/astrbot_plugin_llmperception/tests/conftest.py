@@ -0,0 +1,7 @@
+import sys
+from pathlib import Path
+
+# 与 AstrBot 加载插件时一致，从 AstrBot 根目录按 data.plugins.<插件名> 导入
+ASTRBOT_ROOT = Path(__file__).resolve().parents[4]
+if str(ASTRBOT_ROOT) not in sys.path:
+    sys.path.insert(0, str(ASTRBOT_ROOT))
@@ -0,0 +1,141 @@
+import asyncio
+import datetime as real_datetime
+import zoneinfo
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from data.plugins.astrbot_plugin_llmperception import main as perception  # noqa: E402
+
+TZ = zoneinfo.ZoneInfo("Asia/Shanghai")
+CONFIG = {
+    "enable_lunar_perception": False,
+    "enable_solar_term_perception": False,
+    "enable_almanac_perception": False,
+}
+
+
+class FrozenClock:
+    """替换 main.datetime：now() 返回可控时间；asyncio.sleep 推进该时间而不真正等待"""
+
+    def __init__(self, start: real_datetime.datetime):
+        self.now = start
+        self.sleeps: list[float] = []
+        clock = self
+
+        class FrozenDatetime(real_datetime.datetime):
+            @classmethod
+            def now(cls, tz=None):
+                return clock.now.astimezone(tz)
+
+        self.datetime = FrozenDatetime
+
+    async def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += real_datetime.timedelta(seconds=seconds)
+        await _real_sleep(0)
+
+
+_real_sleep = asyncio.sleep
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FrozenClock(real_datetime.datetime(2026, 10, 19, 23, 59, 58, tzinfo=TZ))
+    monkeypatch.setattr(perception, "datetime", clock.datetime)
+    monkeypatch.setattr(perception.asyncio, "sleep", clock.sleep)
+    return clock
+
+
+def make_plugin(monkeypatch):
+    plugin = perception.MyPlugin(None, dict(CONFIG))
+    built = []
+    build = plugin._build_daily_context
+
+    def tracking_build(current_time):
+        built.append(current_time.date())
+        return build(current_time)
+
+    monkeypatch.setattr(plugin, "_build_daily_context", tracking_build)
+    return plugin, built
+
+
+def test_midnight_timer_rebuilds_context_for_each_new_day(clock, monkeypatch):
+    async def scenario():
+        plugin, built = make_plugin(monkeypatch)
+        await plugin.initialize()
+        assert built == [real_datetime.date(2026, 10, 19)]
+
+        # 定时器先睡到零点（2 秒），之后每次睡一整天
+        for _ in range(6):
+            await _real_sleep(0)
+        await plugin.terminate()
+
+        assert clock.sleeps[0] == pytest.approx(2.0)
+        assert all(s == pytest.approx(86400.0) for s in clock.sleeps[1:])
+        start = real_datetime.date(2026, 10, 19)
+        assert built == [
+            start + real_datetime.timedelta(days=i) for i in range(len(built))
+        ]
+        assert len(built) >= 3
+        assert plugin._daily_context.day == built[-1]
+
+    asyncio.run(scenario())
+
+
+def test_request_after_missed_timer_rebuilds_once(clock, monkeypatch):
+    plugin, built = make_plugin(monkeypatch)
+    first = plugin._get_daily_context(clock.now)
+    assert plugin._get_daily_context(clock.now) is first
+
+    # 零点定时器没有运行时，跨天后的第一次请求按日期重建，之后复用
+    clock.now += real_datetime.timedelta(seconds=5)
+    second = plugin._get_daily_context(clock.now)
+    assert second.day == real_datetime.date(2026, 10, 20)
+    assert plugin._get_daily_context(clock.now) is second
+    assert len(built) == 2
+
+
+class UnsupportedYearCalendar:
+    """模拟 chinese-calendar 遇到未收录年份"""
+
+    @staticmethod
+    def is_holiday(day):
+        raise NotImplementedError(f"no available data for year {day.year}")
+
+    is_workday = is_holiday
+    get_holiday_detail = is_holiday
+
+
+def test_unsupported_calendar_year_degrades_instead_of_failing(clock, monkeypatch):
+    monkeypatch.setattr(perception, "CHINESE_CALENDAR_AVAILABLE", True)
+    monkeypatch.setattr(
+        perception, "calendar_cn", UnsupportedYearCalendar, raising=False
+    )
+
+    async def scenario():
+        plugin = perception.MyPlugin(None, dict(CONFIG))
+        await plugin.initialize()
+        await plugin.terminate()
+        return plugin
+
+    plugin = asyncio.run(scenario())
+    # 2026-10-19 是周一，降级为按周末判断
+    assert plugin._daily_context.day_type == "周一, 工作日"
+
+
+def test_initialize_survives_failed_precompute(clock, monkeypatch):
+    async def scenario():
+        plugin = perception.MyPlugin(None, dict(CONFIG))
+
+        def broken(current_time):
+            raise RuntimeError("calendar backend unavailable")
+
+        monkeypatch.setattr(plugin, "_build_daily_context", broken)
+        await plugin.initialize()
+        assert plugin._daily_context is None
+        assert plugin._daily_refresh_task is not None
+        await plugin.terminate()
+
+    asyncio.run(scenario())
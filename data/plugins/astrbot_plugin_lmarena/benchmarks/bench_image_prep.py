@@ -0,0 +1,134 @@
+"""
+上传前图片压缩的耗时对比：
+原实现每一档质量/缩放都完整编码一次（此处已修正原实现中 seek(0) 导致的大小判断失效），
+现实现一次完整编码探测，在探测图上二分查找质量后只做一次最终编码
+
+在 AstrBot 根目录运行:
+    python data/plugins/astrbot_plugin_lmarena/benchmarks/bench_image_prep.py
+"""
+
+import asyncio
+import io
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from data.plugins.astrbot_plugin_lmarena.image_prep import (  # noqa: E402
+    ImagePreparer,
+)
+
+LIMITS = (3_500_000, 300_000, 150_000)
+
+
+def legacy_compress(image_bytes: bytes, max_bytes: int) -> bytes:
+    """原实现的压缩循环"""
+    img = Image.open(io.BytesIO(image_bytes))
+    if img.format == "GIF" or len(image_bytes) <= max_bytes:
+        return image_bytes
+
+    img.thumbnail((1024, 1024), Image.LANCZOS)  # type: ignore
+    resampled = io.BytesIO()
+    img.save(resampled, format=img.format, quality=70, optimize=True)
+    if resampled.tell() <= max_bytes:
+        return resampled.getvalue()
+
+    quality, scale = 50, 0.6
+    while True:
+        resampled.seek(0)
+        resampled.truncate(0)
+        if scale < 1:
+            w, h = img.size
+            tmp = img.resize((int(w * scale), int(h * scale)), Image.LANCZOS)  # type: ignore
+        else:
+            tmp = img
+        tmp.save(resampled, format=img.format, quality=quality, optimize=True)
+        if resampled.tell() <= max_bytes or (quality <= 5 and scale <= 0.2):
+            break
+        if quality > 5:
+            quality -= 5
+        else:
+            scale *= 0.9
+    return resampled.getvalue()
+
+
+def make_samples() -> dict[str, bytes]:
+    rng = np.random.default_rng(0)
+
+    def encode(pixels, fmt, mode="RGB"):
+        out = io.BytesIO()
+        options = {"quality": 98} if fmt == "JPEG" else {}
+        Image.fromarray(pixels, mode).save(out, fmt, **options)
+        return out.getvalue()
+
+    def photo(w, h, fmt):
+        x, y = np.linspace(0, 8, w), np.linspace(0, 8, h)[:, None]
+        base = np.sin(x) * np.cos(y) * 100 + 128
+        pixels = np.stack([base, base[::-1], base[:, ::-1]], -1)
+        pixels = pixels + rng.normal(0, 25, (h, w, 3))
+        return encode(pixels.clip(0, 255).astype(np.uint8), fmt)
+
+    def noise(w, h, fmt, mode="RGB"):
+        pixels = rng.integers(0, 256, (h, w, 4 if mode == "RGBA" else 3), np.uint8)
+        return encode(pixels, fmt, mode)
+
+    return {
+        "photo 4000x3000 jpeg": photo(4000, 3000, "JPEG"),
+        "photo 3000x2000 png": photo(3000, 2000, "PNG"),
+        "noise 2048x2048 png": noise(2048, 2048, "PNG"),
+        "noise rgba 1800x1800 png": noise(1800, 1800, "PNG", "RGBA"),
+        "small 800x600 jpeg": photo(800, 600, "JPEG"),
+    }
+
+
+async def main():
+    samples = make_samples()
+    encodes = 0
+    original_save = Image.Image.save
+
+    def counting_save(self, *args, **kwargs):
+        nonlocal encodes
+        encodes += 1
+        return original_save(self, *args, **kwargs)
+
+    for limit in LIMITS:
+        print(f"max_bytes={limit}")
+        preparer = ImagePreparer()
+        for name, data in samples.items():
+            Image.Image.save = counting_save
+            encodes = 0
+            start = time.perf_counter()
+            try:
+                old = legacy_compress(data, limit)
+            except OSError:  # RGBA 无法按 JPEG 保存
+                old = b""
+            old_ms = (time.perf_counter() - start) * 1000
+            old_encodes = encodes
+            Image.Image.save = original_save
+
+            before = dict(preparer.stats)
+            start = time.perf_counter()
+            new = await preparer.prepare(data, limit)
+            new_ms = (time.perf_counter() - start) * 1000
+            full = preparer.stats["full_encodes"] - before["full_encodes"]
+            probe = preparer.stats["probe_encodes"] - before["probe_encodes"]
+
+            start = time.perf_counter()
+            assert await preparer.prepare(data, limit) is new
+            cached_ms = (time.perf_counter() - start) * 1000
+
+            print(
+                f"  {name:26s} {len(data):>9} 字节 | "
+                f"原实现 {old_encodes:2d} 次编码 {old_ms:6.0f} ms -> {len(old):>8} | "
+                f"现实现 {full}+{probe} 次编码 {new_ms:6.0f} ms -> {len(new):>8} | "
+                f"缓存 {cached_ms:.1f} ms"
+            )
+        preparer.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,112 @@
+"""
+100 KB 数据流按 64 字节分块送入时的解析耗时对比：
+原实现把数据块追加到缓冲区后，每个数据块都用正则从头搜索整个缓冲区，
+现实现每个数据块只扫描一次，只缓存一条未完成的记录
+
+在 AstrBot 根目录运行:
+    python data/plugins/astrbot_plugin_lmarena/benchmarks/bench_stream_parser.py
+"""
+
+import json
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[4]))
+
+from data.plugins.astrbot_plugin_lmarena.bridge.stream import (  # noqa: E402
+    LMArenaStreamParser,
+)
+
+STREAM_SIZE = 100_000
+CHUNK_SIZE = 64
+ROUNDS = 5
+
+_pat_text = re.compile(r'[ab]0:"((?:\\.|[^"\\])*)"')
+_pat_image = re.compile(r"[ab]2:(\[.*?\])")
+_pat_finish = re.compile(r'[ab]d:(\{.*?"finishReason".*?\})')
+_pat_error = re.compile(r'(\{\s*"error".*?\})', re.DOTALL)
+
+
+def legacy_parse(chunks: list[str]) -> list:
+    """原实现的解析循环（去掉队列与超时部分）"""
+    events, buffer = [], ""
+    for chunk in chunks:
+        buffer += chunk
+        if error_match := _pat_error.search(buffer):
+            try:
+                events.append(("error", json.loads(error_match.group(1))["error"]))
+                return events
+            except json.JSONDecodeError:
+                pass
+        while match_text := _pat_text.search(buffer):
+            text = json.loads(f'"{match_text.group(1)}"')
+            if text:
+                events.append(("content", text))
+            buffer = buffer[match_text.end() :]
+        while match_img := _pat_image.search(buffer):
+            image_info = json.loads(match_img.group(1))[0]
+            events.append(("content", f"![Image]({image_info['image']})"))
+            buffer = buffer[match_img.end() :]
+        if match_fin := _pat_finish.search(buffer):
+            events.append(("finish", json.loads(match_fin.group(1))["finishReason"]))
+            buffer = buffer[match_fin.end() :]
+    return events
+
+
+def parse(chunks: list[str]) -> list:
+    parser = LMArenaStreamParser()
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.flush())
+    return events
+
+
+def make_stream(rng: random.Random, size: int) -> str:
+    records, length = [], 0
+    while length < size:
+        if rng.random() < 0.95:
+            text = "".join(
+                rng.choice(["你好", "world", " ", "\n", "😀", "é"])
+                for _ in range(rng.randint(1, 30))
+            )
+            record = f"a0:{json.dumps(text, ensure_ascii=False)}"
+        else:
+            url = f"https://example.com/{rng.randint(0, 999)}.png"
+            record = "a2:" + json.dumps([{"type": "image", "image": url}])
+        records.append(record)
+        length += len(record) + 1
+    records.append('ad:{"finishReason":"stop"}')
+    return "\n".join(records) + "\n"
+
+
+def texts(events: list) -> list:
+    return [event for event in events if not event[1].startswith("![Image]")]
+
+
+def timed(func, chunks) -> float:
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        func(chunks)
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    stream = make_stream(random.Random(1), STREAM_SIZE)
+    chunks = [stream[i : i + CHUNK_SIZE] for i in range(0, len(stream), CHUNK_SIZE)]
+    # 原实现先处理文本再处理图片，文本之前未处理的图片记录会被丢弃，这里只比较文本
+    assert texts(legacy_parse(chunks)) == texts(parse(chunks))
+    old, new = timed(legacy_parse, chunks), timed(parse, chunks)
+    print(
+        f"{len(stream)} 字符 / {len(chunks)} 个数据块: "
+        f"原实现 {old:.1f} ms, 现实现 {new:.1f} ms ({old / new:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
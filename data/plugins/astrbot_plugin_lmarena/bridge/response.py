@@ -3,11 +3,15 @@ import json
 import re
 import time
 import uuid
+from contextlib import aclosing
 from typing import Any
 from fastapi import Response
+from fastapi.responses import StreamingResponse
 from astrbot.api import logger
 from astrbot.core.config.astrbot_config import AstrBotConfig
 
+from .stream import LMArenaStreamParser
+
 
 class ResponseManager:
     """
@@ -18,12 +22,8 @@ class ResponseManager:
         self.conf = config
         self.channels: dict[str, asyncio.Queue] = {}
         self.callback: Any = None
-
-        # 预编译正则
-        self._pat_text = re.compile(r'[ab]0:"((?:\\.|[^"\\])*)"')
-        self._pat_image = re.compile(r"[ab]2:(\[.*?\])")
-        self._pat_finish = re.compile(r'[ab]d:(\{.*?"finishReason".*?\})')
-        self._pat_error = re.compile(r'(\{\s*"error".*?\})', re.DOTALL)
+        # 响应通道关闭时的回调，参数为 request_id
+        self.on_close: Any = None
 
         # Cloudflare 识别片段
         self._cf_patterns = [
@@ -55,6 +55,23 @@ class ResponseManager:
             },
         }
 
+    def _make_chunk(
+        self,
+        request_id: str,
+        model: str,
+        delta: dict,
+        reason: str | None = None,
+    ) -> str:
+        """流式响应的单个 SSE 数据块"""
+        chunk = {
+            "id": request_id,
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "delta": delta, "finish_reason": reason}],
+        }
+        return f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n"
+
     # ---------------- 错误辅助 ----------------
     def _is_cloudflare_error(self, text: str) -> bool:
         return any(re.search(p, text, re.IGNORECASE) for p in self._cf_patterns)
@@ -90,7 +107,8 @@ class ResponseManager:
             yield "error", "Internal server error: response channel not found."
             return
 
-        buffer: Any = ""
+        # 增量解析：每个数据块只扫描一次，只缓存被截断的最后一条记录
+        parser = LMArenaStreamParser(self._is_cloudflare_error)
         has_yielded_content = False
 
         try:
@@ -106,120 +124,130 @@ class ResponseManager:
                         f"Response timed out after {self.conf['timeout']} seconds.",
                     )
                     return
+                finished = False
                 match raw_data:
                     case {"error": err}:  # WebSocket 直接错误
                         yield "error", self._handle_error(err, request_id)
                         return
                     case "[DONE]":  # 结束信号
-                        if has_yielded_content and getattr(
-                            self, "IS_REFRESHING_FOR_VERIFICATION", False
-                        ):
-                            logger.info(
-                                f"PROCESSOR [ID: {request_id[:8]}]: 请求成功完成，重置人机验证状态。"
-                            )
-                            self.IS_REFRESHING_FOR_VERIFICATION = False
-                        break
+                        events = parser.flush()
+                        finished = True
                     case list() as lst:
-                        buffer += "".join(str(item) for item in lst)
+                        events = parser.feed("".join(str(item) for item in lst))
                     case _:
-                        buffer += str(raw_data)
-
-                # Cloudflare 检测（页面片段）
-                if self._is_cloudflare_error(buffer):
-                    yield "error", self._handle_error(buffer, request_id)
-
-                # 错误 JSON
-                if error_match := self._pat_error.search(buffer):
-                    try:
-                        error_json = json.loads(error_match.group(1))
-                        yield (
-                            "error",
-                            error_json.get("error", "来自 LMArena 的未知错误"),
-                        )
-                        return
-                    except json.JSONDecodeError:
-                        pass
-
-                # 文本内容
-                while match_text := self._pat_text.search(buffer):
-                    try:
-                        text_content = json.loads(f'"{match_text.group(1)}"')
-                        if text_content:
+                        events = parser.feed(str(raw_data))
+
+                for event_type, data in events:
+                    match event_type:
+                        case "cloudflare":  # Cloudflare 页面片段
+                            yield "error", self._handle_error(data, request_id)
+                            return
+                        case "error":  # 错误 JSON
+                            yield "error", data
+                            return
+                        case "content":
                             has_yielded_content = True
-                            yield "content", text_content
-                    except (ValueError, json.JSONDecodeError):
-                        pass
-                    buffer = buffer[match_text.end() :]
-
-                # 图片内容
-                while match_img := self._pat_image.search(buffer):
-                    try:
-                        image_data_list = json.loads(match_img.group(1))
-                        if isinstance(image_data_list, list) and image_data_list:
-                            image_info = image_data_list[0]
-                            if (
-                                image_info.get("type") == "image"
-                                and "image" in image_info
-                            ):
-                                yield "content", f"![Image]({image_info['image']})"
-                    except (json.JSONDecodeError, IndexError) as e:
-                        logger.warning(
-                            f"解析图片URL时出错: {e}, buffer: {buffer[:150]}"
-                        )
-                    buffer = buffer[match_img.end() :]
+                    yield event_type, data
 
-                # 结束原因
-                if match_fin := self._pat_finish.search(buffer):
-                    try:
-                        finish_data = json.loads(match_fin.group(1))
-                        yield "finish", finish_data.get("finishReason", "stop")
-                    except (json.JSONDecodeError, IndexError):
-                        pass
-                    buffer = buffer[match_fin.end() :]
+                if finished:
+                    if has_yielded_content and getattr(
+                        self, "IS_REFRESHING_FOR_VERIFICATION", False
+                    ):
+                        logger.info(
+                            f"PROCESSOR [ID: {request_id[:8]}]: 请求成功完成，重置人机验证状态。"
+                        )
+                        self.IS_REFRESHING_FOR_VERIFICATION = False
+                    break
 
         except asyncio.CancelledError:
             logger.debug(f"PROCESSOR [ID: {request_id[:8]}]: 任务被取消。")
         finally:
             if request_id in self.channels:
                 del self.channels[request_id]
+            if self.on_close:
+                self.on_close(request_id)
 
     # ---------------- 对外接口 ----------------
+    def stream_response(self, request_id: str, model: str) -> StreamingResponse:
+        """将内部事件流直接转为 OpenAI 兼容的 SSE 流式响应。"""
+        response_id = f"chatcmpl-{uuid.uuid4()}"
+
+        async def event_stream():
+            yield self._make_chunk(response_id, model, {"role": "assistant"})
+            finish_reason = "stop"
+            async with aclosing(self._process_lmarena_stream(request_id)) as events:
+                async for event_type, data in events:
+                    match event_type:
+                        case "content":
+                            yield self._make_chunk(
+                                response_id, model, {"content": data}
+                            )
+                        case "finish":
+                            finish_reason = data
+                            if data == "content-filter":
+                                yield self._make_chunk(
+                                    response_id,
+                                    model,
+                                    {
+                                        "content": "\n\n响应被终止，可能是上下文超限或者模型内部审查（大概率）的原因"
+                                    },
+                                )
+                        case "error":
+                            logger.error(
+                                f"STREAM [ID: {request_id[:8]}]: 处理时发生错误: {data}"
+                            )
+                            error_response = {
+                                "error": {
+                                    "message": f"[LMArena Bridge Error]: {data}",
+                                    "type": "bridge_error",
+                                    "code": "processing_error",
+                                }
+                            }
+                            yield f"data: {json.dumps(error_response, ensure_ascii=False)}\n\n"
+                            yield "data: [DONE]\n\n"
+                            return
+            yield self._make_chunk(response_id, model, {}, finish_reason)
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(event_stream(), media_type="text/event-stream")
+
     async def non_stream_response(self, request_id: str, model: str):
         """聚合内部事件流并返回单个 OpenAI JSON 响应。"""
         response_id = f"chatcmpl-{uuid.uuid4()}"
         full_content: list[str] = []
         finish_reason = "stop"
 
-        async for event_type, data in self._process_lmarena_stream(request_id):
-            match event_type:
-                case "content":
-                    full_content.append(data)
-                case "finish":
-                    finish_reason = data
-                    if data == "content-filter":
-                        full_content.append(
-                            "\n\n响应被终止，可能是上下文超限或者模型内部审查（大概率）的原因"
+        async with aclosing(self._process_lmarena_stream(request_id)) as events:
+            async for event_type, data in events:
+                match event_type:
+                    case "content":
+                        full_content.append(data)
+                    case "finish":
+                        finish_reason = data
+                        if data == "content-filter":
+                            full_content.append(
+                                "\n\n响应被终止，可能是上下文超限或者模型内部审查（大概率）的原因"
+                            )
+                        # 不 break，等待 [DONE]，避免竞态
+                    case "error":
+                        logger.error(
+                            f"NON-STREAM [ID: {request_id[:8]}]: 处理时发生错误: {data}"
                         )
-                    # 不 break，等待 [DONE]，避免竞态
-                case "error":
-                    logger.error(
-                        f"NON-STREAM [ID: {request_id[:8]}]: 处理时发生错误: {data}"
-                    )
-                    status_code = 413 if "附件大小超过了" in str(data) else 500
-                    error_response = {
-                        "error": {
-                            "message": f"[LMArena Bridge Error]: {data}",
-                            "type": "bridge_error",
-                            "code": "attachment_too_large"
-                            if status_code == 413
-                            else "processing_error",
+                        status_code = 413 if "附件大小超过了" in str(data) else 500
+                        error_response = {
+                            "error": {
+                                "message": f"[LMArena Bridge Error]: {data}",
+                                "type": "bridge_error",
+                                "code": "attachment_too_large"
+                                if status_code == 413
+                                else "processing_error",
+                            }
                         }
-                    }
-                    return Response(
-                        content=json.dumps(error_response, ensure_ascii=False),
-                        status_code=status_code,
-                        media_type="application/json",
-                    )
+                        return Response(
+                            content=json.dumps(error_response, ensure_ascii=False),
+                            status_code=status_code,
+                            media_type="application/json",
+                        )
 
         final_content = "".join(full_content)
         response_data = self._make_non_stream(
@@ -1,5 +1,6 @@
 import asyncio
 import json
+import time
 from aiohttp import web
 import threading
 from astrbot.api import logger
@@ -12,6 +13,7 @@ from typing import Optional
 from .models import ModelsManager
 from .response import ResponseManager
 from .process import Process
+from .workers import NoWorkerError, WorkerPool
 
 
 class FastAPIWrapper:
@@ -56,6 +58,10 @@ class FastAPIWrapper:
         async def chat_completions(request: Request):
             return await s.chat_completions(request)
 
+        @app.get("/internal/workers")
+        async def get_workers():
+            return s.get_worker_stats()
+
         @app.post("/internal/update_available_models")
         async def update_available_models(request: Request):
             return await s.update_available_models_endpoint(request)
@@ -92,8 +98,6 @@ class LMArenaBridgeServer:
     LMArena Bridge 后端服务
     """
 
-    browser_ws: WebSocket | None = None  # 与单个油猴脚本的 WebSocket 连接
-
     def __init__(self, config: AstrBotConfig):
         self.conf = config
         # 消息模版处理器
@@ -101,23 +105,33 @@ class LMArenaBridgeServer:
         # 响应管理器
         self.responser = ResponseManager(config)
         self.responser.callback = self.refresh
+        self.responser.on_close = self._on_response_closed
+
+        # 油猴脚本标签页池（可同时连接多个标签页）
+        self.pool = WorkerPool(
+            max_concurrency=config["bridge_server"].get("worker_max_concurrency", 2),
+            timeout=config["timeout"],
+        )
 
         # 模型管理器
         self.model_mgr = ModelsManager(config)
 
     # ---------------- WS处理 ----------------
     async def websocket_endpoint(self, websocket: WebSocket):
-        """处理来自油猴脚本的 WebSocket 连接。"""
+        """处理来自油猴脚本的 WebSocket 连接，每个连接是池中的一个标签页。"""
         await websocket.accept()
-        self.browser_ws = websocket
-        logger.info("✅ 油猴脚本已成功连接 WebSocket。")
+        worker = self.pool.add(websocket)
+        logger.info(
+            f"✅ 油猴脚本已成功连接 WebSocket。[标签页 {worker.id}，共 {len(self.pool.workers)} 个]"
+        )
         # 刷新模型列表
-        await self.trigger_model_update()
+        await self.trigger_model_update(worker)
         try:
             while True:
                 # 等待并接收来自油猴脚本的消息
                 message_str = await websocket.receive_text()
-                logger.debug(f"[油猴->本地]: {message_str[:100]}")
+                worker.last_seen = time.time()
+                logger.debug(f"[油猴 {worker.id}->本地]: {message_str[:100]}")
                 message = json.loads(message_str)
 
                 request_id = message.get("request_id")
@@ -129,39 +143,79 @@ class LMArenaBridgeServer:
 
                 # 将收到的数据放入对应的响应通道
                 if request_id in self.responser.channels:
+                    self.pool.mark_started(request_id)
                     await self.responser.channels[request_id].put(data)
                 else:
                     logger.warning(f"[油猴脚本]未知响应: {request_id}")
 
+                # 浏览器端的请求已结束，释放该标签页的名额
+                if data == "[DONE]":
+                    self.pool.finish(request_id, ok=True)
+
         except WebSocketDisconnect:
-            logger.warning("❌ 油猴脚本客户端已断开连接。")
+            logger.warning(f"❌ 油猴脚本客户端已断开连接。[标签页 {worker.id}]")
         except Exception as e:
             logger.error(f"WebSocket 处理时发生未知错误: {e}", exc_info=True)
         finally:
-            self.browser_ws = None
-            for queue in self.responser.channels.values():
-                await queue.put({"error": "Browser disconnected during operation"})
-            self.responser.channels.clear()
+            requeue, broken = self.pool.remove(worker)
+            # 已经开始返回数据的请求无法续传，直接报错
+            for request_id in broken:
+                if queue := self.responser.channels.get(request_id):
+                    await queue.put({"error": "Browser disconnected during operation"})
+            # 尚未返回数据的请求重新派发到其他标签页
+            for request_id in requeue:
+                asyncio.create_task(self._requeue(request_id))
+            if requeue:
+                logger.info(f"标签页 {worker.id} 断开，{len(requeue)} 个请求已重新排队")
+
+    async def _requeue(self, request_id: str):
+        request = self.pool.requests.get(request_id)
+        if not request or request_id not in self.responser.channels:
+            self.pool.requests.pop(request_id, None)
+            return
+        try:
+            await self.pool.dispatch(request_id, request.payload)
+        except NoWorkerError as e:
+            if queue := self.responser.channels.get(request_id):
+                await queue.put(
+                    {"error": f"Browser disconnected during operation: {e}"}
+                )
 
-    async def ws_send(self, payload: dict):
-        if not self.browser_ws:
+    def _on_response_closed(self, request_id: str):
+        """响应通道关闭（完成、超时或客户端断开）；仍在途说明浏览器未正常结束"""
+        self.pool.finish(request_id, ok=False)
+
+    async def ws_send(self, payload: dict, worker=None):
+        """发送命令到指定标签页，未指定时选择最空闲的标签页"""
+        worker = (
+            worker or self.pool.pick() or next(iter(self.pool.workers.values()), None)
+        )
+        if not worker:
             raise HTTPException(
                 status_code=503,
                 detail="油猴脚本客户端未连接。请确保 LMArena 页面已打开并激活脚本。",
             )
 
-        await self.browser_ws.send_text(json.dumps(payload, ensure_ascii=False))
+        await worker.send(payload)
         truncated_payload = json.dumps(payload, ensure_ascii=False)[:200]
-        logger.debug(f"[本地->油猴]: {truncated_payload}...")
+        logger.debug(f"[本地->油猴 {worker.id}]: {truncated_payload}...")
+
+    def get_worker_stats(self) -> dict:
+        """各标签页的在途数、健康状态与请求统计"""
+        return self.pool.stats()
 
     # ---------------- main.py调用的接口 ----------------
     async def refresh(self):
-        """刷新油猴脚本页面"""
-        await self.ws_send({"command": "refresh"})
+        """刷新所有油猴脚本页面（人机验证对同一浏览器的所有标签页生效）"""
+        for worker in list(self.pool.workers.values()):
+            try:
+                await self.ws_send({"command": "refresh"}, worker)
+            except Exception as e:
+                logger.warning(f"刷新标签页 {worker.id} 失败: {e}")
 
-    async def trigger_model_update(self):
+    async def trigger_model_update(self, worker=None):
         """让油猴发送页面源代码"""
-        await self.ws_send({"command": "send_page_source"})
+        await self.ws_send({"command": "send_page_source"}, worker)
 
     def get_model_dict(self) -> dict:
         """获取所有模型列表"""
@@ -271,10 +325,16 @@ class LMArenaBridgeServer:
             },
         }
         logger.debug(payload)
-        await self.ws_send(payload)
+        try:
+            await self.pool.dispatch(request_id, payload["payload"])
+        except NoWorkerError as e:
+            self.responser.channels.pop(request_id, None)
+            raise HTTPException(status_code=503, detail=str(e))
 
         # 返回响应（stream 参数开启流式响应）
         try:
+            if openai_req.get("stream"):
+                return self.responser.stream_response(request_id, "default_model")
             return await self.responser.non_stream_response(
                 request_id, "default_model"
             )
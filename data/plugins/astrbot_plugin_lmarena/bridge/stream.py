@@ -0,0 +1,186 @@
+import json
+import re
+from typing import Callable
+from astrbot.api import logger
+
+
+class LMArenaStreamParser:
+    """
+    LMArena 数据流的增量解析器
+
+    数据流由换行分隔的记录组成，如 a0:"文本" / a2:[图片] / ad:{"finishReason":...}。
+    每个数据块只扫描一次：完整的记录立即解析并产出事件，
+    被数据块截断的记录暂存到收到换行为止，因此每个流只缓存一条未完成的记录。
+    产出事件: ('content', str) / ('finish', str) / ('error', str) / ('cloudflare', str)
+    """
+
+    # 单条未完成记录的最大长度，超出后丢弃该记录，保证每个流的内存有上限
+    max_record_size = 8 * 1024 * 1024
+    # 跨多行（格式化输出）的错误 JSON 的最大长度
+    max_json_size = 64 * 1024
+
+    _pat_record = re.compile(r"[ab]([0-9a-z]):")
+
+    def __init__(self, is_cloudflare: Callable[[str], bool] | None = None):
+        self._is_cloudflare = is_cloudflare
+        self._pending: list[str] = []  # 未完成记录的片段
+        self._pending_size = 0
+        self._discarding = False  # 当前记录超长，丢弃到下一个换行
+        self._json_lines: list[str] = []  # 跨多行的 JSON 对象（如格式化的错误信息）
+        self._json_depth = 0
+        self._json_size = 0
+
+    def feed(self, chunk: str) -> list[tuple[str, str]]:
+        """喂入一个数据块，返回其中所有完整记录产出的事件"""
+        events: list[tuple[str, str]] = []
+        start = 0
+        while (end := chunk.find("\n", start)) != -1:
+            if self._pending:
+                self._pending.append(chunk[start:end])
+                line = "".join(self._pending)
+                self._pending.clear()
+                self._pending_size = 0
+            else:
+                line = chunk[start:end]
+
+            if self._discarding:
+                self._discarding = False
+            else:
+                self._parse_record(line, events)
+            start = end + 1
+
+        if start < len(chunk) and not self._discarding:
+            self._pending.append(chunk[start:])
+            self._pending_size += len(chunk) - start
+            if self._pending_size > self.max_record_size:
+                logger.warning(
+                    f"LMArena 数据流中单条记录超过 {self.max_record_size} 字符，已丢弃。"
+                )
+                self._pending.clear()
+                self._pending_size = 0
+                self._discarding = True
+
+        return events
+
+    def flush(self) -> list[tuple[str, str]]:
+        """数据流结束时解析最后一条（没有换行结尾的）记录"""
+        events: list[tuple[str, str]] = []
+        if self._pending and not self._discarding:
+            self._parse_record("".join(self._pending), events)
+        if self._json_lines:
+            # 数据流在 JSON 闭合前结束，按现有内容尝试解析一次
+            self._parse_error_json("\n".join(self._json_lines), events)
+            self._reset_json()
+        self._pending.clear()
+        self._pending_size = 0
+        self._discarding = False
+        return events
+
+    def _parse_record(self, line: str, events: list[tuple[str, str]]):
+        line = line.strip()
+        if not line:
+            return
+
+        if self._json_lines:
+            self._continue_json(line, events)
+            return
+
+        match = self._pat_record.match(line)
+        if not match:
+            self._parse_other(line, events)
+            return
+
+        kind, payload = match.group(1), line[match.end() :]
+        try:
+            data = json.loads(payload)
+        except json.JSONDecodeError:
+            logger.debug(f"无法解析的 LMArena 记录: {line[:150]}")
+            return
+
+        match kind:
+            # 文本内容
+            case "0":
+                if isinstance(data, str) and data:
+                    events.append(("content", data))
+
+            # 图片内容
+            case "2":
+                try:
+                    if isinstance(data, list) and data:
+                        image_info = data[0]
+                        if image_info.get("type") == "image" and "image" in image_info:
+                            events.append(
+                                ("content", f"![Image]({image_info['image']})")
+                            )
+                except (AttributeError, IndexError) as e:
+                    logger.warning(f"解析图片URL时出错: {e}, record: {line[:150]}")
+
+            # 结束原因
+            case "d":
+                if isinstance(data, dict) and "finishReason" in data:
+                    events.append(("finish", data.get("finishReason", "stop")))
+
+    def _parse_other(self, line: str, events: list[tuple[str, str]]):
+        """非记录行：Cloudflare 页面片段或错误 JSON"""
+        if self._is_cloudflare and self._is_cloudflare(line):
+            events.append(("cloudflare", line))
+            return
+
+        if not line.startswith("{"):
+            return
+        depth = self._brace_depth(line)
+        if depth > 0:
+            # 格式化输出的 JSON 跨多行，缓存到括号闭合为止
+            self._json_lines.append(line)
+            self._json_depth = depth
+            self._json_size = len(line)
+        elif '"error"' in line:
+            self._parse_error_json(line, events)
+
+    def _continue_json(self, line: str, events: list[tuple[str, str]]):
+        self._json_lines.append(line)
+        self._json_depth += self._brace_depth(line)
+        self._json_size += len(line)
+        if self._json_depth <= 0:
+            self._parse_error_json("\n".join(self._json_lines), events)
+            self._reset_json()
+        elif self._json_size > self.max_json_size:
+            logger.warning(
+                f"LMArena 数据流中的 JSON 超过 {self.max_json_size} 字符仍未闭合，已丢弃。"
+            )
+            self._reset_json()
+
+    def _reset_json(self):
+        self._json_lines.clear()
+        self._json_depth = 0
+        self._json_size = 0
+
+    @staticmethod
+    def _brace_depth(line: str) -> int:
+        """一行中 { 与 } 的数量差，忽略 JSON 字符串内的括号（字符串不会跨行）"""
+        depth = 0
+        in_string = escaped = False
+        for ch in line:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch == "{":
+                depth += 1
+            elif ch == "}":
+                depth -= 1
+        return depth
+
+    @staticmethod
+    def _parse_error_json(text: str, events: list[tuple[str, str]]):
+        try:
+            error_json = json.loads(text)
+        except json.JSONDecodeError:
+            return
+        if isinstance(error_json, dict) and "error" in error_json:
+            events.append(("error", error_json.get("error", "来自 LMArena 的未知错误")))
@@ -0,0 +1,219 @@
+import asyncio
+import json
+import time
+import uuid
+from typing import Any
+from astrbot.api import logger
+
+
+class NoWorkerError(Exception):
+    """没有可用的油猴脚本标签页"""
+
+
+class BrowserWorker:
+    """
+    单个油猴脚本标签页的 WebSocket 连接
+    """
+
+    # 连续失败达到此次数后视为不健康，调度时排在健康标签页之后
+    max_consecutive_failures = 3
+
+    def __init__(self, ws: Any, max_concurrency: int):
+        self.id = uuid.uuid4().hex[:8]
+        self.ws = ws
+        self.max_concurrency = max(1, max_concurrency)
+        self.in_flight: set[str] = set()
+        self.connected_at = time.time()
+        self.last_seen = self.connected_at
+
+        self.total_requests = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+        self.consecutive_failures = 0
+
+    @property
+    def healthy(self) -> bool:
+        return self.consecutive_failures < self.max_consecutive_failures
+
+    @property
+    def available(self) -> bool:
+        return len(self.in_flight) < self.max_concurrency
+
+    async def send(self, payload: dict):
+        await self.ws.send_text(json.dumps(payload, ensure_ascii=False))
+
+    def stats(self) -> dict:
+        return {
+            "id": self.id,
+            "healthy": self.healthy,
+            "in_flight": len(self.in_flight),
+            "max_concurrency": self.max_concurrency,
+            "total_requests": self.total_requests,
+            "completed": self.completed,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "consecutive_failures": self.consecutive_failures,
+            "connected_at": int(self.connected_at),
+            "last_seen": int(self.last_seen),
+        }
+
+
+class PendingRequest:
+    """已派发、尚未结束的请求，断线时用于重新派发"""
+
+    __slots__ = ("payload", "worker_id", "started")
+
+    def __init__(self, payload: dict):
+        self.payload = payload
+        self.worker_id: str | None = None
+        self.started = False  # 是否已收到浏览器返回的数据
+
+
+class WorkerPool:
+    """
+    油猴脚本标签页池
+
+    - 请求按最少在途数优先派发，每个标签页有并发上限，健康的标签页优先
+    - 所有标签页都满载时，等待空闲名额直到超时
+    - 标签页断开时，尚未返回任何数据的请求会重新派发到其他标签页
+    - 向某个标签页发送失败后，本次派发不再选择该标签页
+    """
+
+    # 单个请求最多尝试发送的次数
+    max_dispatch_attempts = 5
+
+    def __init__(self, max_concurrency: int, timeout: float):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.workers: dict[str, BrowserWorker] = {}
+        self.requests: dict[str, PendingRequest] = {}
+        # 标签页增减或名额释放时触发，唤醒等待派发的请求
+        self._changed = asyncio.Event()
+
+    def _notify(self):
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    # ---------------- 标签页管理 ----------------
+    def add(self, ws: Any) -> BrowserWorker:
+        worker = BrowserWorker(ws, self.max_concurrency)
+        self.workers[worker.id] = worker
+        self._notify()
+        return worker
+
+    def remove(self, worker: BrowserWorker) -> tuple[list[str], list[str]]:
+        """
+        移除断开的标签页，返回 (可重新派发的请求, 已中断的请求)
+        """
+        self.workers.pop(worker.id, None)
+        requeue, broken = [], []
+        for request_id in worker.in_flight:
+            request = self.requests.get(request_id)
+            if request and not request.started:
+                request.worker_id = None
+                worker.requeued += 1
+                requeue.append(request_id)
+            else:
+                self.requests.pop(request_id, None)
+                broken.append(request_id)
+        worker.in_flight.clear()
+        self._notify()
+        return requeue, broken
+
+    def pick(self, exclude: set[str] | None = None) -> BrowserWorker | None:
+        """选出有空闲名额的标签页：健康优先，其次在途数最少；跳过 exclude 中的标签页"""
+        candidates = [
+            w
+            for w in self.workers.values()
+            if w.available and not (exclude and w.id in exclude)
+        ]
+        if not candidates:
+            return None
+        return min(
+            candidates,
+            key=lambda w: (not w.healthy, len(w.in_flight), w.total_requests),
+        )
+
+    # ---------------- 请求派发 ----------------
+    async def dispatch(self, request_id: str, payload: dict) -> BrowserWorker:
+        """
+        将请求派发到一个标签页；标签页全部满载时等待，超时或无连接时抛出 NoWorkerError
+        """
+        request = self.requests.setdefault(request_id, PendingRequest(payload))
+        deadline = time.monotonic() + self.timeout
+        tried: set[str] = set()  # 本次派发中发送失败的标签页
+
+        while True:
+            if not self.workers:
+                self.requests.pop(request_id, None)
+                raise NoWorkerError(
+                    "油猴脚本客户端未连接。请确保 LMArena 页面已打开并激活脚本。"
+                )
+            if len(tried) >= self.max_dispatch_attempts or self.workers.keys() <= tried:
+                self.requests.pop(request_id, None)
+                raise NoWorkerError("向油猴脚本标签页派发请求失败，请检查页面连接。")
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                self.requests.pop(request_id, None)
+                raise NoWorkerError("所有油猴脚本标签页都在忙，请稍后再试。")
+
+            worker = self.pick(exclude=tried)
+            if worker is None:
+                try:
+                    await asyncio.wait_for(self._changed.wait(), remaining)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            worker.in_flight.add(request_id)
+            worker.total_requests += 1
+            request.worker_id = worker.id
+            try:
+                await worker.send({"request_id": request_id, "payload": payload})
+            except Exception as e:
+                # 发送失败：释放名额，换一个标签页重试
+                logger.warning(f"向标签页 {worker.id} 派发请求失败: {e}")
+                worker.in_flight.discard(request_id)
+                worker.failed += 1
+                worker.consecutive_failures += 1
+                request.worker_id = None
+                tried.add(worker.id)
+                # 发送可能不经挂起就失败，让出事件循环后再重试
+                await asyncio.sleep(0)
+                continue
+
+            logger.debug(
+                f"[本地->油猴 {worker.id}]: 请求 {request_id[:8]} "
+                f"(在途 {len(worker.in_flight)}/{worker.max_concurrency})"
+            )
+            return worker
+
+    def mark_started(self, request_id: str):
+        if request := self.requests.get(request_id):
+            request.started = True
+
+    def finish(self, request_id: str, ok: bool):
+        """请求结束（收到 [DONE]、出错或响应通道关闭），释放名额；重复调用无副作用"""
+        request = self.requests.pop(request_id, None)
+        if not request or not request.worker_id:
+            return
+        worker = self.workers.get(request.worker_id)
+        if not worker or request_id not in worker.in_flight:
+            return
+
+        worker.in_flight.discard(request_id)
+        if ok:
+            worker.completed += 1
+            worker.consecutive_failures = 0
+        else:
+            worker.failed += 1
+            worker.consecutive_failures += 1
+        self._notify()
+
+    def stats(self) -> dict:
+        return {
+            "workers": [w.stats() for w in self.workers.values()],
+            "in_flight": sum(len(w.in_flight) for w in self.workers.values()),
+            "pending": len(self.requests),
+        }
@@ -0,0 +1,249 @@
+import asyncio
+import hashlib
+import io
+import math
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from astrbot.api import logger
+from PIL import Image
+
+
+def extract_first_frame(raw: bytes) -> bytes:
+    """把 GIF 的第一帧抽出来，返回 PNG/JPEG 字节流"""
+    img_io = io.BytesIO(raw)
+    img = Image.open(img_io)
+    if img.format != "GIF":
+        return raw  # 不是 GIF，原样返回
+    first_frame = img.convert("RGBA")
+    out_io = io.BytesIO()
+    first_frame.save(out_io, format="PNG")
+    return out_io.getvalue()
+
+
+class ImagePreparer:
+    """
+    上传前的图片预处理（压缩到指定大小以内），全部在独立线程池中执行
+
+    压缩流程:
+      1. 长边先缩到 max_side 以内，按默认质量完整编码一次作为首次探测
+      2. 在探测图（从原图均匀截取的小块拼成的缩小图）上二分查找质量，
+         用首次探测的每像素字节数校准后估算原尺寸的输出大小；
+         最低质量仍超限时，按每像素字节数直接算出目标尺寸
+      3. 按选定的尺寸和质量完整编码一次；估算偏差导致超限时按实际大小再缩放（最多两次）
+    处理结果按源图片哈希缓存，重试时同一张图不会重复压缩。
+    """
+
+    max_side = 1024  # 长边上限
+    probe_tiles = 6  # 探测图每边的小块数
+    probe_tile_size = 64  # 小块边长，与 JPEG 的 8x8 分块对齐
+    default_quality = 85
+    min_quality = 40
+    budget_ratio = 0.95  # 目标大小留出的余量
+
+    def __init__(self, max_workers: int = 2, cache_size: int = 32):
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="lmarena_image"
+        )
+        self._cache: OrderedDict[tuple[str, int], bytes] = OrderedDict()
+        self._cache_size = cache_size
+        self._inflight: dict[tuple[str, int], asyncio.Task] = {}
+        self.stats = {
+            "prepared": 0,
+            "cache_hits": 0,
+            "full_encodes": 0,
+            "probe_encodes": 0,
+        }
+
+    async def run(self, func, *args):
+        """在图片线程池中执行同步函数"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def first_frame(self, raw: bytes) -> bytes:
+        """抽取 GIF 第一帧（线程池中执行）"""
+        return await self.run(extract_first_frame, raw)
+
+    async def prepare(self, image_bytes: bytes, max_bytes: int) -> bytes:
+        """压缩静态图片到 max_bytes 以内，GIF 不处理；相同图片直接返回缓存结果"""
+        key = (await self.run(self._digest, image_bytes), max_bytes)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["cache_hits"] += 1
+            return self._cache[key]
+
+        # 同一张图片正在处理时，等待同一个结果；
+        # 处理作为独立任务运行，发起方被取消时其他等待方仍能拿到结果
+        if task := self._inflight.get(key):
+            self.stats["cache_hits"] += 1
+        else:
+            task = asyncio.create_task(self._prepare_task(image_bytes, key))
+            task.add_done_callback(self._task_done)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _prepare_task(self, image_bytes: bytes, key: tuple[str, int]) -> bytes:
+        max_bytes = key[1]
+        try:
+            data, digest, full_encodes, probe_encodes = await self.run(
+                self._prepare_job, image_bytes, max_bytes
+            )
+        except Exception as e:
+            raise ValueError(f"图片压缩失败: {e}")
+        finally:
+            self._inflight.pop(key, None)
+
+        self.stats["prepared"] += 1
+        self.stats["full_encodes"] += full_encodes
+        self.stats["probe_encodes"] += probe_encodes
+        self._remember(key, data)
+        if digest is not None:
+            # 压缩结果再次送入时（如图床失败回退到 base64）直接命中
+            self._remember((digest, max_bytes), data)
+            logger.debug(
+                f"图片压缩: {len(image_bytes)} -> {len(data)} 字节 "
+                f"(完整编码 {full_encodes} 次, 探测编码 {probe_encodes} 次)"
+            )
+        return data
+
+    def _remember(self, key: tuple[str, int], data: bytes):
+        self._cache[key] = data
+        self._cache.move_to_end(key)
+        if len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    @staticmethod
+    def _task_done(task: asyncio.Task):
+        # 等待方都已取消时异常无人读取，这里读取一次避免警告
+        if not task.cancelled():
+            task.exception()
+
+    def close(self):
+        for task in self._inflight.values():
+            task.cancel()
+        self._inflight.clear()
+        self._executor.shutdown(wait=False)
+        self._cache.clear()
+
+    # ---------------- 线程池内执行 ----------------
+    @staticmethod
+    def _digest(data: bytes) -> str:
+        return hashlib.sha1(data).hexdigest()
+
+    @staticmethod
+    def _encode(img: Image.Image, quality: int) -> bytes:
+        out = io.BytesIO()
+        img.save(out, format="JPEG", quality=quality, optimize=True)
+        return out.getvalue()
+
+    @staticmethod
+    def _to_rgb(img: Image.Image) -> Image.Image:
+        """JPEG 不支持透明通道，透明部分铺白底"""
+        if img.mode in ("RGBA", "LA") or (
+            img.mode == "P" and "transparency" in img.info
+        ):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            return background
+        return img.convert("RGB") if img.mode != "RGB" else img
+
+    def _make_probe(self, img: Image.Image) -> Image.Image:
+        """
+        从原图均匀截取小块拼成探测图
+        直接缩小会抹掉细节，每像素字节数和原图差得很远；原分辨率的小块能保留这部分信息
+        """
+        tiles, size = self.probe_tiles, self.probe_tile_size
+        if img.width < tiles * size or img.height < tiles * size:
+            return img
+        probe = Image.new("RGB", (tiles * size, tiles * size))
+        for row in range(tiles):
+            for col in range(tiles):
+                x = (img.width - size) * col // (tiles - 1) // 8 * 8
+                y = (img.height - size) * row // (tiles - 1) // 8 * 8
+                probe.paste(
+                    img.crop((x, y, x + size, y + size)), (col * size, row * size)
+                )
+        return probe
+
+    def _prepare_job(
+        self, image_bytes: bytes, max_bytes: int
+    ) -> tuple[bytes, str | None, int, int]:
+        """返回 (压缩结果, 压缩结果的哈希（未改动时为 None）, 完整编码次数, 探测编码次数)"""
+        data, full_encodes, probe_encodes = self._prepare_sync(image_bytes, max_bytes)
+        digest = self._digest(data) if data is not image_bytes else None
+        return data, digest, full_encodes, probe_encodes
+
+    def _prepare_sync(
+        self, image_bytes: bytes, max_bytes: int
+    ) -> tuple[bytes, int, int]:
+        """返回 (压缩结果, 完整编码次数, 探测编码次数)"""
+        img = Image.open(io.BytesIO(image_bytes))
+
+        # GIF 不处理
+        if img.format == "GIF" or len(image_bytes) <= max_bytes:
+            return image_bytes, 0, 0
+
+        # JPEG 直接按缩小后的尺寸解码，省去大图的完整解码
+        img.draft("RGB", (self.max_side, self.max_side))
+        img = self._to_rgb(img)
+        img.thumbnail((self.max_side, self.max_side), Image.LANCZOS)  # type: ignore
+        budget = max_bytes * self.budget_ratio
+        full_encodes = probe_encodes = 0
+
+        # 1) 首次探测：默认质量完整编码
+        data = self._encode(img, self.default_quality)
+        full_encodes += 1
+        if len(data) <= max_bytes:
+            return data, full_encodes, probe_encodes
+        pixels = img.width * img.height
+
+        # 2) 在探测图上二分查找质量
+        probe = self._make_probe(img)
+        probe_pixels = probe.width * probe.height
+        probe_bpp: dict[int, float] = {}
+
+        def estimate(quality: int) -> float:
+            """估算当前尺寸下按 quality 编码的字节数"""
+            nonlocal probe_encodes
+            if quality not in probe_bpp:
+                probe_bpp[quality] = len(self._encode(probe, quality)) / probe_pixels
+                probe_encodes += 1
+            return probe_bpp[quality] * calibration * pixels
+
+        # 探测图与原尺寸的每像素字节数并不相同，用默认质量下的实测值校准
+        calibration = 1.0
+        calibration = len(data) / estimate(self.default_quality)
+
+        quality = None
+        lo, hi = self.min_quality, self.default_quality - 1
+        while lo <= hi:
+            mid = (lo + hi) // 2
+            if estimate(mid) <= budget:
+                quality, lo = mid, mid + 1
+            else:
+                hi = mid - 1
+
+        if quality is None:
+            # 最低质量仍超限：按每像素字节数算出目标尺寸
+            quality = self.min_quality
+            scale = math.sqrt(budget / estimate(quality))
+            img = img.resize(
+                (max(1, int(img.width * scale)), max(1, int(img.height * scale))),
+                Image.LANCZOS,  # type: ignore
+            )
+
+        # 3) 最终编码；估算偏差导致超限时按实际大小再缩放
+        data = self._encode(img, quality)
+        full_encodes += 1
+        for _ in range(2):
+            if len(data) <= max_bytes:
+                break
+            scale = math.sqrt(budget / len(data))
+            img = img.resize(
+                (max(1, int(img.width * scale)), max(1, int(img.height * scale))),
+                Image.LANCZOS,  # type: ignore
+            )
+            data = self._encode(img, quality)
+            full_encodes += 1
+
+        return data, full_encodes, probe_encodes
@@ -0,0 +1,142 @@
+import asyncio
+import io
+import threading
+
+import pytest
+
+pytest.importorskip("astrbot")
+np = pytest.importorskip("numpy")
+from PIL import Image  # noqa: E402
+
+from data.plugins.astrbot_plugin_lmarena.image_prep import (  # noqa: E402
+    ImagePreparer,
+)
+
+
+def noise_image(width: int, height: int, fmt: str = "PNG", mode: str = "RGB"):
+    rng = np.random.default_rng(width * height)
+    channels = 4 if mode == "RGBA" else 3
+    pixels = rng.integers(0, 256, (height, width, channels), dtype=np.uint8)
+    out = io.BytesIO()
+    Image.fromarray(pixels, mode).save(out, fmt)
+    return out.getvalue()
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+@pytest.fixture
+def preparer():
+    preparer = ImagePreparer()
+    yield preparer
+    preparer.close()
+
+
+@pytest.mark.parametrize(
+    "size,mode,max_bytes",
+    [((1600, 1200), "RGB", 300_000), ((900, 900), "RGBA", 150_000)],
+)
+def test_output_fits_limit(preparer, size, mode, max_bytes):
+    source = noise_image(*size, mode=mode)
+    assert len(source) > max_bytes
+    data = run(preparer.prepare(source, max_bytes))
+    assert len(data) <= max_bytes
+    img = Image.open(io.BytesIO(data))
+    assert img.format == "JPEG" and max(img.size) <= preparer.max_side
+    assert preparer.stats["full_encodes"] <= 4
+
+
+def test_small_and_gif_unchanged(preparer):
+    small = noise_image(64, 64)
+    assert run(preparer.prepare(small, 1_000_000)) is small
+    gif = noise_image(400, 400, fmt="GIF")
+    assert run(preparer.prepare(gif, 1_000)) is gif
+
+
+def test_cache_hits_for_source_and_output(preparer):
+    async def main():
+        source = noise_image(1200, 1200)
+        first = await preparer.prepare(source, 200_000)
+        assert await preparer.prepare(bytes(source), 200_000) is first
+        # 压缩结果再次送入时直接命中
+        assert await preparer.prepare(first, 200_000) is first
+        assert preparer.stats["prepared"] == 1
+        assert preparer.stats["cache_hits"] == 2
+
+    run(main())
+
+
+def test_concurrent_callers_share_one_job(preparer):
+    async def main():
+        source = noise_image(1200, 1200)
+        results = await asyncio.gather(
+            *(preparer.prepare(source, 200_000) for _ in range(5))
+        )
+        assert all(r is results[0] for r in results)
+        assert preparer.stats["prepared"] == 1
+
+    run(main())
+
+
+def test_owner_cancellation_does_not_orphan_joiners(preparer):
+    async def main():
+        source = noise_image(1600, 1600)
+        owner = asyncio.create_task(preparer.prepare(source, 200_000))
+        while not preparer._inflight:
+            await asyncio.sleep(0.001)
+        joiner = asyncio.create_task(preparer.prepare(source, 200_000))
+        while not preparer.stats["cache_hits"]:
+            await asyncio.sleep(0.001)
+        assert preparer._inflight
+        owner.cancel()
+
+        data = await asyncio.wait_for(joiner, 10)
+        assert len(data) <= 200_000
+        assert owner.cancelled()
+        assert not preparer._inflight
+        # 发起方被取消，结果仍然写入缓存
+        assert await preparer.prepare(source, 200_000) is data
+
+    run(main())
+
+
+def test_unreadable_image_raises_value_error(preparer):
+    async def main():
+        waiters = [preparer.prepare(b"not an image" * 100, 10) for _ in range(3)]
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        assert all(isinstance(r, ValueError) for r in results)
+        assert not preparer._inflight
+        assert not preparer._cache
+
+    run(main())
+
+
+def test_hashing_runs_in_pool(preparer, monkeypatch):
+    threads = []
+    digest = ImagePreparer._digest
+
+    def recording_digest(data):
+        threads.append(threading.current_thread().name)
+        return digest(data)
+
+    monkeypatch.setattr(preparer, "_digest", recording_digest)
+    run(preparer.prepare(noise_image(1200, 1200), 200_000))
+    # 源图片与压缩结果各计算一次
+    assert len(threads) == 2
+    assert all(name.startswith("lmarena_image") for name in threads)
+
+
+def test_workflow_falls_back_to_raw_bytes(preparer):
+    from data.plugins.astrbot_plugin_lmarena.workflow import Workflow
+
+    workflow = Workflow.__new__(Workflow)
+    workflow.image_preparer = preparer
+    raw = b"not an image" * 100
+
+    async def main():
+        assert await workflow._prepare_image(raw) is raw
+        req = await workflow.make_openai_req("hi", [raw], "model")
+        assert len(req["messages"][0]["content"]) == 2
+
+    run(main())
@@ -0,0 +1,128 @@
+import json
+import random
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from data.plugins.astrbot_plugin_lmarena.bridge.stream import (  # noqa: E402
+    LMArenaStreamParser,
+)
+
+TEXT_PIECES = ["你好", "world", " ", "\n", '"quoted"', "\\", "{x}", "a0:", "😀", "é"]
+
+
+def is_cloudflare(text: str) -> bool:
+    return "Just a moment..." in text
+
+
+def make_stream(rng: random.Random, size: int) -> tuple[str, list]:
+    """生成随机数据流，同时返回应产出的事件"""
+    records, expected, length = [], [], 0
+    while length < size:
+        r = rng.random()
+        if r < 0.85:
+            text = "".join(rng.choice(TEXT_PIECES) for _ in range(rng.randint(1, 30)))
+            record = f"a0:{json.dumps(text, ensure_ascii=rng.random() < 0.5)}"
+            expected.append(("content", text))
+        elif r < 0.9:
+            url = f"https://example.com/{rng.randint(0, 999)}.png"
+            record = "a2:" + json.dumps(
+                [{"type": "image", "image": url, "mimeType": "image/png"}]
+            )
+            expected.append(("content", f"![Image]({url})"))
+        else:
+            # 不产出事件的记录
+            record = rng.choice(
+                [
+                    'ae:{"finishReason":"stop","usage":{"promptTokens":1}}',
+                    'a8:[{"k":1}]',
+                ]
+            )
+        records.append(record)
+        length += len(record) + 1
+    records.append('ad:{"finishReason":"stop"}')
+    expected.append(("finish", "stop"))
+    return "\n".join(records) + "\n", expected
+
+
+def random_slices(rng: random.Random, stream: str) -> list[str]:
+    chunks, i = [], 0
+    while i < len(stream):
+        j = min(len(stream), i + rng.choice([1, 2, 3, 7, 50, rng.randint(1, 2000)]))
+        chunks.append(stream[i:j])
+        i = j
+    return chunks
+
+
+def parse(chunks: list[str]) -> list:
+    parser = LMArenaStreamParser(is_cloudflare)
+    events = []
+    for chunk in chunks:
+        events.extend(parser.feed(chunk))
+    events.extend(parser.flush())
+    return events
+
+
+@pytest.mark.parametrize("seed", range(100))
+def test_random_chunk_boundaries_match_whole_stream(seed):
+    rng = random.Random(seed)
+    stream, expected = make_stream(rng, rng.choice([200, 2000, 20000]))
+    assert parse([stream]) == expected
+    assert parse(random_slices(rng, stream)) == expected
+    # 逐行送入（与浏览器按记录转发一致）
+    assert parse([line + "\n" for line in stream.split("\n") if line]) == expected
+
+
+def test_last_record_without_newline():
+    assert parse(['a0:"hi"\nad:{"finishReason":"length"}']) == [
+        ("content", "hi"),
+        ("finish", "length"),
+    ]
+
+
+def test_record_split_inside_escape():
+    stream = 'a0:"line\\nbreak \\u4f60\\"x\\""\n'
+    for cut in range(len(stream)):
+        assert parse([stream[:cut], stream[cut:]]) == [("content", 'line\nbreak 你"x"')]
+
+
+def test_single_line_error_json():
+    assert parse(['{"error": "rate', ' limited"}\n']) == [("error", "rate limited")]
+
+
+@pytest.mark.parametrize("trailing_newline", [True, False])
+def test_pretty_printed_error_json(trailing_newline):
+    error = {"error": {"message": 'Rate limit {x} "quoted" }', "code": 429}}
+    stream = 'a0:"hi"\n' + json.dumps(error, indent=2)
+    if trailing_newline:
+        stream += '\na0:"after"\n'
+    events = parse([stream[i : i + 3] for i in range(0, len(stream), 3)])
+    assert events[:2] == [("content", "hi"), ("error", error["error"])]
+    if trailing_newline:
+        assert events[2:] == [("content", "after")]
+
+
+def test_multiline_json_without_error_is_ignored():
+    assert parse(['{"foo": {\n"bar": 1}}\na0:"ok"\n']) == [("content", "ok")]
+
+
+def test_unclosed_json_is_bounded():
+    parser = LMArenaStreamParser()
+    parser.max_json_size = 100
+    events = parser.feed('{\n"error": "x' + "y" * 200 + '",\na0:"ok"\n')
+    assert events == [("content", "ok")]
+
+
+def test_cloudflare_page():
+    events = parse(["<html>\n<title>Just a moment...</title>\n</html>\n"])
+    assert events == [("cloudflare", "<title>Just a moment...</title>")]
+
+
+def test_oversized_record_is_dropped():
+    parser = LMArenaStreamParser()
+    parser.max_record_size = 100
+    events = parser.feed('a0:"' + "x" * 60)
+    events += parser.feed("x" * 60)
+    events += parser.feed('x"\na0:"ok"\n')
+    assert events == [("content", "ok")]
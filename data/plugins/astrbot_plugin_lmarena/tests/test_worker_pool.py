@@ -0,0 +1,208 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+pytest.importorskip("astrbot")
+
+from data.plugins.astrbot_plugin_lmarena.bridge.workers import (  # noqa: E402
+    NoWorkerError,
+    WorkerPool,
+)
+
+
+class FakeWebSocket:
+    """记录发送内容；closed 时发送直接抛错（不经挂起，与连接关闭后的 Starlette 一致）"""
+
+    def __init__(self, closed: bool = False):
+        self.closed = closed
+        self.sent: list[dict] = []
+        self.attempts = 0
+
+    async def send_text(self, text: str):
+        self.attempts += 1
+        if self.closed:
+            raise RuntimeError("WebSocket is not connected")
+        self.sent.append(json.loads(text))
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_dispatch_prefers_least_busy_worker():
+    async def main():
+        pool = WorkerPool(max_concurrency=2, timeout=1)
+        first, second = FakeWebSocket(), FakeWebSocket()
+        pool.add(first)
+        pool.add(second)
+        workers = [await pool.dispatch(f"r{i}", {"i": i}) for i in range(4)]
+        assert len(first.sent) == len(second.sent) == 2
+        assert {w.id for w in workers} == set(pool.workers)
+        assert first.sent[0]["request_id"] in ("r0", "r1")
+
+    run(main())
+
+
+def test_send_failure_fails_over_to_other_worker():
+    async def main():
+        pool = WorkerPool(max_concurrency=2, timeout=1)
+        dead = pool.add(FakeWebSocket(closed=True))
+        alive_ws = FakeWebSocket()
+        alive = pool.add(alive_ws)
+        # 让失败的标签页先被选中
+        alive.total_requests = 10
+
+        worker = await pool.dispatch("r1", {"x": 1})
+        assert worker is alive
+        assert alive_ws.sent == [{"request_id": "r1", "payload": {"x": 1}}]
+        assert dead.ws.attempts == 1
+        assert dead.failed == dead.consecutive_failures == 1
+        assert not dead.in_flight
+        assert pool.requests["r1"].worker_id == alive.id
+
+    run(main())
+
+
+def test_dead_only_worker_fails_without_blocking_loop():
+    async def main():
+        pool = WorkerPool(max_concurrency=2, timeout=30)
+        dead = pool.add(FakeWebSocket(closed=True))
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        start = time.monotonic()
+        with pytest.raises(NoWorkerError):
+            await asyncio.wait_for(pool.dispatch("r1", {}), 3)
+        task.cancel()
+
+        assert time.monotonic() - start < 1
+        assert dead.ws.attempts == 1
+        assert ticks > 0
+        assert "r1" not in pool.requests
+        assert not dead.in_flight
+
+    run(main())
+
+
+def test_attempts_are_capped():
+    async def main():
+        pool = WorkerPool(max_concurrency=1, timeout=30)
+        sockets = [FakeWebSocket(closed=True) for _ in range(8)]
+        for ws in sockets:
+            pool.add(ws)
+        with pytest.raises(NoWorkerError):
+            await pool.dispatch("r1", {})
+        assert sum(ws.attempts for ws in sockets) == pool.max_dispatch_attempts
+
+    run(main())
+
+
+def test_full_pool_waits_for_free_slot():
+    async def main():
+        pool = WorkerPool(max_concurrency=1, timeout=5)
+        ws = FakeWebSocket()
+        pool.add(ws)
+        await pool.dispatch("r1", {})
+
+        waiting = asyncio.create_task(pool.dispatch("r2", {}))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+
+        pool.finish("r1", ok=True)
+        worker = await asyncio.wait_for(waiting, 1)
+        assert worker.in_flight == {"r2"}
+        assert worker.completed == 1
+        assert [m["request_id"] for m in ws.sent] == ["r1", "r2"]
+
+    run(main())
+
+
+def test_full_pool_times_out():
+    async def main():
+        pool = WorkerPool(max_concurrency=1, timeout=0.1)
+        pool.add(FakeWebSocket())
+        await pool.dispatch("r1", {})
+        with pytest.raises(NoWorkerError):
+            await pool.dispatch("r2", {})
+        assert "r2" not in pool.requests
+        assert "r1" in pool.requests
+
+    run(main())
+
+
+def test_failed_worker_is_retried_after_new_worker_joins():
+    async def main():
+        pool = WorkerPool(max_concurrency=1, timeout=5)
+        busy = pool.add(FakeWebSocket())
+        dead = pool.add(FakeWebSocket(closed=True))
+        await pool.dispatch("r1", {})
+        assert busy.in_flight == {"r1"}
+
+        # 唯一有名额的标签页发送失败，等待新标签页连接
+        waiting = asyncio.create_task(pool.dispatch("r2", {}))
+        await asyncio.sleep(0.05)
+        assert not waiting.done()
+        assert dead.ws.attempts == 1
+
+        fresh_ws = FakeWebSocket()
+        fresh = pool.add(fresh_ws)
+        assert await asyncio.wait_for(waiting, 1) is fresh
+        assert fresh_ws.sent[0]["request_id"] == "r2"
+        assert dead.ws.attempts == 1
+
+    run(main())
+
+
+def test_no_workers():
+    async def main():
+        pool = WorkerPool(max_concurrency=1, timeout=5)
+        with pytest.raises(NoWorkerError):
+            await pool.dispatch("r1", {})
+        assert not pool.requests
+
+    run(main())
+
+
+def test_remove_requeues_unstarted_requests():
+    async def main():
+        pool = WorkerPool(max_concurrency=2, timeout=1)
+        worker = pool.add(FakeWebSocket())
+        await pool.dispatch("r1", {})
+        await pool.dispatch("r2", {})
+        pool.mark_started("r2")
+
+        requeue, broken = pool.remove(worker)
+        assert requeue == ["r1"] and broken == ["r2"]
+        assert pool.requests["r1"].worker_id is None
+        assert "r2" not in pool.requests
+
+        other_ws = FakeWebSocket()
+        other = pool.add(other_ws)
+        assert await pool.dispatch("r1", pool.requests["r1"].payload) is other
+        assert other.in_flight == {"r1"}
+
+    run(main())
+
+
+def test_finish_updates_health():
+    async def main():
+        pool = WorkerPool(max_concurrency=4, timeout=1)
+        worker = pool.add(FakeWebSocket())
+        for i in range(worker.max_consecutive_failures):
+            await pool.dispatch(f"r{i}", {})
+            pool.finish(f"r{i}", ok=False)
+        assert not worker.healthy
+        await pool.dispatch("ok", {})
+        pool.finish("ok", ok=True)
+        pool.finish("ok", ok=True)  # 重复调用无副作用
+        assert worker.healthy and worker.completed == 1 and not worker.in_flight
+
+    run(main())
@@ -11,77 +11,7 @@ from astrbot.api import logger
 from astrbot.core.config.astrbot_config import AstrBotConfig
 from astrbot.core.platform.astr_message_event import AstrMessageEvent
 import astrbot.core.message.components as Comp
-import io
-from PIL import Image
-
-
-def extract_first_frame(raw: bytes) -> bytes:
-    """把 GIF 的第一帧抽出来，返回 PNG/JPEG 字节流"""
-    img_io = io.BytesIO(raw)
-    img = Image.open(img_io)
-    if img.format != "GIF":
-        return raw  # 不是 GIF，原样返回
-    first_frame = img.convert("RGBA")
-    out_io = io.BytesIO()
-    first_frame.save(out_io, format="PNG")
-    return out_io.getvalue()
-
-
-async def compress_image(image_bytes: bytes, max_bytes: int) -> bytes:
-    """
-    线程池里压缩静态图片到指定大小以内，GIF 不处理
-    """
-    loop = asyncio.get_running_loop()
-
-    def _inner(image_bytes: bytes, max_bytes: int) -> bytes:
-        try:
-            img = Image.open(io.BytesIO(image_bytes))
-
-            # GIF 不处理
-            if img.format == "GIF":
-                return image_bytes
-
-            if len(image_bytes) <= max_bytes:
-                return image_bytes
-
-            # 2) 先把长边一次性缩到 1024 以下，质量先压到 70
-            img.thumbnail((1024, 1024), Image.LANCZOS)  # type: ignore
-            resampled = io.BytesIO()
-            img.save(resampled, format=img.format, quality=70, optimize=True)
-            resampled.seek(0)
-            if resampled.tell() <= max_bytes:
-                return resampled.getvalue()
-
-            # 3) 还不够小，再进入原有循环微调
-            quality, scale = 50, 0.6
-            resample = Image.LANCZOS  # type: ignore
-
-            while True:
-                resampled.seek(0)
-                resampled.truncate(0)
-
-                if scale < 1:
-                    w, h = img.size
-                    tmp = img.resize((int(w * scale), int(h * scale)), resample)
-                else:
-                    tmp = img
-
-                tmp.save(resampled, format=img.format, quality=quality, optimize=True)
-
-                if resampled.tell() <= max_bytes or (quality <= 5 and scale <= 0.2):
-                    break
-
-                if quality > 5:
-                    quality -= 5
-                else:
-                    scale *= 0.9
-
-            return resampled.getvalue()
-
-        except Exception as e:
-            raise ValueError(f"图片压缩失败: {e}")
-
-    return await loop.run_in_executor(None, _inner, image_bytes, max_bytes)
+from .image_prep import ImagePreparer
 
 
 class Workflow:
@@ -90,6 +20,7 @@ class Workflow:
     """
 
     headers = {"Content-Type": "application/json"}
+    max_image_bytes = 3_500_000  # 单张图片上传大小上限
 
     def __init__(
         self, config: AstrBotConfig, bridge_server_url: str, image_server_url: str | None
@@ -98,6 +29,7 @@ class Workflow:
         self.bridge_server_url = bridge_server_url
         self.image_server_url = image_server_url
         self.session = aiohttp.ClientSession()
+        self.image_preparer = ImagePreparer()
 
     async def upload_to_bed(self, img_bytes: bytes, image_server_url: str) -> str | None:
         """
@@ -181,7 +113,15 @@ class Workflow:
         if not raw:
             return None
         # 抽 GIF 第一帧
-        return extract_first_frame(raw)
+        return await self.image_preparer.first_frame(raw)
+
+    async def _prepare_image(self, img_bytes: bytes) -> bytes:
+        """压缩图片；无法识别的图片原样返回，交给后续流程处理"""
+        try:
+            return await self.image_preparer.prepare(img_bytes, self.max_image_bytes)
+        except ValueError as e:
+            logger.warning(f"{e}，使用原图")
+            return img_bytes
 
     async def _extract_from_segments(
         self, segments: list, event: AstrMessageEvent
@@ -193,6 +133,8 @@ class Workflow:
             if isinstance(seg, Comp.Image):
                 if src := seg.url or seg.file:
                     if img_bytes := await self._load_bytes(src):
+                        # 先压缩再上传，图床和 base64 回退都使用压缩结果
+                        img_bytes = await self._prepare_image(img_bytes)
                         if self.image_server_url:
                             if url := await self.upload_to_bed(
                                 img_bytes, self.image_server_url
@@ -208,6 +150,7 @@ class Workflow:
             elif isinstance(seg, Comp.At) and str(seg.qq) != event.get_self_id():
                 avatar = await self._get_avatar(str(seg.qq))
                 if isinstance(avatar, bytes):
+                    avatar = await self._prepare_image(avatar)
                     if self.image_server_url:
                         if url := await self.upload_to_bed(
                             avatar, self.image_server_url
@@ -236,9 +179,8 @@ class Workflow:
         images.extend(await self._extract_from_segments(event.get_messages(), event))
         return images
 
-    @staticmethod
     async def make_openai_req(
-        text: str, images: list[bytes | str] | None, model: str
+        self, text: str, images: list[bytes | str] | None, model: str
     ) -> dict:
         """
         制作 OpenAI 格式数据块，支持多张图片
@@ -249,7 +191,7 @@ class Workflow:
         if images:
             for img in images:
                 if isinstance(img, bytes):
-                    compressed = await compress_image(img, 3_500_000)
+                    compressed = await self._prepare_image(img)
                     img_url = f"data:image/jpeg;base64,{base64.b64encode(compressed).decode()}"
                 elif isinstance(img, str):
                     img_url = img
@@ -328,3 +270,4 @@ class Workflow:
     async def terminate(self):
         if self.session:
             await self.session.close()
+        self.image_preparer.close()
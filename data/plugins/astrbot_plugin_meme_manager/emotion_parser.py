@@ -0,0 +1,320 @@
+"""表情标记解析器
+
+单次线性扫描 LLM 回复文本，识别并移除所有表情标记：
+- 严格标记 ``&&tag&&``
+- 替代标记 ``[tag]`` / ``(tag)``
+- 重复表情词（如 ``angryangryangry``）
+- 松散表情词（独立出现的分类名）
+
+表情词的匹配基于由合法分类构建的字典树，每个位置只需沿树向下走一次，
+不再对每个分类分别跑一遍正则。
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+_THINKING_PATTERN = re.compile(
+    r"<think(?:ing)?>.*?</think(?:ing)?>", re.DOTALL | re.IGNORECASE
+)
+_CHINESE_CHAR = re.compile(r"[\u4e00-\u9fff]")
+_ENGLISH_BEFORE = re.compile(r"[a-zA-Z]\s+$")
+_ENGLISH_AFTER = re.compile(r"^\s+[a-zA-Z]")
+_NUMERIC_MARKUP = re.compile(r"\[\d+\]")
+_DANGLING_AMPERSANDS = re.compile(r"&&+")
+
+_SENTENCE_ENDINGS = ("。", "，", "！", "？", ".", ",", ":", ";", "!", "?", "\n")
+_SEPARATORS = " \t\n.,!?;:'\"()[]{}"
+
+# 字典树中标记词条结束的键
+_END = ""
+
+
+def _is_word_char(ch: str) -> bool:
+    """与正则 ``\\b`` 的单词字符定义保持一致"""
+    return ch.isalnum() or ch == "_"
+
+
+def _last_visible(out: List[str]) -> str:
+    """已输出文本中最后一个非空白字符
+
+    上下文判断只看去除空白后的首尾字符，因此无需拼接整段已输出文本。
+    """
+    for piece in reversed(out):
+        if not piece.isspace():
+            return piece
+    return ""
+
+
+def _first_visible(text: str, start: int) -> str:
+    """text[start:] 中第一个非空白字符"""
+    length = len(text)
+    while start < length and text[start].isspace():
+        start += 1
+    return text[start] if start < length else ""
+
+
+class EmotionParser:
+    """基于字典树的单遍表情标记解析器
+
+    解析器只依赖合法分类集合和配置开关，构建后不可变，可被多个事件并发复用。
+    """
+
+    def __init__(
+        self,
+        valid_emotions: Iterable[str],
+        enable_alternative_markup: bool = True,
+        enable_repeated_emotion_detection: bool = True,
+        enable_loose_emotion_matching: bool = True,
+        high_confidence_emotions: Iterable[str] = (),
+    ):
+        self.valid_emotions = frozenset(e for e in valid_emotions if e)
+        self.enable_alternative_markup = enable_alternative_markup
+        self.enable_repeated_emotion_detection = enable_repeated_emotion_detection
+        self.enable_loose_emotion_matching = enable_loose_emotion_matching
+        self.high_confidence_emotions = frozenset(high_confidence_emotions or ())
+        self._trie = self._build_trie(self.valid_emotions)
+
+    @staticmethod
+    def _build_trie(words: Iterable[str]) -> Dict:
+        root: Dict = {}
+        for word in words:
+            node = root
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[_END] = word
+        return root
+
+    def _match_words(self, text: str, start: int) -> List[str]:
+        """返回从 start 开始能匹配到的所有表情词，按长度从长到短排列"""
+        matches = []
+        node = self._trie
+        i = start
+        length = len(text)
+        while i < length:
+            node = node.get(text[i])
+            if node is None:
+                break
+            i += 1
+            word = node.get(_END)
+            if word is not None:
+                matches.append(word)
+        matches.reverse()
+        return matches
+
+    def _repeat_threshold(self, emotion: str) -> Optional[int]:
+        """重复多少次才视为表情；太短的词不参与重复检测"""
+        if len(emotion) < 3:
+            return None
+        if emotion in self.high_confidence_emotions:
+            return 2
+        if len(emotion) >= 4:
+            return 3
+        return None
+
+    def _strict_end(self, text: str, start: int) -> Optional[int]:
+        """&&tag&& 标记的结束位置，不是完整标记时返回 None"""
+        if not text.startswith("&&", start):
+            return None
+        end = text.find("&", start + 2)
+        if end > start + 2 and text.startswith("&&", end):
+            return end + 2
+        return None
+
+    def _bracket_end(self, text: str, start: int) -> Optional[int]:
+        """[tag] / (tag) 标记的结束位置，不是完整标记时返回 None"""
+        opener = text[start] if start < len(text) else ""
+        if not self.enable_alternative_markup or opener not in "[(":
+            return None
+        closer, forbidden = ("]", "[]") if opener == "[" else (")", "()")
+        end = start + 1
+        length = len(text)
+        while end < length and text[end] not in forbidden:
+            end += 1
+        if end >= length or end == start + 1 or text[end] != closer:
+            return None
+        return end + 1
+
+    def _repeat_match(self, text: str, start: int) -> Optional[Tuple[int, str]]:
+        """重复表情词（如 angryangryangry）的 (结束位置, 表情)"""
+        if not self.enable_repeated_emotion_detection:
+            return None
+        for emotion in self._match_words(text, start):
+            threshold = self._repeat_threshold(emotion)
+            if threshold is None:
+                continue
+            end = start + len(emotion)
+            repeats = 1
+            while text.startswith(emotion, end):
+                end += len(emotion)
+                repeats += 1
+            if repeats >= threshold:
+                return end, emotion
+        return None
+
+    def _skip_removed(self, text: str, pos: int, skip_spaces: bool) -> int:
+        """跳过紧随其后、必然会被移除的标记，得到清理后文本中真正相邻的位置
+
+        旧实现是先整体移除标记再判断上下文，这里向前看以保持相同的判断结果。
+        """
+        length = len(text)
+        while pos < length:
+            if skip_spaces and text[pos].isspace():
+                pos += 1
+                continue
+            end = self._strict_end(text, pos) or self._bracket_end(text, pos)
+            if end is None:
+                repeat = self._repeat_match(text, pos)
+                end = repeat[0] if repeat else None
+            if end is None:
+                break
+            pos = end
+        return pos
+
+    def parse(self, text: str) -> Tuple[str, List[str]]:
+        """解析文本，返回 (清理后的文本, 按出现顺序排列的表情列表)"""
+        if not text:
+            return text, []
+
+        # thinking 标签内的表情词不做关键词匹配（符号包裹的标记照常处理）
+        thinking_spans = [m.span() for m in _THINKING_PATTERN.finditer(text)]
+        span_index = 0
+        match_keywords = bool(self._trie) and (
+            self.enable_repeated_emotion_detection
+            or self.enable_loose_emotion_matching
+        )
+
+        out: List[str] = []
+        emotions: List[str] = []
+        i = 0
+        length = len(text)
+
+        while i < length:
+            ch = text[i]
+
+            # 严格标记 &&tag&&，非法表情静默移除
+            if ch == "&":
+                end = self._strict_end(text, i)
+                if end is not None:
+                    emotion = text[i + 2 : end - 2].strip()
+                    if emotion in self.valid_emotions:
+                        emotions.append(emotion)
+                    i = end
+                    continue
+
+            # 替代标记 [tag] / (tag)，非法标记整体移除
+            if ch in "[(":
+                end = self._bracket_end(text, i)
+                if end is not None:
+                    markup = text[i:end]
+                    emotion = markup[1:-1].strip()
+                    if emotion not in self.valid_emotions:
+                        i = end
+                        continue
+                    if ch == "[" or is_likely_emotion_markup(
+                        markup,
+                        _last_visible(out),
+                        text[self._skip_removed(text, end, True) :][:1],
+                    ):
+                        emotions.append(emotion)
+                        i = end
+                        continue
+
+            if match_keywords:
+                while span_index < len(thinking_spans) and thinking_spans[span_index][1] <= i:
+                    span_index += 1
+                in_thinking = (
+                    span_index < len(thinking_spans)
+                    and thinking_spans[span_index][0] <= i
+                )
+                if not in_thinking:
+                    token = self._repeat_match(text, i) or self._loose_match(
+                        text, i, out
+                    )
+                    if token is not None:
+                        i, emotion = token
+                        emotions.append(emotion)
+                        continue
+
+            out.append(ch)
+            i += 1
+
+        # 防御性清理未成对的 && 符号
+        return _DANGLING_AMPERSANDS.sub("", "".join(out)).strip(), emotions
+
+    def _loose_match(
+        self, text: str, start: int, out: List[str]
+    ) -> Optional[Tuple[int, str]]:
+        """独立出现、且上下文像表情的表情词的 (结束位置, 表情)"""
+        if not self.enable_loose_emotion_matching:
+            return None
+        # 单词边界以清理后的文本为准
+        if out and _is_word_char(out[-1]):
+            return None
+        for emotion in self._match_words(text, start):
+            end = start + len(emotion)
+            adjacent = self._skip_removed(text, end, False)
+            if adjacent < len(text) and _is_word_char(text[adjacent]):
+                continue
+            after = text[self._skip_removed(text, adjacent, True) :][:1]
+            if is_likely_emotion(
+                emotion, _last_visible(out), after, self.high_confidence_emotions
+            ):
+                return end, emotion
+        return None
+
+
+def is_likely_emotion_markup(markup: str, before: str, after: str) -> bool:
+    """判断一个括号标记是否可能是表情而非普通文本的一部分"""
+    before_text = before.strip()
+    after_text = after.strip()
+
+    # 如果是在中文上下文中，更可能是表情
+    if _CHINESE_CHAR.search(before_text[-1:]) or _CHINESE_CHAR.search(
+        after_text[:1]
+    ):
+        return True
+
+    # 如果在数字标记中，可能是引用标记如[1]，不是表情
+    if _NUMERIC_MARKUP.match(markup):
+        return False
+
+    # 如果标记内有空格，可能是普通句子，不是表情
+    if " " in markup[1:-1]:
+        return False
+
+    # 如果标记前后是完整的英文句子，可能不是表情
+    if _ENGLISH_BEFORE.search(before_text) and _ENGLISH_AFTER.search(after_text):
+        return False
+
+    return True
+
+
+def is_likely_emotion(
+    word: str, before: str, after: str, high_confidence_emotions=frozenset()
+) -> bool:
+    """判断一个单词是否可能是表情而非普通英文单词"""
+    before_text = before.strip()
+    after_text = after.strip()
+
+    # 规则1：在英文上下文中，不太可能是表情
+    if _ENGLISH_BEFORE.search(before_text) or _ENGLISH_AFTER.search(after_text):
+        return False
+
+    # 规则2：前后有中文字符，更可能是表情
+    if _CHINESE_CHAR.search(before_text[-1:]) or _CHINESE_CHAR.search(
+        after_text[:1]
+    ):
+        return True
+
+    # 规则3：如果是句子开头或结尾，可能是表情
+    if not before_text or before_text.endswith(_SENTENCE_ENDINGS):
+        return True
+
+    # 规则4：如果前后都是标点或空格，可能是表情
+    if (not before_text or before_text[-1] in _SEPARATORS) and (
+        not after_text or after_text[0] in _SEPARATORS
+    ):
+        return True
+
+    # 规则5：高置信度表情即使在英文上下文中也可能是表情
+    return word in high_confidence_emotions
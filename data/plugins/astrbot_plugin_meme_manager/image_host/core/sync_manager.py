@@ -1,18 +1,33 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from pathlib import Path
 from typing import Dict, List, Optional
 from tqdm import tqdm
 from ..interfaces.image_host import ImageHostInterface
 from .file_handler import FileHandler
+from .sync_manifest import SyncManifest
 from .upload_tracker import UploadTracker
 
 
 class SyncManager:
     """同步管理器"""
 
-    def __init__(self, image_host: ImageHostInterface, local_dir: Path, upload_tracker: Optional[UploadTracker] = None):
+    DEFAULT_MAX_WORKERS = 4
+    # 每完成多少个上传落盘一次清单，中断时最多重传这么多个文件
+    MANIFEST_SAVE_INTERVAL = 20
+
+    def __init__(
+        self,
+        image_host: ImageHostInterface,
+        local_dir: Path,
+        upload_tracker: Optional[UploadTracker] = None,
+        manifest: Optional[SyncManifest] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+    ):
         self.image_host = image_host
         self.file_handler = FileHandler(local_dir)
         self.upload_tracker = upload_tracker
+        self.manifest = manifest
+        self.max_workers = max(1, int(max_workers or 1))
 
     def _normalize_remote_id(self, remote_id: str, provider_name: str = None) -> str:
         """
@@ -67,8 +82,11 @@ class SyncManager:
                 print(f"  - [{img.get('category', '根目录')}] {img['filename']}")
 
         # 上传：检查哪些文件没有上传记录
-        to_upload = []
-        if self.upload_tracker:
+        if self.manifest:
+            to_upload = self._collect_pending_uploads(local_images)
+            print(f"\n未上传过的文件: {len(to_upload)} 个")
+        elif self.upload_tracker:
+            to_upload = []
             for img in local_images:
                 category = img.get("category", "")
                 file_path = Path(img["path"])
@@ -107,6 +125,77 @@ class SyncManager:
             "is_synced": not (to_upload or to_download),
         }
 
+    def _collect_pending_uploads(self, local_images: List[Dict]) -> List[Dict]:
+        """基于同步清单增量计算待上传文件
+
+        mtime 与 size 未变化的文件复用清单中缓存的哈希，不重新读取文件内容。
+        清单中尚无记录、但旧版上传记录中存在且大小一致的文件视为已上传，
+        从而平滑迁移已有的上传记录。
+        """
+        to_upload = []
+        for img in local_images:
+            file_path = Path(img["path"])
+            rel_path = img["id"]
+            try:
+                content_hash = self.manifest.get_hash(rel_path, file_path)
+            except OSError as e:
+                print(f"\n读取文件失败，跳过: {rel_path} - {str(e)}")
+                continue
+            img["hash"] = content_hash
+
+            if self.manifest.is_done(content_hash, rel_path):
+                continue
+
+            if self.upload_tracker and content_hash not in self.manifest.files:
+                record = self.upload_tracker.uploaded_files.get(
+                    str(Path(img.get("category", "")) / file_path.name)
+                    if img.get("category")
+                    else file_path.name
+                )
+                if record and record.get("file_size") == file_path.stat().st_size:
+                    self.manifest.set_state(
+                        content_hash,
+                        SyncManifest.DONE,
+                        rel_path,
+                        record.get("remote_url", ""),
+                    )
+                    continue
+
+            to_upload.append(img)
+
+        self.manifest.prune_paths(img["id"] for img in local_images)
+        self.manifest.save()
+        return to_upload
+
+    def _upload_one(self, image: Dict) -> Dict[str, str]:
+        """在线程池中执行的单个上传任务"""
+        return self.image_host.upload_image(Path(image["path"]))
+
+    def _on_upload_finished(self, image: Dict, result: Optional[Dict], error: Optional[Exception]):
+        """在主线程中记录上传结果，清单与上传记录只在这里修改"""
+        file_path = Path(image["path"])
+        category = image.get("category", "")
+        content_hash = image.get("hash")
+
+        if error is None:
+            remote_url = (result or {}).get("url", "")
+            if self.manifest and content_hash:
+                self.manifest.set_state(content_hash, SyncManifest.DONE, image["id"], remote_url)
+            if self.upload_tracker:
+                self.upload_tracker.mark_uploaded(file_path, category, remote_url, save=False)
+        else:
+            print(f"\n上传失败: {file_path.name} - {str(error)}")
+            if self.manifest and content_hash:
+                self.manifest.set_state(
+                    content_hash, SyncManifest.FAILED, image["id"], error=str(error)
+                )
+
+    def _save_progress(self):
+        if self.manifest:
+            self.manifest.save()
+        if self.upload_tracker:
+            self.upload_tracker.save()
+
     def sync_to_remote(self) -> bool:
         """同步本地文件到远程 - 只上传未上传过的文件"""
         status = self.check_sync_status()
@@ -118,32 +207,54 @@ class SyncManager:
         # 上传新文件
         to_upload = status["to_upload"]
         if to_upload:
-            print(f"\n开始上传 {len(to_upload)} 个文件...")
+            print(f"\n开始上传 {len(to_upload)} 个文件（并发数 {self.max_workers}）...")
             uploaded_count = 0
             skipped_count = 0
-            
-            with tqdm(total=len(to_upload), desc="上传进度") as pbar:
+
+            if self.manifest:
                 for image in to_upload:
-                    file_path = Path(image["path"])
-                    category = image.get("category", "")
-                    
-                    try:
-                        # 上传文件
-                        result = self.image_host.upload_image(file_path)
-                        
-                        # 记录已上传
-                        if self.upload_tracker:
-                            remote_url = result.get("url", "")
-                            self.upload_tracker.mark_uploaded(file_path, category, remote_url)
-                        
-                        uploaded_count += 1
-                        pbar.update(1)
-                        
-                    except Exception as e:
-                        print(f"\n上传失败: {file_path.name} - {str(e)}")
-                        skipped_count += 1
+                    if image.get("hash"):
+                        self.manifest.set_state(image["hash"], SyncManifest.PENDING, image["id"])
+                self.manifest.save()
+
+            # 同时在途的任务数不超过 max_workers，保证清单中 uploading 状态与实际一致
+            queue = iter(to_upload)
+            in_flight = {}
+            finished_since_save = 0
+
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor, tqdm(
+                total=len(to_upload), desc="上传进度"
+            ) as pbar:
+                while True:
+                    while len(in_flight) < self.max_workers:
+                        image = next(queue, None)
+                        if image is None:
+                            break
+                        if self.manifest and image.get("hash"):
+                            self.manifest.set_state(image["hash"], SyncManifest.UPLOADING, image["id"])
+                        in_flight[executor.submit(self._upload_one, image)] = image
+
+                    if not in_flight:
+                        break
+
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        image = in_flight.pop(future)
+                        error = future.exception()
+                        result = None if error else future.result()
+                        self._on_upload_finished(image, result, error)
+                        if error is None:
+                            uploaded_count += 1
+                        else:
+                            skipped_count += 1
+                        finished_since_save += 1
                         pbar.update(1)
-            
+
+                    if finished_since_save >= self.MANIFEST_SAVE_INTERVAL:
+                        self._save_progress()
+                        finished_since_save = 0
+
+            self._save_progress()
             print(f"\n上传完成: 成功 {uploaded_count} 个，失败 {skipped_count} 个")
         else:
             print("\n没有需要上传的文件")
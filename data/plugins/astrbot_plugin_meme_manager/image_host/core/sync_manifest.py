@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class SyncManifest:
+    """同步清单 - 按内容哈希记录每个文件的上传状态，支持中断后续传
+
+    清单结构:
+        {
+            "files": {"<sha256>": {"state": "done", "rel_paths": ["..."], ...}},
+            "paths": {"<rel_path>": {"mtime_ns": 0, "size": 0, "hash": "<sha256>"}}
+        }
+
+    ``paths`` 用于增量检测：mtime 和 size 都未变化的文件直接复用缓存的哈希，
+    只有发生变化的文件才需要重新读取并计算哈希。
+    """
+
+    PENDING = "pending"
+    UPLOADING = "uploading"
+    DONE = "done"
+    FAILED = "failed"
+
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, manifest_file: Path):
+        self.manifest_file = Path(manifest_file)
+        self.files: Dict[str, dict] = {}
+        self.paths: Dict[str, dict] = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        """加载同步清单，并把上次中断时处于 uploading 的条目重置为 pending"""
+        self.files = {}
+        self.paths = {}
+        if self.manifest_file.exists():
+            try:
+                with open(self.manifest_file, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                self.files = data.get("files", {})
+                self.paths = data.get("paths", {})
+                logger.info(f"加载同步清单: {len(self.files)} 个文件")
+            except Exception as e:
+                logger.error(f"加载同步清单失败: {e}")
+
+        interrupted = 0
+        for entry in self.files.values():
+            if entry.get("state") == self.UPLOADING:
+                entry["state"] = self.PENDING
+                interrupted += 1
+        if interrupted:
+            logger.info(f"发现 {interrupted} 个上次中断的上传，已重新加入队列")
+            self._dirty = True
+
+    def save(self, force: bool = False):
+        """保存同步清单（先写临时文件再替换，避免中断时写坏清单）"""
+        if not (self._dirty or force):
+            return
+        try:
+            self.manifest_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = self.manifest_file.with_suffix(".tmp")
+            with open(tmp_file, "w", encoding="utf-8") as f:
+                json.dump(
+                    {"files": self.files, "paths": self.paths},
+                    f,
+                    ensure_ascii=False,
+                )
+            tmp_file.replace(self.manifest_file)
+            self._dirty = False
+        except Exception as e:
+            logger.error(f"保存同步清单失败: {e}")
+
+    @classmethod
+    def compute_hash(cls, file_path: Path) -> str:
+        """计算文件内容的 sha256"""
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(cls.HASH_CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    def get_hash(self, rel_path: str, file_path: Path) -> str:
+        """获取文件哈希，mtime 与 size 未变化时直接使用缓存"""
+        stat = file_path.stat()
+        cached = self.paths.get(rel_path)
+        if (
+            cached
+            and cached.get("mtime_ns") == stat.st_mtime_ns
+            and cached.get("size") == stat.st_size
+        ):
+            return cached["hash"]
+
+        content_hash = self.compute_hash(file_path)
+        self.paths[rel_path] = {
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size,
+            "hash": content_hash,
+        }
+        self._dirty = True
+        return content_hash
+
+    def get_state(self, content_hash: str) -> Optional[str]:
+        """获取文件状态，未记录时返回 None"""
+        entry = self.files.get(content_hash)
+        return entry.get("state") if entry else None
+
+    def is_done(self, content_hash: str, rel_path: str) -> bool:
+        """检查该内容是否已上传到指定路径（同一内容放在不同分类下需分别上传）"""
+        entry = self.files.get(content_hash)
+        return bool(entry) and rel_path in entry.get("rel_paths", [])
+
+    def set_state(
+        self,
+        content_hash: str,
+        state: str,
+        rel_path: str = "",
+        remote_url: str = "",
+        error: str = "",
+    ):
+        """更新文件状态"""
+        entry = self.files.setdefault(content_hash, {"attempts": 0})
+        entry["state"] = state
+        entry["updated_at"] = time.time()
+        if rel_path:
+            entry["rel_path"] = rel_path
+        if remote_url:
+            entry["remote_url"] = remote_url
+        if state == self.UPLOADING:
+            entry["attempts"] = entry.get("attempts", 0) + 1
+        if state == self.DONE and rel_path:
+            rel_paths = entry.setdefault("rel_paths", [])
+            if rel_path not in rel_paths:
+                rel_paths.append(rel_path)
+        if state == self.FAILED:
+            entry["error"] = error
+        else:
+            entry.pop("error", None)
+        self._dirty = True
+
+    def prune_paths(self, existing_rel_paths):
+        """移除本地已不存在的路径缓存"""
+        stale = set(self.paths) - set(existing_rel_paths)
+        for rel_path in stale:
+            del self.paths[rel_path]
+        if stale:
+            self._dirty = True
+
+    def count_by_state(self) -> Dict[str, int]:
+        """按状态统计文件数量"""
+        counts = {self.PENDING: 0, self.UPLOADING: 0, self.DONE: 0, self.FAILED: 0}
+        for entry in self.files.values():
+            state = entry.get("state", self.PENDING)
+            counts[state] = counts.get(state, 0) + 1
+        return counts
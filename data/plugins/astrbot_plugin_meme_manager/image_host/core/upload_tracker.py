@@ -42,8 +42,8 @@ class UploadTracker:
         rel_path = str(Path(category) / file_path.name) if category else file_path.name
         return rel_path in self.uploaded_files
     
-    def mark_uploaded(self, file_path: Path, category: str = "", remote_url: str = ""):
-        """标记文件为已上传"""
+    def mark_uploaded(self, file_path: Path, category: str = "", remote_url: str = "", save: bool = True):
+        """标记文件为已上传，批量上传时可传入 save=False 并由调用方统一保存"""
         import time
         
         rel_path = str(Path(category) / file_path.name) if category else file_path.name
@@ -55,7 +55,8 @@ class UploadTracker:
             "upload_time": time.time(),
             "file_size": file_path.stat().st_size if file_path.exists() else 0
         }
-        self.save()
+        if save:
+            self.save()
         logger.info(f"标记为已上传: {rel_path}")
     
     def get_uploaded_count(self) -> int:
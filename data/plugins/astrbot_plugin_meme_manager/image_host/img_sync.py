@@ -1,8 +1,9 @@
 from pathlib import Path
 from typing import Dict, List, Union
 from .core.sync_manager import SyncManager
+from .core.sync_manifest import SyncManifest
 from .core.upload_tracker import UploadTracker
-from .providers import StarDotsProvider, CloudflareR2Provider
+from .providers import StarDotsProvider, CloudflareR2Provider, LocalProvider
 import multiprocessing
 import sys
 import asyncio
@@ -37,18 +38,26 @@ class ImageSync:
         sync.sync_all()
     """
 
-    def __init__(self, config: Dict[str, str], local_dir: Union[str, Path], provider_type: str = "stardots"):
+    def __init__(
+        self,
+        config: Dict[str, str],
+        local_dir: Union[str, Path],
+        provider_type: str = "stardots",
+        max_workers: int = SyncManager.DEFAULT_MAX_WORKERS,
+    ):
         """
         初始化同步客户端
 
         Args:
             config: 包含图床配置信息的字典
             local_dir: 本地图片目录的路径
-            provider_type: 图床提供者类型，可选 "stardots" 或 "cloudflare_r2"
+            provider_type: 图床提供者类型，可选 "stardots"、"cloudflare_r2" 或 "local"（离线调试）
+            max_workers: 上传并发数
         """
         self.config = config
         self.local_dir = Path(local_dir)
         self.provider_type = provider_type
+        self.max_workers = max_workers
         
         # 根据 provider_type 初始化对应的 provider
         if provider_type == "stardots":
@@ -62,15 +71,24 @@ class ImageSync:
             )
         elif provider_type == "cloudflare_r2":
             self.provider = CloudflareR2Provider(config)
+        elif provider_type == "local":
+            self.provider = LocalProvider({**config, "local_dir": str(local_dir)})
         else:
             raise ValueError(f"不支持的图床提供者类型: {provider_type}")
         
         # 初始化上传追踪器（仅用于记录已上传文件）
         tracker_file = Path(local_dir) / ".upload_tracker.json"
         self.upload_tracker = UploadTracker(tracker_file)
+
+        # 同步清单：按内容哈希记录上传状态，支持中断续传与增量检测
+        self.manifest = SyncManifest(Path(local_dir) / ".sync_manifest.json")
         
         self.sync_manager = SyncManager(
-            image_host=self.provider, local_dir=self.local_dir, upload_tracker=self.upload_tracker
+            image_host=self.provider,
+            local_dir=self.local_dir,
+            upload_tracker=self.upload_tracker,
+            manifest=self.manifest,
+            max_workers=max_workers,
         )
         
         self.sync_process = None
@@ -115,7 +133,8 @@ class ImageSync:
 
         # 创建并启动进程
         self.sync_process = multiprocessing.Process(
-            target=run_sync_process, args=(self.config, str(self.local_dir), task)
+            target=run_sync_process,
+            args=(self.config, str(self.local_dir), task, self.max_workers),
         )
         self.sync_process.start()
 
@@ -219,7 +238,8 @@ class ImageSync:
         """
         # 创建进程对象
         process = multiprocessing.Process(
-            target=run_sync_process, args=(self.config, str(self.local_dir), task)
+            target=run_sync_process,
+            args=(self.config, str(self.local_dir), task, self.max_workers),
         )
 
         # 启动进程
@@ -227,7 +247,12 @@ class ImageSync:
         return process
 
 
-def run_sync_process(config: Dict[str, str], local_dir: str, task: str):
+def run_sync_process(
+    config: Dict[str, str],
+    local_dir: str,
+    task: str,
+    max_workers: int = SyncManager.DEFAULT_MAX_WORKERS,
+):
     """
     在独立进程中运行同步任务
     """
@@ -243,6 +268,9 @@ def run_sync_process(config: Dict[str, str], local_dir: str, task: str):
             # 如果是 stardots 配置
             provider_config = config["stardots"]
             provider_type = "stardots"
+        elif "local" in config:
+            provider_config = config["local"]
+            provider_type = "local"
         elif "account_id" in config:
             # 如果是直接的 R2 配置
             provider_config = config
@@ -251,11 +279,15 @@ def run_sync_process(config: Dict[str, str], local_dir: str, task: str):
             # 如果是直接的 stardots 配置
             provider_config = config
             provider_type = "stardots"
+        elif "remote_dir" in config:
+            # 如果是本地离线图床配置
+            provider_config = config
+            provider_type = "local"
         else:
             logger.error(f"无法识别的配置格式: {list(config.keys())}")
             sys.exit(1)
         
-        sync = ImageSync(provider_config, local_dir, provider_type)
+        sync = ImageSync(provider_config, local_dir, provider_type, max_workers)
 
         if task == "upload":
             logger.info("开始上传任务")
@@ -2,10 +2,12 @@
 
 from .stardots_provider import StarDotsProvider
 from .cloudflare_r2_provider import CloudflareR2Provider
+from .local_provider import LocalProvider
 from .provider_template import ProviderTemplate as ImageHostProvider
 
 __all__ = [
     "StarDotsProvider",
     "CloudflareR2Provider", 
+    "LocalProvider",
     "ImageHostProvider"
 ]
\ No newline at end of file
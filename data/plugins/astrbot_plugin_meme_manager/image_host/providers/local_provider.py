@@ -0,0 +1,118 @@
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List
+from ..interfaces.image_host import ImageHostInterface
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class LocalProvider(ImageHostInterface):
+    """本地目录图床提供者
+
+    把另一个本地目录当作"远程图床"，不依赖网络，用于离线调试同步流程。
+    可通过 upload_delay 模拟网络延迟，通过 fail_names 模拟指定文件上传失败。
+    """
+
+    def __init__(self, config: Dict):
+        """
+        初始化本地图床
+
+        Args:
+            config: {
+                'remote_dir': '模拟远程存储的目录',
+                'local_dir': '本地表情包目录，用于计算分类',
+                'upload_delay': 0.0,
+                'fail_names': []
+            }
+        """
+        if not config.get("remote_dir"):
+            raise ValueError("Missing required config fields: {'remote_dir'}")
+        self.config = config
+        self.remote_dir = Path(config["remote_dir"])
+        self.remote_dir.mkdir(parents=True, exist_ok=True)
+        self.local_dir = Path(config.get("local_dir", ""))
+        self.upload_delay = float(config.get("upload_delay", 0) or 0)
+        self.fail_names = set(config.get("fail_names", []))
+
+        self._lock = threading.Lock()
+        self.upload_count = 0
+        self.max_concurrent_uploads = 0
+        self._active_uploads = 0
+
+    def _get_rel_path(self, file_path: Path) -> Path:
+        try:
+            return file_path.relative_to(self.local_dir)
+        except ValueError:
+            return Path(file_path.name)
+
+    def upload_image(self, file_path: Path) -> Dict[str, str]:
+        """复制图片到模拟的远程目录"""
+        with self._lock:
+            self._active_uploads += 1
+            self.max_concurrent_uploads = max(
+                self.max_concurrent_uploads, self._active_uploads
+            )
+        try:
+            if self.upload_delay:
+                time.sleep(self.upload_delay)
+            if file_path.name in self.fail_names:
+                raise IOError(f"模拟上传失败: {file_path.name}")
+
+            rel_path = self._get_rel_path(file_path)
+            target = self.remote_dir / rel_path
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(file_path, target)
+
+            with self._lock:
+                self.upload_count += 1
+
+            category = str(rel_path.parent).replace("\\", "/")
+            if category == ".":
+                category = ""
+            return {
+                "url": target.as_uri(),
+                "id": str(rel_path).replace("\\", "/"),
+                "filename": rel_path.name,
+                "category": category,
+            }
+        finally:
+            with self._lock:
+                self._active_uploads -= 1
+
+    def delete_image(self, image_hash: str) -> bool:
+        target = self.remote_dir / image_hash
+        if target.is_file():
+            target.unlink()
+            return True
+        return False
+
+    def get_image_list(self) -> List[Dict[str, str]]:
+        images = []
+        for file_path in self.remote_dir.rglob("*"):
+            if not file_path.is_file():
+                continue
+            rel_path = file_path.relative_to(self.remote_dir)
+            category = str(rel_path.parent).replace("\\", "/")
+            if category == ".":
+                category = ""
+            images.append(
+                {
+                    "url": file_path.as_uri(),
+                    "id": str(rel_path).replace("\\", "/"),
+                    "filename": rel_path.name,
+                    "category": category,
+                }
+            )
+        return images
+
+    def download_image(self, image_info: Dict[str, str], save_path: Path) -> bool:
+        source = self.remote_dir / image_info["id"]
+        if not source.is_file():
+            logger.error(f"下载失败，文件不存在: {image_info['id']}")
+            return False
+        save_path.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copyfile(source, save_path)
+        return True
@@ -23,12 +23,17 @@ from astrbot.core.message.message_event_result import MessageChain, ResultConten
 
 from .backend.category_manager import CategoryManager
 from .config import DEFAULT_CATEGORY_DESCRIPTIONS, MEMES_DATA_PATH, MEMES_DIR
+from .emotion_parser import EmotionParser
 from .image_host.img_sync import ImageSync
 from .init import init_plugin
 from .utils import dict_to_string, generate_secret_key, get_public_ip, load_json
 from .webui import ServerState, run_server
 
 
+# 事件上存放识别出的表情列表的键
+FOUND_EMOTIONS_EXTRA_KEY = "meme_manager_found_emotions"
+
+
 @register(
     "meme_manager", "anka", "anka - 表情包管理器 - 支持表情包发送及表情包上传", "3.18"
 )
@@ -47,6 +52,7 @@ class MemeSender(Star):
         # 初始化图床同步客户端
         self.img_sync = None
         image_host_type = self.config.get("image_host", "stardots")
+        sync_concurrency = self.config.get("sync_concurrency", 4)
 
         if image_host_type == "stardots":
             stardots_config = self.config.get("image_host_config", {}).get(
@@ -64,6 +70,7 @@ class MemeSender(Star):
                     },
                     local_dir=MEMES_DIR,
                     provider_type="stardots",
+                    max_workers=sync_concurrency,
                 )
         elif image_host_type == "cloudflare_r2":
             r2_config = self.config.get("image_host_config", {}).get(
@@ -82,7 +89,10 @@ class MemeSender(Star):
                 # 添加提供商信息到配置中
                 r2_config["provider"] = "cloudflare_r2"
                 self.img_sync = ImageSync(
-                    config=r2_config, local_dir=MEMES_DIR, provider_type="cloudflare_r2"
+                    config=r2_config,
+                    local_dir=MEMES_DIR,
+                    provider_type="cloudflare_r2",
+                    max_workers=sync_concurrency,
                 )
                 # 延迟日志记录，避免 logger 未初始化
                 self._r2_bucket_name = r2_config.get("bucket_name")
@@ -94,7 +104,8 @@ class MemeSender(Star):
         self.server_port = self.config.get("webui_port", 5000)
 
         # 初始化表情状态
-        self.found_emotions = []  # 存储找到的表情
+        self._emotion_parser = None  # 表情解析器，按分类与配置缓存
+        self._emotion_parser_key = None
         self.upload_states = {}  # 存储上传状态：{user_session: {"category": str, "expire_time": float}}
         self.pending_images = {}  # 存储待发送的图片
 
@@ -398,25 +409,6 @@ class MemeSender(Star):
         except Exception as e:
             self.logger.error(f"重新加载表情配置失败: {str(e)}")
 
-    def _is_position_in_thinking_tags(self, text: str, position: int) -> bool:
-        """检查指定位置是否在thinking标签内
-
-        Args:
-            text: 原始文本
-            position: 要检查的位置
-
-        Returns:
-            True如果位置在thinking标签内，False否则
-        """
-        import re
-        # 找到所有thinking标签的开始和结束位置
-        thinking_pattern = re.compile(r"<think(?:ing)?>.*?</think(?:ing)?>", re.DOTALL | re.IGNORECASE)
-
-        for match in thinking_pattern.finditer(text):
-            if match.start() <= position < match.end():
-                return True
-        return False
-
     def _check_meme_directories(self):
         """检查表情包目录是否存在并且包含图片"""
         self.logger.info(f"开始检查表情包根目录: {MEMES_DIR}")
@@ -444,6 +436,27 @@ class MemeSender(Star):
                     f"表情分类 {emotion} 对应的目录 {emotion_path} 包含 {len(memes)} 个图片"
                 )
 
+    def _get_emotion_parser(self) -> EmotionParser:
+        """获取表情解析器，表情分类或相关配置变化时重新构建"""
+        high_confidence_emotions = self.config.get("high_confidence_emotions", [])
+        key = (
+            frozenset(self.category_mapping.keys()),
+            self.config.get("enable_alternative_markup", True),
+            self.config.get("enable_repeated_emotion_detection", True),
+            self.config.get("enable_loose_emotion_matching", True),
+            frozenset(high_confidence_emotions),
+        )
+        if self._emotion_parser is None or self._emotion_parser_key != key:
+            self._emotion_parser = EmotionParser(
+                key[0],
+                enable_alternative_markup=key[1],
+                enable_repeated_emotion_detection=key[2],
+                enable_loose_emotion_matching=key[3],
+                high_confidence_emotions=high_confidence_emotions,
+            )
+            self._emotion_parser_key = key
+        return self._emotion_parser
+
     @filter.on_llm_response(priority=99999)
     async def resp(self, event: AstrMessageEvent, response: LLMResponse):
         """处理 LLM 响应，识别表情"""
@@ -451,242 +464,23 @@ class MemeSender(Star):
         if not response or not response.completion_text:
             return
 
-        text = response.completion_text
-        self.found_emotions = []  # 重置表情列表
-        valid_emoticons = set(self.category_mapping.keys())  # 预加载合法表情集合
-
-        clean_text = text
-
-        # 第一阶段：严格匹配符号包裹的表情
-        hex_pattern = r"&&([^&&]+)&&"
-        matches = re.finditer(hex_pattern, clean_text)
-
-        # 严格模式处理
-        temp_replacements = []
-        for match in matches:
-            original = match.group(0)
-            emotion = match.group(1).strip()
-
-            # 合法性验证
-            if emotion in valid_emoticons:
-                temp_replacements.append((original, emotion))
-            else:
-                temp_replacements.append((original, ""))  # 非法表情静默移除
-
-        # 保持原始顺序替换
-        for original, emotion in temp_replacements:
-            clean_text = clean_text.replace(original, "", 1)  # 每次替换第一个匹配项
-            if emotion:
-                self.found_emotions.append(emotion)
-
-        # 第二阶段：替代标记处理（如[emotion]、(emotion)等）
-        if self.config.get("enable_alternative_markup", True):
-            # 处理[emotion]格式
-            bracket_pattern = r"\[([^\[\]]+)\]"
-            matches = re.finditer(bracket_pattern, clean_text)
-            bracket_replacements = []
-            invalid_brackets = []
-
-            for match in matches:
-                original = match.group(0)
-                emotion = match.group(1).strip()
-
-                if emotion in valid_emoticons:
-                    bracket_replacements.append((original, emotion))
-                else:
-                    # 记录无效标记，稍后删除
-                    invalid_brackets.append(original)
-
-            # 删除所有无效标记
-            for invalid in invalid_brackets:
-                clean_text = clean_text.replace(invalid, "", 1)
-
-            for original, emotion in bracket_replacements:
-                clean_text = clean_text.replace(original, "", 1)
-                self.found_emotions.append(emotion)
-
-            # 处理(emotion)格式
-            paren_pattern = r"\(([^()]+)\)"
-            matches = re.finditer(paren_pattern, clean_text)
-            paren_replacements = []
-            invalid_parens = []
-
-            for match in matches:
-                original = match.group(0)
-                emotion = match.group(1).strip()
-
-                if emotion in valid_emoticons:
-                    # 需要额外验证，确保不是普通句子的一部分
-                    if self._is_likely_emotion_markup(
-                        original, clean_text, match.start()
-                    ):
-                        paren_replacements.append((original, emotion))
-                else:
-                    # 记录无效标记，稍后删除
-                    invalid_parens.append(original)
-
-            # 删除所有无效标记
-            for invalid in invalid_parens:
-                clean_text = clean_text.replace(invalid, "", 1)
-
-            for original, emotion in paren_replacements:
-                clean_text = clean_text.replace(original, "", 1)
-                self.found_emotions.append(emotion)
-
-        # 第三阶段：处理重复表情模式（如angryangryangry）
-        if self.config.get("enable_repeated_emotion_detection", True):
-            high_confidence_emotions = self.config.get("high_confidence_emotions", [])
-
-            for emotion in valid_emoticons:
-                # 跳过太短的表情词，避免误判
-                if len(emotion) < 3:
-                    continue
-
-                # 对高置信度表情，重复两次即可识别
-                if emotion in high_confidence_emotions:
-                    # 检测重复两次的模式，如 happyhappy
-                    repeat_pattern = f"({re.escape(emotion)})\\1{{1,}}"
-                    matches = re.finditer(repeat_pattern, clean_text)
-                    for match in matches:
-                        # 跳过thinking标签内的内容
-                        if self._is_position_in_thinking_tags(clean_text, match.start()):
-                            continue
-                        original = match.group(0)
-                        clean_text = clean_text.replace(original, "", 1)
-                        self.found_emotions.append(emotion)
-                else:
-                    # 普通表情词需要重复至少3次才识别
-                    # 只检查长度>=4的表情，以减少误判
-                    if len(emotion) >= 4:
-                        # 查找表情词重复3次以上的模式
-                        repeat_pattern = f"({re.escape(emotion)})\\1{{2,}}"
-                        matches = re.finditer(repeat_pattern, clean_text)
-                        for match in matches:
-                            # 跳过thinking标签内的内容
-                            if self._is_position_in_thinking_tags(clean_text, match.start()):
-                                continue
-                            original = match.group(0)
-                            clean_text = clean_text.replace(original, "", 1)
-                            self.found_emotions.append(emotion)
-
-        # 第四阶段：智能识别可能的表情（松散模式）
-        if self.config.get("enable_loose_emotion_matching", True):
-            # 查找所有可能的表情词
-            for emotion in valid_emoticons:
-                # 使用单词边界确保不是其他单词的一部分
-                pattern = r"\b(" + re.escape(emotion) + r")\b"
-                for match in re.finditer(pattern, clean_text):
-                    word = match.group(1)
-                    position = match.start()
-
-                    # 跳过thinking标签内的内容
-                    if self._is_position_in_thinking_tags(clean_text, position):
-                        continue
-
-                    # 判断是否可能是表情而非英文单词
-                    if self._is_likely_emotion(
-                        word, clean_text, position, valid_emoticons
-                    ):
-                        # 添加到表情列表
-                        self.found_emotions.append(word)
-                        # 替换文本中的表情词
-                        clean_text = (
-                            clean_text[:position] + clean_text[position + len(word) :]
-                        )
+        clean_text, emotions = self._get_emotion_parser().parse(
+            response.completion_text
+        )
 
         # 去重并应用数量限制
         seen = set()
         filtered_emotions = []
-        for emo in self.found_emotions:
+        for emo in emotions:
             if emo not in seen:
                 seen.add(emo)
                 filtered_emotions.append(emo)
             if len(filtered_emotions) >= self.max_emotions_per_message:
                 break
 
-        self.found_emotions = filtered_emotions
-
-        # 防御性清理残留符号
-        clean_text = re.sub(r"&&+", "", clean_text)  # 清除未成对的&&符号
-        response.completion_text = clean_text.strip()
-
-    def _is_likely_emotion_markup(self, markup, text, position):
-        """判断一个标记是否可能是表情而非普通文本的一部分"""
-        # 获取标记前后的文本
-        before_text = text[:position].strip()
-        after_text = text[position + len(markup) :].strip()
-
-        # 如果是在中文上下文中，更可能是表情
-        has_chinese_before = bool(
-            re.search(r"[\u4e00-\u9fff]", before_text[-1:] if before_text else "")
-        )
-        has_chinese_after = bool(
-            re.search(r"[\u4e00-\u9fff]", after_text[:1] if after_text else "")
-        )
-        if has_chinese_before or has_chinese_after:
-            return True
-
-        # 如果在数字标记中，可能是引用标记如[1]，不是表情
-        if re.match(r"\[\d+\]", markup):
-            return False
-
-        # 如果标记内有空格，可能是普通句子，不是表情
-        if " " in markup[1:-1]:
-            return False
-
-        # 如果标记前后是完整的英文句子，可能不是表情
-        english_context_before = bool(re.search(r"[a-zA-Z]\s+$", before_text))
-        english_context_after = bool(re.search(r"^\s+[a-zA-Z]", after_text))
-        if english_context_before and english_context_after:
-            return False
-
-        # 默认情况下认为可能是表情
-        return True
-
-    def _is_likely_emotion(self, word, text, position, valid_emotions):
-        """判断一个单词是否可能是表情而非普通英文单词"""
-
-        # 先获取上下文
-        before_text = text[:position].strip()
-        after_text = text[position + len(word) :].strip()
-
-        # 规则1：检查是否在英文上下文中
-        # 如果前面有英文单词+空格，或后面有空格+英文单词，可能是英文上下文
-        english_context_before = bool(re.search(r"[a-zA-Z]\s+$", before_text))
-        english_context_after = bool(re.search(r"^\s+[a-zA-Z]", after_text))
-
-        # 在英文上下文中，不太可能是表情
-        if english_context_before or english_context_after:
-            return False
-
-        # 规则2：前后有中文字符，更可能是表情
-        has_chinese_before = bool(
-            re.search(r"[\u4e00-\u9fff]", before_text[-1:] if before_text else "")
-        )
-        has_chinese_after = bool(
-            re.search(r"[\u4e00-\u9fff]", after_text[:1] if after_text else "")
-        )
-
-        if has_chinese_before or has_chinese_after:
-            return True
-
-        # 规则3：如果是句子开头或结尾，可能是表情
-        if not before_text or before_text.endswith(
-            ("。", "，", "！", "？", ".", ",", ":", ";", "!", "?", "\n")
-        ):
-            return True
-
-        # 规则4：如果前后都是标点或空格，可能是表情
-        if (not before_text or before_text[-1] in " \t\n.,!?;:'\"()[]{}") and (
-            not after_text or after_text[0] in " \t\n.,!?;:'\"()[]{}"
-        ):
-            return True
-
-        # 规则5：如果是已知的表情占比很高(>=70%)的单词，即使在英文上下文中也可能是表情
-        if word in self.config.get("high_confidence_emotions", []):
-            return True
-
-        return False
+        # 表情结果挂在事件上，避免并发会话之间互相串表情
+        event.set_extra(FOUND_EMOTIONS_EXTRA_KEY, filtered_emotions)
+        response.completion_text = clean_text
 
     @filter.on_decorating_result(priority=99999)
     async def on_decorating_result(self, event: AstrMessageEvent):
@@ -730,12 +524,13 @@ class MemeSender(Star):
                             cleaned_components.append(component)
 
             # 第二步：添加表情图片（如果有找到的表情）
-            if self.found_emotions:
+            found_emotions = event.get_extra(FOUND_EMOTIONS_EXTRA_KEY) or []
+            if found_emotions:
                 # 检查概率（注意：概率判断是"小于等于"才发送）
                 if random.randint(1, 100) <= self.emotions_probability:
                     # 创建表情图片列表
                     emotion_images = []
-                    for emotion in self.found_emotions:
+                    for emotion in found_emotions:
                         if not emotion:
                             continue
 
@@ -776,7 +571,7 @@ class MemeSender(Star):
                         self.logger.info("没有找到表情图片")
 
                 # 清空已处理的表情列表
-                self.found_emotions = []
+                event.set_extra(FOUND_EMOTIONS_EXTRA_KEY, [])
 
             # 第三步：更新消息链
             if cleaned_components:
@@ -0,0 +1,259 @@
+import asyncio
+import re
+from types import SimpleNamespace
+
+import pytest
+
+from data.plugins.astrbot_plugin_meme_manager.emotion_parser import EmotionParser
+
+EMOTIONS = ["angry", "happy", "sad", "surprised", "confused", "开心", "生气"]
+HIGH_CONFIDENCE = ["happy", "angry"]
+
+CORPUS = [
+    "今天天气不错&&happy&&",
+    "&&angry&&你怎么又迟到了",
+    "好的[开心]马上来",
+    "我有点难过(sad)",
+    "This is a sad story, but I am fine.",
+    "He was angry at me (really).",
+    "angryangryangry 不要再这样了",
+    "happyhappy！今天放假",
+    "surprisedsurprisedsurprised",
+    "参考文献[1]里写得很清楚[happy]",
+    "happy",
+    "嗯，happy。",
+    "I feel happy today",
+    "&&unknown&&这个标签不存在",
+    "[unknown]无效的方括号会被删掉",
+    "(unknown) 无效的圆括号也会被删掉",
+    "<think>用户好像很 angry</think>好的，我明白了",
+    "<thinking>happy?</thinking>没问题&&happy&&",
+    "连续表情&&happy&&&&sad&&结尾",
+    "混合 [生气] 和 &&开心&& 还有 confused。",
+    "sad, confused, angry",
+    "残留的&&符号&&&",
+    "",
+    "普通回复，没有表情。",
+    "The (confused) cat.",
+    "答案是(happy)吧",
+]
+
+
+def legacy_parse(text, valid_emoticons, config):
+    """改动前 resp 中的分阶段正则实现（去掉去重与数量限制）"""
+    found = []
+    thinking = re.compile(
+        r"<think(?:ing)?>.*?</think(?:ing)?>", re.DOTALL | re.IGNORECASE
+    )
+
+    def in_thinking(text, position):
+        return any(m.start() <= position < m.end() for m in thinking.finditer(text))
+
+    def likely_markup(markup, text, position):
+        before_text = text[:position].strip()
+        after_text = text[position + len(markup) :].strip()
+        if re.search(r"[\u4e00-\u9fff]", before_text[-1:]) or re.search(
+            r"[\u4e00-\u9fff]", after_text[:1]
+        ):
+            return True
+        if re.match(r"\[\d+\]", markup):
+            return False
+        if " " in markup[1:-1]:
+            return False
+        if re.search(r"[a-zA-Z]\s+$", before_text) and re.search(
+            r"^\s+[a-zA-Z]", after_text
+        ):
+            return False
+        return True
+
+    def likely_emotion(word, text, position):
+        before_text = text[:position].strip()
+        after_text = text[position + len(word) :].strip()
+        if re.search(r"[a-zA-Z]\s+$", before_text) or re.search(
+            r"^\s+[a-zA-Z]", after_text
+        ):
+            return False
+        if re.search(r"[\u4e00-\u9fff]", before_text[-1:]) or re.search(
+            r"[\u4e00-\u9fff]", after_text[:1]
+        ):
+            return True
+        if not before_text or before_text.endswith(
+            ("。", "，", "！", "？", ".", ",", ":", ";", "!", "?", "\n")
+        ):
+            return True
+        if (not before_text or before_text[-1] in " \t\n.,!?;:'\"()[]{}") and (
+            not after_text or after_text[0] in " \t\n.,!?;:'\"()[]{}"
+        ):
+            return True
+        return word in config["high_confidence_emotions"]
+
+    clean_text = text
+    replacements = []
+    for match in re.finditer(r"&&([^&&]+)&&", clean_text):
+        emotion = match.group(1).strip()
+        replacements.append(
+            (match.group(0), emotion if emotion in valid_emoticons else "")
+        )
+    for original, emotion in replacements:
+        clean_text = clean_text.replace(original, "", 1)
+        if emotion:
+            found.append(emotion)
+
+    if config["enable_alternative_markup"]:
+        for pattern, check in ((r"\[([^\[\]]+)\]", False), (r"\(([^()]+)\)", True)):
+            valid, invalid = [], []
+            for match in re.finditer(pattern, clean_text):
+                emotion = match.group(1).strip()
+                if emotion not in valid_emoticons:
+                    invalid.append(match.group(0))
+                elif not check or likely_markup(
+                    match.group(0), clean_text, match.start()
+                ):
+                    valid.append((match.group(0), emotion))
+            for original in invalid:
+                clean_text = clean_text.replace(original, "", 1)
+            for original, emotion in valid:
+                clean_text = clean_text.replace(original, "", 1)
+                found.append(emotion)
+
+    if config["enable_repeated_emotion_detection"]:
+        for emotion in valid_emoticons:
+            if len(emotion) < 3:
+                continue
+            if emotion in config["high_confidence_emotions"]:
+                repeat = f"({re.escape(emotion)})\\1{{1,}}"
+            elif len(emotion) >= 4:
+                repeat = f"({re.escape(emotion)})\\1{{2,}}"
+            else:
+                continue
+            for match in re.finditer(repeat, clean_text):
+                if in_thinking(clean_text, match.start()):
+                    continue
+                clean_text = clean_text.replace(match.group(0), "", 1)
+                found.append(emotion)
+
+    if config["enable_loose_emotion_matching"]:
+        for emotion in valid_emoticons:
+            pattern = r"\b(" + re.escape(emotion) + r")\b"
+            for match in re.finditer(pattern, clean_text):
+                word, position = match.group(1), match.start()
+                if in_thinking(clean_text, position):
+                    continue
+                if likely_emotion(word, clean_text, position):
+                    found.append(word)
+                    clean_text = (
+                        clean_text[:position] + clean_text[position + len(word) :]
+                    )
+
+    return re.sub(r"&&+", "", clean_text).strip(), found
+
+
+CONFIGS = [
+    dict(
+        enable_alternative_markup=True,
+        enable_repeated_emotion_detection=True,
+        enable_loose_emotion_matching=True,
+        high_confidence_emotions=HIGH_CONFIDENCE,
+    ),
+    dict(
+        enable_alternative_markup=False,
+        enable_repeated_emotion_detection=False,
+        enable_loose_emotion_matching=False,
+        high_confidence_emotions=[],
+    ),
+]
+
+
+@pytest.mark.parametrize("config", CONFIGS)
+@pytest.mark.parametrize("text", CORPUS)
+def test_matches_legacy_pipeline(text, config):
+    parser = EmotionParser(EMOTIONS, **config)
+    clean_text, emotions = parser.parse(text)
+    legacy_text, legacy_emotions = legacy_parse(text, set(EMOTIONS), config)
+    assert clean_text == legacy_text
+    # 旧实现按阶段收集，新实现按出现顺序收集
+    assert sorted(emotions) == sorted(legacy_emotions)
+
+
+def test_emotions_reported_in_text_order():
+    parser = EmotionParser(EMOTIONS, high_confidence_emotions=HIGH_CONFIDENCE)
+    assert parser.parse("先&&sad&&再[开心]最后(生气)")[1] == ["sad", "开心", "生气"]
+
+
+# ---------------------------------------------------------------- 并发事件
+class FakeEvent:
+    def __init__(self, text):
+        from astrbot.core.message.components import Plain
+        from astrbot.core.message.message_event_result import MessageEventResult
+
+        self._extras = {}
+        self._result = MessageEventResult()
+        self._result.chain = [Plain(text)]
+
+    def set_extra(self, key, value):
+        self._extras[key] = value
+
+    def get_extra(self, key=None, default=None):
+        return self._extras.get(key, default)
+
+    def get_result(self):
+        return self._result
+
+
+@pytest.fixture
+def meme_main():
+    return pytest.importorskip(
+        "data.plugins.astrbot_plugin_meme_manager.main",
+        reason="需要 AstrBot 与插件依赖",
+    )
+
+
+@pytest.fixture
+def plugin(meme_main, tmp_path, monkeypatch):
+    for emotion in EMOTIONS:
+        (tmp_path / emotion).mkdir()
+        (tmp_path / emotion / f"{emotion}.png").write_bytes(b"png")
+    monkeypatch.setattr(meme_main, "MEMES_DIR", str(tmp_path))
+
+    sender = meme_main.MemeSender.__new__(meme_main.MemeSender)
+    sender.config = dict(CONFIGS[0])
+    sender.category_mapping = {emotion: emotion for emotion in EMOTIONS}
+    sender.max_emotions_per_message = 2
+    sender.emotions_probability = 100
+    sender.content_cleanup_rule = "&&[a-zA-Z]*&&"
+    sender._emotion_parser = None
+    sender._emotion_parser_key = None
+    sender.logger = meme_main.logging.getLogger("meme_manager_test")
+    return sender
+
+
+def image_names(event):
+    from astrbot.core.message.components import Image
+
+    return [
+        comp.file.rsplit("/", 1)[-1]
+        for comp in event.get_result().chain
+        if isinstance(comp, Image)
+    ]
+
+
+def test_interleaved_events_keep_their_own_emotions(meme_main, plugin):
+    first, second = FakeEvent("好的&&happy&&"), FakeEvent("哼&&angry&&&&sad&&")
+    first_resp = SimpleNamespace(completion_text="好的&&happy&&")
+    second_resp = SimpleNamespace(completion_text="哼&&angry&&&&sad&&")
+
+    # 两个会话的 LLM 响应先后到达，装饰阶段以相反顺序执行
+    async def main():
+        await plugin.resp(first, first_resp)
+        await plugin.resp(second, second_resp)
+        await plugin.on_decorating_result(second)
+        await plugin.on_decorating_result(first)
+
+    asyncio.run(main())
+
+    assert first_resp.completion_text == "好的"
+    assert second_resp.completion_text == "哼"
+    assert image_names(first) == ["happy.png"]
+    assert sorted(image_names(second)) == ["angry.png", "sad.png"]
+    assert first.get_extra(meme_main.FOUND_EMOTIONS_EXTRA_KEY) == []
+    assert second.get_extra(meme_main.FOUND_EMOTIONS_EXTRA_KEY) == []
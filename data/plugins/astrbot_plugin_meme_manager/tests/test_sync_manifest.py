@@ -0,0 +1,165 @@
+import json
+import threading
+from pathlib import Path
+
+import pytest
+
+from data.plugins.astrbot_plugin_meme_manager.image_host.core.sync_manifest import (
+    SyncManifest,
+)
+
+pytest.importorskip("tqdm")
+
+from data.plugins.astrbot_plugin_meme_manager.image_host.core.sync_manager import (  # noqa: E402
+    SyncManager,
+)
+
+
+class RecordingHost:
+    """记录上传的文件，不访问网络"""
+
+    def __init__(self):
+        self.config = {}
+        self.uploaded: list[str] = []
+        self._lock = threading.Lock()
+
+    def upload_image(self, file_path: Path) -> dict:
+        with self._lock:
+            self.uploaded.append(file_path.name)
+        return {"url": f"https://example.com/{file_path.name}"}
+
+    def get_image_list(self) -> list:
+        return []
+
+
+class Interrupted(Exception):
+    pass
+
+
+def make_images(local_dir: Path, count: int) -> list[str]:
+    names = []
+    for i in range(count):
+        category = local_dir / ("happy" if i % 2 else "sad")
+        category.mkdir(parents=True, exist_ok=True)
+        (category / f"{i}.png").write_bytes(f"image-{i}".encode())
+        names.append(f"{i}.png")
+    return names
+
+
+def test_uploading_entries_resume_as_pending(tmp_path):
+    manifest_file = tmp_path / ".sync_manifest.json"
+    manifest = SyncManifest(manifest_file)
+    manifest.set_state("a", SyncManifest.DONE, "happy/a.png", "https://x/a")
+    manifest.set_state("b", SyncManifest.UPLOADING, "happy/b.png")
+    manifest.set_state("c", SyncManifest.FAILED, "sad/c.png", error="boom")
+    manifest.save()
+
+    reloaded = SyncManifest(manifest_file)
+    assert reloaded.get_state("a") == SyncManifest.DONE
+    assert reloaded.get_state("b") == SyncManifest.PENDING
+    assert reloaded.get_state("c") == SyncManifest.FAILED
+    assert reloaded.is_done("a", "happy/a.png")
+    assert not reloaded.is_done("a", "sad/a.png")
+    assert reloaded.files["b"]["attempts"] == 1
+    # 重置后的状态需要写回磁盘
+    reloaded.save()
+    assert json.loads(manifest_file.read_text("utf-8"))["files"]["b"]["state"] == (
+        SyncManifest.PENDING
+    )
+
+
+def test_hash_cache_reused_until_file_changes(tmp_path, monkeypatch):
+    image = tmp_path / "a.png"
+    image.write_bytes(b"one")
+    manifest = SyncManifest(tmp_path / ".sync_manifest.json")
+    first = manifest.get_hash("a.png", image)
+
+    calls = []
+    compute = SyncManifest.compute_hash
+    monkeypatch.setattr(
+        SyncManifest,
+        "compute_hash",
+        classmethod(lambda cls, path: calls.append(path) or compute(path)),
+    )
+    assert manifest.get_hash("a.png", image) == first
+    assert not calls
+
+    image.write_bytes(b"changed")
+    assert manifest.get_hash("a.png", image) != first
+    assert calls == [image]
+
+
+def test_sync_resumes_after_interruption(tmp_path, monkeypatch):
+    local_dir = tmp_path / "memes"
+    names = make_images(local_dir, 12)
+    manifest_file = local_dir / ".sync_manifest.json"
+    monkeypatch.setattr(SyncManager, "MANIFEST_SAVE_INTERVAL", 1)
+
+    # 第一次同步在完成 5 个上传后被中断
+    first_host = RecordingHost()
+    manager = SyncManager(
+        first_host, local_dir, manifest=SyncManifest(manifest_file), max_workers=3
+    )
+    finished = 0
+    record = manager._on_upload_finished
+
+    def interrupt_after_five(image, result, error):
+        nonlocal finished
+        if finished == 5:
+            raise Interrupted()
+        finished += 1
+        record(image, result, error)
+
+    monkeypatch.setattr(manager, "_on_upload_finished", interrupt_after_five)
+    with pytest.raises(Interrupted):
+        manager.sync_to_remote()
+
+    on_disk = SyncManifest(manifest_file)
+    done = [
+        path
+        for entry in on_disk.files.values()
+        if entry["state"] == SyncManifest.DONE
+        for path in entry["rel_paths"]
+    ]
+    # 清单在每批上传结束后落盘，中断时未落盘的结果会在下次同步时重传
+    assert 0 < len(done) <= 5
+    assert on_disk.count_by_state()[SyncManifest.UPLOADING] == 0
+
+    # 重新同步只上传未完成的文件
+    second_host = RecordingHost()
+    SyncManager(
+        second_host, local_dir, manifest=on_disk, max_workers=3
+    ).sync_to_remote()
+    done_names = {Path(path).name for path in done}
+    assert sorted(second_host.uploaded) == sorted(set(names) - done_names)
+
+    final = SyncManifest(manifest_file)
+    assert final.count_by_state()[SyncManifest.DONE] == len(names)
+
+    # 全部完成后再次同步不会上传任何文件
+    third_host = RecordingHost()
+    SyncManager(third_host, local_dir, manifest=final).sync_to_remote()
+    assert third_host.uploaded == []
+
+
+def test_failed_uploads_are_retried(tmp_path):
+    local_dir = tmp_path / "memes"
+    make_images(local_dir, 4)
+    manifest_file = local_dir / ".sync_manifest.json"
+
+    class FlakyHost(RecordingHost):
+        def upload_image(self, file_path):
+            if file_path.name == "2.png":
+                raise IOError("network down")
+            return super().upload_image(file_path)
+
+    SyncManager(
+        FlakyHost(), local_dir, manifest=SyncManifest(manifest_file)
+    ).sync_to_remote()
+    manifest = SyncManifest(manifest_file)
+    counts = manifest.count_by_state()
+    assert counts[SyncManifest.DONE] == 3 and counts[SyncManifest.FAILED] == 1
+
+    retry_host = RecordingHost()
+    SyncManager(retry_host, local_dir, manifest=manifest).sync_to_remote()
+    assert retry_host.uploaded == ["2.png"]